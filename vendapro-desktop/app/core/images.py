@@ -0,0 +1,31 @@
+THUMB_SIZE = 40  # mesmo tamanho das fotos nas tabelas
+THUMB_QUALITY = 85
+
+
+def make_thumbnail(photo_bytes, size=THUMB_SIZE):
+    """Miniatura compacta (JPEG, ou PNG se tiver transparência) da foto.
+
+    Retorna b"" quando os bytes não são uma imagem válida, para que a linha
+    não seja reprocessada pelo backfill.
+    """
+    if not photo_bytes:
+        return None
+
+    # import local: o repositório pode ser usado sem Qt (scripts, benchmarks)
+    from PyQt5.QtCore import Qt, QBuffer, QByteArray, QIODevice
+    from PyQt5.QtGui import QImage
+
+    image = QImage()
+    if not image.loadFromData(bytes(photo_bytes)):
+        return b""
+    image = image.scaled(size, size, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    if image.hasAlphaChannel():
+        image.save(buffer, "PNG")
+    else:
+        image.save(buffer, "JPEG", THUMB_QUALITY)
+    buffer.close()
+    return bytes(data)
@@ -3,3 +3,5 @@ import os
 class Settings:
     DB_PATH = "db/vendapro.db"
     API_URL = os.getenv("API_URL", "http://localhost:8000")
+    # espera após a última tecla antes de pesquisar nas listagens
+    SEARCH_DEBOUNCE_MS = int(os.getenv("SEARCH_DEBOUNCE_MS", "250"))
@@ -0,0 +1,105 @@
+"""Índice em memória codigo_barra -> produto, para a leitura no caixa.
+
+Carregado no login só com as colunas escalares do produto (sem fotos). O
+repositório relê do banco os produtos que alterou, depois do commit, então
+o índice acompanha cadastros, edições, exclusões e movimentos de estoque
+feitos por este processo. Escritas de outro processo no mesmo arquivo não
+são vistas até o próximo login; o saldo mostrado é só informativo (a venda
+confere o estoque no banco).
+"""
+import threading
+
+from app.database.connection import manager
+
+PRODUCT_FIELDS = ("id", "nome", "marca", "valor", "quantidade", "codigo_barra")
+REFRESH_CHUNK = 500  # ids por consulta (limite de parâmetros do SQLite antigo)
+
+_SELECT = f"SELECT {', '.join(PRODUCT_FIELDS)} FROM produto"
+
+
+class BarcodeIndex:
+    """Produtos por código de barras, por banco de empresa.
+
+    `get` é uma consulta a um dict (sem SQL); `hits` e `misses` contam as
+    consultas respondidas ou não pelo índice (sob o lock, como o dict). `load` e `refresh` leem o
+    banco segurando o lock, para que duas atualizações concorrentes não
+    gravem no índice uma leitura mais antiga por cima de uma mais nova.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._products = {}  # db_path -> {codigo_barra: linha}
+        self._codes = {}     # db_path -> {produto_id: codigo_barra}
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, db_path):
+        with self._lock, manager.connection(db_path) as conn:
+            rows = conn.execute(_SELECT).fetchall()
+            self._products[db_path] = {row[5]: row for row in rows}
+            self._codes[db_path] = {row[0]: row[5] for row in rows}
+        return len(rows)
+
+    def loaded(self, db_path):
+        return db_path in self._products
+
+    def get(self, db_path, codigo_barra):
+        """Linha (PRODUCT_FIELDS) do produto, ou None se não estiver no índice"""
+        with self._lock:
+            products = self._products.get(db_path)
+            row = products.get(codigo_barra) if products is not None else None
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return row
+
+    def refresh(self, db_path, ids):
+        """Relê os produtos `ids`; chamar depois do commit de quem os alterou.
+
+        Produto que não existe mais sai do índice; código de barras trocado
+        tem a chave antiga removida.
+        """
+        ids = list(set(ids))
+        if not ids or db_path not in self._products:
+            return
+        with self._lock, manager.connection(db_path) as conn:
+            products = self._products.get(db_path)
+            codes = self._codes.get(db_path)
+            if products is None:
+                return  # fechado enquanto esperava o lock
+            rows = []
+            for start in range(0, len(ids), REFRESH_CHUNK):
+                chunk = ids[start:start + REFRESH_CHUNK]
+                rows += conn.execute(
+                    f"{_SELECT} WHERE id IN ({', '.join('?' * len(chunk))})", chunk
+                ).fetchall()
+
+            # remove tudo antes de inserir (dois produtos podem trocar de código)
+            for produto_id in ids:
+                old = codes.pop(produto_id, None)
+                if old is not None:
+                    products.pop(old, None)
+            for row in rows:
+                products[row[5]] = row
+                codes[row[0]] = row[5]
+
+    def drop(self, db_path):
+        with self._lock:
+            self._products.pop(db_path, None)
+            self._codes.pop(db_path, None)
+
+    def stats(self):
+        with self._lock:
+            hits, misses = self.hits, self.misses
+            produtos = sum(len(products) for products in self._products.values())
+        total = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / total if total else 0.0,
+            "produtos": produtos,
+        }
+
+
+barcode_index = BarcodeIndex()
@@ -0,0 +1,290 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+POOL_SIZE = 4  # conexões por banco reservadas para threads de trabalho
+PROGRESS_STEPS = 1000  # instruções da VM entre verificações de cancelamento
+CHECKPOINT_INTERVAL = 1.0  # segundos entre checkpoints do WAL em segundo plano
+WAL_LIMITE = 64 * 1024 * 1024  # WAL acima disso é zerado (checkpoint TRUNCATE)
+TRUNCATE_ESPERA_MS = 1000  # quanto o TRUNCATE espera os leitores terminarem
+
+# Perfis de armazenamento; o nome do perfil fica salvo em cada banco de
+# empresa (tabela configuracao) e é aplicado uma única vez por conexão.
+STORAGE_PROFILES = {
+    # WAL + synchronous=NORMAL: escritas não bloqueiam leitores e não há
+    # fsync a cada commit (o banco continua íntegro numa queda de energia,
+    # mas os últimos commits podem ser perdidos)
+    "fast": {
+        "journal_mode": "WAL",
+        "synchronous": "NORMAL",
+        "cache_size": -65536,      # 64 MB
+        "mmap_size": 268435456,    # 256 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": 5000,
+    },
+    # WAL + synchronous=FULL: fsync a cada commit, nada se perde
+    "durable": {
+        "journal_mode": "WAL",
+        "synchronous": "FULL",
+        "cache_size": -16384,      # 16 MB
+        "mmap_size": 67108864,     # 64 MB
+        "temp_store": "MEMORY",
+        "busy_timeout": 10000,
+    },
+}
+DEFAULT_PROFILE = "fast"
+
+
+def read_storage_profile(conn):
+    """Nome do perfil salvo no banco (ou o padrão se não houver)."""
+    try:
+        row = conn.execute(
+            "SELECT valor FROM configuracao WHERE chave = 'storage_profile'"
+        ).fetchone()
+    except sqlite3.OperationalError:
+        row = None  # banco global ou empresa ainda sem a tabela
+    if row and row[0] in STORAGE_PROFILES:
+        return row[0]
+    return DEFAULT_PROFILE
+
+
+def configure_connection(conn):
+    """Aplica o perfil do banco. Retorna True num banco de empresa (com a
+    tabela configuracao), onde o checkpoint do WAL sai do commit e fica com
+    o WalCheckpointer; o banco global mantém o checkpoint automático."""
+    cursor = conn.cursor()
+    cursor.execute(f"PRAGMA busy_timeout = {STORAGE_PROFILES[DEFAULT_PROFILE]['busy_timeout']}")
+    profile = STORAGE_PROFILES[read_storage_profile(conn)]
+    for pragma, value in profile.items():
+        cursor.execute(f"PRAGMA {pragma} = {value}")
+    empresa = cursor.execute(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'configuracao'"
+    ).fetchone() is not None
+    if empresa:
+        cursor.execute("PRAGMA wal_autocheckpoint = 0")
+        # quando o WAL recomeça do início, o arquivo volta a este tamanho
+        cursor.execute(f"PRAGMA journal_size_limit = {WAL_LIMITE}")
+    cursor.close()
+    return empresa
+
+
+class WalCheckpointer(threading.Thread):
+    """Copia o WAL para o banco numa thread própria.
+
+    Com o checkpoint automático, o commit que enche o WAL paga a cópia de
+    todas as páginas (o pico de latência de uma venda, por exemplo). Aqui o
+    checkpoint PASSIVE roda a cada `interval` segundos se houve commit, sem
+    bloquear quem está gravando. Uma leitura longa impede o PASSIVE de
+    copiar tudo e o WAL não recomeça; se ele passar de `limit` bytes nessa
+    situação, o TRUNCATE espera os leitores (até TRUNCATE_ESPERA_MS) e zera
+    o arquivo.
+    """
+
+    def __init__(self, db_path, interval=CHECKPOINT_INTERVAL, limit=WAL_LIMITE):
+        super().__init__(name=f"wal-checkpoint {os.path.basename(db_path)}", daemon=True)
+        self.db_path = db_path
+        self.interval = interval
+        self.limit = limit
+        self.pending = threading.Event()  # houve commit desde o último checkpoint
+        self._stop_event = threading.Event()
+
+    def run(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        conn.execute(f"PRAGMA busy_timeout = {TRUNCATE_ESPERA_MS}")
+        try:
+            while not self._stop_event.wait(self.interval):
+                if not self.pending.is_set():
+                    continue
+                self.pending.clear()
+                try:
+                    self._checkpoint(conn)
+                except sqlite3.OperationalError:
+                    self.pending.set()  # tenta de novo no próximo intervalo
+        finally:
+            conn.close()
+
+    def _checkpoint(self, conn):
+        busy, paginas, copiadas = conn.execute("PRAGMA wal_checkpoint(PASSIVE)").fetchone()
+        if not busy and copiadas >= paginas:
+            return  # a próxima escrita recomeça o WAL (e journal_size_limit o encolhe)
+        try:
+            grande = os.path.getsize(self.db_path + "-wal") > self.limit
+        except OSError:
+            grande = False
+        if grande:
+            # um leitor impediu a cópia e o WAL não para de crescer
+            busy, paginas, copiadas = conn.execute("PRAGMA wal_checkpoint(TRUNCATE)").fetchone()
+        if busy or copiadas < paginas:
+            self.pending.set()  # tenta de novo no próximo intervalo
+
+    def stop(self):
+        self._stop_event.set()
+
+
+class ConnectionManager:
+    """Mantém conexões SQLite abertas por arquivo de banco.
+
+    A thread principal (UI) reutiliza sempre a mesma conexão. Threads de
+    trabalho pegam emprestada uma conexão de um pool limitado por banco e a
+    devolvem ao sair do bloco `with`.
+    """
+
+    def __init__(self, pool_size=POOL_SIZE):
+        self.pool_size = pool_size
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._main = {}        # db_path -> conexão da thread principal
+        self._idle = {}        # db_path -> conexões livres do pool
+        self._slots = {}       # db_path -> semáforo que limita o pool
+        self._generation = {}  # db_path -> incrementa a cada close()
+        self._checkpointers = {}  # db_path -> WalCheckpointer
+        self._background = set()  # bancos sem checkpoint automático (empresas)
+
+    # ------------------- ABERTURA -------------------
+    def _open(self, db_path, shared):
+        conn = sqlite3.connect(db_path, check_same_thread=not shared)
+        if configure_connection(conn):
+            with self._lock:
+                self._background.add(db_path)
+        return conn
+
+    def _held(self):
+        held = getattr(self._local, "held", None)
+        if held is None:
+            held = self._local.held = {}
+        return held
+
+    def _acquire(self, db_path):
+        if threading.current_thread() is threading.main_thread():
+            conn = self._main.get(db_path)
+            if conn is None:
+                conn = self._main[db_path] = self._open(db_path, shared=False)
+            return conn, None
+
+        with self._lock:
+            slots = self._slots.get(db_path)
+            if slots is None:
+                slots = self._slots[db_path] = threading.BoundedSemaphore(self.pool_size)
+            generation = self._generation.get(db_path, 0)
+        slots.acquire()
+        with self._lock:
+            idle = self._idle.setdefault(db_path, [])
+            conn = idle.pop() if idle else None
+        if conn is None:
+            try:
+                conn = self._open(db_path, shared=True)
+            except Exception:
+                slots.release()
+                raise
+        return conn, generation
+
+    def _release(self, db_path, conn, generation):
+        if generation is None:
+            return  # conexão da thread principal continua aberta
+        with self._lock:
+            stale = generation != self._generation.get(db_path, 0)
+            if not stale:
+                self._idle.setdefault(db_path, []).append(conn)
+            slots = self._slots[db_path]
+        if stale:
+            conn.close()
+        slots.release()
+
+    @contextmanager
+    def connection(self, db_path):
+        """Entrega uma conexão aquecida e controla a transação.
+
+        Faz commit ao sair do bloco mais externo e rollback em caso de erro.
+        Blocos aninhados na mesma thread reutilizam a mesma conexão.
+        """
+        held = self._held()
+        entry = held.get(db_path)
+        if entry is not None:
+            entry[2] += 1
+            try:
+                yield entry[0]
+            finally:
+                entry[2] -= 1
+            return
+
+        conn, generation = self._acquire(db_path)
+        entry = held[db_path] = [conn, generation, 1]
+        cancel = getattr(self._local, "cancel", None)
+        if cancel is not None:
+            conn.set_progress_handler(cancel.is_set, PROGRESS_STEPS)
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+                if db_path in self._background:
+                    self._checkpointer(db_path).pending.set()
+        except BaseException:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            if cancel is not None:
+                conn.set_progress_handler(None, 0)
+            del held[db_path]
+            self._release(db_path, conn, generation)
+
+    def nested(self, db_path):
+        """True se a thread atual já está num bloco `connection` de db_path:
+        um bloco aberto agora não faz commit nem rollback, quem decide é o
+        mais externo (um erro precisa subir até ele)"""
+        return db_path in self._held()
+
+    def _checkpointer(self, db_path):
+        checkpointer = self._checkpointers.get(db_path)
+        if checkpointer is None:
+            with self._lock:
+                checkpointer = self._checkpointers.get(db_path)
+                if checkpointer is None:
+                    checkpointer = self._checkpointers[db_path] = WalCheckpointer(db_path)
+                    checkpointer.start()
+        return checkpointer
+
+    # ------------------- CANCELAMENTO -------------------
+    @contextmanager
+    def cancellable(self, cancel_event):
+        """Consultas feitas pela thread atual dentro do bloco são abortadas
+        (sqlite3.OperationalError "interrupted") quando `cancel_event`
+        (threading.Event) for sinalizado.
+        """
+        self._local.cancel = cancel_event
+        try:
+            yield
+        finally:
+            self._local.cancel = None
+
+    # ------------------- FECHAMENTO -------------------
+    def close(self, db_path):
+        """Fecha as conexões de um banco (logout / troca de empresa).
+
+        Conexões emprestadas a threads de trabalho são fechadas quando
+        devolvidas.
+        """
+        with self._lock:
+            self._generation[db_path] = self._generation.get(db_path, 0) + 1
+            idle = self._idle.pop(db_path, [])
+            checkpointer = self._checkpointers.pop(db_path, None)
+            self._background.discard(db_path)
+        if checkpointer is not None:
+            checkpointer.stop()
+            checkpointer.join(timeout=5)
+        for conn in idle:
+            conn.close()
+        if threading.current_thread() is threading.main_thread():
+            conn = self._main.pop(db_path, None)
+            if conn is not None:
+                conn.close()
+
+    def close_all(self):
+        with self._lock:
+            paths = set(self._main) | set(self._idle) | set(self._checkpointers)
+        for db_path in paths:
+            self.close(db_path)
+
+
+manager = ConnectionManager()
@@ -0,0 +1,219 @@
+"""Tarefas de manutenção dos bancos de empresa.
+
+Uso (dentro de vendapro-desktop):
+    python -m app.database.maintenance thumbnails "Minha Empresa"
+    python -m app.database.maintenance estoque "Minha Empresa" [--corrigir]
+    python -m app.database.maintenance checkpoints "Minha Empresa" [--ate AAAA-MM-DD]
+    python -m app.database.maintenance valorizacao "Minha Empresa" AAAA-MM-DD
+    python -m app.database.maintenance importar "Minha Empresa" produtos.csv [--lote 5000]
+    python -m app.database.maintenance caixa "Minha Empresa" [--sessao N]
+    python -m app.database.maintenance rollups "Minha Empresa" [--refazer [--desde AAAA-MM-DD]]
+    python -m app.database.maintenance relatorio "Minha Empresa" INICIO FIM [--por produto] [--bruto]
+    python -m app.database.maintenance abc "Minha Empresa" [--dias 365]
+    python -m app.database.maintenance alertas "Minha Empresa" [--recalcular [--dias 30]]
+    python -m app.database.maintenance midia "Minha Empresa" [--importar PASTA] [--limpar] [--compactar]
+"""
+import argparse
+
+from app.database import user_repository as repo
+
+
+def cmd_thumbnails(args):
+    total = repo.backfill_thumbnails(args.empresa, batch_size=args.lote)
+    print(f"{total} miniaturas geradas")
+
+
+def cmd_estoque(args):
+    divergentes = repo.reconcile_stock(args.empresa, fix=args.corrigir)
+    negativos = 0
+    for produto_id, nome, saldo, saldo_hist in divergentes:
+        print(f"#{produto_id} {nome}: saldo {saldo}, histórico {saldo_hist} (diferença {saldo - saldo_hist:+d})")
+        negativos += saldo_hist < 0
+    if not divergentes:
+        print("saldos conferem com o histórico")
+    elif args.corrigir:
+        print(f"{len(divergentes) - negativos} saldos corrigidos pelo histórico")
+    if negativos:
+        print(f"{negativos} com histórico negativo não corrigidos: lance um ajuste de entrada antes")
+
+
+def cmd_checkpoints(args):
+    total = repo.update_stock_checkpoints(args.empresa, until=args.ate)
+    print(f"{total} checkpoints de estoque gravados")
+
+
+def cmd_valorizacao(args):
+    itens, total = repo.get_stock_valuation(args.empresa, args.data)
+    print(f"{len(itens)} produtos com saldo em {args.data}: R$ {total:,.2f}")
+
+
+def cmd_importar(args):
+    # import local: o serviço de importação carrega o leitor de planilhas
+    from app.services.product_import import import_products
+
+    def progress(linhas, fracao):
+        print(f"\r{linhas} linhas ({fracao:.0%})", end="", flush=True)
+
+    result = import_products(args.empresa, args.arquivo, batch_size=args.lote, progress=progress)
+    print(f"\nimportação {result['status']}: {result['gravados']} produtos gravados, {result['erros']} linhas com erro")
+    for linha, msg in result["detalhes"]:
+        print(f"  linha {linha}: {msg}")
+
+
+def cmd_caixa(args):
+    report = repo.caixa_report(args.empresa, args.sessao)
+    if report is None:
+        print("nenhum caixa aberto" if args.sessao is None else f"sessão #{args.sessao} não encontrada")
+        return
+    print(f"caixa #{report['id']} ({report['status']}) aberto em {report['aberto_em']}")
+    for forma, (vendas, total) in sorted(report["por_forma"].items()):
+        print(f"  {forma}: {vendas} vendas, R$ {total:,.2f}")
+    print(f"total: {report['vendas']} vendas, R$ {report['total_vendas']:,.2f}")
+    print(f"dinheiro esperado na gaveta: R$ {report['dinheiro_esperado']:,.2f}")
+    if "diferenca" in report:
+        print(f"contado: R$ {report['valor_contado']:,.2f} (diferença {report['diferenca']:+,.2f})")
+    divergentes = repo.verify_caixa(args.empresa, report["id"])
+    for forma, contadores, vendas in divergentes:
+        print(f"  {forma}: contadores {contadores}, vendas {vendas}")
+    if not divergentes:
+        print("contadores conferem com as vendas")
+
+
+def cmd_rollups(args):
+    if args.refazer:
+        repo.rebuild_sales_rollups(args.empresa, since=args.desde)
+        print("rollups de vendas recalculados" + (f" desde o mês de {args.desde}" if args.desde else ""))
+    else:
+        print(f"{repo.update_sales_rollups(args.empresa)} vendas somadas aos rollups")
+
+
+def cmd_relatorio(args):
+    from app.database.reports import sales_report
+
+    for _chave, rotulo, quantidade, valor in sales_report(
+        args.empresa, args.inicio, args.fim, por=args.por, rollups=not args.bruto
+    ):
+        print(f"{str(rotulo):<40}{quantidade:>10}{valor:>16,.2f}")
+
+
+def cmd_abc(args):
+    # import local: a análise usa numpy
+    from app.services.abc_analysis import update_abc_classification
+
+    total = update_abc_classification(args.empresa, dias=args.dias, force=True)
+    print(f"{total} produtos classificados (últimos {args.dias} dias)")
+    for classe, produtos, receita in repo.get_abc_summary(args.empresa):
+        print(f"  classe {classe}: {produtos} produtos, R$ {receita or 0:,.2f}")
+
+
+def cmd_alertas(args):
+    if args.recalcular:
+        alterados = repo.update_reorder_points(args.empresa, dias=args.dias, force=True)
+        print(f"{alterados} pontos de reposição recalculados (consumo dos últimos {args.dias} dias)")
+    alertas = repo.get_stock_alerts(args.empresa)
+    for produto_id, nome, quantidade, ponto, desde in alertas:
+        print(f"#{produto_id} {nome}: saldo {quantidade}, ponto {ponto} (desde {desde})")
+    if not alertas:
+        print("nenhum produto abaixo do ponto de reposição")
+
+
+def cmd_midia(args):
+    movidos = repo.migrate_photos_to_store(args.empresa)
+    if movidos:
+        print(f"{movidos} fotos movidas do banco para a biblioteca")
+    if args.importar:
+        from app.services.media_import import import_media_folder
+
+        result = import_media_folder(args.empresa, args.importar)
+        print(f"{result['arquivos']} arquivos: {result['vinculados']} fotos de produtos, "
+              f"{result['novas']} imagens novas, {result['repetidas']} repetidas "
+              f"({result['bytes_repetidos']:,} bytes não duplicados)")
+        for codigo in result["sem_produto"]:
+            print(f"  sem produto: {codigo}")
+        for path, msg in result["erros"]:
+            print(f"  {path}: {msg}")
+    if args.limpar:
+        arquivos, liberados = repo.collect_media(args.empresa)
+        print(f"{arquivos} imagens sem uso removidas ({liberados:,} bytes)")
+    stats = repo.get_media_stats(args.empresa)
+    print(f"biblioteca: {stats['arquivos']} imagens, {stats['bytes']:,} bytes, {stats['referencias']} usos "
+          f"(copiadas em cada registro: {stats['bytes_sem_dedup']:,} bytes), {stats['orfas']} sem uso")
+    if args.compactar:
+        antes, depois = repo.compact_company_db(args.empresa)
+        print(f"banco compactado: {antes:,} -> {depois:,} bytes")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manutenção dos bancos do VendaPRO")
+    sub = parser.add_subparsers(dest="comando", required=True)
+
+    p = sub.add_parser("thumbnails", help="gera miniaturas das fotos antigas")
+    p.add_argument("empresa")
+    p.add_argument("--lote", type=int, default=200)
+    p.set_defaults(func=cmd_thumbnails)
+
+    p = sub.add_parser("estoque", help="confere os saldos contra o histórico de estoque")
+    p.add_argument("empresa")
+    p.add_argument("--corrigir", action="store_true", help="ajusta o saldo para o do histórico")
+    p.set_defaults(func=cmd_estoque)
+
+    p = sub.add_parser("checkpoints", help="consolida os checkpoints diários de estoque")
+    p.add_argument("empresa")
+    p.add_argument("--ate", help="último dia a consolidar (padrão: ontem)")
+    p.set_defaults(func=cmd_checkpoints)
+
+    p = sub.add_parser("valorizacao", help="posição e valor do estoque no fim de um dia")
+    p.add_argument("empresa")
+    p.add_argument("data", help="AAAA-MM-DD")
+    p.set_defaults(func=cmd_valorizacao)
+
+    p = sub.add_parser("importar", help="importa o catálogo de produtos de um CSV/XLSX")
+    p.add_argument("empresa")
+    p.add_argument("arquivo")
+    p.add_argument("--lote", type=int, default=5000, help="linhas por transação")
+    p.set_defaults(func=cmd_importar)
+
+    p = sub.add_parser("caixa", help="relatório de uma sessão de caixa e conferência com as vendas")
+    p.add_argument("empresa")
+    p.add_argument("--sessao", type=int, help="sessão fechada (padrão: caixa aberto)")
+    p.set_defaults(func=cmd_caixa)
+
+    p = sub.add_parser("rollups", help="soma as vendas novas nos rollups de vendas")
+    p.add_argument("empresa")
+    p.add_argument("--refazer", action="store_true", help="recalcula os rollups a partir das vendas")
+    p.add_argument("--desde", help="com --refazer: recalcula a partir do mês deste dia (padrão: tudo)")
+    p.set_defaults(func=cmd_rollups)
+
+    p = sub.add_parser("relatorio", help="relatório de vendas de um período")
+    p.add_argument("empresa")
+    p.add_argument("inicio", help="AAAA-MM-DD ou 'AAAA-MM-DD HH:MM:SS'")
+    p.add_argument("fim", help="fim exclusivo, mesmo formato")
+    p.add_argument("--por", default="dia", choices=["dia", "forma_pagamento", "funcionario", "produto", "marca"])
+    p.add_argument("--bruto", action="store_true", help="soma direto das vendas, sem rollups")
+    p.set_defaults(func=cmd_relatorio)
+
+    p = sub.add_parser("abc", help="recalcula a curva ABC dos produtos")
+    p.add_argument("empresa")
+    p.add_argument("--dias", type=int, default=365, help="período analisado")
+    p.set_defaults(func=cmd_abc)
+
+    p = sub.add_parser("alertas", help="produtos no ponto de reposição ou abaixo")
+    p.add_argument("empresa")
+    p.add_argument("--recalcular", action="store_true", help="recalcula os pontos pelo consumo antes")
+    p.add_argument("--dias", type=int, default=repo.CONSUMO_DIAS, help="com --recalcular: janela do consumo")
+    p.set_defaults(func=cmd_alertas)
+
+    p = sub.add_parser("midia", help="biblioteca de imagens: move as fotos antigas e mostra os totais")
+    p.add_argument("empresa")
+    p.add_argument("--importar", metavar="PASTA", help="fotos de produtos (nome do arquivo = código de barras)")
+    p.add_argument("--limpar", action="store_true", help="apaga as imagens sem uso")
+    p.add_argument("--compactar", action="store_true", help="VACUUM do banco depois de mover as fotos")
+    p.set_defaults(func=cmd_midia)
+
+    args = parser.parse_args(argv)
+    repo.open_company_db(args.empresa)
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Biblioteca de imagens endereçada pelo conteúdo, fora dos bancos.
+
+Cada imagem é um arquivo com o nome do seu sha256, numa pasta ao lado do
+banco (`loja.db` -> `loja_midia/ab/abcdef...`). As tabelas guardam só o
+hash; a tabela midia tem uma linha por arquivo (tamanho, miniatura e refs,
+o número de registros que apontam para ele, mantido por triggers). A mesma
+imagem em mil produtos é um arquivo e uma miniatura.
+
+Concorrência: `put` grava a linha antes do arquivo, já com o lock de
+escrita do banco, e `collect` apaga arquivos segurando esse lock; assim a
+coleta nunca remove um arquivo que uma transação em andamento acabou de
+reaproveitar. A coleta automática só leva as órfãs com mais de
+CARENCIA_DIAS: uma imagem recém-importada que ainda não tem produto, ou que
+uma importação em andamento vai vincular no próximo lote, fica.
+"""
+import hashlib
+import os
+import tempfile
+import time
+
+from app.core.images import make_thumbnail
+from app.database.connection import manager
+
+PASTA_SUFIXO = "_midia"
+CARENCIA_DIAS = 7  # idade mínima de uma órfã para a coleta automática
+
+
+def media_dir(db_path):
+    return os.path.splitext(db_path)[0] + PASTA_SUFIXO
+
+
+def media_path(db_path, key):
+    """Caminho do arquivo de um hash (existe ou não)"""
+    return os.path.join(media_dir(db_path), key[:2], key)
+
+
+def digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def prepare(data, key=None, thumb=True):
+    """(hash, bytes, miniatura) de uma imagem, calculados fora da transação;
+    None sem imagem. `thumb=False` deixa a miniatura para quem já a tem."""
+    if not data:
+        return None
+    data = bytes(data)
+    return key or digest(data), data, make_thumbnail(data) if thumb else None
+
+
+def put(conn, db_path, media):
+    """Grava a imagem preparada na transação de `conn`; retorna o hash (None
+    sem imagem). Quem grava o hash no registro faz isso na mesma transação."""
+    if media is None:
+        return None
+    key, data, thumb = media
+    # primeiro a escrita no banco: pega o lock antes de olhar o arquivo
+    cursor = conn.execute(
+        "INSERT OR IGNORE INTO midia (hash, tamanho, thumb) VALUES (?, ?, ?)",
+        (key, len(data), thumb)
+    )
+    if cursor.rowcount and thumb is None:
+        # quem preparou achava que a imagem já existia (foi coletada no meio)
+        thumb = make_thumbnail(data)
+    if thumb is not None:
+        conn.execute("UPDATE midia SET thumb = ? WHERE hash = ? AND thumb IS NULL", (thumb, key))
+    path = media_path(db_path, key)
+    if not os.path.exists(path):
+        _write(path, data)
+    return key
+
+
+def _write(path, data):
+    # grava num temporário e renomeia: o arquivo nunca aparece pela metade
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def read(db_path, key):
+    """Bytes da imagem, ou None se o arquivo não existir"""
+    try:
+        with open(media_path(db_path, key), "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+def collect(db_path, dias=None):
+    """Remove as imagens sem referência (linhas com refs = 0 e arquivos sem
+    linha, como os de uma transação desfeita); com `dias`, só as criadas há
+    mais tempo que isso. Retorna (arquivos, bytes)."""
+    removidos, liberados = 0, 0
+    where, params, limite = "refs <= 0", [], None
+    if dias is not None:
+        where += " AND criada_em < datetime('now', ?)"
+        params.append(f"-{int(dias)} days")
+        limite = time.time() - dias * 86400
+    with manager.connection(db_path) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        orfas = conn.execute(f"SELECT hash FROM midia WHERE {where}", params).fetchall()
+        conn.executemany("DELETE FROM midia WHERE hash = ?", orfas)
+        conhecidos = {key for (key,) in conn.execute("SELECT hash FROM midia")}
+        # apaga antes do commit, ainda com o lock (ver docstring do módulo)
+        pasta = media_dir(db_path)
+        for raiz, _dirs, arquivos in os.walk(pasta):
+            for nome in arquivos:
+                if nome in conhecidos:
+                    continue
+                path = os.path.join(raiz, nome)
+                if limite is not None and os.path.getmtime(path) > limite:
+                    continue
+                liberados += os.path.getsize(path)
+                os.remove(path)
+                removidos += 1
+    return removidos, liberados
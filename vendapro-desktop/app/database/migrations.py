@@ -0,0 +1,716 @@
+"""Migrações versionadas dos bancos de empresa.
+
+A versão do schema fica em `PRAGMA user_version`. Cada migração roda uma
+única vez, dentro de uma transação, e atualiza o arquivo no lugar (nunca
+recria tabelas existentes).
+"""
+
+# ------------------- MIGRAÇÕES -------------------
+def _v1_schema_base(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS configuracao (
+            chave TEXT PRIMARY KEY,
+            valor TEXT NOT NULL
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password TEXT NOT NULL,
+            photo BLOB
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS clients (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT,
+            phone TEXT,
+            address TEXT,
+            photo BLOB
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS funcionarios (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT,
+            phone TEXT,
+            cargo TEXT,
+            address TEXT,
+            photo BLOB
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS fornecedores (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            email TEXT,
+            phone TEXT,
+            address TEXT,
+            photo BLOB
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS produto (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            nome TEXT NOT NULL,
+            valor REAL NOT NULL,
+            quantidade INTEGER NOT NULL,
+            marca TEXT NOT NULL,
+            codigo_barra TEXT UNIQUE NOT NULL,
+            photo BLOB
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS estoque (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            produto_id INTEGER NOT NULL,
+            codigo_barra TEXT NOT NULL,
+            quantidade INTEGER NOT NULL,
+            movimento_tipo TEXT NOT NULL,
+            origem TEXT NOT NULL,
+            data TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(produto_id) REFERENCES produto(id)
+        )
+    """)
+
+
+def _v2_indices(cursor):
+    # histórico por produto e listagem do estoque por data
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_estoque_produto_data ON estoque(produto_id, data)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_estoque_data ON estoque(data)")
+    # ordenação / busca de produtos
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_produto_nome ON produto(nome)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_produto_marca ON produto(marca)")
+
+
+def _v3_produto_fts(cursor):
+    # índice full-text externo: o conteúdo continua só na tabela produto
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS produto_fts USING fts5(
+            nome, marca, codigo_barra,
+            content='produto', content_rowid='id',
+            tokenize='unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS produto_fts_ai AFTER INSERT ON produto BEGIN
+            INSERT INTO produto_fts (rowid, nome, marca, codigo_barra)
+            VALUES (new.id, new.nome, new.marca, new.codigo_barra);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS produto_fts_ad AFTER DELETE ON produto BEGIN
+            INSERT INTO produto_fts (produto_fts, rowid, nome, marca, codigo_barra)
+            VALUES ('delete', old.id, old.nome, old.marca, old.codigo_barra);
+        END
+    """)
+    # só reindexa quando muda texto pesquisável (não em movimentos de estoque)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS produto_fts_au AFTER UPDATE OF nome, marca, codigo_barra ON produto BEGIN
+            INSERT INTO produto_fts (produto_fts, rowid, nome, marca, codigo_barra)
+            VALUES ('delete', old.id, old.nome, old.marca, old.codigo_barra);
+            INSERT INTO produto_fts (rowid, nome, marca, codigo_barra)
+            VALUES (new.id, new.nome, new.marca, new.codigo_barra);
+        END
+    """)
+    cursor.execute("INSERT INTO produto_fts (produto_fts) VALUES ('rebuild')")
+
+
+def _v4_indices_listagem(cursor):
+    # paginação por nome nas páginas de cadastro
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_clients_name ON clients(name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_funcionarios_name ON funcionarios(name)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_fornecedores_name ON fornecedores(name)")
+
+
+def _add_column(cursor, table, column, decl):
+    columns = [row[1] for row in cursor.execute(f"PRAGMA table_info({table})")]
+    if column not in columns:
+        cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+
+def _v5_miniaturas(cursor):
+    # miniatura gerada na gravação da foto (preenchida pelo backfill nas antigas)
+    for table in ("produto", "clients", "funcionarios", "fornecedores"):
+        _add_column(cursor, table, "thumb", "BLOB")
+
+
+def _v6_estoque_nao_negativo(cursor):
+    # movimentos aplicam quantidade = quantidade + ?; o saldo nunca fica negativo
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS produto_qtd_ins BEFORE INSERT ON produto
+        WHEN new.quantidade < 0 BEGIN
+            SELECT RAISE(ABORT, 'estoque insuficiente');
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS produto_qtd_upd BEFORE UPDATE OF quantidade ON produto
+        WHEN new.quantidade < 0 BEGIN
+            SELECT RAISE(ABORT, 'estoque insuficiente');
+        END
+    """)
+
+
+# sinal de um movimento no saldo: Entrada soma, os demais tipos subtraem
+SINAL_NEW = "(CASE WHEN new.movimento_tipo = 'Entrada' THEN new.quantidade ELSE -new.quantidade END)"
+SINAL_OLD = "(CASE WHEN old.movimento_tipo = 'Entrada' THEN old.quantidade ELSE -old.quantidade END)"
+
+
+def _v7_saldo_por_trigger(cursor):
+    # saldo por produto direto do índice, sem ler a tabela estoque
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_estoque_saldo
+        ON estoque(produto_id, movimento_tipo, quantidade)
+    """)
+
+    # o histórico passa a ser a fonte do saldo: antes dos triggers, registra
+    # a diferença de cada produto como movimento de saldo inicial
+    cursor.execute("""
+        INSERT INTO estoque (produto_id, codigo_barra, quantidade, movimento_tipo, origem)
+        SELECT p.id, p.codigo_barra, ABS(p.quantidade - COALESCE(s.saldo, 0)),
+               CASE WHEN p.quantidade > COALESCE(s.saldo, 0) THEN 'Entrada' ELSE 'Saída' END,
+               'Saldo inicial'
+        FROM produto p
+        LEFT JOIN (
+            SELECT produto_id,
+                   SUM(CASE WHEN movimento_tipo = 'Entrada' THEN quantidade ELSE -quantidade END) AS saldo
+            FROM estoque GROUP BY produto_id
+        ) s ON s.produto_id = p.id
+        WHERE p.quantidade != COALESCE(s.saldo, 0)
+    """)
+
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS estoque_saldo_ai AFTER INSERT ON estoque BEGIN
+            UPDATE produto SET quantidade = quantidade + {SINAL_NEW} WHERE id = new.produto_id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS estoque_saldo_ad AFTER DELETE ON estoque BEGIN
+            UPDATE produto SET quantidade = quantidade - {SINAL_OLD} WHERE id = old.produto_id;
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS estoque_saldo_au
+        AFTER UPDATE OF produto_id, quantidade, movimento_tipo ON estoque BEGIN
+            -- diferença líquida num só UPDATE (sem saldo negativo intermediário)
+            UPDATE produto SET quantidade = quantidade
+                + (CASE WHEN id = new.produto_id THEN {SINAL_NEW} ELSE 0 END)
+                - (CASE WHEN id = old.produto_id THEN {SINAL_OLD} ELSE 0 END)
+            WHERE id IN (old.produto_id, new.produto_id);
+        END
+    """)
+
+
+def _v8_checkpoints_estoque(cursor):
+    # saldo de cada produto no fim de cada dia em que ele movimentou
+    # (esparso: dias sem movimento herdam o checkpoint anterior)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS estoque_checkpoint (
+            produto_id INTEGER NOT NULL,
+            data TEXT NOT NULL,
+            saldo INTEGER NOT NULL,
+            PRIMARY KEY (produto_id, data)
+        ) WITHOUT ROWID
+    """)
+    # índice coberto para somar o histórico de um produto por período
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_estoque_produto_data_qtd
+        ON estoque(produto_id, data, movimento_tipo, quantidade)
+    """)
+    cursor.execute("DROP INDEX IF EXISTS idx_estoque_produto_data")
+
+    # movimento gravado/alterado/apagado num dia já consolidado recua a
+    # marca 'checkpoint_estoque'; o job recalcula a partir dali
+    for nome, evento, data in (
+        ("estoque_ckpt_ai", "INSERT", "new.data"),
+        ("estoque_ckpt_ad", "DELETE", "old.data"),
+        ("estoque_ckpt_au", "UPDATE", "MIN(old.data, new.data)"),
+    ):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {nome} AFTER {evento} ON estoque BEGIN
+                UPDATE configuracao SET valor = date({data}, '-1 day')
+                WHERE chave = 'checkpoint_estoque' AND valor >= date({data});
+            END
+        """)
+
+
+FTS_EM_LOTE = "fts_em_lote"
+
+def _v9_importacao(cursor):
+    # uma linha por importação de catálogo; `linhas` é a última linha do
+    # arquivo já gravada (atualizada junto com cada lote, para retomar)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS importacao (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            arquivo TEXT NOT NULL,
+            tamanho INTEGER NOT NULL,
+            modificado REAL NOT NULL,
+            linhas INTEGER NOT NULL DEFAULT 0,
+            gravados INTEGER NOT NULL DEFAULT 0,
+            erros INTEGER NOT NULL DEFAULT 0,
+            status TEXT NOT NULL DEFAULT 'em andamento',
+            iniciado_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            concluido_em TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_importacao_arquivo ON importacao(arquivo, status)")
+
+    # carga em lote indexa o full-text de uma vez: enquanto a chave
+    # FTS_EM_LOTE existir (só dentro da transação do lote) os triggers
+    # por linha ficam quietos
+    cursor.execute("DROP TRIGGER IF EXISTS produto_fts_ai")
+    cursor.execute("DROP TRIGGER IF EXISTS produto_fts_au")
+    cursor.execute(f"""
+        CREATE TRIGGER produto_fts_ai AFTER INSERT ON produto
+        WHEN NOT EXISTS (SELECT 1 FROM configuracao WHERE chave = '{FTS_EM_LOTE}') BEGIN
+            INSERT INTO produto_fts (rowid, nome, marca, codigo_barra)
+            VALUES (new.id, new.nome, new.marca, new.codigo_barra);
+        END
+    """)
+    cursor.execute(f"""
+        CREATE TRIGGER produto_fts_au AFTER UPDATE OF nome, marca, codigo_barra ON produto
+        WHEN NOT EXISTS (SELECT 1 FROM configuracao WHERE chave = '{FTS_EM_LOTE}') BEGIN
+            INSERT INTO produto_fts (produto_fts, rowid, nome, marca, codigo_barra)
+            VALUES ('delete', old.id, old.nome, old.marca, old.codigo_barra);
+            INSERT INTO produto_fts (rowid, nome, marca, codigo_barra)
+            VALUES (new.id, new.nome, new.marca, new.codigo_barra);
+        END
+    """)
+
+
+def _v10_vendas(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS vendas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            data TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            cliente_id INTEGER,
+            forma_pagamento TEXT NOT NULL,
+            subtotal REAL NOT NULL DEFAULT 0,
+            desconto REAL NOT NULL DEFAULT 0,
+            total REAL NOT NULL DEFAULT 0,
+            FOREIGN KEY(cliente_id) REFERENCES clients(id)
+        )
+    """)
+    # preço gravado no item: a venda não muda se o cadastro mudar depois
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS itens_venda (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            venda_id INTEGER NOT NULL,
+            produto_id INTEGER NOT NULL,
+            quantidade INTEGER NOT NULL CHECK (quantidade > 0),
+            valor_unitario REAL NOT NULL,
+            FOREIGN KEY(venda_id) REFERENCES vendas(id),
+            FOREIGN KEY(produto_id) REFERENCES produto(id)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_vendas_data ON vendas(data)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_itens_venda_venda ON itens_venda(venda_id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_itens_venda_produto ON itens_venda(produto_id)")
+
+
+def _v11_caixa(cursor):
+    # uma sessão por abertura de caixa; só uma pode estar aberta
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS caixa_sessao (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            aberto_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            fechado_em TIMESTAMP,
+            valor_abertura REAL NOT NULL DEFAULT 0,
+            suprimentos REAL NOT NULL DEFAULT 0,
+            sangrias REAL NOT NULL DEFAULT 0,
+            valor_contado REAL,
+            status TEXT NOT NULL DEFAULT 'aberto'
+        )
+    """)
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_caixa_sessao_aberta
+        ON caixa_sessao(status) WHERE status = 'aberto'
+    """)
+    # contadores por forma de pagamento, somados a cada venda (não no fechamento)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS caixa_totais (
+            sessao_id INTEGER NOT NULL,
+            forma_pagamento TEXT NOT NULL,
+            vendas INTEGER NOT NULL DEFAULT 0,
+            total REAL NOT NULL DEFAULT 0,
+            PRIMARY KEY (sessao_id, forma_pagamento)
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS caixa_movimento (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            sessao_id INTEGER NOT NULL,
+            tipo TEXT NOT NULL,
+            valor REAL NOT NULL CHECK (valor > 0),
+            motivo TEXT,
+            data TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(sessao_id) REFERENCES caixa_sessao(id)
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_caixa_movimento_sessao ON caixa_movimento(sessao_id)")
+    _add_column(cursor, "vendas", "caixa_sessao_id", "INTEGER REFERENCES caixa_sessao(id)")
+    # índice coberto para conferir os contadores com uma única agregação
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_vendas_caixa
+        ON vendas(caixa_sessao_id, forma_pagamento, total)
+    """)
+
+
+ESTOQUE_BAIXO = 5  # ponto de reposição padrão (sem ponto fixo nem consumo calculado)
+# contribuição de uma linha de produto para as métricas de estoque
+_BAIXO = "(CASE WHEN {p}.quantidade <= " + str(ESTOQUE_BAIXO) + " THEN 1 ELSE 0 END)"
+_VALOR = "({p}.quantidade * {p}.valor)"
+
+def _v12_metricas_painel(cursor):
+    # vendas e faturamento por dia, mantidos pelos triggers de vendas
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS vendas_dia (
+            dia TEXT PRIMARY KEY,
+            vendas INTEGER NOT NULL DEFAULT 0,
+            faturamento REAL NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    # contadores globais do painel: clientes, estoque_baixo, valor_estoque
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS metricas (
+            chave TEXT PRIMARY KEY,
+            valor REAL NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+
+    cursor.execute("""
+        INSERT OR REPLACE INTO vendas_dia (dia, vendas, faturamento)
+        SELECT date(data), COUNT(*), ROUND(SUM(total), 2) FROM vendas GROUP BY date(data)
+    """)
+    cursor.execute(f"""
+        INSERT OR REPLACE INTO metricas (chave, valor)
+        SELECT 'clientes', COUNT(*) FROM clients
+        UNION ALL SELECT 'estoque_baixo', COALESCE(SUM({_BAIXO.format(p="produto")}), 0) FROM produto
+        UNION ALL SELECT 'valor_estoque', ROUND(COALESCE(SUM({_VALOR.format(p="produto")}), 0), 2) FROM produto
+    """)
+
+    # venda entra com total 0 e recebe o total no mesmo checkout
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS vendas_dia_ai AFTER INSERT ON vendas BEGIN
+            INSERT INTO vendas_dia (dia, vendas, faturamento) VALUES (date(new.data), 1, new.total)
+            ON CONFLICT(dia) DO UPDATE SET vendas = vendas + 1,
+                faturamento = ROUND(faturamento + excluded.faturamento, 2);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS vendas_dia_au AFTER UPDATE OF data, total ON vendas BEGIN
+            UPDATE vendas_dia SET vendas = vendas - 1, faturamento = ROUND(faturamento - old.total, 2)
+            WHERE dia = date(old.data);
+            INSERT INTO vendas_dia (dia, vendas, faturamento) VALUES (date(new.data), 1, new.total)
+            ON CONFLICT(dia) DO UPDATE SET vendas = vendas + 1,
+                faturamento = ROUND(faturamento + excluded.faturamento, 2);
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS vendas_dia_ad AFTER DELETE ON vendas BEGIN
+            UPDATE vendas_dia SET vendas = vendas - 1, faturamento = ROUND(faturamento - old.total, 2)
+            WHERE dia = date(old.data);
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS metricas_clientes_ai AFTER INSERT ON clients BEGIN
+            UPDATE metricas SET valor = valor + 1 WHERE chave = 'clientes';
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS metricas_clientes_ad AFTER DELETE ON clients BEGIN
+            UPDATE metricas SET valor = valor - 1 WHERE chave = 'clientes';
+        END
+    """)
+    for nome, evento, delta_baixo, delta_valor in (
+        ("metricas_produto_ai", "INSERT", _BAIXO.format(p="new"), _VALOR.format(p="new")),
+        ("metricas_produto_ad", "DELETE", f"-{_BAIXO.format(p='old')}", f"-{_VALOR.format(p='old')}"),
+        ("metricas_produto_au", "UPDATE OF quantidade, valor",
+         f"{_BAIXO.format(p='new')} - {_BAIXO.format(p='old')}",
+         f"{_VALOR.format(p='new')} - {_VALOR.format(p='old')}"),
+    ):
+        # carga em lote (FTS_EM_LOTE) aplica a diferença do lote de uma vez
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {nome} AFTER {evento} ON produto
+            WHEN NOT EXISTS (SELECT 1 FROM configuracao WHERE chave = '{FTS_EM_LOTE}') BEGIN
+                UPDATE metricas SET valor = CASE chave
+                    WHEN 'estoque_baixo' THEN valor + {delta_baixo}
+                    ELSE ROUND(valor + {delta_valor}, 2) END
+                WHERE chave IN ('estoque_baixo', 'valor_estoque');
+            END
+        """)
+
+
+def _v13_rollups_vendas(cursor):
+    # vendedor da venda (funcionário); 0 nos rollups = sem vendedor
+    _add_column(cursor, "vendas", "funcionario_id", "INTEGER REFERENCES funcionarios(id)")
+
+    # totais por hora, dia e mês: cabeçalho da venda (forma de pagamento e
+    # vendedor) e itens (produto; a marca vem do cadastro no relatório).
+    # Preenchidos pelo repositório a partir da marca 'rollup_vendas'.
+    for periodo in ("hora", "dia", "mes"):
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS rollup_vendas_{periodo} (
+                {periodo} TEXT NOT NULL,
+                forma_pagamento TEXT NOT NULL,
+                funcionario_id INTEGER NOT NULL,
+                vendas INTEGER NOT NULL DEFAULT 0,
+                desconto REAL NOT NULL DEFAULT 0,
+                total REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY ({periodo}, forma_pagamento, funcionario_id)
+            ) WITHOUT ROWID
+        """)
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS rollup_itens_{periodo} (
+                {periodo} TEXT NOT NULL,
+                produto_id INTEGER NOT NULL,
+                quantidade INTEGER NOT NULL DEFAULT 0,
+                receita REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY ({periodo}, produto_id)
+            ) WITHOUT ROWID
+        """)
+
+
+def _v14_curva_abc(cursor):
+    # última classificação ABC (refeita inteira a cada cálculo): por receita
+    # no período (classe) e por giro do estoque (classe_giro)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS produto_abc (
+            produto_id INTEGER PRIMARY KEY,
+            receita REAL NOT NULL DEFAULT 0,
+            participacao REAL NOT NULL DEFAULT 0,
+            classe TEXT NOT NULL,
+            saidas INTEGER NOT NULL DEFAULT 0,
+            estoque_medio REAL NOT NULL DEFAULT 0,
+            giro REAL NOT NULL DEFAULT 0,
+            classe_giro TEXT NOT NULL
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_produto_abc_classe ON produto_abc(classe, produto_id)")
+
+
+# ponto de reposição efetivo: o fixo do cadastro, senão o calculado pelo
+# consumo recente, senão ESTOQUE_BAIXO
+PONTO_REPOSICAO = "COALESCE({p}.ponto_reposicao, {p}.ponto_calculado, " + str(ESTOQUE_BAIXO) + ")"
+
+def _v15_alertas_estoque(cursor):
+    _add_column(cursor, "produto", "ponto_reposicao", "INTEGER")
+    _add_column(cursor, "produto", "ponto_calculado", "INTEGER")
+
+    # produtos com saldo no ponto de reposição ou abaixo; `desde` é quando
+    # o produto entrou em alerta (mantido enquanto ele não sair)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS alerta_estoque (
+            produto_id INTEGER PRIMARY KEY,
+            quantidade INTEGER NOT NULL,
+            ponto INTEGER NOT NULL,
+            desde TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_alerta_estoque_quantidade ON alerta_estoque(quantidade)")
+    cursor.execute(f"""
+        INSERT OR REPLACE INTO alerta_estoque (produto_id, quantidade, ponto)
+        SELECT id, quantidade, {PONTO_REPOSICAO.format(p="produto")} FROM produto
+        WHERE quantidade <= {PONTO_REPOSICAO.format(p="produto")}
+    """)
+
+    # o contador do painel passa a ser o número de alertas
+    for nome in ("metricas_produto_ai", "metricas_produto_ad", "metricas_produto_au"):
+        cursor.execute(f"DROP TRIGGER IF EXISTS {nome}")
+    for nome, evento, delta_valor in (
+        ("metricas_produto_ai", "INSERT", _VALOR.format(p="new")),
+        ("metricas_produto_ad", "DELETE", f"-{_VALOR.format(p='old')}"),
+        ("metricas_produto_au", "UPDATE OF quantidade, valor",
+         f"{_VALOR.format(p='new')} - {_VALOR.format(p='old')}"),
+    ):
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {nome} AFTER {evento} ON produto
+            WHEN NOT EXISTS (SELECT 1 FROM configuracao WHERE chave = '{FTS_EM_LOTE}') BEGIN
+                UPDATE metricas SET valor = ROUND(valor + {delta_valor}, 2) WHERE chave = 'valor_estoque';
+            END
+        """)
+    cursor.execute("""
+        INSERT OR REPLACE INTO metricas (chave, valor)
+        SELECT 'estoque_baixo', COUNT(*) FROM alerta_estoque
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS metricas_alerta_ai AFTER INSERT ON alerta_estoque BEGIN
+            UPDATE metricas SET valor = valor + 1 WHERE chave = 'estoque_baixo';
+        END
+    """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS metricas_alerta_ad AFTER DELETE ON alerta_estoque BEGIN
+            UPDATE metricas SET valor = valor - 1 WHERE chave = 'estoque_baixo';
+        END
+    """)
+
+    # cada mudança de saldo ou de ponto entra/sai do alerta na hora; o
+    # trigger só trabalha se o produto estava ou ficou em alerta
+    ponto_new, ponto_old = PONTO_REPOSICAO.format(p="new"), PONTO_REPOSICAO.format(p="old")
+    for nome, evento, quando in (
+        ("alerta_estoque_ai", "INSERT", f"new.quantidade <= {ponto_new}"),
+        ("alerta_estoque_au", "UPDATE OF quantidade, ponto_reposicao, ponto_calculado",
+         f"(new.quantidade <= {ponto_new} OR old.quantidade <= {ponto_old})"),
+    ):
+        # carga em lote (FTS_EM_LOTE) atualiza os alertas do lote de uma vez
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {nome} AFTER {evento} ON produto
+            WHEN {quando}
+             AND NOT EXISTS (SELECT 1 FROM configuracao WHERE chave = '{FTS_EM_LOTE}') BEGIN
+                DELETE FROM alerta_estoque WHERE produto_id = new.id AND new.quantidade > {ponto_new};
+                INSERT INTO alerta_estoque (produto_id, quantidade, ponto)
+                SELECT new.id, new.quantidade, {ponto_new} WHERE new.quantidade <= {ponto_new}
+                ON CONFLICT(produto_id) DO UPDATE SET quantidade = excluded.quantidade, ponto = excluded.ponto;
+            END
+        """)
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS alerta_estoque_ad AFTER DELETE ON produto BEGIN
+            DELETE FROM alerta_estoque WHERE produto_id = old.id;
+        END
+    """)
+
+
+def _v16_entregas(cursor):
+    # entrega de uma venda; zona = faixa de distância (0 = mais perto).
+    # Abertas: 'pendente' e 'em rota'; depois 'entregue' ou 'cancelada'
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS entregas (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            venda_id INTEGER NOT NULL REFERENCES vendas(id),
+            endereco TEXT NOT NULL,
+            zona INTEGER NOT NULL DEFAULT 0,
+            prometida_para TIMESTAMP NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pendente',
+            entregador_id INTEGER REFERENCES funcionarios(id),
+            criada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            atualizada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # no máximo uma entrega não cancelada por venda
+    cursor.execute("""
+        CREATE UNIQUE INDEX IF NOT EXISTS idx_entregas_venda
+        ON entregas(venda_id) WHERE status != 'cancelada'
+    """)
+    # a fila carrega só as abertas, sem varrer o histórico de entregas
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_entregas_abertas
+        ON entregas(status) WHERE status IN ('pendente', 'em rota')
+    """)
+
+
+def _v17_rotas_entregas(cursor):
+    # coordenadas digitadas na entrega (sem serviço de mapas) e a posição
+    # da entrega na rota do lote em que saiu
+    _add_column(cursor, "entregas", "latitude", "REAL")
+    _add_column(cursor, "entregas", "longitude", "REAL")
+    _add_column(cursor, "entregas", "rota_ordem", "INTEGER")
+    # reaproveita as coordenadas de um endereço já entregue
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_entregas_endereco ON entregas(endereco)")
+
+
+def create_media_schema(cursor, tabelas):
+    """Tabela midia e os triggers que contam as referências de cada hash.
+
+    `tabelas` são pares (tabela, coluna do hash). Usado pela migração 18 e
+    pelo banco global (logo das empresas)."""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS midia (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            hash TEXT UNIQUE NOT NULL,
+            tamanho INTEGER NOT NULL,
+            thumb BLOB,
+            refs INTEGER NOT NULL DEFAULT 0,
+            criada_em TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    # a coleta só procura as sem referência
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_midia_orfas ON midia(id) WHERE refs <= 0")
+    for tabela, coluna in tabelas:
+        _add_column(cursor, tabela, coluna, "TEXT")
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {tabela}_midia_ai AFTER INSERT ON {tabela}
+            WHEN new.{coluna} IS NOT NULL BEGIN
+                UPDATE midia SET refs = refs + 1 WHERE hash = new.{coluna};
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {tabela}_midia_au AFTER UPDATE OF {coluna} ON {tabela}
+            WHEN old.{coluna} IS NOT new.{coluna} BEGIN
+                UPDATE midia SET refs = refs - 1 WHERE hash = old.{coluna};
+                UPDATE midia SET refs = refs + 1 WHERE hash = new.{coluna};
+            END
+        """)
+        cursor.execute(f"""
+            CREATE TRIGGER IF NOT EXISTS {tabela}_midia_ad AFTER DELETE ON {tabela}
+            WHEN old.{coluna} IS NOT NULL BEGIN
+                UPDATE midia SET refs = refs - 1 WHERE hash = old.{coluna};
+            END
+        """)
+
+
+def _v18_biblioteca(cursor):
+    # fotos saem dos registros para a biblioteca (media_store); as antigas
+    # são movidas aos poucos por migrate_photos_to_store
+    create_media_schema(cursor, [
+        (tabela, "photo_hash") for tabela in ("produto", "clients", "funcionarios", "fornecedores", "users")
+    ])
+
+
+MIGRATIONS = [
+    (1, "schema base", _v1_schema_base),
+    (2, "índices de estoque e produto", _v2_indices),
+    (3, "busca full-text de produtos", _v3_produto_fts),
+    (4, "índices de listagem por nome", _v4_indices_listagem),
+    (5, "miniaturas das fotos", _v5_miniaturas),
+    (6, "estoque não negativo", _v6_estoque_nao_negativo),
+    (7, "saldo mantido pelo histórico de estoque", _v7_saldo_por_trigger),
+    (8, "checkpoints de saldo de estoque", _v8_checkpoints_estoque),
+    (9, "registro de importações de produtos", _v9_importacao),
+    (10, "vendas e itens de venda", _v10_vendas),
+    (11, "sessões de caixa", _v11_caixa),
+    (12, "métricas do painel", _v12_metricas_painel),
+    (13, "rollups de vendas por hora, dia e mês", _v13_rollups_vendas),
+    (14, "curva ABC dos produtos", _v14_curva_abc),
+    (15, "pontos de reposição e alertas de estoque", _v15_alertas_estoque),
+    (16, "entregas", _v16_entregas),
+    (17, "coordenadas e rotas das entregas", _v17_rotas_entregas),
+    (18, "biblioteca de imagens", _v18_biblioteca),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+
+# ------------------- EXECUÇÃO -------------------
+def get_schema_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """Aplica as migrações pendentes; retorna a versão final do schema."""
+    current = get_schema_version(conn)
+    for version, _descricao, apply in MIGRATIONS:
+        if version <= current:
+            continue
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            cursor = conn.cursor()
+            apply(cursor)
+            cursor.execute(f"PRAGMA user_version = {version}")
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        current = version
+
+    return current
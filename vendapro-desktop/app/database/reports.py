@@ -0,0 +1,151 @@
+"""Relatórios de vendas por dia, produto, marca, vendedor e forma de pagamento.
+
+O intervalo [inicio, fim) é dividido em trechos: meses inteiros saem de
+rollup_*_mes, os dias inteiros que sobram de rollup_*_dia, as horas
+inteiras de rollup_*_hora e só os pedaços de hora nas extremidades são
+somados das vendas. Assim o custo depende do número de períodos e produtos
+do relatório, não do número de itens vendidos. Antes de ler, os rollups
+recebem as vendas ainda não somadas (update_sales_rollups).
+"""
+from datetime import datetime, timedelta
+
+from app.database.connection import manager
+from app.database.user_repository import get_company_db_path, update_sales_rollups
+
+FORMATO = "%Y-%m-%d %H:%M:%S"
+BRUTO, HORA, DIA, MES = "bruto", "hora", "dia", "mes"
+
+
+def _next_month(value):
+    return value.replace(year=value.year + value.month // 12, month=value.month % 12 + 1)
+
+
+# níveis de rollup, do mais agregado ao menos: (nome, início do período
+# que contém o instante, início do período seguinte, formato da chave)
+LEVELS = [
+    (MES, lambda d: d.replace(day=1, hour=0, minute=0, second=0), _next_month, "%Y-%m"),
+    (DIA, lambda d: d.replace(hour=0, minute=0, second=0), lambda d: d + timedelta(days=1), "%Y-%m-%d"),
+    (HORA, lambda d: d.replace(minute=0, second=0), lambda d: d + timedelta(hours=1), FORMATO),
+]
+_KEY_FORMAT = {nome: formato for nome, _floor, _next, formato in LEVELS}
+_KEY_FORMAT[BRUTO] = FORMATO
+
+# Cada relatório: nível (vendas: cabeçalho, itens: produtos vendidos) e a
+# chave de agrupamento em cada fonte que consegue respondê-lo (por dia não
+# usa o rollup mensal). Métricas: vendas/total no nível "vendas",
+# quantidade/receita (sem desconto da venda) no nível "itens".
+_VENDA = {fonte: "r.forma_pagamento" for fonte in (HORA, DIA, MES)}
+_VENDEDOR = {fonte: "r.funcionario_id" for fonte in (HORA, DIA, MES)}
+_PRODUTO = {fonte: "r.produto_id" for fonte in (HORA, DIA, MES)}
+_MARCA = {fonte: "COALESCE(p.marca, '')" for fonte in (BRUTO, HORA, DIA, MES)}
+REPORTS = {
+    "dia": ("vendas", {BRUTO: "date(v.data)", HORA: "substr(r.hora, 1, 10)", DIA: "r.dia"}),
+    "forma_pagamento": ("vendas", dict(_VENDA, **{BRUTO: "v.forma_pagamento"})),
+    "funcionario": ("vendas", dict(_VENDEDOR, **{BRUTO: "COALESCE(v.funcionario_id, 0)"})),
+    "produto": ("itens", dict(_PRODUTO, **{BRUTO: "i.produto_id"})),
+    "marca": ("itens+produto", _MARCA),
+}
+
+# fonte: (métricas, tabela, coluna do período)
+_SOURCES = {
+    ("vendas", BRUTO): ("COUNT(*), SUM(v.total)", "vendas v", "v.data"),
+    ("itens", BRUTO): ("SUM(i.quantidade), SUM(i.quantidade * i.valor_unitario)",
+                       "vendas v JOIN itens_venda i ON i.venda_id = v.id", "v.data"),
+}
+for _nivel in (HORA, DIA, MES):
+    _SOURCES[("vendas", _nivel)] = ("SUM(r.vendas), SUM(r.total)", f"rollup_vendas_{_nivel} r", f"r.{_nivel}")
+    _SOURCES[("itens", _nivel)] = ("SUM(r.quantidade), SUM(r.receita)", f"rollup_itens_{_nivel} r", f"r.{_nivel}")
+# relatórios por atributo do cadastro (marca): itens + produto atual
+for (_base, _nivel), (_metricas, _tabela, _coluna) in list(_SOURCES.items()):
+    if _base == "itens":
+        _produto = "i.produto_id" if _nivel == BRUTO else "r.produto_id"
+        _SOURCES[("itens+produto", _nivel)] = (
+            _metricas, f"{_tabela} LEFT JOIN produto p ON p.id = {_produto}", _coluna
+        )
+
+# rótulo de cada chave (produto e vendedor pelo cadastro)
+_LABELS = {
+    "produto": "SELECT id, nome FROM produto WHERE id IN ({ids})",
+    "funcionario": "SELECT id, name FROM funcionarios WHERE id IN ({ids})",
+}
+
+
+def _parse(value):
+    if isinstance(value, datetime):
+        return value.replace(microsecond=0)
+    value = str(value)
+    return datetime.strptime(value, "%Y-%m-%d") if len(value) == 10 else datetime.strptime(value, FORMATO)
+
+
+def plan(inicio, fim, niveis=(MES, DIA, HORA)):
+    """Trechos [(fonte, inicio, fim)] que cobrem [inicio, fim) com a fonte
+    mais agregada possível (entre `niveis`) em cada um"""
+    levels = [level for level in LEVELS if level[0] in niveis]
+
+    def split(ini, f, nivel):
+        if ini >= f:
+            return []
+        if nivel == len(levels):
+            return [(BRUTO, ini, f)]
+        nome, floor, step, _formato = levels[nivel]
+        a = floor(ini)
+        if a < ini:
+            a = step(a)
+        b = floor(f)
+        if a >= b:
+            return split(ini, f, nivel + 1)
+        return split(ini, a, nivel + 1) + [(nome, a, b)] + split(b, f, nivel + 1)
+
+    return split(_parse(inicio), _parse(fim), 0)
+
+
+def sales_report(company_name, inicio, fim, por="dia", rollups=True):
+    """Vendas de [inicio, fim) ("AAAA-MM-DD" ou "AAAA-MM-DD HH:MM:SS", UTC
+    como as datas gravadas) agrupadas por `por` (uma chave de REPORTS).
+
+    Retorna [(chave, rótulo, quantidade, valor)]: vendas e total (dia,
+    forma_pagamento, funcionario) ou unidades e receita dos itens (produto,
+    marca); por dia em ordem de data, os demais do maior valor ao menor.
+    rollups=False soma tudo das vendas (para conferência).
+    """
+    nivel, chaves = REPORTS[por]
+    if rollups:
+        update_sales_rollups(company_name)  # vendas desde a última atualização
+        trechos = plan(inicio, fim, [fonte for fonte in chaves if fonte != BRUTO])
+    else:
+        trechos = [(BRUTO, _parse(inicio), _parse(fim))]
+
+    totais = {}
+    db_path = get_company_db_path(company_name)
+    with manager.connection(db_path) as conn:
+        for fonte, ini, f in trechos:
+            metricas, tabela, coluna = _SOURCES[(nivel, fonte)]
+            formato = _KEY_FORMAT[fonte]
+            rows = conn.execute(f"""
+                SELECT {chaves[fonte]}, {metricas} FROM {tabela}
+                WHERE {coluna} >= ? AND {coluna} < ?
+                GROUP BY 1
+            """, (ini.strftime(formato), f.strftime(formato)))
+            for chave, quantidade, valor in rows:
+                atual = totais.get(chave, (0, 0.0))
+                totais[chave] = (atual[0] + quantidade, atual[1] + (valor or 0))
+
+        rotulos = {}
+        if por in _LABELS and totais:
+            ids = [chave for chave in totais if chave]
+            for start in range(0, len(ids), 500):
+                chunk = ids[start:start + 500]
+                rotulos.update(conn.execute(
+                    _LABELS[por].format(ids=", ".join("?" * len(chunk))), chunk
+                ))
+
+    if por == "funcionario":
+        rotulos[0] = "Sem vendedor"
+    removido = "Produto removido" if por == "produto" else None
+    report = [
+        (chave, rotulos.get(chave, removido or chave), quantidade, round(valor, 2))
+        for chave, (quantidade, valor) in totais.items()
+    ]
+    if por == "dia":
+        return sorted(report)
+    return sorted(report, key=lambda row: (-row[3], str(row[0])))
@@ -1,184 +1,445 @@
 import sqlite3
 import hashlib
 import os
-
-BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+import re
+import string
+import unicodedata
+from datetime import date, datetime
+
+from app.database.connection import manager, STORAGE_PROFILES, DEFAULT_PROFILE, read_storage_profile
+from app.database.barcode_index import barcode_index
+from app.database import media_store
+from app.database.migrations import migrate, create_media_schema, FTS_EM_LOTE, PONTO_REPOSICAO
+from app.core.images import make_thumbnail
+
+# VENDAPRO_DATA_DIR troca a pasta dos bancos (os testes usam uma temporária);
+# precisa estar definida antes deste import, que já cria o banco global
+BASE_DIR = os.environ.get("VENDAPRO_DATA_DIR") or os.path.dirname(os.path.abspath(__file__))
 GLOBAL_DB = os.path.join(BASE_DIR, "database.db")  # banco global para registrar empresas
 
 # ------------------- UTIL -------------------
 def hash_password(password):
     return hashlib.sha256(password.encode()).hexdigest()
 
-def get_connection(db_path=GLOBAL_DB):
-    return sqlite3.connect(db_path)
+def get_connection(db_path=None):
+    """Conexão reaproveitada do gerenciador (padrão: banco global); use sempre com `with`."""
+    return manager.connection(db_path or GLOBAL_DB)
+
+# ------------------- PAGINAÇÃO -------------------
+PAGE_SIZE = 100
+
+def _keyset_page(db_path, table, columns, orderable, order_by, where, params, limit, after_key):
+    """Página de `table` filtrada e ordenada no SQL, com cursor keyset.
+
+    `order_by` é uma coluna de `orderable` (prefixo "-" = decrescente); o
+    desempate é sempre pelo id. `after_key` é o `next_key` da página
+    anterior. O total só é contado na primeira página (after_key=None).
+    Retorna (linhas, total, next_key); next_key=None na última página.
+    """
+    desc = order_by.startswith("-")
+    column = order_by.lstrip("-")
+    if column not in orderable:
+        raise ValueError(f"Ordenação inválida: {order_by}")
+    direction = "DESC" if desc else "ASC"
+    op = "<" if desc else ">"
+
+    where = list(where)
+    params = list(params)
+    total_where = " AND ".join(where) or "1"
+    total_params = list(params)
+
+    if after_key is not None:
+        if column == "id":
+            where.append(f"id {op} ?")
+            params.append(after_key[1])
+        else:
+            where.append(f"({column}, id) {op} (?, ?)")
+            params.extend(after_key)
+
+    sql = f"""
+        SELECT {', '.join(columns)}
+        FROM {table}
+        WHERE {' AND '.join(where) or '1'}
+        ORDER BY {column} {direction}, id {direction}
+        LIMIT ?
+    """
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute(sql, params + [limit + 1])
+        rows = cursor.fetchall()
+
+        total = None
+        if after_key is None:
+            cursor.execute(f"SELECT COUNT(*) FROM {table} WHERE {total_where}", total_params)
+            total = cursor.fetchone()[0]
+
+    next_key = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_key = (last[columns.index(column)], last[0])
+    return rows, total, next_key
+
+def _name_filter(search):
+    if not search:
+        return [], []
+    return ["name LIKE ?"], [f"%{search}%"]
+
+# LIKE do SQLite só ignora maiúsculas/minúsculas em ASCII
+_LIKE_FOLD = str.maketrans(string.ascii_uppercase, string.ascii_lowercase)
+
+def name_matches(row, search):
+    """Mesmo critério de _name_filter aplicado a uma linha já carregada
+    (a coluna name é sempre a segunda nas listagens)"""
+    return str(search).translate(_LIKE_FOLD) in str(row[1] or "").translate(_LIKE_FOLD)
+
+# ------------------- FOTOS -------------------
+# os registros guardam só o hash da foto (photo_hash); a imagem fica na
+# biblioteca (media_store) e a miniatura na tabela midia. Linhas antigas,
+# com photo/thumb preenchidos, são movidas por migrate_photos_to_store.
+# Listagens trazem só a miniatura; a foto original é lida com get_photo().
+THUMB = "COALESCE(thumb, (SELECT m.thumb FROM midia m WHERE m.hash = photo_hash))"
+
+PHOTO_TABLES = ("produto", "clients", "funcionarios", "fornecedores", "users")
+THUMB_TABLES = ("produto", "clients", "funcionarios", "fornecedores")
+# foto nova: só o hash, e limpa o BLOB antigo se a linha ainda tiver
+SET_PHOTO = "photo_hash=?, photo=NULL, thumb=NULL"
+
+def get_photo(company_name, entity, entity_id):
+    """Bytes da foto de um registro (entity = nome da tabela)"""
+    if entity not in PHOTO_TABLES:
+        raise ValueError(f"Entidade sem foto: {entity}")
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        row = conn.execute(f"SELECT photo_hash, photo FROM {entity} WHERE id = ?", (entity_id,)).fetchone()
+    if not row:
+        return None
+    return media_store.read(db_path, row[0]) if row[0] else row[1]
+
+def get_photo_path(company_name, entity, entity_id):
+    """Arquivo da foto na biblioteca, para ler direto do disco (QPixmap,
+    QImageReader) sem passar os bytes pelo Python; None sem foto ou com a
+    foto ainda no registro"""
+    if entity not in PHOTO_TABLES:
+        raise ValueError(f"Entidade sem foto: {entity}")
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        row = conn.execute(f"SELECT photo_hash FROM {entity} WHERE id = ?", (entity_id,)).fetchone()
+    return media_store.media_path(db_path, row[0]) if row and row[0] else None
+
+def backfill_thumbnails(company_name, batch_size=200):
+    """Gera as miniaturas das fotos gravadas antes da coluna thumb existir
+    e das imagens da biblioteca que ficaram sem miniatura"""
+    db_path = get_company_db_path(company_name)
+    total = 0
+    for table in THUMB_TABLES:
+        while True:
+            with get_connection(db_path) as conn:
+                rows = conn.execute(
+                    f"SELECT id, photo FROM {table} WHERE photo IS NOT NULL AND thumb IS NULL LIMIT ?",
+                    (batch_size,)
+                ).fetchall()
+            if not rows:
+                break
+            thumbs = [(make_thumbnail(photo), row_id) for row_id, photo in rows]
+            with get_connection(db_path) as conn:
+                conn.executemany(f"UPDATE {table} SET thumb = ? WHERE id = ?", thumbs)
+            total += len(rows)
+
+    ultimo = 0
+    while True:
+        with get_connection(db_path) as conn:
+            rows = conn.execute(
+                "SELECT id, hash FROM midia WHERE thumb IS NULL AND id > ? ORDER BY id LIMIT ?",
+                (ultimo, batch_size)
+            ).fetchall()
+        if not rows:
+            break
+        ultimo = rows[-1][0]
+        thumbs = [(make_thumbnail(media_store.read(db_path, key)) or b"", row_id) for row_id, key in rows]
+        with get_connection(db_path) as conn:
+            conn.executemany("UPDATE midia SET thumb = ? WHERE id = ?", thumbs)
+        total += len(rows)
+    return total
+
+def _get_row_by_id(company_name, table, row_id):
+    """Linha completa; na coluna photo vêm os bytes da foto, da biblioteca
+    quando a linha guarda só o hash"""
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        cursor = conn.execute(f"SELECT * FROM {table} WHERE id = ?", (row_id,))
+        row = cursor.fetchone()
+        names = [column[0] for column in cursor.description]
+    if row is None or "photo_hash" not in names or not row[names.index("photo_hash")]:
+        return row
+    row = list(row)
+    row[names.index("photo")] = media_store.read(db_path, row[names.index("photo_hash")])
+    return tuple(row)
+
+# ------------------- BIBLIOTECA -------------------
+MIGRAR_LOTE = 50  # fotos movidas por transação
+MEDIA_COLUMNS = ["id", "hash", "tamanho", "refs", "criada_em", "thumb"]
+# nome de exibição de cada tabela que aponta para a biblioteca
+MEDIA_OWNERS = {"produto": "nome", "clients": "name", "funcionarios": "name",
+                "fornecedores": "name", "users": "username"}
+
+def _move_photos(db_path, table, blob, hash_column, where, params, batch_size):
+    """Move os BLOBs `blob` de `table` para a biblioteca de `db_path`, em
+    lotes; retorna quantas linhas foram movidas"""
+    thumb = "thumb" if table in THUMB_TABLES else "NULL"
+    clear = f"{blob} = NULL" + (", thumb = NULL" if table in THUMB_TABLES else "")
+    total = 0
+    while True:
+        with get_connection(db_path) as conn:
+            rows = conn.execute(
+                f"SELECT id, {blob}, {thumb} FROM {table} WHERE {blob} IS NOT NULL AND {where} LIMIT ?",
+                list(params) + [batch_size]
+            ).fetchall()
+        if not rows:
+            return total
+        # hash e miniatura fora da transação; a miniatura antiga é reaproveitada
+        photos = []
+        for row_id, data, old_thumb in rows:
+            photo = media_store.prepare(data, thumb=old_thumb is None and table in THUMB_TABLES)
+            if photo and old_thumb is not None:
+                photo = photo[:2] + (old_thumb,)
+            photos.append((row_id, photo))
+        with get_connection(db_path) as conn:
+            for row_id, photo in photos:
+                # a linha pode ter ganhado foto nova entre a leitura e aqui
+                conn.execute(
+                    f"UPDATE {table} SET {hash_column} = ?, {clear} WHERE id = ? AND {blob} IS NOT NULL",
+                    (media_store.put(conn, db_path, photo), row_id)
+                )
+        total += len(rows)
+
+def migrate_photos_to_store(company_name, batch_size=MIGRAR_LOTE):
+    """Move as fotos gravadas como BLOB nos registros (e a logo da empresa,
+    no banco global) para a biblioteca. Imagens iguais viram um arquivo só.
+    Retorna quantos registros foram movidos."""
+    db_path = get_company_db_path(company_name)
+    total = sum(
+        _move_photos(db_path, table, "photo", "photo_hash", "1", (), batch_size)
+        for table in PHOTO_TABLES
+    )
+    total += _move_photos(GLOBAL_DB, "companies", "logo", "logo_hash", "name = ?", (company_name,), batch_size)
+    return total
+
+def update_media_library(company_name):
+    """Job da biblioteca: move as fotos antigas e apaga as imagens sem
+    referência há mais de media_store.CARENCIA_DIAS. Retorna (registros
+    movidos, arquivos removidos, bytes)."""
+    movidos = migrate_photos_to_store(company_name)
+    dias = media_store.CARENCIA_DIAS
+    removidos, liberados = media_store.collect(get_company_db_path(company_name), dias)
+    globais, bytes_globais = media_store.collect(GLOBAL_DB, dias)
+    return movidos, removidos + globais, liberados + bytes_globais
+
+def collect_media(company_name):
+    """Apaga agora as imagens sem referência; retorna (arquivos, bytes)"""
+    return media_store.collect(get_company_db_path(company_name))
+
+def get_media_page(company_name, order_by="-id", limit=PAGE_SIZE, after_key=None, orfas=False):
+    """Página das imagens da biblioteca (MEDIA_COLUMNS)"""
+    where = ["refs <= 0"] if orfas else []
+    return _keyset_page(
+        get_company_db_path(company_name), "midia", MEDIA_COLUMNS, ("id", "tamanho", "refs"),
+        order_by, where, [], limit, after_key
+    )
+
+def get_media_path(company_name, key):
+    return media_store.media_path(get_company_db_path(company_name), key)
+
+def get_media_stats(company_name):
+    """Totais da biblioteca: arquivos, bytes em disco, referências, bytes
+    que as fotos ocupariam copiadas em cada registro, fotos ainda em BLOB e
+    imagens sem referência"""
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        arquivos, em_disco, refs, sem_dedup, orfas = conn.execute("""
+            SELECT COUNT(*), COALESCE(SUM(tamanho), 0), COALESCE(SUM(refs), 0),
+                   COALESCE(SUM(tamanho * refs), 0), COALESCE(SUM(refs <= 0), 0)
+            FROM midia
+        """).fetchone()
+        em_blob = sum(
+            conn.execute(f"SELECT COUNT(*) FROM {table} WHERE photo IS NOT NULL").fetchone()[0]
+            for table in PHOTO_TABLES
+        )
+    return {
+        "arquivos": arquivos, "bytes": em_disco, "referencias": refs,
+        "bytes_sem_dedup": sem_dedup, "em_blob": em_blob, "orfas": orfas,
+    }
+
+def get_media_usage(company_name, key, limit=50):
+    """Registros que usam a imagem: [(tabela, id, nome)]"""
+    db_path = get_company_db_path(company_name)
+    union = " UNION ALL ".join(
+        f"SELECT '{table}', id, {nome} FROM {table} WHERE photo_hash = :hash"
+        for table, nome in MEDIA_OWNERS.items()
+    )
+    with get_connection(db_path) as conn:
+        return conn.execute(f"{union} LIMIT :limit", {"hash": key, "limit": limit}).fetchall()
+
+def set_products_photo(company_name, photos):
+    """Grava fotos de produtos num lote (uma transação): `photos` são pares
+    (codigo_barra, imagem preparada por media_store.prepare). Retorna os
+    códigos que não existem."""
+    db_path = get_company_db_path(company_name)
+    faltando = []
+    with get_connection(db_path) as conn:
+        for codigo_barra, photo in photos:
+            cursor = conn.execute(
+                f"UPDATE produto SET {SET_PHOTO} WHERE codigo_barra = ?",
+                (media_store.put(conn, db_path, photo), str(codigo_barra))
+            )
+            if not cursor.rowcount:
+                faltando.append(codigo_barra)
+    return faltando
+
+def compact_company_db(company_name):
+    """VACUUM do banco da empresa: devolve ao disco o espaço das fotos
+    movidas. Retorna (bytes antes, bytes depois)."""
+    db_path = get_company_db_path(company_name)
+    antes = os.path.getsize(db_path)
+    with get_connection(db_path) as conn:
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    return antes, os.path.getsize(db_path)
+
+def known_media(company_name):
+    """Hashes já na biblioteca (o import não recalcula a miniatura deles)"""
+    with get_connection(get_company_db_path(company_name)) as conn:
+        return {key for (key,) in conn.execute("SELECT hash FROM midia")}
 
 # ------------------- INICIALIZAÇÃO -------------------
 def init_db():
     """Banco global apenas para companies (empresa + logo)"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS companies (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT UNIQUE NOT NULL,
-            logo BLOB
-        )
-    """)
-    conn.commit()
-    conn.close()
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS companies (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT UNIQUE NOT NULL,
+                logo BLOB
+            )
+        """)
+        # logos na biblioteca do banco global (logo fica só nas antigas)
+        create_media_schema(cursor, [("companies", "logo_hash")])
 
 def get_company_db_path(company_name):
     safe_name = company_name.lower().replace(" ", "_")
     return os.path.join(BASE_DIR, f"{safe_name}.db")
 
-def init_company_db(company_name):
+def init_company_db(company_name, storage_profile=DEFAULT_PROFILE):
+    """Cria ou atualiza (migrações) o banco isolado da empresa"""
     db_path = get_company_db_path(company_name)
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-
-    # ⭐ NOVA TABELA USERS
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            username TEXT UNIQUE NOT NULL,
-            password TEXT NOT NULL,
-            photo BLOB
-        )
-    """) 
-
-    # ⭐ NOVA TABELA CLIENTES
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS clients (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT,
-            phone TEXT,
-            address TEXT,
-            photo BLOB
-        )
-    """)
-
-    # ⭐ NOVA TABELA FUNCIONÁRIOS
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS funcionarios (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT,
-            phone TEXT,
-            cargo TEXT,
-            address TEXT,
-            photo BLOB
+    with get_connection(db_path) as conn:
+        migrate(conn)
+        conn.execute(
+            "INSERT OR IGNORE INTO configuracao (chave, valor) VALUES ('storage_profile', ?)",
+            (storage_profile,)
         )
-    """)
-
-    # ⭐ NOVA TABELA FORNECEDORES
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS fornecedores (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT NOT NULL,
-            email TEXT,
-            phone TEXT,
-            address TEXT,
-            photo BLOB
-        )
-    """)
-
-    # ⭐ NOVA TABELA PRODUTOS
-    cursor.execute("""
-        CREATE TABLE produto (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            nome TEXT NOT NULL,
-            valor REAL NOT NULL,
-            quantidade INTEGER NOT NULL,
-            marca TEXT NOT NULL,
-            codigo_barra TEXT UNIQUE NOT NULL,
-            photo BLOB
-        )
-    """)
-
-    # ⭐ NOVA TABELA ESTOQUE
-    cursor.execute("""
-        CREATE TABLE estoque (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            produto_id INTEGER NOT NULL,
-            codigo_barra TEXT NOT NULL,
-            quantidade INTEGER NOT NULL,
-            movimento_tipo TEXT NOT NULL,  
-            origem TEXT NOT NULL,         
-            data TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY(produto_id) REFERENCES produto(id)
+
+    # reabre as conexões para aplicar o perfil salvo
+    manager.close(db_path)
+    return db_path
+
+def get_storage_profile(company_name):
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        return read_storage_profile(conn)
+
+def set_storage_profile(company_name, profile):
+    """Troca o perfil de armazenamento ("fast" ou "durable") da empresa"""
+    if profile not in STORAGE_PROFILES:
+        raise ValueError(f"Perfil de armazenamento desconhecido: {profile}")
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO configuracao (chave, valor) VALUES ('storage_profile', ?)",
+            (profile,)
         )
-    """)
+    manager.close(db_path)
+
+def open_company_db(company_name):
+    """Abre (e aquece) a conexão da empresa; chamado no login.
 
-    conn.commit()
-    conn.close()
+    Bancos criados por versões antigas são migrados aqui, no lugar.
+    """
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        migrate(conn)
+    barcode_index.load(db_path)
     return db_path
+
+def close_company_db(company_name):
+    """Fecha as conexões da empresa; chamado no logout / troca de empresa."""
+    db_path = get_company_db_path(company_name)
+    barcode_index.drop(db_path)
+    manager.close(db_path)
  
 # ------------------- EMPRESA -------------------
-def create_company(name, logo_bytes=None):
+def create_company(name, logo_bytes=None, storage_profile=DEFAULT_PROFILE):
     """Cria empresa global + DB isolado"""
-    conn = get_connection()
-    cursor = conn.cursor()
+    logo = media_store.prepare(logo_bytes, thumb=False)
     try:
-        cursor.execute("INSERT INTO companies (name, logo) VALUES (?, ?)", (name, logo_bytes))
-        conn.commit()
-        company_id = cursor.lastrowid
+        with get_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO companies (name, logo_hash) VALUES (?, ?)",
+                (name, media_store.put(conn, GLOBAL_DB, logo))
+            )
+            company_id = cursor.lastrowid
     except sqlite3.IntegrityError:
-        conn.close()
         return None  # empresa já existe
-    conn.close()
 
     # inicializa DB isolado da empresa
-    init_company_db(name)
+    init_company_db(name, storage_profile)
     return company_id
 
 def get_all_companies():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, name FROM companies ORDER BY name")
-    companies = cursor.fetchall()
-    conn.close()
-    return companies
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, name FROM companies ORDER BY name")
+        return cursor.fetchall()
 
 def get_company_logo(company_name):
     """Retorna bytes da logo da empresa"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("SELECT logo FROM companies WHERE name = ?", (company_name,))
-    row = cursor.fetchone()
-    conn.close()
-    return row[0] if row else None
+    with get_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT logo_hash, logo FROM companies WHERE name = ?", (company_name,))
+        row = cursor.fetchone()
+    if not row:
+        return None
+    return media_store.read(GLOBAL_DB, row[0]) if row[0] else row[1]
 
 # ------------------- USUÁRIO -------------------
 def create_user(company_name, username, password, photo_bytes=None):
     """Cria usuário dentro do DB da empresa"""
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
+    photo = media_store.prepare(photo_bytes, thumb=False)
     try:
-        cursor.execute(
-            "INSERT INTO users (username, password, photo) VALUES (?, ?, ?)",
-            (username, hash_password(password), photo_bytes)
-        )
-        conn.commit()
+        with get_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT INTO users (username, password, photo_hash) VALUES (?, ?, ?)",
+                (username, hash_password(password), media_store.put(conn, db_path, photo))
+            )
         return True
     except sqlite3.IntegrityError:
         return False
-    finally:
-        conn.close()
 
 def get_user_by_id(company_name, user_id):
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)  # conecta no DB certo
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, username, photo FROM users WHERE id = ?", (user_id,))
-    row = cursor.fetchone()
-    conn.close()
+    with get_connection(db_path) as conn:  # conecta no DB certo
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, username, photo_hash, photo FROM users WHERE id = ?", (user_id,))
+        row = cursor.fetchone()
     if row:
         return {
             "id": row[0],
             "username": row[1],
-            "photo": row[2],
+            "photo": media_store.read(db_path, row[2]) if row[2] else row[3],
             "company_name": company_name
         }
     return None
@@ -186,28 +447,36 @@ def get_user_by_id(company_name, user_id):
 # ------------------- CLIENTES -------------------
 def create_client(company_name, name, email, phone, address, photo_bytes=None):
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO clients (name, email, phone, address, photo)
-        VALUES (?, ?, ?, ?, ?)
-    """, (name, email, phone, address, photo_bytes))
-    conn.commit()
-    conn.close()
+    photo = media_store.prepare(photo_bytes)
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO clients (name, email, phone, address, photo_hash)
+            VALUES (?, ?, ?, ?, ?)
+        """, (name, email, phone, address, media_store.put(conn, db_path, photo)))
+
+CLIENT_COLUMNS = ["id", "name", "email", "phone", "address", THUMB]
 
 def get_all_clients(company_name):
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM clients ORDER BY id DESC")
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {', '.join(CLIENT_COLUMNS)} FROM clients ORDER BY id DESC")
+        return cursor.fetchall()
+
+def get_client_by_id(company_name, client_id):
+    """Linha completa (com foto) de um único registro"""
+    return _get_row_by_id(company_name, "clients", client_id)
+
+def get_clients_page(company_name, search=None, order_by="-id", limit=PAGE_SIZE, after_key=None):
+    where, params = _name_filter(search)
+    return _keyset_page(
+        get_company_db_path(company_name), "clients", CLIENT_COLUMNS, ("id", "name"),
+        order_by, where, params, limit, after_key
+    )
 
 def update_client(company_name, client_id, name=None, email=None, phone=None, address=None, photo=None):
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
 
     fields = []
     params = []
@@ -224,56 +493,61 @@ def update_client(company_name, client_id, name=None, email=None, phone=None, ad
     if address:
         fields.append("address=?")
         params.append(address)
+    photo = media_store.prepare(photo)
     if photo:
-        fields.append("photo=?")
-        params.append(photo)
+        fields.append(SET_PHOTO)
+        params.append(photo[0])
 
     if not fields:
-        conn.close()
         return False  # nada pra atualizar
 
     params.append(client_id)
     sql = f"UPDATE clients SET {', '.join(fields)} WHERE id=?"
-    cursor.execute(sql, params)
-    conn.commit()
-    conn.close()
+    with get_connection(db_path) as conn:
+        media_store.put(conn, db_path, photo)
+        conn.execute(sql, params)
     return True
 
 
 def delete_client(company_name, client_id):
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM clients WHERE id=?", (client_id,))
-    conn.commit()
-    conn.close()
+    with get_connection(db_path) as conn:
+        conn.execute("DELETE FROM clients WHERE id=?", (client_id,))
  
 # ------------------- FUNCIONÁRIOS -------------------
 def create_funcionario(company_name, name, email, phone, cargo, address, photo_bytes=None):
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO funcionarios (name, email, phone, cargo, address, photo)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (name, email, phone, cargo, address, photo_bytes))
-    conn.commit()
-    conn.close()
+    photo = media_store.prepare(photo_bytes)
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO funcionarios (name, email, phone, cargo, address, photo_hash)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, (name, email, phone, cargo, address, media_store.put(conn, db_path, photo)))
+
+FUNCIONARIO_COLUMNS = ["id", "name", "email", "phone", "cargo", "address", THUMB]
 
 def get_all_funcionarios(company_name):
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM funcionarios ORDER BY id DESC")
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {', '.join(FUNCIONARIO_COLUMNS)} FROM funcionarios ORDER BY id DESC")
+        return cursor.fetchall()
+
+def get_funcionario_by_id(company_name, funcionario_id):
+    """Linha completa (com foto) de um único registro"""
+    return _get_row_by_id(company_name, "funcionarios", funcionario_id)
 
 
+def get_funcionarios_page(company_name, search=None, order_by="-id", limit=PAGE_SIZE, after_key=None):
+    where, params = _name_filter(search)
+    return _keyset_page(
+        get_company_db_path(company_name), "funcionarios", FUNCIONARIO_COLUMNS, ("id", "name"),
+        order_by, where, params, limit, after_key
+    )
+
 def update_funcionario(company_name, funcionario_id, name=None, email=None, phone=None, cargo=None, address=None, photo_bytes=None):
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
 
     fields = []
     params = []
@@ -293,55 +567,60 @@ def update_funcionario(company_name, funcionario_id, name=None, email=None, phon
     if address:
         fields.append("address=?")
         params.append(address)
-    if photo_bytes is not None:  # permite atualizar a foto
-        fields.append("photo=?")
-        params.append(photo_bytes)
+    photo = media_store.prepare(photo_bytes)
+    if photo:  # permite atualizar a foto
+        fields.append(SET_PHOTO)
+        params.append(photo[0])
 
     if not fields:
-        conn.close()
         return False
 
     params.append(funcionario_id)
     sql = f"UPDATE funcionarios SET {', '.join(fields)} WHERE id=?"
-    cursor.execute(sql, params)
-    conn.commit()
-    conn.close()
+    with get_connection(db_path) as conn:
+        media_store.put(conn, db_path, photo)
+        conn.execute(sql, params)
     return True
 
 
 def delete_funcionario(company_name, funcionario_id):
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM funcionarios WHERE id=?", (funcionario_id,))
-    conn.commit()
-    conn.close()
+    with get_connection(db_path) as conn:
+        conn.execute("DELETE FROM funcionarios WHERE id=?", (funcionario_id,))
 
 # ------------------- FORNECCEDORES -------------------
 def create_fornecedor(company_name, name, email, phone, address, photo_bytes=None):
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO fornecedores (name, email, phone, address, photo)
-        VALUES (?, ?, ?, ?, ?)
-    """, (name, email, phone, address, photo_bytes))
-    conn.commit()
-    conn.close()
+    photo = media_store.prepare(photo_bytes)
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO fornecedores (name, email, phone, address, photo_hash)
+            VALUES (?, ?, ?, ?, ?)
+        """, (name, email, phone, address, media_store.put(conn, db_path, photo)))
+
+FORNECEDOR_COLUMNS = ["id", "name", "email", "phone", "address", THUMB]
 
 def get_all_fornecedores(company_name):
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM fornecedores ORDER BY id DESC")
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {', '.join(FORNECEDOR_COLUMNS)} FROM fornecedores ORDER BY id DESC")
+        return cursor.fetchall()
+
+def get_fornecedor_by_id(company_name, forn_id):
+    """Linha completa (com foto) de um único registro"""
+    return _get_row_by_id(company_name, "fornecedores", forn_id)
+
+def get_fornecedores_page(company_name, search=None, order_by="-id", limit=PAGE_SIZE, after_key=None):
+    where, params = _name_filter(search)
+    return _keyset_page(
+        get_company_db_path(company_name), "fornecedores", FORNECEDOR_COLUMNS, ("id", "name"),
+        order_by, where, params, limit, after_key
+    )
 
 def update_fornecedor(company_name, forn_id, name=None, email=None, phone=None, address=None, photo=None):
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
 
     fields = []
     params = []
@@ -358,57 +637,82 @@ def update_fornecedor(company_name, forn_id, name=None, email=None, phone=None,
     if address:
         fields.append("address=?")
         params.append(address)
+    photo = media_store.prepare(photo)
     if photo:
-        fields.append("photo=?")
-        params.append(photo)
+        fields.append(SET_PHOTO)
+        params.append(photo[0])
 
     if not fields:
-        conn.close()
         return False  # nada pra atualizar
 
     params.append(forn_id)
     sql = f"UPDATE fornecedores SET {', '.join(fields)} WHERE id=?"
-    cursor.execute(sql, params)
-    conn.commit()
-    conn.close()
+    with get_connection(db_path) as conn:
+        media_store.put(conn, db_path, photo)
+        conn.execute(sql, params)
     return True
 
 
 def delete_fornecedor(company_name, client_id):
 
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM fornecedores WHERE id=?", (client_id,))
-    conn.commit()
-    conn.close()
+    with get_connection(db_path) as conn:
+        conn.execute("DELETE FROM fornecedores WHERE id=?", (client_id,))
 
 # ------------------- PRODUTOS -------------------
 def create_product(company_name, nome, valor, quantidade, marca, codigo_barra, photo_bytes=None):
+    """Cria o produto com saldo zero; a quantidade inicial entra pelo histórico"""
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO produto (nome, valor, quantidade, marca, codigo_barra, photo)
-        VALUES (?, ?, ?, ?, ?, ?)
-    """, (nome, valor, quantidade, marca, codigo_barra, photo_bytes))
-    conn.commit()
-    conn.close()
+    photo = media_store.prepare(photo_bytes)
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO produto (nome, valor, quantidade, marca, codigo_barra, photo_hash)
+            VALUES (?, ?, 0, ?, ?, ?)
+        """, (nome, valor, marca, codigo_barra, media_store.put(conn, db_path, photo)))
+        product_id = cursor.lastrowid
+        _adjust_stock(conn, product_id, int(quantidade or 0), SALDO_INICIAL)
+    barcode_index.refresh(db_path, [product_id])
+
 
+PRODUCT_COLUMNS = ["id", "nome", "valor", "quantidade", "marca", "codigo_barra", THUMB]
 
 def get_all_products(company_name):
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT * FROM produto ORDER BY id DESC")
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
-
-def update_product(company_name, product_id, nome=None, valor=None, quantidade=None, marca=None, codigo_barra=None, photo=None):
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {', '.join(PRODUCT_COLUMNS)} FROM produto ORDER BY id DESC")
+        return cursor.fetchall()
+
+def get_product_by_id(company_name, product_id):
+    """Linha completa (com foto) de um único registro"""
+    return _get_row_by_id(company_name, "produto", product_id)
+
+def get_products_page(company_name, search=None, order_by="-id", limit=PAGE_SIZE, after_key=None, classe=None):
+    """Página de produtos; a busca usa o índice full-text (nome, marca, código).
+    `classe` ("A", "B" ou "C") filtra pela última curva ABC calculada."""
+    where, params = [], []
+    query = fts_query(search) if search else ""
+    if query:
+        where.append("id IN (SELECT rowid FROM produto_fts WHERE produto_fts MATCH ?)")
+        params.append(query)
+    if classe:
+        where.append("id IN (SELECT produto_id FROM produto_abc WHERE classe = ?)")
+        params.append(classe)
+    return _keyset_page(
+        get_company_db_path(company_name), "produto", PRODUCT_COLUMNS, ("id", "nome", "marca"),
+        order_by, where, params, limit, after_key
+    )
+
+MANTER = object()  # ponto_reposicao não informado (None volta ao automático)
+
+def update_product(company_name, product_id, nome=None, valor=None, quantidade=None, marca=None, codigo_barra=None, photo=None,
+                   ponto_reposicao=MANTER):
+    """Atualiza os campos informados numa transação (o trigger de alertas vê
+    saldo e ponto de reposição juntos). Retorna True; None se não houver
+    nada para atualizar; False, sem gravar, se o código de barras já for de
+    outro produto ou o saldo ficaria negativo."""
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
 
     fields = []
     params = []
@@ -421,10 +725,6 @@ def update_product(company_name, product_id, nome=None, valor=None, quantidade=N
         fields.append("valor=?")
         params.append(valor)
 
-    if quantidade is not None:
-        fields.append("quantidade=?")
-        params.append(quantidade)
-
     if marca is not None:
         fields.append("marca=?")
         params.append(marca)
@@ -433,106 +733,309 @@ def update_product(company_name, product_id, nome=None, valor=None, quantidade=N
         fields.append("codigo_barra=?")
         params.append(codigo_barra)
 
-    if photo is not None:
-        fields.append("photo=?")
-        params.append(photo)
+    if ponto_reposicao is not MANTER:
+        fields.append("ponto_reposicao=?")
+        params.append(None if ponto_reposicao is None else int(ponto_reposicao))
 
-    if not fields:
-        conn.close()
-        return False  # nada pra atualizar
+    photo = media_store.prepare(photo)
+    if photo:
+        fields.append(SET_PHOTO)
+        params.append(photo[0])
+
+    if not fields and quantidade is None:
+        return None  # nada pra atualizar
 
     params.append(product_id)
 
     sql = f"UPDATE produto SET {', '.join(fields)} WHERE id=?"
-    cursor.execute(sql, params)
-
-    conn.commit()
-    conn.close()
+    try:
+        with get_connection(db_path) as conn:
+            if fields:
+                media_store.put(conn, db_path, photo)
+                conn.execute(sql, params)
+            if quantidade is not None:
+                # saldo editado à mão vira movimento de ajuste no histórico
+                _adjust_stock(conn, product_id, int(quantidade), AJUSTE)
+    except sqlite3.IntegrityError:
+        return False  # saldo negativo ou código de barras já usado
+    barcode_index.refresh(db_path, [product_id])
     return True
 
 
 def delete_product(company_name, product_id):
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM produto WHERE id=?", (product_id,))
-    conn.commit()
-    conn.close()
+    with get_connection(db_path) as conn:
+        conn.execute("DELETE FROM produto WHERE id=?", (product_id,))
+    barcode_index.refresh(db_path, [product_id])
     
 
-def get_product_by_search(company_name, termo):
+def _product_dict(row):
+    return {
+        'id': row[0],
+        'nome': row[1],
+        'marca': row[2],
+        'valor': row[3],
+        'quantidade': row[4],
+        'codigo_barra': row[5]
+    }
+
+def fts_query(termo):
+    """Converte o texto digitado em consulta FTS5 (prefixo em cada palavra)"""
+    tokens = re.findall(r"\w+", str(termo))
+    return " ".join(f'"{t}"*' for t in tokens)
+
+def _fts_tokens(texto):
+    # mesma normalização do tokenizer unicode61 (remove_diacritics 2)
+    texto = unicodedata.normalize("NFKD", str(texto or "").lower())
+    texto = "".join(c for c in texto if not unicodedata.combining(c))
+    return re.findall(r"[^\W_]+", texto)
+
+def product_matches(row, search):
+    """Mesmo critério da busca full-text de get_products_page aplicado a
+    uma linha de PRODUCT_COLUMNS já carregada"""
+    words = set()
+    for column in ("nome", "marca", "codigo_barra"):
+        words.update(_fts_tokens(row[PRODUCT_COLUMNS.index(column)]))
+    return all(any(w.startswith(t) for w in words) for t in _fts_tokens(search))
+
+def get_product_by_barcode(company_name, codigo_barra):
+    """Leitura do caixa: índice em memória; o banco só quando o código não
+    está no índice (produto de outro terminal ou índice não carregado)"""
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
-    
-    like_term = f"%{termo}%"
-    cursor.execute("""
-        SELECT id, nome, marca, valor, quantidade, codigo_barra
-        FROM produto
-        WHERE nome LIKE ? OR marca LIKE ? OR codigo_barra LIKE ?
-        LIMIT 1
-    """, (like_term, like_term, like_term))
-    
-    row = cursor.fetchone()
-    conn.close()
-    if row:
-        return {
-            'id': row[0],
-            'nome': row[1],
-            'marca': row[2],
-            'valor': row[3],
-            'quantidade': row[4],
-            'codigo_barra': row[5]
-        }
-    return None
+    row = barcode_index.get(db_path, str(codigo_barra))
+    if row is not None:
+        return _product_dict(row)
+
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, nome, marca, valor, quantidade, codigo_barra
+            FROM produto
+            WHERE codigo_barra = ?
+        """, (str(codigo_barra),))
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    barcode_index.refresh(db_path, [row[0]])
+    return _product_dict(row)
+
+def barcode_index_stats():
+    """Acertos / faltas do índice de códigos de barras (desde o início)"""
+    return barcode_index.stats()
+
+def _parece_codigo(termo):
+    # uma palavra com dígitos; nomes digitados no caixa não passam pelo índice
+    return not any(ch.isspace() for ch in termo) and any(ch.isdigit() for ch in termo)
+
+def search_products(company_name, termo, limit=20):
+    """Busca ranqueada: código de barras exato primeiro (se o termo parecer
+    um código), depois full-text"""
+    termo = str(termo).strip()
+    if not termo:
+        return []
+
+    if _parece_codigo(termo):
+        produto = get_product_by_barcode(company_name, termo)
+        if produto:
+            return [produto]
+
+    query = fts_query(termo)
+    if not query:
+        return []
+
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT p.id, p.nome, p.marca, p.valor, p.quantidade, p.codigo_barra
+            FROM produto_fts f
+            JOIN produto p ON p.id = f.rowid
+            WHERE produto_fts MATCH ?
+            ORDER BY bm25(produto_fts, 4.0, 2.0, 1.0)
+            LIMIT ?
+        """, (query, limit))
+        rows = cursor.fetchall()
+    return [_product_dict(row) for row in rows]
+
+def get_product_by_search(company_name, termo):
+    resultados = search_products(company_name, termo, limit=1)
+    return resultados[0] if resultados else None
 
 def update_product_quantity(company_name, product_id, nova_qtd):
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        UPDATE produto
-        SET quantidade = ?
-        WHERE id = ?
-    """, (nova_qtd, product_id))
-    
-    conn.commit()
-    conn.close()
+    with get_connection(db_path) as conn:
+        _adjust_stock(conn, product_id, nova_qtd, AJUSTE)
+    barcode_index.refresh(db_path, [product_id])
 
 
 # ------------------- ESTOQUE -------------------
+# produto.quantidade é mantido pelos triggers do histórico (migração v7):
+# todo movimento gravado, alterado ou apagado em `estoque` ajusta o saldo.
+# Depois do commit, os produtos tocados são relidos no barcode_index.
+ENTRADA = "Entrada"  # demais tipos de movimento (Saída, ...) retiram do saldo
+MOVIMENTO_TIPOS = (ENTRADA, "Saída")
+SALDO_INICIAL = "Saldo inicial"
+AJUSTE = "Ajuste manual"
+
+def _adjust_stock(conn, product_id, nova_qtd, origem):
+    """Leva o saldo do produto a `nova_qtd` gravando a diferença no histórico"""
+    conn.execute("""
+        INSERT INTO estoque (produto_id, codigo_barra, quantidade, movimento_tipo, origem)
+        SELECT id, codigo_barra, ABS(? - quantidade),
+               CASE WHEN ? > quantidade THEN 'Entrada' ELSE 'Saída' END, ?
+        FROM produto
+        WHERE id = ? AND quantidade != ?
+    """, (nova_qtd, nova_qtd, origem, product_id, nova_qtd))
+
 def add_stock(company_name, produto_id, codigo_barra, quantidade, movimento_tipo, origem):
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
+    with get_connection(db_path) as conn:
+        conn.execute("""
+            INSERT INTO estoque (produto_id, codigo_barra, quantidade, movimento_tipo, origem)
+            VALUES (?, ?, ?, ?, ?)
+        """, (produto_id, codigo_barra, quantidade, movimento_tipo, origem))
+    barcode_index.refresh(db_path, [produto_id])
+
+def apply_stock_movements(company_name, movements):
+    """Aplica vários movimentos de estoque numa única transação.
+
+    `movements` é uma lista de (produto_id, quantidade, movimento_tipo, origem).
+    Só o histórico é gravado; o trigger do estoque aplica cada movimento ao
+    saldo de forma relativa (quantidade = quantidade ± n). Retorna False, sem
+    gravar nada, se algum movimento for inválido (quantidade <= 0, tipo fora
+    de MOVIMENTO_TIPOS), algum produto não existir ou ficaria com estoque
+    negativo. Dentro da transação de quem chamou, a recusa sobe como
+    sqlite3.IntegrityError e o `with` mais externo desfaz tudo.
+    """
+    ledger = [
+        (int(qtd), tipo, origem, produto_id)
+        for produto_id, qtd, tipo, origem in movements
+    ]
+    if not ledger:
+        return True
+    if any(qtd <= 0 or tipo not in MOVIMENTO_TIPOS for qtd, tipo, _origem, _id in ledger):
+        return False
 
-    cursor.execute("""
-        INSERT INTO estoque (produto_id, codigo_barra, quantidade, movimento_tipo, origem)
-        VALUES (?, ?, ?, ?, ?)
-    """, (produto_id, codigo_barra, quantidade, movimento_tipo, origem))
+    db_path = get_company_db_path(company_name)
+    nested = manager.nested(db_path)
+    try:
+        with get_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.executemany("""
+                INSERT INTO estoque (produto_id, codigo_barra, quantidade, movimento_tipo, origem)
+                SELECT id, codigo_barra, ?, ?, ? FROM produto WHERE id = ?
+            """, ledger)
+            if cursor.rowcount != len(ledger):
+                raise sqlite3.IntegrityError("produto inexistente")
+    except sqlite3.IntegrityError:
+        if nested:
+            raise
+        return False  # produto inexistente ou estoque insuficiente (trigger produto_qtd_upd)
+    barcode_index.refresh(db_path, [produto_id for produto_id, *_ in movements])
+    return True
 
-    conn.commit()
-    conn.close()
+def reconcile_stock(company_name, fix=False):
+    """Confere o saldo de cada produto contra a soma do histórico.
+
+    Uma única consulta agrupada, resolvida pelo índice idx_estoque_saldo.
+    Retorna [(produto_id, nome, saldo, saldo_historico)] dos produtos com
+    divergência; com fix=True o saldo é corrigido para o do histórico. Os de
+    histórico negativo só são listados: o trigger de saldo não negativo
+    recusaria a correção (o histórico precisa de um ajuste antes).
+    """
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT p.id, p.nome, p.quantidade, COALESCE(s.saldo, 0)
+            FROM produto p
+            LEFT JOIN (
+                SELECT produto_id,
+                       SUM(CASE WHEN movimento_tipo = 'Entrada' THEN quantidade ELSE -quantidade END) AS saldo
+                FROM estoque
+                GROUP BY produto_id
+            ) s ON s.produto_id = p.id
+            WHERE p.quantidade != COALESCE(s.saldo, 0)
+        """)
+        divergentes = cursor.fetchall()
+
+        corrigir = [
+            (saldo_hist, produto_id) for produto_id, _nome, _saldo, saldo_hist in divergentes if saldo_hist >= 0
+        ]
+        if fix and corrigir:
+            cursor.executemany("UPDATE produto SET quantidade = ? WHERE id = ?", corrigir)
+    if fix:
+        barcode_index.refresh(db_path, [produto_id for _saldo, produto_id in corrigir])
+    return divergentes
 
 def get_all_stock(company_name):
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT e.id, p.nome, p.marca, e.codigo_barra, e.quantidade, e.movimento_tipo, e.origem, e.data
-        FROM estoque e
-        JOIN produto p ON e.produto_id = p.id
-        ORDER BY e.data DESC
-    """)
-    rows = cursor.fetchall()
-    conn.close()
-    return rows
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT e.id, p.nome, p.marca, e.codigo_barra, e.quantidade, e.movimento_tipo, e.origem, e.data
+            FROM estoque e
+            JOIN produto p ON e.produto_id = p.id
+            ORDER BY e.data DESC
+        """)
+        return cursor.fetchall()
+
+STOCK_COLUMNS = ["e.id", "p.nome", "p.marca", "e.codigo_barra", "e.quantidade", "e.movimento_tipo", "e.origem", "e.data"]
+
+def get_stock_page(company_name, date_from=None, date_to=None, produto_id=None,
+                   limit=PAGE_SIZE, after_key=None, count=True):
+    """Página do histórico de movimentos, mais recentes primeiro.
+
+    Filtra por período (datas "AAAA-MM-DD", inclusivas) e/ou produto. O
+    cursor é (data, id), servido pelos índices idx_estoque_data e, com
+    produto, idx_estoque_produto_data_qtd (prefixo produto_id, data; só os
+    movimentos de mesmo horário são ordenados por id), então cada página
+    custa o mesmo qualquer que seja o tamanho do histórico. Mesmo retorno de
+    _keyset_page; com count=False o total não é contado (total=None).
+    """
+    where, params = [], []
+    if date_from:
+        where.append("e.data >= ?")
+        params.append(str(date_from))
+    if date_to:
+        where.append("e.data < date(?, '+1 day')")
+        params.append(str(date_to))
+    if produto_id is not None:
+        where.append("e.produto_id = ?")
+        params.append(produto_id)
+    total_where = " AND ".join(where) or "1"
+    total_params = list(params)
+
+    if after_key is not None:
+        where.append("(e.data, e.id) < (?, ?)")
+        params.extend(after_key)
+
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {', '.join(STOCK_COLUMNS)}
+            FROM estoque e
+            JOIN produto p ON e.produto_id = p.id
+            WHERE {' AND '.join(where) or '1'}
+            ORDER BY e.data DESC, e.id DESC
+            LIMIT ?
+        """, params + [limit + 1])
+        rows = cursor.fetchall()
+
+        total = None
+        if count and after_key is None:
+            cursor.execute(f"SELECT COUNT(*) FROM estoque e WHERE {total_where}", total_params)
+            total = cursor.fetchone()[0]
+
+    next_key = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_key = (rows[-1][7], rows[-1][0])
+    return rows, total, next_key
 
 def update_stock(company_name, stock_id, quantidade=None, movimento_tipo=None, origem=None):
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
 
     fields = []
     params = []
@@ -548,24 +1051,936 @@ def update_stock(company_name, stock_id, quantidade=None, movimento_tipo=None, o
         params.append(origem)
 
     if not fields:
-        conn.close()
         return False  # nada pra atualizar
 
     params.append(stock_id)
     sql = f"UPDATE estoque SET {', '.join(fields)} WHERE id=?"
-    cursor.execute(sql, params)
-
-    conn.commit()
-    conn.close()
+    try:
+        with get_connection(db_path) as conn:
+            row = conn.execute("SELECT produto_id FROM estoque WHERE id=?", (stock_id,)).fetchone()
+            conn.execute(sql, params)
+    except sqlite3.IntegrityError:
+        return False  # o saldo ficaria negativo
+    if row:
+        barcode_index.refresh(db_path, [row[0]])
     return True
 
 def delete_stock(company_name, stock_id):
+    """Exclui o movimento; False se o saldo ficaria negativo (entrada já
+    consumida)"""
     db_path = get_company_db_path(company_name)
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
-    cursor.execute("DELETE FROM estoque WHERE id=?", (stock_id,))
-    conn.commit()
-    conn.close()
+    try:
+        with get_connection(db_path) as conn:
+            row = conn.execute("SELECT produto_id FROM estoque WHERE id=?", (stock_id,)).fetchone()
+            conn.execute("DELETE FROM estoque WHERE id=?", (stock_id,))
+    except sqlite3.IntegrityError:
+        return False
+    if row:
+        barcode_index.refresh(db_path, [row[0]])
+    return True
+
+# ------------------- CHECKPOINTS DE ESTOQUE -------------------
+# estoque_checkpoint guarda o saldo de fim de dia de cada produto nos dias em
+# que ele movimentou. 'checkpoint_estoque' (configuracao) é o último dia
+# consolidado; triggers recuam essa marca quando um dia antigo é alterado.
+CHECKPOINT_KEY = "checkpoint_estoque"
+_SINAL = "CASE WHEN movimento_tipo = 'Entrada' THEN quantidade ELSE -quantidade END"
+
+def _dia(value):
+    """"AAAA-MM-DD" de um date, datetime ou texto ("AAAA-MM-DD[ HH:MM:SS]"):
+    os dias são comparados como texto, então precisam do mesmo formato"""
+    if isinstance(value, datetime):
+        return value.strftime("%Y-%m-%d")
+    if isinstance(value, date):
+        return value.isoformat()
+    return datetime.fromisoformat(str(value)).strftime("%Y-%m-%d")
+
+def update_stock_checkpoints(company_name, until=None):
+    """Consolida os checkpoints diários até `until` (date, datetime ou
+    "AAAA-MM-DD"; padrão: ontem).
+
+    Incremental e retomável: continua da marca salva, um mês por transação.
+    Retorna quantos checkpoints foram gravados.
+    """
+    db_path = get_company_db_path(company_name)
+    until = _dia(until) if until else None
+    total = 0
+    while True:
+        with get_connection(db_path) as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            cursor = conn.cursor()
+            fim = until or cursor.execute("SELECT date('now', '-1 day')").fetchone()[0]
+            row = cursor.execute("SELECT valor FROM configuracao WHERE chave = ?", (CHECKPOINT_KEY,)).fetchone()
+            if row:
+                inicio = cursor.execute("SELECT date(?, '+1 day')", (row[0],)).fetchone()[0]
+            else:
+                inicio = cursor.execute("SELECT date(MIN(data)) FROM estoque").fetchone()[0] or fim
+            if inicio > fim:
+                return total
+
+            # no máximo um mês por vez
+            fim_lote = cursor.execute(
+                "SELECT MIN(?, date(?, 'start of month', '+1 month', '-1 day'))", (fim, inicio)
+            ).fetchone()[0]
+            cursor.execute("DELETE FROM estoque_checkpoint WHERE data >= ?", (inicio,))
+            cursor.execute(f"""
+                INSERT INTO estoque_checkpoint (produto_id, data, saldo)
+                SELECT d.produto_id, d.dia,
+                       COALESCE((SELECT c.saldo FROM estoque_checkpoint c
+                                 WHERE c.produto_id = d.produto_id AND c.data < :inicio
+                                 ORDER BY c.data DESC LIMIT 1), 0)
+                       + SUM(d.delta) OVER (PARTITION BY d.produto_id ORDER BY d.dia)
+                FROM (
+                    SELECT produto_id, date(data) AS dia, SUM({_SINAL}) AS delta
+                    FROM estoque
+                    WHERE data >= :inicio AND data < date(:fim, '+1 day')
+                    GROUP BY produto_id, dia
+                ) d
+            """, {"inicio": inicio, "fim": fim_lote})
+            total += cursor.rowcount
+            cursor.execute(
+                "INSERT OR REPLACE INTO configuracao (chave, valor) VALUES (?, ?)",
+                (CHECKPOINT_KEY, fim_lote)
+            )
+
+_AS_OF_SQL = f"""
+    WITH base AS (
+        SELECT p.id, p.nome, p.valor,
+               (SELECT MAX(c.data) FROM estoque_checkpoint c
+                WHERE c.produto_id = p.id
+                  AND c.data <= MIN(:data, COALESCE(
+                      (SELECT valor FROM configuracao WHERE chave = '{CHECKPOINT_KEY}'), ''))
+               ) AS checkpoint
+        FROM produto p
+        WHERE {{where}}
+    )
+    SELECT b.id, b.nome, b.valor,
+           COALESCE((SELECT c.saldo FROM estoque_checkpoint c
+                     WHERE c.produto_id = b.id AND c.data = b.checkpoint), 0)
+           + COALESCE((SELECT SUM({_SINAL}) FROM estoque e
+                       WHERE e.produto_id = b.id
+                         AND e.data >= date(COALESCE(b.checkpoint, '0000-01-01'), '+1 day')
+                         AND e.data < date(:data, '+1 day')), 0) AS saldo
+    FROM base b
+"""
+
+def get_stock_as_of(company_name, produto_id, data):
+    """Saldo do produto no fim do dia `data` (date, datetime ou "AAAA-MM-DD").
+
+    Lê o checkpoint mais próximo e soma só os movimentos depois dele.
+    """
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        row = conn.execute(
+            _AS_OF_SQL.format(where="p.id = :produto_id"),
+            {"data": _dia(data), "produto_id": produto_id}
+        ).fetchone()
+    return row[3] if row else None
+
+def get_stock_valuation(company_name, data):
+    """Posição do estoque no fim do dia `data` (ex.: último dia do mês).
+
+    Retorna ([(produto_id, nome, saldo, valor, total)], total_geral) dos
+    produtos com saldo; o valor usado é o preço atual do cadastro.
+    """
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        rows = conn.execute(_AS_OF_SQL.format(where="1"), {"data": _dia(data)}).fetchall()
+    itens = [
+        (produto_id, nome, saldo, valor, saldo * valor)
+        for produto_id, nome, valor, saldo in rows if saldo
+    ]
+    return itens, sum(item[4] for item in itens)
+
+# ------------------- REPOSIÇÃO -------------------
+# alerta_estoque é mantido pelos triggers de produto (migração 15): cada
+# movimento que muda o saldo (ou mudança de ponto) entra ou sai do alerta na
+# hora. O ponto efetivo é o fixo (ponto_reposicao), senão o calculado pelo
+# consumo (ponto_calculado, refeito uma vez por dia), senão ESTOQUE_BAIXO.
+REPOSICAO_KEY = "reposicao"
+CONSUMO_DIAS = 30     # janela do consumo médio diário
+COBERTURA_DIAS = 10   # dias de consumo que o ponto cobre (entrega + margem)
+
+def set_reorder_point(company_name, product_id, ponto):
+    """Ponto de reposição fixo do produto; None volta ao automático"""
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        cursor = conn.execute(
+            "UPDATE produto SET ponto_reposicao = ? WHERE id = ?",
+            (None if ponto is None else int(ponto), product_id)
+        )
+        return cursor.rowcount > 0
+
+def get_reorder_point(company_name, product_id):
+    """(ponto fixo ou None, ponto efetivo) do produto, ou None"""
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        return conn.execute(
+            f"SELECT ponto_reposicao, {PONTO_REPOSICAO.format(p='produto')} FROM produto WHERE id = ?",
+            (product_id,)
+        ).fetchone()
+
+def update_reorder_points(company_name, dias=CONSUMO_DIAS, force=False):
+    """Recalcula ponto_calculado: saídas dos últimos `dias` (sem saldo
+    inicial, ajustes e importações) por dia x COBERTURA_DIAS, arredondado
+    para cima; sem saída no período fica NULL. Roda uma vez por dia (ou
+    sempre com `force`) e só grava os produtos cujo ponto mudou.
+
+    Retorna quantos mudaram, ou None se o cálculo de hoje já foi feito.
+    """
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        row = cursor.execute(
+            "SELECT valor >= date('now') FROM configuracao WHERE chave = ?", (REPOSICAO_KEY,)
+        ).fetchone()
+        if row and row[0] and not force:
+            return None
+        cursor.execute("CREATE TEMP TABLE IF NOT EXISTS consumo (produto_id INTEGER PRIMARY KEY, ponto INTEGER)")
+        cursor.execute("DELETE FROM temp.consumo")
+        cursor.execute("""
+            INSERT INTO temp.consumo (produto_id, ponto)
+            SELECT produto_id, (SUM(quantidade) * ? + ? - 1) / ? FROM estoque
+            WHERE data >= datetime('now', ?) AND movimento_tipo != ?
+              AND origem NOT IN (?, ?, ?)
+            GROUP BY produto_id
+        """, (COBERTURA_DIAS, dias, dias, f"-{int(dias)} days", ENTRADA, SALDO_INICIAL, AJUSTE, IMPORTACAO))
+        cursor.execute("""
+            UPDATE produto SET ponto_calculado = (SELECT ponto FROM temp.consumo WHERE produto_id = produto.id)
+            WHERE ponto_calculado IS NOT (SELECT ponto FROM temp.consumo WHERE produto_id = produto.id)
+        """)
+        alterados = cursor.rowcount
+        cursor.execute("DELETE FROM temp.consumo")
+        cursor.execute(
+            "INSERT OR REPLACE INTO configuracao (chave, valor) VALUES (?, date('now'))", (REPOSICAO_KEY,)
+        )
+        return alterados
+
+def get_stock_alerts(company_name, limit=None):
+    """[(produto_id, nome, quantidade, ponto, desde)] dos produtos em
+    alerta, do menor saldo ao maior"""
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        return conn.execute("""
+            SELECT a.produto_id, p.nome, a.quantidade, a.ponto, a.desde
+            FROM alerta_estoque a JOIN produto p ON p.id = a.produto_id
+            ORDER BY a.quantidade, a.produto_id
+            LIMIT ?
+        """, (-1 if limit is None else limit,)).fetchall()
+
+# ------------------- CURVA ABC -------------------
+# A classificação é calculada em app/services/abc_analysis.py e gravada
+# inteira em produto_abc; 'curva_abc' (configuracao) guarda a data do cálculo.
+ABC_KEY = "curva_abc"
+ABC_FIELDS = ("produto_id", "receita", "participacao", "classe", "saidas", "estoque_medio", "giro", "classe_giro")
+
+def iter_stock_ledger(company_name, since, chunk_size=100000):
+    """Gera blocos de até `chunk_size` movimentos de estoque desde `since`:
+    [(produto_id, julianday(data), quantidade com sinal)]"""
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        # o histórico cresce em ordem de data: lê pela chave a partir do
+        # primeiro movimento do período, em vez de ir e voltar pelo índice
+        # de data a cada linha (+data não usa o índice)
+        cursor = conn.execute(f"""
+            SELECT produto_id, julianday(data), {_SINAL} FROM estoque
+            WHERE id >= (SELECT MIN(id) FROM estoque WHERE data >= :since) AND +data >= :since
+        """, {"since": str(since)})
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield rows
+
+def get_product_balances(company_name):
+    """[(produto_id, saldo)] de todos os produtos"""
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        return conn.execute("SELECT id, quantidade FROM produto").fetchall()
+
+def save_abc_classification(company_name, rows):
+    """Substitui a curva ABC por `rows` (tuplas na ordem de ABC_FIELDS)"""
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        cursor.execute("DELETE FROM produto_abc")
+        cursor.executemany(f"""
+            INSERT INTO produto_abc ({', '.join(ABC_FIELDS)})
+            VALUES ({', '.join('?' * len(ABC_FIELDS))})
+        """, rows)
+        cursor.execute(
+            "INSERT OR REPLACE INTO configuracao (chave, valor) VALUES (?, date('now'))", (ABC_KEY,)
+        )
+
+def get_abc_date(company_name):
+    """Data ("AAAA-MM-DD") do último cálculo da curva ABC, ou None"""
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        row = conn.execute("SELECT valor FROM configuracao WHERE chave = ?", (ABC_KEY,)).fetchone()
+    return row[0] if row else None
+
+def get_abc_summary(company_name):
+    """[(classe, produtos, receita)] da última curva ABC"""
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        return conn.execute("""
+            SELECT classe, COUNT(*), ROUND(SUM(receita), 2) FROM produto_abc
+            GROUP BY classe ORDER BY classe
+        """).fetchall()
+
+# ------------------- IMPORTAÇÃO DE PRODUTOS -------------------
+# Cada importação fica em `importacao` com a última linha do arquivo já
+# gravada. Essa linha é atualizada na mesma transação do lote, então depois
+# de uma queda a importação continua exatamente de onde parou.
+IMPORTACAO = "Importação"
+EM_ANDAMENTO, INTERROMPIDA, CONCLUIDA = "em andamento", "interrompida", "concluída"
+
+# soma (op "+") ou retira (op "-") do valor em estoque do painel a parte
+# dos produtos do lote, com os triggers por linha desligados
+_IMPORT_METRICS_SQL = """
+    UPDATE metricas SET valor = ROUND(valor {op} (
+        SELECT COALESCE(SUM(p.quantidade * p.valor), 0)
+        FROM temp.importacao_lote l JOIN produto p ON p.codigo_barra = l.codigo_barra), 2)
+    WHERE chave = 'valor_estoque'
+"""
+# alertas de estoque dos produtos do lote, depois dos saldos aplicados
+_PONTO_P = PONTO_REPOSICAO.format(p="p")
+_IMPORT_ALERTS_SQL = [
+    f"""
+    DELETE FROM alerta_estoque WHERE produto_id IN (
+        SELECT p.id FROM temp.importacao_lote l JOIN produto p ON p.codigo_barra = l.codigo_barra
+        WHERE p.quantidade > {_PONTO_P})
+    """,
+    f"""
+    INSERT INTO alerta_estoque (produto_id, quantidade, ponto)
+    SELECT p.id, p.quantidade, {_PONTO_P}
+    FROM temp.importacao_lote l JOIN produto p ON p.codigo_barra = l.codigo_barra
+    WHERE p.quantidade <= {_PONTO_P}
+    ON CONFLICT(produto_id) DO UPDATE SET quantidade = excluded.quantidade, ponto = excluded.ponto
+    """,
+]
+
+# lote da importação em andamento (tabela temporária da conexão)
+_IMPORT_BATCH_SQL = """
+    CREATE TEMP TABLE IF NOT EXISTS importacao_lote (
+        codigo_barra TEXT PRIMARY KEY,
+        nome TEXT, valor REAL, marca TEXT, quantidade INTEGER,
+        produto_id INTEGER, alterado INTEGER
+    )
+"""
+
+def start_import(company_name, arquivo, tamanho, modificado):
+    """Retoma a importação inacabada do mesmo arquivo ou abre uma nova.
+
+    O arquivo é identificado pelo caminho, tamanho e data de modificação.
+    Retorna (import_id, linhas já gravadas).
+    """
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        row = cursor.execute("""
+            SELECT id, linhas FROM importacao
+            WHERE arquivo = ? AND tamanho = ? AND modificado = ? AND status != ?
+            ORDER BY id DESC LIMIT 1
+        """, (arquivo, tamanho, modificado, CONCLUIDA)).fetchone()
+        if row:
+            cursor.execute("UPDATE importacao SET status = ? WHERE id = ?", (EM_ANDAMENTO, row[0]))
+            return row[0], row[1]
+        cursor.execute(
+            "INSERT INTO importacao (arquivo, tamanho, modificado) VALUES (?, ?, ?)",
+            (arquivo, tamanho, modificado)
+        )
+        return cursor.lastrowid, 0
+
+def import_products_batch(company_name, import_id, produtos, ultima_linha, erros=0):
+    """Grava um lote da importação numa única transação (upsert por código).
+
+    `produtos` é uma lista de (codigo_barra, nome, valor, marca, quantidade).
+    O lote vai para uma tabela temporária e é aplicado com poucas instruções
+    em conjunto: cria os códigos novos, atualiza só os produtos que mudaram
+    e reindexa o full-text e os alertas de estoque desses de uma vez (os
+    triggers por linha ficam desligados pela chave FTS_EM_LOTE). Quantidade
+    None mantém o saldo; senão a diferença entra no histórico como
+    "Importação".
+    Retorna quantos produtos foram criados ou alterados.
+    """
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute(_IMPORT_BATCH_SQL)
+        cursor.execute("DELETE FROM temp.importacao_lote")
+        # código repetido no arquivo: vale a última linha
+        cursor.executemany("""
+            INSERT OR REPLACE INTO temp.importacao_lote (codigo_barra, nome, valor, marca, quantidade)
+            VALUES (?, ?, ?, ?, ?)
+        """, produtos)
+        cursor.execute("""
+            UPDATE temp.importacao_lote SET
+                produto_id = (SELECT p.id FROM produto p
+                              WHERE p.codigo_barra = importacao_lote.codigo_barra),
+                alterado = COALESCE((SELECT (p.nome, p.valor, p.marca) IS NOT
+                                            (importacao_lote.nome, importacao_lote.valor, importacao_lote.marca)
+                                     FROM produto p
+                                     WHERE p.codigo_barra = importacao_lote.codigo_barra), 1)
+        """)
+
+        cursor.execute("INSERT INTO configuracao (chave, valor) VALUES (?, '1')", (FTS_EM_LOTE,))
+        cursor.execute(_IMPORT_METRICS_SQL.format(op="-"))
+        cursor.execute("""
+            INSERT INTO produto_fts (produto_fts, rowid, nome, marca, codigo_barra)
+            SELECT 'delete', p.id, p.nome, p.marca, p.codigo_barra
+            FROM temp.importacao_lote l JOIN produto p ON p.id = l.produto_id
+            WHERE l.alterado
+        """)
+        cursor.execute("""
+            UPDATE produto SET (nome, valor, marca) = (
+                SELECT l.nome, l.valor, l.marca FROM temp.importacao_lote l
+                WHERE l.codigo_barra = produto.codigo_barra
+            )
+            WHERE id IN (SELECT produto_id FROM temp.importacao_lote WHERE alterado)
+        """)
+        cursor.execute("""
+            INSERT INTO produto (nome, valor, quantidade, marca, codigo_barra)
+            SELECT nome, valor, 0, marca, codigo_barra FROM temp.importacao_lote
+            WHERE produto_id IS NULL
+        """)
+        cursor.execute("""
+            INSERT INTO produto_fts (rowid, nome, marca, codigo_barra)
+            SELECT p.id, p.nome, p.marca, p.codigo_barra
+            FROM temp.importacao_lote l JOIN produto p ON p.codigo_barra = l.codigo_barra
+            WHERE l.alterado
+        """)
+
+        cursor.execute("""
+            INSERT INTO estoque (produto_id, codigo_barra, quantidade, movimento_tipo, origem)
+            SELECT p.id, p.codigo_barra, ABS(l.quantidade - p.quantidade),
+                   CASE WHEN l.quantidade > p.quantidade THEN 'Entrada' ELSE 'Saída' END, ?
+            FROM temp.importacao_lote l JOIN produto p ON p.codigo_barra = l.codigo_barra
+            WHERE l.quantidade IS NOT NULL AND l.quantidade != p.quantidade
+        """, (IMPORTACAO,))
+        cursor.execute(_IMPORT_METRICS_SQL.format(op="+"))
+        for sql in _IMPORT_ALERTS_SQL:
+            cursor.execute(sql)
+        cursor.execute("DELETE FROM configuracao WHERE chave = ?", (FTS_EM_LOTE,))
+
+        gravados = cursor.execute("SELECT COUNT(*) FROM temp.importacao_lote WHERE alterado").fetchone()[0]
+        cursor.execute("""
+            UPDATE importacao SET linhas = ?, gravados = gravados + ?, erros = erros + ?
+            WHERE id = ?
+        """, (ultima_linha, gravados, erros, import_id))
+        tocados = [row[0] for row in cursor.execute("""
+            SELECT p.id FROM temp.importacao_lote l JOIN produto p ON p.codigo_barra = l.codigo_barra
+            WHERE l.alterado OR l.quantidade IS NOT NULL
+        """)]
+        cursor.execute("DELETE FROM temp.importacao_lote")
+    barcode_index.refresh(db_path, tocados)
+    return gravados
+
+def finish_import(company_name, import_id, status=CONCLUIDA):
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        conn.execute("""
+            UPDATE importacao SET status = ?,
+                   concluido_em = CASE WHEN ? = ? THEN CURRENT_TIMESTAMP END
+            WHERE id = ?
+        """, (status, status, CONCLUIDA, import_id))
+
+def get_import(company_name, import_id):
+    """(id, arquivo, linhas, gravados, erros, status) da importação"""
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        return conn.execute("""
+            SELECT id, arquivo, linhas, gravados, erros, status
+            FROM importacao WHERE id = ?
+        """, (import_id,)).fetchone()
+
+# ------------------- VENDAS -------------------
+# O checkout grava cabeçalho, itens e um movimento "Saída" por item numa
+# única transação. O saldo é baixado pelo trigger do histórico
+# (quantidade = quantidade - n, sem ler e regravar o valor) e, se algum
+# produto ficaria negativo, a venda inteira é desfeita. A venda entra na
+# sessão de caixa aberta e soma nos contadores dela na mesma transação.
+VENDA = "Venda"
+FORMAS_PAGAMENTO = ("Dinheiro", "Cartão de Débito", "Cartão de Crédito", "Pix")
+
+def finalize_sale(company_name, itens, forma_pagamento, cliente_id=None, desconto=0, funcionario_id=None):
+    """Registra a venda de `itens` [(produto_id, quantidade)].
+
+    O preço de cada item é o do cadastro no momento da venda; produtos
+    repetidos são somados numa linha. Retorna o id da venda, ou None (nada
+    gravado) se o carrinho for inválido, algum produto não existir ou não
+    houver estoque suficiente. Dentro da transação de quem chamou, a recusa
+    sobe como sqlite3.IntegrityError para o `with` mais externo desfazer.
+    """
+    carrinho = {}
+    for produto_id, quantidade in itens:
+        carrinho[produto_id] = carrinho.get(produto_id, 0) + int(quantidade)
+    if not carrinho or any(q <= 0 for q in carrinho.values()) or desconto < 0:
+        return None
+
+    db_path = get_company_db_path(company_name)
+    nested = manager.nested(db_path)
+    try:
+        with get_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO vendas (cliente_id, funcionario_id, forma_pagamento, desconto, caixa_sessao_id)
+                VALUES (?, ?, ?, ?, (SELECT id FROM caixa_sessao WHERE status = 'aberto'))
+            """, (cliente_id, funcionario_id, forma_pagamento, desconto))
+            venda_id = cursor.lastrowid
+            cursor.executemany("""
+                INSERT INTO itens_venda (venda_id, produto_id, quantidade, valor_unitario)
+                SELECT ?, id, ?, valor FROM produto WHERE id = ?
+            """, [(venda_id, qtd, produto_id) for produto_id, qtd in carrinho.items()])
+            if cursor.rowcount != len(carrinho):
+                raise sqlite3.IntegrityError("produto inexistente")
+
+            cursor.execute("""
+                INSERT INTO estoque (produto_id, codigo_barra, quantidade, movimento_tipo, origem)
+                SELECT i.produto_id, p.codigo_barra, i.quantidade, 'Saída', ?
+                FROM itens_venda i JOIN produto p ON p.id = i.produto_id
+                WHERE i.venda_id = ?
+            """, (f"{VENDA} #{venda_id}", venda_id))
+            cursor.execute("""
+                UPDATE vendas SET
+                    subtotal = (SELECT ROUND(SUM(quantidade * valor_unitario), 2)
+                                FROM itens_venda WHERE venda_id = :id),
+                    total = MAX(0, ROUND((SELECT SUM(quantidade * valor_unitario)
+                                          FROM itens_venda WHERE venda_id = :id) - desconto, 2))
+                WHERE id = :id
+            """, {"id": venda_id})
+            cursor.execute("""
+                INSERT INTO caixa_totais (sessao_id, forma_pagamento, vendas, total)
+                SELECT caixa_sessao_id, forma_pagamento, 1, total FROM vendas
+                WHERE id = ? AND caixa_sessao_id IS NOT NULL
+                ON CONFLICT(sessao_id, forma_pagamento) DO UPDATE SET
+                    vendas = vendas + 1, total = ROUND(total + excluded.total, 2)
+            """, (venda_id,))
+    except sqlite3.IntegrityError:
+        if nested:
+            raise
+        return None  # produto inexistente ou estoque insuficiente (trigger produto_qtd_upd)
+    barcode_index.refresh(db_path, list(carrinho))
+    return venda_id
+
+SALE_COLUMNS = [
+    "id", "data",
+    "(SELECT COALESCE(SUM(i.quantidade), 0) FROM itens_venda i WHERE i.venda_id = vendas.id)",
+    "forma_pagamento", "total",
+]
+
+def get_sales_page(company_name, limit=PAGE_SIZE, after_key=None):
+    """Vendas mais recentes primeiro: (id, data, itens, forma_pagamento, total)"""
+    return _keyset_page(
+        get_company_db_path(company_name), "vendas", SALE_COLUMNS, ("id",),
+        "-id", [], [], limit, after_key
+    )
+
+def get_sale(company_name, venda_id):
+    """Venda com os itens: dict com id, data, cliente, forma_pagamento,
+    subtotal, desconto, total e itens [(nome, codigo_barra, qtd, unitário)]"""
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        row = cursor.execute("""
+            SELECT v.id, v.data, c.name, v.forma_pagamento, v.subtotal, v.desconto, v.total
+            FROM vendas v LEFT JOIN clients c ON c.id = v.cliente_id
+            WHERE v.id = ?
+        """, (venda_id,)).fetchone()
+        if not row:
+            return None
+        itens = cursor.execute("""
+            SELECT COALESCE(p.nome, 'Produto removido'), p.codigo_barra, i.quantidade, i.valor_unitario
+            FROM itens_venda i LEFT JOIN produto p ON p.id = i.produto_id
+            WHERE i.venda_id = ?
+            ORDER BY i.id
+        """, (venda_id,)).fetchall()
+    keys = ("id", "data", "cliente", "forma_pagamento", "subtotal", "desconto", "total")
+    return dict(zip(keys, row), itens=itens)
+
+# ------------------- ROLLUPS DE VENDAS -------------------
+# Totais de vendas por hora, dia e mês (migração 13) para os relatórios.
+# 'rollup_vendas' (configuracao) é o id da última venda já somada; as vendas
+# seguintes entram em conjunto, numa transação, por update_sales_rollups
+# (job periódico e início de cada relatório), fora do checkout.
+ROLLUP_KEY = "rollup_vendas"
+PERIODO_SQL = {
+    "hora": "strftime('%Y-%m-%d %H:00:00', v.data)",
+    "dia": "date(v.data)",
+    "mes": "strftime('%Y-%m', v.data)",
+}
+
+def _add_to_sales_rollups(cursor, where, params):
+    """Soma nos rollups as vendas `v` que satisfazem `where`"""
+    for periodo, chave in PERIODO_SQL.items():
+        cursor.execute(f"""
+            INSERT INTO rollup_vendas_{periodo} ({periodo}, forma_pagamento, funcionario_id, vendas, desconto, total)
+            SELECT {chave}, v.forma_pagamento, COALESCE(v.funcionario_id, 0),
+                   COUNT(*), ROUND(SUM(v.desconto), 2), ROUND(SUM(v.total), 2)
+            FROM vendas v WHERE {where}
+            GROUP BY 1, 2, 3
+            ON CONFLICT({periodo}, forma_pagamento, funcionario_id) DO UPDATE SET
+                vendas = vendas + excluded.vendas,
+                desconto = ROUND(desconto + excluded.desconto, 2),
+                total = ROUND(total + excluded.total, 2)
+        """, params)
+        cursor.execute(f"""
+            INSERT INTO rollup_itens_{periodo} ({periodo}, produto_id, quantidade, receita)
+            SELECT {chave}, i.produto_id, SUM(i.quantidade), ROUND(SUM(i.quantidade * i.valor_unitario), 2)
+            FROM vendas v JOIN itens_venda i ON i.venda_id = v.id
+            WHERE {where}
+            GROUP BY 1, 2
+            ON CONFLICT({periodo}, produto_id) DO UPDATE SET
+                quantidade = quantidade + excluded.quantidade,
+                receita = ROUND(receita + excluded.receita, 2)
+        """, params)
+
+def update_sales_rollups(company_name):
+    """Soma nos rollups as vendas gravadas desde a última chamada.
+
+    Retorna quantas vendas entraram.
+    """
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        row = cursor.execute("SELECT valor FROM configuracao WHERE chave = ?", (ROLLUP_KEY,)).fetchone()
+        ultima = int(row[0]) if row else 0
+        fim = cursor.execute("SELECT COALESCE(MAX(id), 0) FROM vendas").fetchone()[0]
+        if fim <= ultima:
+            return 0
+        _add_to_sales_rollups(cursor, "v.id > ? AND v.id <= ?", (ultima, fim))
+        cursor.execute("INSERT OR REPLACE INTO configuracao (chave, valor) VALUES (?, ?)", (ROLLUP_KEY, str(fim)))
+        return cursor.execute("SELECT COUNT(*) FROM vendas WHERE id > ? AND id <= ?", (ultima, fim)).fetchone()[0]
+
+def rebuild_sales_rollups(company_name, since=None):
+    """Recalcula os rollups a partir do mês de `since` (tudo se None) e
+    soma as vendas pendentes"""
+    mes = str(since)[:7] if since else ""
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        row = cursor.execute("SELECT valor FROM configuracao WHERE chave = ?", (ROLLUP_KEY,)).fetchone()
+        ultima = int(row[0]) if row else 0
+        # chaves "AAAA-MM..." comparadas como texto com o mês
+        for periodo in PERIODO_SQL:
+            cursor.execute(f"DELETE FROM rollup_vendas_{periodo} WHERE {periodo} >= ?", (mes,))
+            cursor.execute(f"DELETE FROM rollup_itens_{periodo} WHERE {periodo} >= ?", (mes,))
+        _add_to_sales_rollups(cursor, "v.data >= ? AND v.id <= ?", (mes, ultima))
+    update_sales_rollups(company_name)
+
+# ------------------- CAIXA -------------------
+# Os totais da sessão (por forma de pagamento, sangrias e suprimentos) são
+# contadores atualizados a cada operação; leitura X e fechamento Z só leem
+# a linha da sessão e seus contadores, qualquer que seja o movimento do dia.
+ABERTO, FECHADO = "aberto", "fechado"
+SANGRIA, SUPRIMENTO = "Sangria", "Suprimento"
+DINHEIRO = FORMAS_PAGAMENTO[0]
+
+def get_open_caixa(company_name):
+    """Id da sessão de caixa aberta, ou None"""
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        row = conn.execute("SELECT id FROM caixa_sessao WHERE status = ?", (ABERTO,)).fetchone()
+    return row[0] if row else None
+
+def open_caixa(company_name, valor_abertura=0):
+    """Abre uma sessão com o troco inicial; None se já houver caixa aberto"""
+    if valor_abertura < 0:
+        return None
+    db_path = get_company_db_path(company_name)
+    try:
+        with get_connection(db_path) as conn:
+            cursor = conn.cursor()
+            cursor.execute("INSERT INTO caixa_sessao (valor_abertura) VALUES (?)", (round(valor_abertura, 2),))
+            return cursor.lastrowid
+    except sqlite3.IntegrityError:
+        return None  # idx_caixa_sessao_aberta: só um caixa aberto
+
+def add_caixa_movement(company_name, tipo, valor, motivo=""):
+    """Sangria (retirada) ou suprimento (reforço) de dinheiro no caixa aberto.
+
+    Retorna False sem gravar se não houver caixa aberto, o valor for
+    inválido ou a sangria for maior que o dinheiro esperado na gaveta.
+    Dentro da transação de quem chamou, a recusa sobe como
+    sqlite3.IntegrityError para o `with` mais externo desfazer.
+    """
+    if tipo not in (SANGRIA, SUPRIMENTO) or valor <= 0:
+        return False
+    valor = round(valor, 2)
+    coluna = "sangrias" if tipo == SANGRIA else "suprimentos"
+    db_path = get_company_db_path(company_name)
+    nested = manager.nested(db_path)
+    try:
+        with get_connection(db_path) as conn:
+            cursor = conn.cursor()
+            if not conn.in_transaction:
+                cursor.execute("BEGIN IMMEDIATE")  # lê o saldo e grava sem outra escrita no meio
+            report = _caixa_report(cursor, None)
+            if report is None:
+                raise sqlite3.IntegrityError("nenhum caixa aberto")
+            if tipo == SANGRIA and valor > report["dinheiro_esperado"] + 0.005:
+                raise sqlite3.IntegrityError("sangria maior que o dinheiro na gaveta")
+            cursor.execute(
+                "INSERT INTO caixa_movimento (sessao_id, tipo, valor, motivo) VALUES (?, ?, ?, ?)",
+                (report["id"], tipo, valor, motivo)
+            )
+            cursor.execute(
+                f"UPDATE caixa_sessao SET {coluna} = ROUND({coluna} + ?, 2) WHERE id = ?",
+                (valor, report["id"])
+            )
+    except sqlite3.IntegrityError:
+        if nested:
+            raise
+        return False
+    return True
+
+def _caixa_report(cursor, sessao_id):
+    if sessao_id is None:
+        cursor.execute("""
+            SELECT id, aberto_em, fechado_em, valor_abertura, suprimentos, sangrias, valor_contado, status
+            FROM caixa_sessao WHERE status = ?
+        """, (ABERTO,))
+    else:
+        cursor.execute("""
+            SELECT id, aberto_em, fechado_em, valor_abertura, suprimentos, sangrias, valor_contado, status
+            FROM caixa_sessao WHERE id = ?
+        """, (sessao_id,))
+    row = cursor.fetchone()
+    if not row:
+        return None
+    keys = ("id", "aberto_em", "fechado_em", "valor_abertura", "suprimentos", "sangrias", "valor_contado", "status")
+    report = dict(zip(keys, row))
+    report["por_forma"] = {
+        forma: (vendas, total)
+        for forma, vendas, total in cursor.execute(
+            "SELECT forma_pagamento, vendas, total FROM caixa_totais WHERE sessao_id = ?", (report["id"],)
+        )
+    }
+    report["vendas"] = sum(vendas for vendas, _total in report["por_forma"].values())
+    report["total_vendas"] = round(sum(total for _vendas, total in report["por_forma"].values()), 2)
+    report["dinheiro_esperado"] = round(
+        report["valor_abertura"] + report["suprimentos"] - report["sangrias"]
+        + report["por_forma"].get(DINHEIRO, (0, 0))[1], 2
+    )
+    if report["valor_contado"] is not None:
+        report["diferenca"] = round(report["valor_contado"] - report["dinheiro_esperado"], 2)
+    return report
+
+def caixa_report(company_name, sessao_id=None):
+    """Leitura X (caixa aberto) ou relatório de uma sessão já fechada.
+
+    dict com os dados da sessão, por_forma {forma: (vendas, total)}, vendas,
+    total_vendas, dinheiro_esperado e, se fechada, diferenca (contado -
+    esperado). Só lê contadores: custo constante.
+    """
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        return _caixa_report(conn.cursor(), sessao_id)
+
+def close_caixa(company_name, valor_contado):
+    """Fechamento (redução Z) do caixa aberto com o dinheiro contado na gaveta.
+
+    Retorna o relatório final da sessão, com `divergencias` (verify_caixa)
+    dos contadores contra as vendas, ou None se não houver caixa aberto
+    (sqlite3.IntegrityError dentro da transação de quem chamou).
+    """
+    db_path = get_company_db_path(company_name)
+    nested = manager.nested(db_path)
+    try:
+        with get_connection(db_path) as conn:
+            cursor = conn.cursor()
+            if not conn.in_transaction:
+                cursor.execute("BEGIN IMMEDIATE")
+            row = cursor.execute("SELECT id FROM caixa_sessao WHERE status = ?", (ABERTO,)).fetchone()
+            if not row:
+                raise sqlite3.IntegrityError("nenhum caixa aberto")
+            cursor.execute("""
+                UPDATE caixa_sessao SET status = ?, fechado_em = CURRENT_TIMESTAMP, valor_contado = ?
+                WHERE id = ?
+            """, (FECHADO, round(valor_contado, 2), row[0]))
+    except sqlite3.IntegrityError:
+        if nested:
+            raise
+        return None
+    report = caixa_report(company_name, row[0])
+    report["divergencias"] = verify_caixa(company_name, row[0])
+    return report
+
+def verify_caixa(company_name, sessao_id):
+    """Confere os contadores da sessão com uma agregação das vendas.
+
+    A agregação usa só o índice idx_vendas_caixa. Retorna
+    [(forma, (vendas, total) dos contadores, (vendas, total) das vendas)]
+    das formas divergentes; lista vazia quando tudo confere.
+    """
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        contadores = {
+            forma: (vendas, total) for forma, vendas, total in cursor.execute(
+                "SELECT forma_pagamento, vendas, total FROM caixa_totais WHERE sessao_id = ?", (sessao_id,)
+            )
+        }
+        agregado = {
+            forma: (vendas, total) for forma, vendas, total in cursor.execute("""
+                SELECT forma_pagamento, COUNT(*), ROUND(SUM(total), 2) FROM vendas
+                WHERE caixa_sessao_id = ?
+                GROUP BY forma_pagamento
+            """, (sessao_id,))
+        }
+    divergentes = []
+    for forma in sorted(set(contadores) | set(agregado)):
+        esperado, real = contadores.get(forma, (0, 0)), agregado.get(forma, (0, 0))
+        if esperado[0] != real[0] or abs(esperado[1] - real[1]) > 0.005:
+            divergentes.append((forma, esperado, real))
+    return divergentes
+
+# ------------------- ENTREGAS -------------------
+# O banco guarda o estado de cada entrega; as abertas ficam também na fila
+# em memória (app/services/delivery_queue.py), carregada de
+# get_open_deliveries. Cada mudança de status é um UPDATE de uma linha que
+# só vale a partir dos status de origem permitidos.
+PENDENTE, EM_ROTA, ENTREGUE, CANCELADA = "pendente", "em rota", "entregue", "cancelada"
+ENTREGA_ABERTA = (PENDENTE, EM_ROTA)
+# status novo -> status de onde se chega nele
+TRANSICOES_ENTREGA = {
+    EM_ROTA: (PENDENTE,),
+    PENDENTE: (EM_ROTA,),  # devolvida à fila pelo entregador
+    ENTREGUE: (EM_ROTA,),
+    CANCELADA: (PENDENTE, EM_ROTA),
+}
+ENTREGA_FIELDS = ("id", "venda_id", "endereco", "zona", "prometida_para", "status", "entregador_id",
+                  "latitude", "longitude", "rota_ordem")
+LOJA_KEY = "loja_coordenadas"  # "latitude,longitude" de onde as rotas saem
+_ENTREGA_SELECT = f"SELECT {', '.join(ENTREGA_FIELDS)} FROM entregas"
+
+def create_delivery(company_name, venda_id, endereco, zona, prometida_para, latitude=None, longitude=None):
+    """Cria a entrega pendente da venda. Retorna a linha (ENTREGA_FIELDS),
+    ou None se a venda não existir ou já tiver entrega não cancelada."""
+    db_path = get_company_db_path(company_name)
+    try:
+        with get_connection(db_path) as conn:
+            cursor = conn.execute("""
+                INSERT INTO entregas (venda_id, endereco, zona, prometida_para, latitude, longitude)
+                SELECT id, ?, ?, ?, ?, ? FROM vendas WHERE id = ?
+            """, (endereco, int(zona), str(prometida_para), latitude, longitude, venda_id))
+            if not cursor.rowcount:
+                return None
+            return conn.execute(f"{_ENTREGA_SELECT} WHERE id = ?", (cursor.lastrowid,)).fetchone()
+    except sqlite3.IntegrityError:
+        return None
+
+def get_open_deliveries(company_name):
+    """Entregas pendentes e em rota [(ENTREGA_FIELDS)]"""
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        return conn.execute(
+            f"{_ENTREGA_SELECT} WHERE status IN ({', '.join('?' * len(ENTREGA_ABERTA))})", ENTREGA_ABERTA
+        ).fetchall()
+
+def get_delivery(company_name, entrega_id):
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        return conn.execute(f"{_ENTREGA_SELECT} WHERE id = ?", (entrega_id,)).fetchone()
+
+def set_delivery_status(company_name, entrega_id, status, entregador_id=None):
+    """Muda o status se a transição for permitida (TRANSICOES_ENTREGA).
+
+    'em rota' exige o entregador (saída avulsa, fora de um lote); voltar
+    para 'pendente' o remove. Retorna False, sem gravar, se a entrega não
+    estiver num status de origem válido.
+    """
+    origens = TRANSICOES_ENTREGA.get(status)
+    if not origens or (status == EM_ROTA and entregador_id is None):
+        return False
+    fields, params = ["status = ?", "atualizada_em = CURRENT_TIMESTAMP"], [status]
+    if status in ENTREGA_ABERTA:
+        fields += ["entregador_id = ?", "rota_ordem = NULL"]
+        params.append(entregador_id if status == EM_ROTA else None)
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        cursor = conn.execute(f"""
+            UPDATE entregas SET {', '.join(fields)}
+            WHERE id = ? AND status IN ({', '.join('?' * len(origens))})
+        """, params + [entrega_id] + list(origens))
+        return cursor.rowcount > 0
+
+def dispatch_deliveries(company_name, ids, entregador_id):
+    """Despacha um lote: as entregas `ids` (na ordem da rota) saem com o
+    entregador numa transação, com rota_ordem 1, 2, ... Só as que ainda
+    estão pendentes mudam; retorna os ids despachados."""
+    db_path = get_company_db_path(company_name)
+    despachados = []
+    with get_connection(db_path) as conn:
+        for ordem, entrega_id in enumerate(ids, 1):
+            cursor = conn.execute("""
+                UPDATE entregas SET status = ?, entregador_id = ?, rota_ordem = ?,
+                                    atualizada_em = CURRENT_TIMESTAMP
+                WHERE id = ? AND status = ?
+            """, (EM_ROTA, entregador_id, ordem, entrega_id, PENDENTE))
+            if cursor.rowcount:
+                despachados.append(entrega_id)
+    return despachados
+
+def get_address_coordinates(company_name, endereco):
+    """(latitude, longitude) da última entrega no mesmo endereço, ou None"""
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        return conn.execute("""
+            SELECT latitude, longitude FROM entregas
+            WHERE endereco = ? AND latitude IS NOT NULL AND longitude IS NOT NULL
+            ORDER BY id DESC LIMIT 1
+        """, (endereco,)).fetchone()
+
+def get_store_location(company_name):
+    """(latitude, longitude) da loja, ou None se não configurada"""
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        row = conn.execute("SELECT valor FROM configuracao WHERE chave = ?", (LOJA_KEY,)).fetchone()
+    if not row:
+        return None
+    latitude, longitude = row[0].split(",")
+    return float(latitude), float(longitude)
+
+def set_store_location(company_name, latitude, longitude):
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        conn.execute(
+            "INSERT OR REPLACE INTO configuracao (chave, valor) VALUES (?, ?)",
+            (LOJA_KEY, f"{float(latitude)},{float(longitude)}")
+        )
+
+# ------------------- PAINEL -------------------
+# vendas_dia e metricas são mantidas por triggers (migração 12): ler o painel
+# custa algumas buscas por chave, sem varrer vendas, clientes ou produtos.
+ALERTAS_PAINEL = 5  # alertas de estoque listados no painel
+
+def get_dashboard_metrics(company_name):
+    """dict com vendas_hoje, faturamento_hoje, ticket_medio, clientes,
+    estoque_baixo (produtos em alerta de reposição), valor_estoque e
+    alertas (os ALERTAS_PAINEL de menor saldo, como em get_stock_alerts)"""
+    db_path = get_company_db_path(company_name)
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        hoje = cursor.execute(
+            "SELECT vendas, faturamento FROM vendas_dia WHERE dia = date('now')"
+        ).fetchone() or (0, 0.0)
+        metricas = dict(cursor.execute("SELECT chave, valor FROM metricas"))
+        alertas = get_stock_alerts(company_name, ALERTAS_PAINEL)
+    vendas, faturamento = hoje
+    return {
+        "vendas_hoje": vendas,
+        "faturamento_hoje": faturamento,
+        "ticket_medio": round(faturamento / vendas, 2) if vendas else 0.0,
+        "clientes": int(metricas.get("clientes", 0)),
+        "estoque_baixo": int(metricas.get("estoque_baixo", 0)),
+        "valor_estoque": metricas.get("valor_estoque", 0.0),
+        "alertas": alertas,
+    }
 
 # ------------------- VALIDAR LOGIN -------------------
 def validate_login_for_company(company_name, username, password):
@@ -573,11 +1988,10 @@ def validate_login_for_company(company_name, username, password):
     if not os.path.exists(db_path):
         return False
 
-    conn = get_connection(db_path)
-    cursor = conn.cursor()
-    cursor.execute("SELECT id, username, password FROM users WHERE username = ?", (username,))
-    row = cursor.fetchone()
-    conn.close()
+    with get_connection(db_path) as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, username, password FROM users WHERE username = ?", (username,))
+        row = cursor.fetchone()
 
     if not row:
         return False
@@ -597,4 +2011,4 @@ def validate_login_for_company(company_name, username, password):
     }
 
 # ------------------- INICIALIZAÇÃO -------------------
-init_db()
+init_db()
\ No newline at end of file
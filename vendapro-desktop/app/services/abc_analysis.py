@@ -0,0 +1,115 @@
+"""Curva ABC dos produtos por receita e por giro de estoque.
+
+Receita: vendas do período por produto, lidas dos rollups (relatório "por
+produto"). Giro: unidades que saíram no período / estoque médio. O
+histórico de estoque é lido em blocos e acumulado por produto em vetores
+numpy (np.bincount), sem laço Python por movimento.
+
+Estoque médio no período [t0, t1] a partir do saldo atual e dos movimentos
+(um movimento em t muda o saldo de todo o trecho [t0, t)):
+    médio = saldo_atual - soma(delta * (t - t0)) / (t1 - t0)
+"""
+from datetime import datetime, timedelta, timezone
+
+import numpy as np
+
+from app.database import user_repository as repo
+from app.database.reports import FORMATO, sales_report
+
+PERIODO_DIAS = 365
+VALIDADE_DIAS = 7        # a curva é refeita uma vez por semana
+CHUNK = 100000           # movimentos por bloco lido do banco
+LIMITE_A, LIMITE_B = 0.80, 0.95  # participação acumulada na receita
+GIRO_A, GIRO_B = 0.20, 0.50      # fração dos produtos com saída, por giro
+
+_UNIX_EPOCH_JD = 2440587.5
+
+
+def _utcnow():
+    # mesmo relógio do CURRENT_TIMESTAMP gravado no banco
+    return datetime.now(timezone.utc).replace(tzinfo=None, microsecond=0)
+
+
+def _julianday(value):
+    return (value - datetime(1970, 1, 1)).total_seconds() / 86400 + _UNIX_EPOCH_JD
+
+
+def _classes(ordem, limite_a, limite_b, posicao):
+    """'A'/'B'/'C' por `posicao` (fração antes de cada item em `ordem`)"""
+    classes = np.full(len(ordem), "C", dtype="<U1")
+    classes[ordem[posicao < limite_b]] = "B"
+    classes[ordem[posicao < limite_a]] = "A"
+    return classes
+
+
+def compute_abc(company_name, dias=PERIODO_DIAS, chunk_size=CHUNK, agora=None):
+    """Calcula a curva dos últimos `dias`; retorna as linhas de produto_abc
+    (tuplas na ordem de repo.ABC_FIELDS), uma por produto cadastrado."""
+    fim = (agora or _utcnow()).replace(microsecond=0)
+    inicio = fim - timedelta(days=dias)
+    t0, t1 = _julianday(inicio), _julianday(fim)
+
+    saldos = np.array(repo.get_product_balances(company_name), dtype=np.int64).reshape(-1, 2)
+    ids = saldos[:, 0]
+    tamanho = int(ids.max()) + 1 if len(ids) else 1
+
+    # acumula por produto_id (índice direto no vetor)
+    ponderado = np.zeros(tamanho)
+    saidas = np.zeros(tamanho)
+    for rows in repo.iter_stock_ledger(company_name, inicio.strftime(FORMATO), chunk_size):
+        bloco = np.array(rows, dtype=np.float64)
+        produto = bloco[:, 0].astype(np.int64)
+        delta = bloco[:, 2]
+        dentro = produto < tamanho  # movimentos de produto já excluído ficam fora
+        produto, delta, tempo = produto[dentro], delta[dentro], bloco[dentro, 1]
+        ponderado += np.bincount(produto, weights=delta * (np.minimum(tempo, t1) - t0), minlength=tamanho)
+        saidas += np.bincount(produto, weights=np.maximum(-delta, 0), minlength=tamanho)
+
+    receita_por_id = np.zeros(tamanho)
+    for produto_id, _nome, _quantidade, receita in sales_report(
+        company_name, inicio.strftime(FORMATO), (fim + timedelta(seconds=1)).strftime(FORMATO), "produto"
+    ):
+        if produto_id < tamanho:
+            receita_por_id[produto_id] = receita
+
+    receita = receita_por_id[ids]
+    saidas = saidas[ids]
+    estoque_medio = np.maximum(saldos[:, 1] - ponderado[ids] / (t1 - t0), 0)
+    giro = saidas / np.maximum(estoque_medio, 1)  # estoque médio mínimo de 1 unidade
+
+    # ABC por receita: participação acumulada antes de cada produto
+    ordem = np.argsort(-receita, kind="stable")
+    total = receita.sum()
+    acumulada = np.cumsum(receita[ordem]) / total if total else np.zeros(len(ordem))
+    antes = np.concatenate(([0.0], acumulada[:-1]))
+    antes[receita[ordem] <= 0] = 1.0  # sem venda é sempre C
+    classe = _classes(ordem, LIMITE_A, LIMITE_B, antes)
+    participacao = np.empty(len(ordem))
+    participacao[ordem] = acumulada
+
+    # ABC por giro: posição entre os produtos que tiveram saída
+    ordem_giro = np.argsort(-giro, kind="stable")
+    com_saida = max(int((giro > 0).sum()), 1)
+    posicao = np.arange(len(ordem_giro)) / com_saida
+    posicao[giro[ordem_giro] <= 0] = 1.0
+    classe_giro = _classes(ordem_giro, GIRO_A, GIRO_B, posicao)
+
+    return list(zip(
+        ids.tolist(), np.round(receita, 2).tolist(), np.round(participacao, 4).tolist(),
+        classe.tolist(), saidas.astype(np.int64).tolist(), np.round(estoque_medio, 2).tolist(),
+        np.round(giro, 4).tolist(), classe_giro.tolist(),
+    ))
+
+
+def update_abc_classification(company_name, dias=PERIODO_DIAS, force=False):
+    """Recalcula e grava a curva se a última tiver mais de VALIDADE_DIAS
+    (ou `force`). Retorna quantos produtos foram classificados, ou None
+    se a curva ainda estava válida."""
+    ultima = repo.get_abc_date(company_name)
+    if ultima and not force:
+        validade = datetime.strptime(ultima, "%Y-%m-%d") + timedelta(days=VALIDADE_DIAS)
+        if _utcnow() < validade:
+            return None
+    rows = compute_abc(company_name, dias)
+    repo.save_abc_classification(company_name, rows)
+    return len(rows)
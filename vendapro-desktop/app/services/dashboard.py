@@ -0,0 +1,54 @@
+"""Cache das métricas do painel, atualizado fora da thread da interface.
+
+`get` devolve na hora o último valor conhecido (ou None na primeira vez) e,
+se ele tiver mais de `ttl` segundos, dispara uma leitura numa thread; quem
+pediu recebe o valor novo pelo callback, chamado nessa thread (na interface,
+o callback deve só emitir um sinal).
+"""
+import threading
+import time
+import traceback
+
+from app.database.user_repository import get_dashboard_metrics
+
+TTL = 30  # segundos
+
+
+class DashboardCache:
+    def __init__(self, ttl=TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._values = {}      # empresa -> (lido_em, métricas)
+        self._loading = {}     # empresa -> callbacks da leitura em andamento
+
+    def get(self, company_name, callback=None):
+        with self._lock:
+            lido_em, metricas = self._values.get(company_name, (None, None))
+            if lido_em is None or time.monotonic() - lido_em >= self.ttl:
+                if company_name not in self._loading:
+                    self._loading[company_name] = []
+                    threading.Thread(target=self._load, args=(company_name,), daemon=True).start()
+                if callback is not None:
+                    self._loading[company_name].append(callback)
+        return metricas
+
+    def invalidate(self, company_name):
+        with self._lock:
+            self._values.pop(company_name, None)
+
+    def _load(self, company_name):
+        try:
+            metricas = get_dashboard_metrics(company_name)
+        except Exception:
+            traceback.print_exc()
+            metricas = None
+        with self._lock:
+            callbacks = self._loading.pop(company_name)
+            if metricas is not None:
+                self._values[company_name] = (time.monotonic(), metricas)
+        if metricas is not None:
+            for callback in callbacks:
+                callback(metricas)
+
+
+dashboard_cache = DashboardCache()
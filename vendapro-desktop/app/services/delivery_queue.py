@@ -0,0 +1,257 @@
+"""Fila de entregas abertas em memória, ordenada por prioridade.
+
+A prioridade de uma entrega é o horário limite de saída (prometida_para
+menos ZONA_MINUTOS por faixa de distância), depois a zona e o id: quem mora
+longe precisa sair antes para chegar na mesma hora. As pendentes ficam num
+heap (heapq): despachar a próxima para um entregador é um heappop e um
+UPDATE por id, O(log n).
+
+Mudanças de status não procuram a entrada no heap: cada entrada leva um
+número de sequência e só vale enquanto for a última empilhada daquela
+entrega; as velhas são descartadas quando chegam ao topo (e o heap é
+compactado se elas passarem da metade). O banco é a fonte do estado; a fila
+de cada empresa é carregada dele no primeiro uso.
+
+Quem mostra a fila registra um listener: ele recebe a entrega (dict) a
+cada mudança, depois do commit, na thread de quem fez a mudança.
+"""
+import heapq
+import itertools
+import threading
+import traceback
+from datetime import datetime, timedelta
+
+from app.database import user_repository as repo
+
+ZONA_MINUTOS = 10  # deslocamento a mais por faixa de distância
+FORMATO = "%Y-%m-%d %H:%M:%S"
+COMPACTAR_MINIMO = 64  # entradas velhas toleradas antes de compactar
+
+
+def priority(entrega):
+    """(saída limite, zona, id): chave de ordem da fila e do quadro"""
+    prometida = datetime.strptime(entrega["prometida_para"], FORMATO)
+    saida = prometida - timedelta(minutes=ZONA_MINUTOS * entrega["zona"])
+    return saida.strftime(FORMATO), entrega["zona"], entrega["id"]
+
+
+def _entrega(row):
+    entrega = dict(zip(repo.ENTREGA_FIELDS, row))
+    entrega["prioridade"] = priority(entrega)
+    return entrega
+
+
+class DeliveryQueue:
+    def __init__(self, company_name):
+        self.company_name = company_name
+        self._lock = threading.Lock()
+        self._seq = itertools.count()
+        self._heap = []       # (prioridade, seq, id) das pendentes
+        self._no_heap = {}    # id -> seq da entrada válida
+        self._abertas = {}    # id -> entrega (pendentes e em rota)
+        self._listeners = []
+        for row in repo.get_open_deliveries(company_name):
+            entrega = _entrega(row)
+            self._abertas[entrega["id"]] = entrega
+            if entrega["status"] == repo.PENDENTE:
+                self._push(entrega)
+
+    # ---------- heap ----------
+    def _push(self, entrega):
+        seq = next(self._seq)
+        self._no_heap[entrega["id"]] = seq
+        heapq.heappush(self._heap, (entrega["prioridade"], seq, entrega["id"]))
+
+    def _discard(self, entrega_id):
+        self._no_heap.pop(entrega_id, None)
+        velhas = len(self._heap) - len(self._no_heap)
+        if velhas > COMPACTAR_MINIMO and velhas > len(self._heap) // 2:
+            self._heap = [item for item in self._heap if self._no_heap.get(item[2]) == item[1]]
+            heapq.heapify(self._heap)
+
+    def _top(self):
+        """Id da próxima pendente (descarta as entradas velhas do topo)"""
+        while self._heap:
+            _prioridade, seq, entrega_id = self._heap[0]
+            if self._no_heap.get(entrega_id) == seq:
+                return entrega_id
+            heapq.heappop(self._heap)
+        return None
+
+    # ---------- consulta ----------
+    def __len__(self):
+        return len(self._no_heap)
+
+    def get(self, entrega_id):
+        entrega = self._abertas.get(entrega_id)
+        return dict(entrega) if entrega else None
+
+    def open_deliveries(self):
+        """Cópia das entregas abertas em ordem de prioridade"""
+        with self._lock:
+            entregas = [dict(entrega) for entrega in self._abertas.values()]
+        return sorted(entregas, key=lambda entrega: entrega["prioridade"])
+
+    def pending(self):
+        """Cópia das pendentes em ordem de prioridade"""
+        return [entrega for entrega in self.open_deliveries() if entrega["status"] == repo.PENDENTE]
+
+    def peek(self):
+        with self._lock:
+            entrega_id = self._top()
+            return self.get(entrega_id) if entrega_id is not None else None
+
+    # ---------- mudanças ----------
+    def add(self, venda_id, endereco, zona, prometida_para, latitude=None, longitude=None):
+        """Cria a entrega pendente da venda; None se a venda não existir ou
+        já tiver entrega"""
+        with self._lock:
+            row = repo.create_delivery(
+                self.company_name, venda_id, endereco, zona, prometida_para, latitude, longitude
+            )
+            if row is None:
+                return None
+            entrega = _entrega(row)
+            self._abertas[entrega["id"]] = entrega
+            self._push(entrega)
+            entrega = dict(entrega)
+        self._notify(entrega)
+        return entrega
+
+    def dispatch_next(self, entregador_id):
+        """Despacha a pendente de maior prioridade; None se a fila estiver
+        vazia. Uma pendente que outro terminal já mudou é recarregada do
+        banco e a próxima é tentada."""
+        if entregador_id is None:
+            return None
+        recarregadas = []
+        with self._lock:
+            while True:
+                entrega_id = self._top()
+                if entrega_id is None:
+                    entrega = None
+                    break
+                entrega = self._set_status(entrega_id, repo.EM_ROTA, entregador_id)
+                if entrega is not None:
+                    break
+                atual = self._reload(entrega_id)
+                recarregadas.append(atual)
+                if atual["status"] == repo.PENDENTE:
+                    break  # ainda pendente no banco: não insiste
+        for atual in recarregadas:
+            self._notify(atual)
+        if entrega is not None:
+            self._notify(entrega)
+        return entrega
+
+    def dispatch_batch(self, ids, entregador_id):
+        """Despacha um lote (ids na ordem da rota) numa transação; retorna
+        as entregas que saíram (as que não estavam mais pendentes ficam).
+        Uma entrega criada por outro terminal, que a fila ainda não tem, é
+        lida do banco."""
+        # rota_ordem é a posição em `ids`, como gravada no banco (uma parada
+        # que não saiu deixa um buraco na numeração)
+        ordem = {entrega_id: n for n, entrega_id in enumerate(ids, 1)}
+        with self._lock:
+            despachadas = []
+            for entrega_id in repo.dispatch_deliveries(self.company_name, ids, entregador_id):
+                entrega = self._abertas.get(entrega_id)
+                if entrega is None:
+                    despachadas.append(self._reload(entrega_id))
+                    continue
+                entrega.update(status=repo.EM_ROTA, entregador_id=entregador_id, rota_ordem=ordem[entrega_id])
+                self._discard(entrega_id)
+                despachadas.append(dict(entrega))
+        for entrega in despachadas:
+            self._notify(entrega)
+        return despachadas
+
+    def dispatch(self, entrega_id, entregador_id):
+        return self._change(entrega_id, repo.EM_ROTA, entregador_id)
+
+    def return_to_queue(self, entrega_id):
+        return self._change(entrega_id, repo.PENDENTE)
+
+    def deliver(self, entrega_id):
+        return self._change(entrega_id, repo.ENTREGUE)
+
+    def cancel(self, entrega_id):
+        return self._change(entrega_id, repo.CANCELADA)
+
+    def _change(self, entrega_id, status, entregador_id=None):
+        """Aplica a transição; retorna a entrega atualizada ou None se ela
+        não estiver aberta ou a transição não for permitida"""
+        with self._lock:
+            if entrega_id not in self._abertas:
+                return None
+            entrega = self._set_status(entrega_id, status, entregador_id)
+        if entrega is not None:
+            self._notify(entrega)
+        return entrega
+
+    def _set_status(self, entrega_id, status, entregador_id=None):
+        # chamado com o lock
+        if not repo.set_delivery_status(self.company_name, entrega_id, status, entregador_id):
+            return None
+        entrega = self._abertas[entrega_id]
+        entrega["status"] = status
+        if status in repo.ENTREGA_ABERTA:
+            entrega["entregador_id"] = entregador_id if status == repo.EM_ROTA else None
+            entrega["rota_ordem"] = None
+        if status == repo.PENDENTE:
+            self._push(entrega)
+        else:
+            self._discard(entrega_id)
+        if status not in repo.ENTREGA_ABERTA:
+            del self._abertas[entrega_id]
+        return dict(entrega)
+
+    def _reload(self, entrega_id):
+        # chamado com o lock: a entrega mudou no banco por fora da fila
+        self._discard(entrega_id)
+        row = repo.get_delivery(self.company_name, entrega_id)
+        entrega = _entrega(row) if row else dict(self._abertas[entrega_id], status=repo.CANCELADA)
+        if entrega["status"] in repo.ENTREGA_ABERTA:
+            self._abertas[entrega_id] = entrega
+            if entrega["status"] == repo.PENDENTE:
+                self._push(entrega)
+        else:
+            del self._abertas[entrega_id]
+        return dict(entrega)
+
+    # ---------- listeners ----------
+    def add_listener(self, callback):
+        with self._lock:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback):
+        with self._lock:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def _notify(self, entrega):
+        with self._lock:
+            listeners = list(self._listeners)
+        for callback in listeners:
+            try:
+                callback(entrega)
+            except Exception:
+                traceback.print_exc()
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_queue(company_name):
+    """Fila da empresa, carregada do banco no primeiro uso"""
+    with _queues_lock:
+        queue = _queues.get(company_name)
+        if queue is None:
+            queue = _queues[company_name] = DeliveryQueue(company_name)
+        return queue
+
+
+def drop_queue(company_name):
+    with _queues_lock:
+        _queues.pop(company_name, None)
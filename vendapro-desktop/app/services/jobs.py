@@ -0,0 +1,28 @@
+import threading
+import traceback
+
+
+class PeriodicJob(threading.Thread):
+    """Roda `func(*args)` numa thread daemon a cada `interval` segundos.
+
+    A primeira execução é imediata; stop() encerra a espera atual. Erros são
+    impressos e não derrubam o job.
+    """
+
+    def __init__(self, name, func, interval, *args):
+        super().__init__(name=name, daemon=True)
+        self.func = func
+        self.interval = interval
+        self.args = args
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                self.func(*self.args)
+            except Exception:
+                traceback.print_exc()
+            self._stop_event.wait(self.interval)
+
+    def stop(self):
+        self._stop_event.set()
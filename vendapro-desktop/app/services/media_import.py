@@ -0,0 +1,70 @@
+"""Importação de fotos de produtos a partir de uma pasta.
+
+Cada arquivo de imagem tem o nome do código de barras do produto
+(`7891234567890.jpg`). As fotos vão para a biblioteca: arquivos iguais,
+mesmo com nomes diferentes, viram uma imagem só, e a miniatura é gerada uma
+vez por imagem nova (as que a biblioteca já tem não são decodificadas).
+Os produtos são gravados em lotes de `batch_size` arquivos, um lote por
+transação.
+"""
+import os
+
+from app.database import media_store
+from app.database import user_repository as repo
+
+BATCH_SIZE = 200
+EXTENSOES = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".webp")
+
+
+def _arquivos(pasta):
+    for raiz, _dirs, nomes in os.walk(pasta):
+        for nome in sorted(nomes):
+            codigo, ext = os.path.splitext(nome)
+            if ext.lower() in EXTENSOES:
+                yield codigo, os.path.join(raiz, nome)
+
+
+def import_media_folder(company_name, pasta, batch_size=BATCH_SIZE, progress=None):
+    """Importa as fotos da pasta; `progress(arquivos lidos)` a cada lote.
+
+    Retorna {"arquivos", "vinculados", "novas", "repetidas", "bytes_repetidos",
+    "sem_produto" (códigos sem produto), "erros" [(arquivo, mensagem)]}.
+    """
+    conhecidas = repo.known_media(company_name)
+    result = {"arquivos": 0, "vinculados": 0, "novas": 0, "repetidas": 0,
+              "bytes_repetidos": 0, "sem_produto": [], "erros": []}
+    lote = []
+
+    def gravar():
+        faltando = repo.set_products_photo(company_name, lote)
+        result["sem_produto"].extend(faltando)
+        result["vinculados"] += len(lote) - len(faltando)
+        lote.clear()
+        if progress:
+            progress(result["arquivos"])
+
+    for codigo, path in _arquivos(pasta):
+        result["arquivos"] += 1
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except OSError as e:
+            result["erros"].append((path, str(e)))
+            continue
+        if not data:
+            result["erros"].append((path, "arquivo vazio"))
+            continue
+        key = media_store.digest(data)
+        nova = key not in conhecidas
+        if nova:
+            conhecidas.add(key)
+            result["novas"] += 1
+        else:
+            result["repetidas"] += 1
+            result["bytes_repetidos"] += len(data)
+        lote.append((codigo, media_store.prepare(data, key=key, thumb=nova)))
+        if len(lote) >= batch_size:
+            gravar()
+    if lote:
+        gravar()
+    return result
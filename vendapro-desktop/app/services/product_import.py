@@ -0,0 +1,220 @@
+"""Importação do catálogo de produtos a partir de CSV ou XLSX.
+
+O arquivo é lido linha a linha (nunca inteiro em memória), validado e gravado
+em lotes de `batch_size` linhas, cada lote numa transação com upsert por
+código de barras. O progresso fica salvo no banco: importar de novo o mesmo
+arquivo depois de uma queda ou cancelamento continua do último lote gravado.
+
+Colunas reconhecidas no cabeçalho (sem diferenciar acentos/maiúsculas):
+nome, valor, codigo_barra (obrigatórias), marca e quantidade (opcionais).
+"""
+import codecs
+import csv
+import io
+import os
+import unicodedata
+
+from app.database import user_repository as repo
+
+BATCH_SIZE = 5000
+MAX_ERRORS = 200  # erros guardados para exibir; o total é sempre contado
+
+COLUMN_ALIASES = {
+    "nome": ("nome", "produto", "descricao"),
+    "valor": ("valor", "preco", "preco_venda", "valor_venda"),
+    "quantidade": ("quantidade", "qtd", "estoque", "saldo"),
+    "marca": ("marca", "fabricante"),
+    "codigo_barra": ("codigo_barra", "codigo_de_barras", "codigo_barras", "codigo", "ean", "gtin"),
+}
+REQUIRED = ("nome", "valor", "codigo_barra")
+
+
+# ------------------- LEITURA -------------------
+def _normalize(header):
+    text = unicodedata.normalize("NFKD", str(header or "")).encode("ascii", "ignore").decode()
+    return "_".join(text.lower().replace(".", " ").split())
+
+
+def _map_columns(header):
+    """{campo: índice da coluna} a partir do cabeçalho do arquivo"""
+    names = [_normalize(h) for h in header]
+    mapping = {}
+    for field, aliases in COLUMN_ALIASES.items():
+        for alias in aliases:
+            if alias in names:
+                mapping[field] = names.index(alias)
+                break
+    missing = [field for field in REQUIRED if field not in mapping]
+    if missing:
+        raise ValueError(f"coluna(s) obrigatória(s) ausente(s): {', '.join(missing)}")
+    return mapping
+
+
+def _open_csv(path):
+    """Gera (número da linha, valores, fração lida) de um CSV.
+
+    Detecta UTF-8 (com ou sem BOM) ou cai para cp1252, e o separador
+    (; , ou tab) pelo começo do arquivo.
+    """
+    with open(path, "rb") as raw:
+        sample = raw.read(64 * 1024)
+        try:
+            # incremental: amostra cortada no meio de um caractere não é erro
+            codecs.getincrementaldecoder("utf-8")().decode(sample)
+            encoding = "utf-8-sig"
+        except UnicodeDecodeError:
+            encoding = "cp1252"
+        text = codecs.decode(sample, encoding, errors="ignore")
+        try:
+            dialect = csv.Sniffer().sniff(text.split("\n", 1)[0], delimiters=";,\t")
+        except csv.Error:
+            dialect = csv.excel
+        raw.seek(0)
+
+        size = os.fstat(raw.fileno()).st_size or 1
+        reader = csv.reader(io.TextIOWrapper(raw, encoding=encoding, newline=""), dialect)
+        for values in reader:
+            yield reader.line_num, values, raw.tell() / size
+
+
+def _open_xlsx(path):
+    """Gera (número da linha, valores, fração lida) da primeira planilha"""
+    try:
+        # import local: openpyxl só é necessário para planilhas do Excel
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("instale o pacote openpyxl para importar arquivos .xlsx")
+
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        total = sheet.max_row or 0
+        for number, values in enumerate(sheet.iter_rows(values_only=True), 1):
+            yield number, ["" if v is None else v for v in values], (number / total if total else 0)
+    finally:
+        workbook.close()
+
+
+def read_rows(path):
+    ext = os.path.splitext(path)[1].lower()
+    if ext == ".xlsx":
+        return _open_xlsx(path)
+    if ext in (".csv", ".txt"):
+        return _open_csv(path)
+    raise ValueError(f"formato não suportado: {ext or path}")
+
+
+# ------------------- VALIDAÇÃO -------------------
+def _text(value):
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # EAN lido como número pelo Excel
+    return str(value).strip()
+
+
+def _number(value):
+    """Aceita 12.5, 12,5, 1.234,56 e números vindos da planilha"""
+    if isinstance(value, (int, float)):
+        return float(value)
+    text = _text(value).replace("R$", "").replace(" ", "")
+    if "," in text:
+        text = text.replace(".", "").replace(",", ".")
+    return float(text)
+
+
+def parse_row(values, columns):
+    """(codigo_barra, nome, valor, marca, quantidade) ou ValueError"""
+    def get(field):
+        index = columns.get(field)
+        if index is None or index >= len(values):
+            return ""
+        return values[index]
+
+    codigo = _text(get("codigo_barra"))
+    nome = _text(get("nome"))
+    if not codigo:
+        raise ValueError("código de barras vazio")
+    if not nome:
+        raise ValueError("nome vazio")
+
+    try:
+        valor = _number(get("valor"))
+    except ValueError:
+        raise ValueError(f"valor inválido: {get('valor')!r}")
+    if valor < 0:
+        raise ValueError("valor negativo")
+
+    quantidade = None
+    if _text(get("quantidade")):
+        try:
+            quantidade = _number(get("quantidade"))
+        except ValueError:
+            raise ValueError(f"quantidade inválida: {get('quantidade')!r}")
+        if quantidade < 0 or not quantidade.is_integer():
+            raise ValueError(f"quantidade inválida: {get('quantidade')!r}")
+        quantidade = int(quantidade)
+
+    return codigo, nome, valor, _text(get("marca")), quantidade
+
+
+# ------------------- IMPORTAÇÃO -------------------
+def import_products(company_name, path, batch_size=BATCH_SIZE, progress=None, cancel=None):
+    """Importa o arquivo; pode ser chamada numa thread.
+
+    `progress(linhas, fração)` é chamado após cada lote gravado; `cancel` é
+    um threading.Event verificado entre os lotes (a importação fica
+    "interrompida" e continua na próxima chamada com o mesmo arquivo).
+
+    Retorna dict com import_id, linhas, gravados, erros (total), a lista
+    `detalhes` [(linha, mensagem)] dos primeiros erros e o status.
+    """
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    rows = read_rows(path)
+
+    header = None
+    for _line, values, _fraction in rows:
+        if any(_text(v) for v in values):
+            header = values
+            break
+    if header is None:
+        raise ValueError("arquivo vazio")
+    columns = _map_columns(header)
+
+    import_id, done = repo.start_import(company_name, path, stat.st_size, stat.st_mtime)
+    detalhes, erros_lote, batch = [], 0, []
+    last_line, status = done, repo.CONCLUIDA
+
+    def flush(line, fraction):
+        nonlocal batch, erros_lote
+        repo.import_products_batch(company_name, import_id, batch, line, erros_lote)
+        batch, erros_lote = [], 0
+        if progress is not None:
+            progress(line, fraction)
+
+    for line, values, fraction in rows:
+        if line <= done or not any(_text(v) for v in values):
+            continue
+        try:
+            batch.append(parse_row(values, columns))
+        except ValueError as e:
+            erros_lote += 1
+            if len(detalhes) < MAX_ERRORS:
+                detalhes.append((line, str(e)))
+        last_line = line
+
+        if len(batch) + erros_lote >= batch_size:
+            flush(line, fraction)
+            if cancel is not None and cancel.is_set():
+                status = repo.INTERROMPIDA
+                break
+
+    if status == repo.CONCLUIDA and (batch or erros_lote):
+        flush(last_line, 1.0)
+    rows.close()
+    repo.finish_import(company_name, import_id, status)
+
+    _id, _arquivo, linhas, gravados, erros, status = repo.get_import(company_name, import_id)
+    return {
+        "import_id": import_id, "linhas": linhas, "gravados": gravados,
+        "erros": erros, "detalhes": detalhes, "status": status,
+    }
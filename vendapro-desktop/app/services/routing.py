@@ -0,0 +1,124 @@
+"""Lotes e rotas de entrega com as coordenadas gravadas (sem serviço de mapas).
+
+Lotes: as entregas pendentes são separadas por zona e, dentro da zona,
+tomadas em ordem de prioridade; um lote junta até LOTE_MAXIMO entregas cuja
+saída limite cabe em JANELA_MINUTOS depois da mais urgente dele.
+
+Rota de cada lote: ciclo loja -> paradas -> loja, começando pelo vizinho
+mais próximo e melhorado por 2-opt (inverte o trecho entre duas arestas
+enquanto isso encurtar o ciclo). Distâncias em linha reta (haversine) numa
+matriz numpy; cada passada do 2-opt avalia todas as trocas de uma vez e
+aplica a melhor. Entregas sem coordenadas vão no fim, em ordem de
+prioridade.
+"""
+from datetime import datetime, timedelta
+
+import numpy as np
+
+RAIO_TERRA_KM = 6371.0
+LOTE_MAXIMO = 6       # entregas por saída de um entregador
+JANELA_MINUTOS = 30   # saída limite da última em relação à mais urgente
+FORMATO = "%Y-%m-%d %H:%M:%S"
+
+
+def distance_matrix(pontos):
+    """Distâncias em km entre os pontos [(latitude, longitude)]"""
+    pontos = np.radians(np.asarray(pontos, dtype=np.float64).reshape(-1, 2))
+    lat, lon = pontos[:, 0], pontos[:, 1]
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * RAIO_TERRA_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+def nearest_neighbour(dist):
+    """Ciclo que sai do nó 0 (loja) e vai sempre ao mais próximo não visitado"""
+    visitado = np.zeros(len(dist), dtype=bool)
+    visitado[0] = True
+    tour = [0]
+    for _ in range(len(dist) - 1):
+        proximo = int(np.argmin(np.where(visitado, np.inf, dist[tour[-1]])))
+        visitado[proximo] = True
+        tour.append(proximo)
+    return np.array(tour)
+
+
+def two_opt(tour, dist):
+    """Melhora o ciclo `tour` (nó 0 fixo no início) até nenhuma troca de
+    duas arestas encurtá-lo"""
+    tour = np.array(tour)
+    m = len(tour)
+    if m < 4:
+        return tour
+    # arestas (t[i], t[i+1]) e (t[j], t[j+1]), não vizinhas
+    i_idx, j_idx = np.triu_indices(m, k=2)
+    valido = ~((i_idx == 0) & (j_idx == m - 1))
+    i_idx, j_idx = i_idx[valido], j_idx[valido]
+    while True:
+        a, b = tour, np.roll(tour, -1)
+        delta = (dist[a[i_idx], a[j_idx]] + dist[b[i_idx], b[j_idx]]
+                 - dist[a[i_idx], b[i_idx]] - dist[a[j_idx], b[j_idx]])
+        k = int(np.argmin(delta))
+        if delta[k] >= -1e-9:
+            return tour
+        i, j = i_idx[k], j_idx[k]
+        tour[i + 1:j + 1] = tour[i + 1:j + 1][::-1].copy()
+
+
+def tour_length(tour, dist):
+    tour = np.asarray(tour)
+    return float(dist[tour, np.roll(tour, -1)].sum())
+
+
+def _coordenadas(entrega):
+    return entrega.get("latitude") is not None and entrega.get("longitude") is not None
+
+
+def route(entregas, loja=None):
+    """Ordena as entregas de um lote; retorna (entregas na ordem, km do
+    ciclo). Sem `loja`, o ciclo sai do centro das paradas."""
+    com = [entrega for entrega in entregas if _coordenadas(entrega)]
+    sem = [entrega for entrega in entregas if not _coordenadas(entrega)]
+    if not com:
+        return sem, 0.0
+    pontos = [(entrega["latitude"], entrega["longitude"]) for entrega in com]
+    origem = loja if loja is not None else tuple(np.mean(pontos, axis=0))
+    dist = distance_matrix([origem] + pontos)
+    tour = two_opt(nearest_neighbour(dist), dist)
+    paradas = [int(k) - 1 for k in tour[1:]]
+    # o ciclo vale nos dois sentidos: sai pelo que chega antes à mais urgente
+    urgente = min(range(len(com)), key=lambda k: com[k]["prioridade"])
+    if paradas.index(urgente) > len(paradas) - 1 - paradas.index(urgente):
+        paradas.reverse()
+    return [com[k] for k in paradas] + sem, tour_length(tour, dist)
+
+
+def plan_batches(entregas, loja=None, lote_maximo=LOTE_MAXIMO, janela=JANELA_MINUTOS):
+    """Lotes das entregas pendentes `entregas` (dicts da fila, com
+    "prioridade"): [{"zona", "entregas" (na ordem da rota), "km",
+    "prioridade" (a da mais urgente)}], do lote mais urgente ao menos"""
+    por_zona = {}
+    for entrega in sorted(entregas, key=lambda entrega: entrega["prioridade"]):
+        por_zona.setdefault(entrega["zona"], []).append(entrega)
+
+    lotes = []
+    for zona, fila in por_zona.items():
+        lote, limite = [], None
+        for entrega in fila:
+            saida = datetime.strptime(entrega["prioridade"][0], FORMATO)
+            if lote and (len(lote) >= lote_maximo or saida > limite):
+                lotes.append((zona, lote))
+                lote = []
+            if not lote:
+                limite = saida + timedelta(minutes=janela)
+            lote.append(entrega)
+        if lote:
+            lotes.append((zona, lote))
+
+    planejados = []
+    for zona, lote in lotes:
+        ordem, km = route(lote, loja)
+        planejados.append({"zona": zona, "entregas": ordem, "km": round(km, 2),
+                           "prioridade": min(entrega["prioridade"] for entrega in lote)})
+    planejados.sort(key=lambda lote: lote["prioridade"])
+    return planejados
@@ -1,9 +1,212 @@
-from PyQt5.QtWidgets import QWidget, QLabel, QVBoxLayout
+import threading
 
+from PyQt5.QtWidgets import (
+    QWidget, QLabel, QVBoxLayout, QHBoxLayout, QPushButton, QTableView, QComboBox,
+    QFileDialog, QMessageBox, QFrame
+)
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtGui import QImageReader, QPixmap
+
+from app.database.user_repository import (
+    get_media_page, get_media_path, get_media_stats, get_media_usage,
+    migrate_photos_to_store, collect_media
+)
+from app.services.media_import import import_media_folder
+from app.ui.components.paged_table_model import PagedTableModel
+
+PREVIEW_SIZE = 220
+TABELAS = {"produto": "Produto", "clients": "Cliente", "funcionarios": "Funcionário",
+           "fornecedores": "Fornecedor", "users": "Usuário"}
+
+
+def _mb(nbytes):
+    return f"{nbytes / 1024 / 1024:.1f} MB"
+
+# ========== BIBLIOTECA WINDOW ==========
 class BibliotecaWindow(QWidget):
-    def __init__(self):
+    """Imagens da biblioteca (media_store). A tabela mostra as miniaturas
+    guardadas no banco; a prévia é decodificada do arquivo já no tamanho
+    final (QImageReader), sem carregar a imagem inteira no Python.
+    Importar, mover fotos antigas e limpar rodam numa thread."""
+
+    _finished = pyqtSignal(str, object)  # (tarefa, resultado)
+    _failed = pyqtSignal(str)
+
+    def __init__(self, company_name):
         super().__init__()
+        self.company_name = company_name
+        self.running = False
+        self.setStyleSheet(CRUD_STYLE)
+        layout = QVBoxLayout(); layout.setContentsMargins(15,15,15,15)
+
+        # Resumo e ações
+        topo = QHBoxLayout()
+        self.stats_label = QLabel()
+        self.filtro_combo = QComboBox()
+        self.filtro_combo.addItem("Todas as imagens", False)
+        self.filtro_combo.addItem("Sem uso", True)
+        self.filtro_combo.currentIndexChanged.connect(self.refresh)
+        self.botoes = []
+        for texto, slot in [("Importar Pasta", self.importar_pasta),
+                            ("Mover Fotos Antigas", self.mover_antigas),
+                            ("Limpar Sem Uso", self.limpar)]:
+            btn = QPushButton(texto); btn.clicked.connect(slot)
+            self.botoes.append(btn)
+        topo.addWidget(self.stats_label); topo.addStretch(); topo.addWidget(self.filtro_combo)
+        for btn in self.botoes:
+            topo.addWidget(btn)
+        layout.addLayout(topo)
+
+        # Tabela + prévia
+        centro = QHBoxLayout()
+        self.model = PagedTableModel(
+            [("Miniatura", 5), ("Hash", 1), ("Bytes", 2), ("Usos", 3), ("Criada em", 4)],
+            photo_column=0, parent=self
+        )
+        self.table = QTableView(); self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QTableView.SelectRows)
+        self.table.setSelectionMode(QTableView.SingleSelection)
+        self.table.verticalHeader().setVisible(False)
+        self.table.verticalHeader().setDefaultSectionSize(44)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.setColumnWidth(1, 300)
+        centro.addWidget(self.table, 1)
 
-        layout = QVBoxLayout()
-        layout.addWidget(QLabel("Biblioteca"))
+        lateral = QFrame(); lateral.setFixedWidth(PREVIEW_SIZE + 30)
+        lateral_layout = QVBoxLayout(lateral)
+        self.preview = QLabel("Selecione uma imagem")
+        self.preview.setAlignment(Qt.AlignCenter)
+        self.preview.setFixedSize(PREVIEW_SIZE, PREVIEW_SIZE)
+        self.usage_label = QLabel(); self.usage_label.setWordWrap(True)
+        self.usage_label.setAlignment(Qt.AlignTop | Qt.AlignLeft)
+        lateral_layout.addWidget(self.preview)
+        lateral_layout.addWidget(self.usage_label, 1)
+        centro.addWidget(lateral)
+        layout.addLayout(centro, 1)
+
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
         self.setLayout(layout)
+
+        self._finished.connect(self.show_result)
+        self._failed.connect(self.show_error)
+        self.table.selectionModel().selectionChanged.connect(self.show_selected)
+        self.refresh()
+
+    # ========== LISTA ==========
+    def refresh(self):
+        orfas = self.filtro_combo.currentData()
+        self.model.reset(lambda after_key: get_media_page(self.company_name, after_key=after_key, orfas=orfas))
+        stats = get_media_stats(self.company_name)
+        self.stats_label.setText(
+            f"{stats['arquivos']} imagens, {_mb(stats['bytes'])} em disco "
+            f"({stats['referencias']} usos; copiadas ocupariam {_mb(stats['bytes_sem_dedup'])})"
+        )
+        avisos = []
+        if stats["em_blob"]:
+            avisos.append(f"{stats['em_blob']} fotos ainda gravadas no banco")
+        if stats["orfas"]:
+            avisos.append(f"{stats['orfas']} imagens sem uso")
+        self.status_label.setText("; ".join(avisos))
+        self.preview.setText("Selecione uma imagem"); self.usage_label.clear()
+
+    def show_selected(self):
+        indexes = self.table.selectionModel().selectedRows()
+        if not indexes:
+            return
+        _id, key, tamanho, refs, criada_em, _thumb = self.model.rows[indexes[0].row()]
+        # decodifica do arquivo já reduzido (JPEG decodifica em escala menor)
+        reader = QImageReader(get_media_path(self.company_name, key))
+        size = reader.size()
+        if size.isValid():
+            reader.setScaledSize(size.scaled(PREVIEW_SIZE, PREVIEW_SIZE, Qt.KeepAspectRatio))
+        image = reader.read()
+        if image.isNull():
+            self.preview.setText("Arquivo ausente ou inválido")
+        else:
+            self.preview.setPixmap(QPixmap.fromImage(image))
+        linhas = [f"{size.width()}x{size.height()}, {tamanho} bytes, desde {criada_em}"]
+        usos = get_media_usage(self.company_name, key)
+        linhas += [f"{TABELAS.get(tabela, tabela)} #{row_id}: {nome}" for tabela, row_id, nome in usos]
+        if refs > len(usos):
+            linhas.append(f"... e mais {refs - len(usos)}")
+        self.usage_label.setText("\n".join(linhas))
+
+    # ========== AÇÕES ==========
+    def importar_pasta(self):
+        pasta = QFileDialog.getExistingDirectory(self, "Pasta com fotos (nome = código de barras)")
+        if pasta:
+            self.executar("importar", import_media_folder, self.company_name, pasta)
+
+    def mover_antigas(self):
+        self.executar("mover", migrate_photos_to_store, self.company_name)
+
+    def limpar(self):
+        self.executar("limpar", collect_media, self.company_name)
+
+    def executar(self, tarefa, func, *args):
+        if self.running:
+            return
+        self.running = True
+        for btn in self.botoes:
+            btn.setEnabled(False)
+        self.status_label.setText("Processando...")
+
+        def run():
+            try:
+                result = func(*args)
+            except Exception as e:
+                self._emit(self._failed, str(e))
+                return
+            self._emit(self._finished, tarefa, result)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def _emit(self, signal, *args):
+        # chamado na thread da tarefa
+        try:
+            signal.emit(*args)
+        except RuntimeError:
+            pass  # página já fechada
+
+    def _done(self):
+        self.running = False
+        for btn in self.botoes:
+            btn.setEnabled(True)
+
+    def show_result(self, tarefa, result):
+        self._done()
+        self.refresh()
+        if tarefa == "importar":
+            mensagem = (
+                f"{result['arquivos']} arquivos: {result['vinculados']} fotos de produtos gravadas, "
+                f"{result['novas']} imagens novas, {result['repetidas']} repetidas "
+                f"({_mb(result['bytes_repetidos'])} não duplicados)"
+            )
+            if result["sem_produto"]:
+                mensagem += f"\n\nSem produto com o código: {', '.join(result['sem_produto'][:20])}"
+            if result["erros"]:
+                mensagem += "\n\n" + "\n".join(f"{path}: {msg}" for path, msg in result["erros"][:20])
+            QMessageBox.information(self, "Importar fotos", mensagem)
+        elif tarefa == "mover":
+            self.status_label.setText(f"{result} fotos movidas para a biblioteca")
+        else:
+            arquivos, liberados = result
+            self.status_label.setText(f"{arquivos} imagens sem uso removidas ({_mb(liberados)})")
+
+    def show_error(self, message):
+        self._done()
+        self.status_label.setText(f"Erro: {message}")
+
+# ========== ESTILO GLOBAL =====================================
+CRUD_STYLE = """
+QWidget { background-color: #1b2330; color: #e5e5e5; font-size: 14px; }
+QLabel { color: #e5e5e5; font-weight: bold; }
+QPushButton { background-color: #3b6cee; padding: 8px 18px; border-radius: 6px; color: white; font-weight: bold; }
+QPushButton:hover { background-color: #5580ff; }
+QPushButton:pressed { background-color: #2d59cc; }
+QPushButton:disabled { background-color: #3a4150; color: #9aa3b2; }
+QComboBox { border: 1px solid #3a4150; padding: 6px; border-radius: 5px; color: #eaeaea; }
+QTableView { background-color: #242c3b; border: 1px solid #384151; border-radius: 6px; gridline-color: #3c4558; }
+QHeaderView::section { background-color: #2e384a; padding: 6px; color: #d1d1d1; font-weight: bold; border: none; }
+"""
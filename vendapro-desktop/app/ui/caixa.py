@@ -1,9 +1,144 @@
-from PyQt5.QtWidgets import QWidget, QLabel, QVBoxLayout
+from PyQt5.QtWidgets import (
+    QWidget, QLabel, QVBoxLayout, QHBoxLayout, QPushButton, QLineEdit,
+    QTableWidget, QTableWidgetItem, QHeaderView, QMessageBox, QInputDialog, QFormLayout
+)
 
+from app.core.utils import format_money
+from app.database.user_repository import (
+    FORMAS_PAGAMENTO, SANGRIA, SUPRIMENTO,
+    open_caixa, add_caixa_movement, caixa_report, close_caixa
+)
+
+# ========== CAIXA WINDOW ==========
 class CaixaWindow(QWidget):
-    def __init__(self):
+    """Abertura, sangria/suprimento, leitura X e fechamento Z do caixa.
+
+    Os valores vêm dos contadores da sessão (atualizados a cada venda), então
+    a tela abre na hora mesmo com o dia cheio de vendas.
+    """
+
+    def __init__(self, company_name):
         super().__init__()
+        self.company_name = company_name
+        self.setStyleSheet(CRUD_STYLE)
+        layout = QVBoxLayout(); layout.setContentsMargins(15,15,15,15)
+
+        self.status_label = QLabel()
+        self.status_label.setStyleSheet("font-size:18px;")
+        layout.addWidget(self.status_label)
+
+        # Abertura
+        self.abertura = QWidget()
+        abertura_layout = QHBoxLayout(self.abertura); abertura_layout.setContentsMargins(0,0,0,0)
+        self.abertura_input = QLineEdit(); self.abertura_input.setPlaceholderText("Troco inicial (0,00)")
+        btn_abrir = QPushButton("Abrir Caixa"); btn_abrir.clicked.connect(self.abrir_caixa)
+        abertura_layout.addWidget(self.abertura_input, 1); abertura_layout.addWidget(btn_abrir)
+        layout.addWidget(self.abertura)
+
+        # Operações do caixa aberto
+        self.operacoes = QWidget()
+        operacoes_layout = QHBoxLayout(self.operacoes); operacoes_layout.setContentsMargins(0,0,0,0)
+        for texto, slot in [("Suprimento", lambda: self.movimentar(SUPRIMENTO)),
+                            ("Sangria", lambda: self.movimentar(SANGRIA)),
+                            ("Leitura X", self.refresh),
+                            ("Fechar Caixa (Z)", self.fechar_caixa)]:
+            btn = QPushButton(texto); btn.clicked.connect(slot)
+            operacoes_layout.addWidget(btn)
+        layout.addWidget(self.operacoes)
+
+        # Relatório da sessão
+        self.resumo = QFormLayout()
+        self.resumo_labels = {}
+        for chave, titulo in [("valor_abertura","Troco inicial"),("suprimentos","Suprimentos"),
+                              ("sangrias","Sangrias"),("total_vendas","Total de vendas"),
+                              ("dinheiro_esperado","Dinheiro na gaveta")]:
+            self.resumo_labels[chave] = QLabel()
+            self.resumo.addRow(titulo+":", self.resumo_labels[chave])
+        layout.addLayout(self.resumo)
+
+        self.formas_table = QTableWidget(len(FORMAS_PAGAMENTO), 3)
+        self.formas_table.setHorizontalHeaderLabels(["Forma de pagamento", "Vendas", "Total"])
+        self.formas_table.verticalHeader().setVisible(False)
+        self.formas_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.formas_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(self.formas_table)
+        layout.addStretch()
 
-        layout = QVBoxLayout()
-        layout.addWidget(QLabel("Caixa"))
         self.setLayout(layout)
+        self.refresh()
+
+    # ========== MÉTODOS ==========
+    def valor(self, texto):
+        texto = texto.strip().replace(",", ".")
+        try: return float(texto) if texto else 0.0
+        except ValueError: return None
+
+    def refresh(self):
+        """Leitura X: mostra os contadores da sessão aberta"""
+        report = caixa_report(self.company_name)
+        aberto = report is not None
+        self.abertura.setVisible(not aberto)
+        self.operacoes.setVisible(aberto)
+        if not aberto:
+            self.status_label.setText("Caixa fechado")
+            report = {"valor_abertura": 0, "suprimentos": 0, "sangrias": 0,
+                      "total_vendas": 0, "dinheiro_esperado": 0, "por_forma": {}}
+        else:
+            self.status_label.setText(f"Caixa #{report['id']} aberto desde {report['aberto_em']} - {report['vendas']} vendas")
+        self.mostrar(report)
+
+    def mostrar(self, report):
+        for chave, label in self.resumo_labels.items():
+            label.setText(format_money(report[chave]))
+        for row, forma in enumerate(FORMAS_PAGAMENTO):
+            vendas, total = report["por_forma"].get(forma, (0, 0))
+            for col, texto in enumerate((forma, str(vendas), format_money(total))):
+                self.formas_table.setItem(row, col, QTableWidgetItem(texto))
+
+    def abrir_caixa(self):
+        valor = self.valor(self.abertura_input.text())
+        if valor is None or valor < 0: QMessageBox.warning(self, "Erro", "Valor inválido"); return
+        if open_caixa(self.company_name, valor) is None:
+            QMessageBox.warning(self, "Erro", "Já existe um caixa aberto")
+        self.abertura_input.clear()
+        self.refresh()
+
+    def movimentar(self, tipo):
+        valor, ok = QInputDialog.getDouble(self, tipo, "Valor:", 0, 0, 1e9, 2)
+        if not ok or valor <= 0: return
+        motivo, ok = QInputDialog.getText(self, tipo, "Motivo:")
+        if not ok: return
+        if not add_caixa_movement(self.company_name, tipo, valor, motivo):
+            QMessageBox.warning(self, "Erro", "Valor maior que o dinheiro na gaveta" if tipo == SANGRIA else "Caixa fechado")
+        self.refresh()
+
+    def fechar_caixa(self):
+        contado, ok = QInputDialog.getDouble(self, "Fechar Caixa", "Dinheiro contado na gaveta:", 0, 0, 1e9, 2)
+        if not ok: return
+        report = close_caixa(self.company_name, contado)
+        if report is None: QMessageBox.warning(self, "Erro", "Nenhum caixa aberto"); self.refresh(); return
+        self.refresh()
+        self.mostrar(report)
+        self.status_label.setText(f"Caixa #{report['id']} fechado - {report['vendas']} vendas")
+        texto = (f"Redução Z do caixa #{report['id']}\n"
+                 f"Vendas: {report['vendas']} ({format_money(report['total_vendas'])})\n"
+                 f"Dinheiro esperado: {format_money(report['dinheiro_esperado'])}\n"
+                 f"Dinheiro contado: {format_money(report['valor_contado'])}\n"
+                 f"Diferença: {format_money(report['diferenca'])}")
+        if report["divergencias"]:
+            formas = ", ".join(forma for forma, _contador, _vendas in report["divergencias"])
+            QMessageBox.warning(self, "Redução Z", texto + f"\n\nATENÇÃO: totais divergentes das vendas em {formas}")
+        else:
+            QMessageBox.information(self, "Redução Z", texto)
+
+# ========== ESTILO GLOBAL =====================================
+CRUD_STYLE = """
+QWidget { background-color: #1b2330; color: #e5e5e5; font-size: 14px; }
+QLabel { color: #e5e5e5; font-weight: bold; }
+QPushButton { background-color: #3b6cee; padding: 8px 18px; border-radius: 6px; color: white; font-weight: bold; }
+QPushButton:hover { background-color: #5580ff; }
+QPushButton:pressed { background-color: #2d59cc; }
+QLineEdit { border: 1px solid #3a4150; padding: 6px; border-radius: 5px; color: #eaeaea; }
+QTableWidget { background-color: #242c3b; border: 1px solid #384151; border-radius: 6px; gridline-color: #3c4558; }
+QHeaderView::section { background-color: #2e384a; padding: 6px; color: #d1d1d1; font-weight: bold; border: none; }
+"""
@@ -1,72 +1,24 @@
 from PyQt5.QtWidgets import (
     QWidget, QLabel, QVBoxLayout, QHBoxLayout, QPushButton,
-    QTableWidget, QTableWidgetItem, QDialog, QFormLayout, QLineEdit,
+    QTableView, QDialog, QFormLayout, QLineEdit,
     QMessageBox, QFileDialog
 )
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QIcon, QPainter, QPainterPath, QPixmap, QColor
+from PyQt5.QtGui import QPixmap
+
+from app.ui.components.paged_table_model import PagedTableModel
+from app.ui.components.action_delegate import ActionDelegate
+from app.ui.components.search_controller import SearchController
 
 from app.database.user_repository import (
-    get_all_clients,
+    name_matches,
+    get_clients_page,
+    get_client_by_id,
     create_client,
     update_client,
     delete_client
 )
 
-# ========== ICONES VETORIAIS ======================================
-
-def make_icon(paint_fn, size=16, color=QColor("white")):
-    pix = QPixmap(size, size)
-    pix.fill(QColor(0,0,0,0))
-    p = QPainter(pix)
-    p.setRenderHint(QPainter.Antialiasing)
-    p.setPen(color)
-    p.setBrush(color)
-    path = QPainterPath()
-    paint_fn(path, size)
-    p.drawPath(path)
-    p.end()
-    return QIcon(pix)
-
-def icon_eye():
-    def paint(path, s):
-        path.addEllipse(s*0.1, s*0.3, s*0.8, s*0.4)
-        path.addEllipse(s*0.4, s*0.4, s*0.2, s*0.2)
-    return make_icon(paint)
-
-def icon_pencil():
-    def paint(path, s):
-        path.moveTo(s*0.2, s*0.8)
-        path.lineTo(s*0.8, s*0.2)
-        path.lineTo(s*0.9, s*0.3)
-        path.lineTo(s*0.3, s*0.9)
-        path.closeSubpath()
-    return make_icon(paint)
-
-def icon_trash():
-    def paint(path, s):
-        path.addRect(s*0.2, s*0.3, s*0.6, s*0.5)
-        path.addRect(s*0.15, s*0.2, s*0.7, s*0.1)
-    return make_icon(paint)
-
-# ========== BOTÕES DE AÇÃO ======================================
-
-def make_action_btn(text, bg):
-    btn = QPushButton(text)
-    btn.setStyleSheet(f"""
-        QPushButton {{
-            background-color: {bg};
-            padding: 4px 10px;
-            border-radius: 4px;
-            color: white;
-            font-weight: bold;
-        }}
-        QPushButton:hover {{
-            background-color: {bg}CC;
-        }}
-    """)
-    return btn
-
 # ========== DIALOG ADD CLIENTE ====================================
 
 class AddClientDialog(QDialog):
@@ -256,82 +208,44 @@ class ClientesWindow(QWidget):
         search_layout = QHBoxLayout()
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Pesquisar cliente...")
-        self.search_input.textChanged.connect(self.search_clients)
         search_layout.addWidget(self.search_input)
         layout.addLayout(search_layout)
 
         # tabela
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels(
-            ["Foto", "Nome", "Email", "Telefone", "Endereço", "Ações"]
+        self.model = PagedTableModel(
+            [("Foto", 5), ("Nome", 1), ("Email", 2), ("Telefone", 3),
+             ("Endereço", 4), ("Ações", None)],
+            photo_column=0, parent=self
         )
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.action_delegate = ActionDelegate(self.table)
+        self.action_delegate.view_clicked.connect(lambda row: self.view_client(self.model.row_id(row)))
+        self.action_delegate.edit_clicked.connect(lambda row: self.edit_client(self.model.row_id(row)))
+        self.action_delegate.delete_clicked.connect(lambda row: self.delete_client_confirm(self.model.row_id(row)))
+        self.table.setItemDelegateForColumn(5, self.action_delegate)
+        self.table.setColumnWidth(5, self.action_delegate.width())
         self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.verticalHeader().setDefaultSectionSize(44)
         layout.addWidget(self.table)
+
+        self.searcher = SearchController(
+            self.search_input, self.model, self.page_query,
+            on_done=self.show_total, matcher=name_matches
+        )
+
         self.setLayout(layout)
         self.refresh()
 
-    def refresh(self, search=None):
-        clientes = get_all_clients(self.company_name)
-        if search:
-            s = search.lower()
-            clientes = [c for c in clientes if s in c[1].lower()]
+    def page_query(self, search):
+        return lambda after_key: get_clients_page(self.company_name, search, after_key=after_key)
 
-        self.total_label.setText(f"Total de Clientes: {len(clientes)}")
-        if not clientes:
-            self.table.hide()
-            return
+    def refresh(self):
+        self.searcher.refresh()
 
-        self.table.show()
-        self.table.setRowCount(len(clientes))
-
-        for index, row in enumerate(clientes):
-            _id, name, email, phone, address, photo_bytes = row
-
-            # foto
-            pixmap = QPixmap()
-            if photo_bytes:
-                pixmap.loadFromData(photo_bytes)
-            else:
-                pixmap.load("assets/images/user_default.png")
-            pixmap = pixmap.scaled(40, 40, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            label_photo = QLabel()
-            label_photo.setPixmap(pixmap)
-            label_photo.setAlignment(Qt.AlignCenter)
-            self.table.setCellWidget(index, 0, label_photo)
-
-            # outras colunas
-            self.table.setItem(index, 1, QTableWidgetItem(name))
-            self.table.setItem(index, 2, QTableWidgetItem(email))
-            self.table.setItem(index, 3, QTableWidgetItem(phone))
-            self.table.setItem(index, 4, QTableWidgetItem(address))
-
-            self.add_actions(index, _id)
-
-    def add_actions(self, row, client_id):
-        btn_view = make_action_btn("Ver", "#f1c40f")
-        btn_edit = make_action_btn("Editar", "#3498db")
-        btn_delete = make_action_btn("Excluir", "#e74c3c")
-        btn_view.setIcon(icon_eye())
-        btn_edit.setIcon(icon_pencil())
-        btn_delete.setIcon(icon_trash())
-
-        btn_view.clicked.connect(lambda: self.view_client(client_id))
-        btn_edit.clicked.connect(lambda: self.edit_client(client_id))
-        btn_delete.clicked.connect(lambda: self.delete_client_confirm(client_id))
-
-        hl = QHBoxLayout()
-        hl.addWidget(btn_view)
-        hl.addWidget(btn_edit)
-        hl.addWidget(btn_delete)
-        hl.setContentsMargins(0, 0, 0, 0)
-
-        widget = QWidget()
-        widget.setLayout(hl)
-        self.table.setCellWidget(row, 5, widget)
-
-    def search_clients(self):
-        self.refresh(self.search_input.text())
+    def show_total(self):
+        self.total_label.setText(f"Total de Clientes: {self.model.total}")
+        self.table.setVisible(self.model.total > 0)
 
     def open_add_dialog(self):
         dialog = AddClientDialog(self.company_name)
@@ -339,15 +253,13 @@ class ClientesWindow(QWidget):
             self.refresh()
 
     def view_client(self, client_id):
-        clients = get_all_clients(self.company_name)
-        client = next((c for c in clients if c[0] == client_id), None)
+        client = get_client_by_id(self.company_name, client_id)
         if client:
             dlg = ViewClientDialog(self.company_name, client)
             dlg.exec_()
 
     def edit_client(self, client_id):
-        clients = get_all_clients(self.company_name)
-        client = next((c for c in clients if c[0] == client_id), None)
+        client = get_client_by_id(self.company_name, client_id)
         if client:
             dlg = EditClientDialog(self.company_name, client)
             if dlg.exec_():
@@ -373,9 +285,9 @@ CRUD_STYLE = """
     QPushButton:hover { background-color: #5580ff; }
     QPushButton:pressed { background-color: #2d59cc; }
     QLineEdit { border: 1px solid #3a4150; padding: 6px; border-radius: 5px; color: #eaeaea; }
-    QTableWidget { background-color: #242c3b; border: 1px solid #384151; border-radius: 6px; gridline-color: #3c4558; }
+    QTableView { background-color: #242c3b; border: 1px solid #384151; border-radius: 6px; gridline-color: #3c4558; }
     QHeaderView::section { background-color: #2e384a; padding: 6px; color: #d1d1d1; font-weight: bold; border: none; }
-    QTableWidget QTableCornerButton::section { background-color: #2e384a; border: none; }
+    QTableView QTableCornerButton::section { background-color: #2e384a; border: none; }
     QScrollBar:vertical { background: #202935; width: 10px; }
     QScrollBar::handle:vertical { background: #3b6cee; min-height: 20px; border-radius: 4px; }
 """
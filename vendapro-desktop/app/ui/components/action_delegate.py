@@ -0,0 +1,176 @@
+from PyQt5.QtWidgets import QStyledItemDelegate
+from PyQt5.QtCore import Qt, QEvent, QRect, pyqtSignal
+from PyQt5.QtGui import QIcon, QPainter, QPainterPath, QPixmap, QColor
+
+# ========== ICONES VETORIAIS ======================================
+
+def make_icon(paint_fn, size=16, color=QColor("white")):
+    pix = QPixmap(size, size)
+    pix.fill(QColor(0,0,0,0))
+    p = QPainter(pix)
+    p.setRenderHint(QPainter.Antialiasing)
+    p.setPen(color)
+    p.setBrush(color)
+    path = QPainterPath()
+    paint_fn(path, size)
+    p.drawPath(path)
+    p.end()
+    return QIcon(pix)
+
+def icon_eye():
+    def paint(path, s):
+        path.addEllipse(s*0.1, s*0.3, s*0.8, s*0.4)
+        path.addEllipse(s*0.4, s*0.4, s*0.2, s*0.2)
+    return make_icon(paint)
+
+def icon_pencil():
+    def paint(path, s):
+        path.moveTo(s*0.2, s*0.8)
+        path.lineTo(s*0.8, s*0.2)
+        path.lineTo(s*0.9, s*0.3)
+        path.lineTo(s*0.3, s*0.9)
+        path.closeSubpath()
+    return make_icon(paint)
+
+def icon_trash():
+    def paint(path, s):
+        path.addRect(s*0.2, s*0.3, s*0.6, s*0.5)
+        path.addRect(s*0.15, s*0.2, s*0.7, s*0.1)
+    return make_icon(paint)
+
+# ========== DELEGATE DE AÇÕES ======================================
+
+ICON_SIZE = 16
+BUTTON_HEIGHT = 28
+PADDING = 10
+SPACING = 6
+
+
+class ActionDelegate(QStyledItemDelegate):
+    """Desenha os botões Ver / Editar / Excluir da coluna de ações.
+
+    `actions` escolhe quais botões aparecem ("view", "edit", "delete").
+
+    Nenhum widget é criado por linha: os botões são pintados no paint() e o
+    clique é resolvido por hit-test no editorEvent(). Os sinais levam a
+    linha do modelo clicada.
+    """
+
+    view_clicked = pyqtSignal(int)
+    edit_clicked = pyqtSignal(int)
+    delete_clicked = pyqtSignal(int)
+
+    def __init__(self, view, show_text=True, actions=("view", "edit", "delete")):
+        super().__init__(view)
+        self.view = view
+        buttons = {
+            "view": ("Ver", QColor("#f1c40f"), icon_eye(), self.view_clicked),
+            "edit": ("Editar", QColor("#3498db"), icon_pencil(), self.edit_clicked),
+            "delete": ("Excluir", QColor("#e74c3c"), icon_trash(), self.delete_clicked),
+        }
+        self.buttons = [
+            (text if show_text else "", color, icon, signal)
+            for text, color, icon, signal in (buttons[action] for action in actions)
+        ]
+        self.hover = None    # (linha, botão) sob o mouse
+        self.pressed = None  # (linha, botão) com o mouse pressionado
+
+        view.setMouseTracking(True)
+        view.viewport().installEventFilter(self)
+
+    def _rects(self, option):
+        """Retângulos de cada botão dentro da célula"""
+        metrics = option.fontMetrics
+        height = min(BUTTON_HEIGHT, option.rect.height() - 4)
+        top = option.rect.top() + (option.rect.height() - height) // 2
+        x = option.rect.left() + SPACING
+        rects = []
+        for text, _color, _icon, _signal in self.buttons:
+            width = ICON_SIZE + 2 * PADDING
+            if text:
+                width += SPACING + metrics.horizontalAdvance(text)
+            rects.append(QRect(x, top, width, height))
+            x += width + SPACING
+        return rects
+
+    def _hit(self, option, pos):
+        for i, rect in enumerate(self._rects(option)):
+            if rect.contains(pos):
+                return i
+        return None
+
+    def paint(self, painter, option, index):
+        super().paint(painter, option, index)
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        font = painter.font()
+        font.setBold(True)
+        painter.setFont(font)
+
+        for i, rect in enumerate(self._rects(option)):
+            text, color, icon, _signal = self.buttons[i]
+            if self.pressed == (index.row(), i):
+                color = color.darker(120)
+            elif self.hover == (index.row(), i):
+                color = color.lighter(115)
+            painter.setPen(Qt.NoPen)
+            painter.setBrush(color)
+            painter.drawRoundedRect(rect, 4, 4)
+
+            icon_rect = QRect(rect.left() + PADDING, rect.center().y() - ICON_SIZE // 2 + 1, ICON_SIZE, ICON_SIZE)
+            if not text:
+                icon_rect.moveLeft(rect.center().x() - ICON_SIZE // 2 + 1)
+            icon.paint(painter, icon_rect)
+            if text:
+                painter.setPen(QColor("white"))
+                text_rect = rect.adjusted(PADDING + ICON_SIZE + SPACING, 0, -PADDING, 0)
+                painter.drawText(text_rect, Qt.AlignVCenter | Qt.AlignLeft, text)
+        painter.restore()
+
+    def width(self):
+        """Largura mínima da coluna para caber todos os botões"""
+        metrics = self.view.fontMetrics()
+        width = SPACING
+        for text, _color, _icon, _signal in self.buttons:
+            width += ICON_SIZE + 2 * PADDING + SPACING
+            if text:
+                width += SPACING + metrics.horizontalAdvance(text)
+        return width
+
+    def sizeHint(self, option, index):
+        size = super().sizeHint(option, index)
+        size.setWidth(self.width())
+        return size
+
+    def editorEvent(self, event, model, option, index):
+        kind = event.type()
+        if kind not in (QEvent.MouseMove, QEvent.MouseButtonPress, QEvent.MouseButtonRelease):
+            return False
+
+        button = self._hit(option, event.pos())
+        target = (index.row(), button) if button is not None else None
+
+        if kind == QEvent.MouseMove:
+            self._set_state(hover=target, pressed=self.pressed)
+            return False
+        if event.button() != Qt.LeftButton:
+            return False
+        if kind == QEvent.MouseButtonPress:
+            self._set_state(hover=target, pressed=target)
+            return target is not None
+
+        clicked = target is not None and target == self.pressed
+        self._set_state(hover=target, pressed=None)
+        if clicked:
+            self.buttons[button][3].emit(index.row())
+        return clicked
+
+    def eventFilter(self, obj, event):
+        if event.type() == QEvent.Leave:
+            self._set_state(hover=None, pressed=None)
+        return False
+
+    def _set_state(self, hover, pressed):
+        if (hover, pressed) != (self.hover, self.pressed):
+            self.hover, self.pressed = hover, pressed
+            self.view.viewport().update()
@@ -0,0 +1,128 @@
+from collections import OrderedDict
+
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant
+from PyQt5.QtGui import QPixmap
+
+DEFAULT_PHOTO = "assets/images/user_default.png"
+PHOTO_SIZE = 40
+PIXMAP_CACHE = 300  # miniaturas decodificadas mantidas em memória
+
+
+class PagedTableModel(QAbstractTableModel):
+    """Modelo de tabela que busca as linhas do banco página por página.
+
+    `fetch_page(after_key)` deve retornar (linhas, total, next_key), como as
+    funções get_*_page do repositório. A view pede mais linhas sozinha
+    (canFetchMore / fetchMore) conforme o usuário rola a tabela.
+
+    `columns` é uma lista de (título, índice do campo na linha); índice None
+    deixa a coluna vazia (ex.: "Ações"). A coluna `photo_column` mostra o
+    campo como miniatura em vez de texto. O id do registro é o campo 0.
+    """
+
+    def __init__(self, columns, fetch_page=None, photo_column=None, parent=None):
+        super().__init__(parent)
+        self.columns = columns
+        self.photo_column = photo_column
+        self.fetch_page = fetch_page
+        self.rows = []
+        self.total = 0
+        self.next_key = None
+        self._pixmaps = OrderedDict()
+        self._default_pixmap = None
+
+    # ---------- carga ----------
+    def reset(self, fetch_page=None, first_page=None):
+        """Descarta as linhas carregadas e busca a primeira página.
+
+        `first_page` permite entregar uma primeira página já pronta (buscada
+        numa thread ou filtrada localmente) no lugar de consultar o banco.
+        """
+        if fetch_page is not None:
+            self.fetch_page = fetch_page
+        self.beginResetModel()
+        self.rows = []
+        self.next_key = None
+        self._pixmaps.clear()
+        self.endResetModel()
+
+        if first_page is None:
+            first_page = self.fetch_page(None)
+        rows, total, next_key = first_page
+        self.total = total or 0
+        self._append(rows, next_key)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.next_key is not None
+
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        rows, _, next_key = self.fetch_page(self.next_key)
+        self._append(rows, next_key)
+
+    def _append(self, rows, next_key):
+        self.next_key = next_key
+        if not rows:
+            return
+        start = len(self.rows)
+        self.beginInsertRows(QModelIndex(), start, start + len(rows) - 1)
+        self.rows.extend(rows)
+        self.endInsertRows()
+
+    def row_id(self, row):
+        return self.rows[row][0]
+
+    # ---------- QAbstractTableModel ----------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.columns[section][0]
+        return QVariant()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return QVariant()
+        field = self.columns[index.column()][1]
+        if field is None:
+            return QVariant()
+        row = self.rows[index.row()]
+
+        if index.column() == self.photo_column:
+            if role == Qt.DecorationRole:
+                return self._pixmap(row[0], row[field])
+            return QVariant()
+
+        if role == Qt.DisplayRole:
+            value = row[field]
+            return "" if value is None else str(value)
+        return QVariant()
+
+    # ---------- miniaturas ----------
+    def _pixmap(self, row_id, thumb):
+        """Decodifica só as miniaturas visíveis, com cache LRU pequeno"""
+        if not thumb:
+            return self.default_pixmap()
+        pixmap = self._pixmaps.get(row_id)
+        if pixmap is None:
+            pixmap = QPixmap()
+            pixmap.loadFromData(thumb)  # miniatura já vem no tamanho da tabela
+            self._pixmaps[row_id] = pixmap
+            if len(self._pixmaps) > PIXMAP_CACHE:
+                self._pixmaps.popitem(last=False)
+        else:
+            self._pixmaps.move_to_end(row_id)
+        return pixmap
+
+    def default_pixmap(self):
+        if self._default_pixmap is None:
+            pixmap = QPixmap(DEFAULT_PHOTO)
+            if not pixmap.isNull():
+                pixmap = pixmap.scaled(PHOTO_SIZE, PHOTO_SIZE, Qt.KeepAspectRatio, Qt.SmoothTransformation)
+            self._default_pixmap = pixmap
+        return self._default_pixmap
@@ -0,0 +1,109 @@
+import sqlite3
+import threading
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal
+
+from app.core.settings import Settings
+from app.database.connection import manager
+
+
+class SearchController(QObject):
+    """Pesquisa incremental de uma listagem paginada.
+
+    - debounce: só pesquisa `delay_ms` depois da última tecla;
+    - a primeira página é buscada numa thread; uma pesquisa nova cancela a
+      anterior ainda em andamento (a consulta SQLite é interrompida);
+    - se o termo novo apenas estende o anterior e o resultado anterior já
+      estava completo, filtra localmente com `matcher(linha, termo)` em vez
+      de ir ao banco.
+
+    `query(termo)` devolve a função de página usada pelo PagedTableModel;
+    `on_done()` é chamado depois que o modelo recebe o resultado.
+    """
+
+    _finished = pyqtSignal(int, str, object)
+
+    def __init__(self, line_edit, model, query, on_done=None, matcher=None,
+                 delay_ms=None, parent=None):
+        super().__init__(parent or line_edit)
+        self.line_edit = line_edit
+        self.model = model
+        self.query = query
+        self.on_done = on_done
+        self.matcher = matcher
+        self.term = ""         # termo do resultado mostrado no modelo
+        self._generation = 0
+        self._cancel = None    # threading.Event da busca em andamento
+
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(Settings.SEARCH_DEBOUNCE_MS if delay_ms is None else delay_ms)
+        self.timer.timeout.connect(self.search)
+
+        line_edit.textChanged.connect(self.timer.start)
+        self._finished.connect(self._deliver)
+
+    def text(self):
+        return self.line_edit.text().strip()
+
+    def refresh(self):
+        """Recarrega já (sem debounce nem thread), ex.: depois de salvar"""
+        self.timer.stop()
+        self._start()
+        self.term = self.text()
+        self.model.reset(self.query(self.term))
+        self._done()
+
+    def search(self):
+        term = self.text()
+        if term == self.term and self._cancel is None:
+            return
+        generation = self._start()
+
+        if self._can_refine(term):
+            rows = [row for row in self.model.rows if self.matcher(row, term)]
+            self._deliver(generation, term, (rows, len(rows), None))
+            return
+
+        fetch_page = self.query(term)
+        cancel = self._cancel = threading.Event()
+
+        def run():
+            with manager.cancellable(cancel):
+                try:
+                    page = fetch_page(None)
+                except sqlite3.OperationalError:
+                    if cancel.is_set():
+                        return  # substituída por uma pesquisa mais nova
+                    raise
+            self._finished.emit(generation, term, page)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    # ---------- interno ----------
+    def _start(self):
+        """Invalida (e interrompe) a pesquisa anterior"""
+        if self._cancel is not None:
+            self._cancel.set()
+            self._cancel = None
+        self._generation += 1
+        return self._generation
+
+    def _can_refine(self, term):
+        return (
+            self.matcher is not None
+            and self.term and term.startswith(self.term)
+            and self.model.next_key is None  # resultado anterior completo
+        )
+
+    def _deliver(self, generation, term, page):
+        if generation != self._generation:
+            return  # resposta de uma pesquisa já substituída
+        self._cancel = None
+        self.term = term
+        self.model.reset(self.query(term), first_page=page)
+        self._done()
+
+    def _done(self):
+        if self.on_done is not None:
+            self.on_done()
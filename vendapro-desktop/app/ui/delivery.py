@@ -1,9 +1,399 @@
-from PyQt5.QtWidgets import QWidget, QLabel, QVBoxLayout
+from bisect import bisect_left
+from datetime import datetime, timedelta, timezone
 
+from PyQt5.QtWidgets import (
+    QWidget, QLabel, QVBoxLayout, QHBoxLayout, QPushButton, QTableView, QLineEdit,
+    QComboBox, QSpinBox, QMessageBox, QDialog, QFormLayout, QHeaderView, QTableWidget,
+    QTableWidgetItem
+)
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant, QTimer, pyqtSignal
+from PyQt5.QtGui import QColor
+
+from app.database.user_repository import (
+    PENDENTE, EM_ROTA, ENTREGA_ABERTA, get_all_funcionarios, get_sales_page,
+    get_address_coordinates, get_store_location, set_store_location
+)
+from app.services.delivery_queue import FORMATO, get_queue
+from app.services.routing import plan_batches
+
+ATRASO_INTERVAL = 30  # segundos entre repinturas das entregas atrasadas
+
+
+def _agora():
+    # datas das entregas são UTC, como o CURRENT_TIMESTAMP do banco
+    return datetime.now(timezone.utc).strftime(FORMATO)
+
+
+def _hora_local(data):
+    utc = datetime.strptime(data, FORMATO).replace(tzinfo=timezone.utc)
+    return utc.astimezone().strftime("%d/%m %H:%M")
+
+
+def _coordenada(texto, limite):
+    """Float do campo (aceita vírgula); None se vazio; ValueError se inválido"""
+    texto = texto.strip().replace(",", ".")
+    if not texto:
+        return None
+    valor = float(texto)
+    if not -limite <= valor <= limite:
+        raise ValueError(texto)
+    return valor
+
+# ========== MODELO DO QUADRO ==========
+class DeliveryTableModel(QAbstractTableModel):
+    """Entregas abertas em ordem de prioridade da fila.
+
+    `upsert` aplica uma entrega alterada mexendo só na linha dela: a
+    posição vem de uma busca binária pela prioridade (que não muda com o
+    status), então o quadro nunca é recarregado inteiro.
+    """
+
+    COLUMNS = ["#", "Venda", "Endereço", "Zona", "Prometida", "Status", "Entregador", "Parada"]
+
+    def __init__(self, entregadores, parent=None):
+        super().__init__(parent)
+        self.entregadores = entregadores  # id -> nome
+        self.rows = []
+        self.keys = []  # prioridade de cada linha, para o bisect
+
+    def reset(self, entregas):
+        self.beginResetModel()
+        self.rows = list(entregas)
+        self.keys = [entrega["prioridade"] for entrega in self.rows]
+        self.endResetModel()
+
+    def upsert(self, entrega):
+        key = entrega["prioridade"]
+        row = bisect_left(self.keys, key)
+        existe = row < len(self.keys) and self.keys[row] == key
+        if entrega["status"] not in ENTREGA_ABERTA:
+            if existe:
+                self.beginRemoveRows(QModelIndex(), row, row)
+                del self.rows[row], self.keys[row]
+                self.endRemoveRows()
+        elif existe:
+            self.rows[row] = entrega
+            self.dataChanged.emit(self.index(row, 0), self.index(row, len(self.COLUMNS) - 1))
+        else:
+            self.beginInsertRows(QModelIndex(), row, row)
+            self.rows.insert(row, entrega)
+            self.keys.insert(row, key)
+            self.endInsertRows()
+
+    def entrega(self, row):
+        return self.rows[row] if 0 <= row < len(self.rows) else None
+
+    def counts(self):
+        pendentes = sum(1 for entrega in self.rows if entrega["status"] == PENDENTE)
+        return pendentes, len(self.rows) - pendentes
+
+    # ---------- QAbstractTableModel ----------
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return self.COLUMNS[section]
+        return QVariant()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return QVariant()
+        entrega = self.rows[index.row()]
+        if role == Qt.DisplayRole:
+            return (
+                str(entrega["id"]), str(entrega["venda_id"]), entrega["endereco"], str(entrega["zona"]),
+                _hora_local(entrega["prometida_para"]), entrega["status"],
+                self.entregadores.get(entrega["entregador_id"], ""),
+                str(entrega["rota_ordem"] or ""),
+            )[index.column()]
+        if role == Qt.ForegroundRole:
+            if entrega["prometida_para"] < _agora():
+                return QColor("#ff6b6b")  # atrasada
+            if entrega["status"] == EM_ROTA:
+                return QColor("#7dd3fc")
+        return QVariant()
+
+# ========== DIALOG NOVA ENTREGA ==========
+class NewDeliveryDialog(QDialog):
+    def __init__(self, company_name):
+        super().__init__()
+        self.company_name = company_name
+        self.entrega = None
+        self.setWindowTitle("Nova Entrega")
+        self.setFixedWidth(420)
+        self.setStyleSheet(CRUD_STYLE)
+
+        form = QFormLayout()
+        ultimas = get_sales_page(company_name, limit=1)[0]
+        self.venda_input = QSpinBox(); self.venda_input.setRange(1, 2**31 - 1)
+        self.venda_input.setValue(ultimas[0][0] if ultimas else 1)
+        self.endereco_input = QLineEdit()
+        self.endereco_input.editingFinished.connect(self.preencher_coordenadas)
+        self.latitude_input = QLineEdit(); self.latitude_input.setPlaceholderText("opcional, ex.: -23.5505")
+        self.longitude_input = QLineEdit(); self.longitude_input.setPlaceholderText("opcional, ex.: -46.6333")
+        self.zona_input = QSpinBox(); self.zona_input.setRange(0, 20)
+        self.prazo_input = QSpinBox(); self.prazo_input.setRange(5, 24 * 60); self.prazo_input.setValue(40)
+        self.prazo_input.setSuffix(" min")
+        form.addRow("Venda nº:", self.venda_input)
+        form.addRow("Endereço:", self.endereco_input)
+        form.addRow("Latitude:", self.latitude_input)
+        form.addRow("Longitude:", self.longitude_input)
+        form.addRow("Zona (distância):", self.zona_input)
+        form.addRow("Entregar em:", self.prazo_input)
+
+        btn_save = QPushButton("Salvar")
+        btn_save.clicked.connect(self.save)
+        form.addWidget(btn_save)
+        self.setLayout(form)
+
+    def preencher_coordenadas(self):
+        # endereço já atendido: reaproveita as coordenadas gravadas
+        if self.latitude_input.text().strip() or self.longitude_input.text().strip():
+            return
+        endereco = self.endereco_input.text().strip()
+        coordenadas = get_address_coordinates(self.company_name, endereco) if endereco else None
+        if coordenadas:
+            self.latitude_input.setText(str(coordenadas[0]))
+            self.longitude_input.setText(str(coordenadas[1]))
+
+    def save(self):
+        endereco = self.endereco_input.text().strip()
+        if not endereco: QMessageBox.warning(self, "Erro", "Endereço é obrigatório!"); return
+        try:
+            latitude = _coordenada(self.latitude_input.text(), 90)
+            longitude = _coordenada(self.longitude_input.text(), 180)
+        except ValueError:
+            QMessageBox.warning(self, "Erro", "Coordenadas inválidas"); return
+        if (latitude is None) != (longitude is None):
+            QMessageBox.warning(self, "Erro", "Informe latitude e longitude, ou nenhuma"); return
+        prometida = datetime.now(timezone.utc) + timedelta(minutes=self.prazo_input.value())
+        self.entrega = get_queue(self.company_name).add(
+            self.venda_input.value(), endereco, self.zona_input.value(), prometida.strftime(FORMATO),
+            latitude, longitude
+        )
+        if self.entrega is None:
+            QMessageBox.warning(self, "Erro", "Venda inexistente ou já com entrega"); return
+        self.accept()
+
+# ========== DIALOG ROTAS ==========
+class RoutesDialog(QDialog):
+    """Lotes das pendentes por zona, cada um na ordem da rota (routing);
+    despachar um lote manda as entregas com o entregador escolhido."""
+
+    COLUMNS = ["Zona", "Paradas", "Km", "Saída até", "Rota (#)"]
+
+    def __init__(self, company_name, entregador_combo):
+        super().__init__()
+        self.company_name = company_name
+        self.queue = get_queue(company_name)
+        self.lotes = []
+        self.setWindowTitle("Rotas de Entrega")
+        self.resize(760, 420)
+        self.setStyleSheet(CRUD_STYLE)
+        layout = QVBoxLayout(self)
+
+        # Loja (origem das rotas)
+        loja = QHBoxLayout()
+        self.latitude_input = QLineEdit(); self.latitude_input.setPlaceholderText("latitude")
+        self.longitude_input = QLineEdit(); self.longitude_input.setPlaceholderText("longitude")
+        local = get_store_location(company_name)
+        if local:
+            self.latitude_input.setText(str(local[0])); self.longitude_input.setText(str(local[1]))
+        btn_loja = QPushButton("Salvar Loja"); btn_loja.clicked.connect(self.salvar_loja)
+        loja.addWidget(QLabel("Loja:")); loja.addWidget(self.latitude_input)
+        loja.addWidget(self.longitude_input); loja.addWidget(btn_loja)
+        layout.addLayout(loja)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.table.setSelectionMode(QTableWidget.SingleSelection)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(4, QHeaderView.Stretch)
+        layout.addWidget(self.table, 1)
+
+        acoes = QHBoxLayout()
+        self.entregador_combo = QComboBox()
+        for i in range(entregador_combo.count()):
+            self.entregador_combo.addItem(entregador_combo.itemText(i), entregador_combo.itemData(i))
+        self.entregador_combo.setCurrentIndex(entregador_combo.currentIndex())
+        btn_despachar = QPushButton("Despachar Lote"); btn_despachar.clicked.connect(self.despachar)
+        btn_recalcular = QPushButton("Recalcular"); btn_recalcular.clicked.connect(self.montar)
+        self.status_label = QLabel()
+        acoes.addWidget(QLabel("Entregador:")); acoes.addWidget(self.entregador_combo)
+        acoes.addWidget(btn_despachar); acoes.addWidget(btn_recalcular)
+        acoes.addStretch(); acoes.addWidget(self.status_label)
+        layout.addLayout(acoes)
+
+        self.montar()
+
+    def montar(self):
+        self.lotes = plan_batches(self.queue.pending(), get_store_location(self.company_name))
+        self.table.setRowCount(len(self.lotes))
+        for row, lote in enumerate(self.lotes):
+            valores = (
+                str(lote["zona"]), str(len(lote["entregas"])), f"{lote['km']:.1f}",
+                _hora_local(lote["prioridade"][0]),
+                " → ".join(str(entrega["id"]) for entrega in lote["entregas"]),
+            )
+            for col, valor in enumerate(valores):
+                self.table.setItem(row, col, QTableWidgetItem(valor))
+        paradas = sum(len(lote["entregas"]) for lote in self.lotes)
+        self.status_label.setText(f"{len(self.lotes)} lotes, {paradas} entregas")
+
+    def salvar_loja(self):
+        try:
+            latitude = _coordenada(self.latitude_input.text(), 90)
+            longitude = _coordenada(self.longitude_input.text(), 180)
+        except ValueError:
+            latitude = longitude = None
+        if latitude is None or longitude is None:
+            QMessageBox.warning(self, "Erro", "Coordenadas inválidas"); return
+        set_store_location(self.company_name, latitude, longitude)
+        self.montar()
+
+    def despachar(self):
+        entregador_id = self.entregador_combo.currentData()
+        if entregador_id is None: QMessageBox.warning(self, "Erro", "Cadastre um entregador"); return
+        row = self.table.currentRow()
+        if not 0 <= row < len(self.lotes): QMessageBox.warning(self, "Erro", "Selecione um lote"); return
+        ids = [entrega["id"] for entrega in self.lotes[row]["entregas"]]
+        despachadas = self.queue.dispatch_batch(ids, entregador_id)
+        if len(despachadas) < len(ids):
+            QMessageBox.information(self, "Entregas", f"{len(ids) - len(despachadas)} entrega(s) do lote já tinham saído")
+        self.montar()
+
+# ========== DELIVERY WINDOW ==========
 class DeliveryWindow(QWidget):
-    def __init__(self):
+    """Quadro das entregas abertas. A fila fica em memória (delivery_queue)
+    e avisa cada mudança; o quadro aplica só a linha alterada."""
+
+    _changed = pyqtSignal(object)
+
+    def __init__(self, company_name):
         super().__init__()
+        self.company_name = company_name
+        self.queue = get_queue(company_name)
+        self.setStyleSheet(CRUD_STYLE)
+        layout = QVBoxLayout(); layout.setContentsMargins(15,15,15,15)
+
+        # Despacho
+        topo = QHBoxLayout()
+        self.entregador_combo = QComboBox()
+        entregadores = {}
+        for funcionario in get_all_funcionarios(company_name):
+            self.entregador_combo.addItem(funcionario[1], funcionario[0])
+            entregadores[funcionario[0]] = funcionario[1]
+        btn_proxima = QPushButton("Despachar Próxima"); btn_proxima.clicked.connect(self.despachar_proxima)
+        btn_rotas = QPushButton("Montar Rotas"); btn_rotas.clicked.connect(self.montar_rotas)
+        btn_nova = QPushButton("Nova Entrega"); btn_nova.clicked.connect(self.nova_entrega)
+        self.status_label = QLabel()
+        topo.addWidget(QLabel("Entregador:")); topo.addWidget(self.entregador_combo)
+        topo.addWidget(btn_proxima); topo.addWidget(btn_rotas); topo.addStretch()
+        topo.addWidget(self.status_label); topo.addWidget(btn_nova)
+        layout.addLayout(topo)
+
+        # Quadro
+        self.model = DeliveryTableModel(entregadores, parent=self)
+        self.table = QTableView(); self.table.setModel(self.model)
+        self.table.setSelectionBehavior(QTableView.SelectRows)
+        self.table.setSelectionMode(QTableView.SingleSelection)
+        self.table.verticalHeader().setVisible(False)
+        self.table.horizontalHeader().setSectionResizeMode(2, QHeaderView.Stretch)
+        layout.addWidget(self.table, 1)
 
-        layout = QVBoxLayout()
-        layout.addWidget(QLabel("Delivery"))
+        # Ações da entrega selecionada
+        acoes = QHBoxLayout()
+        for texto, slot in [("Despachar Selecionada", self.despachar_selecionada),
+                            ("Entregue", lambda: self.mudar(self.queue.deliver)),
+                            ("Devolver à Fila", lambda: self.mudar(self.queue.return_to_queue)),
+                            ("Cancelar", self.cancelar)]:
+            btn = QPushButton(texto); btn.clicked.connect(slot)
+            acoes.addWidget(btn)
+        acoes.addStretch()
+        layout.addLayout(acoes)
         self.setLayout(layout)
+
+        self._changed.connect(self.aplicar)
+        queue, listener = self.queue, self._emit_changed
+        queue.add_listener(listener)
+        self.destroyed.connect(lambda: queue.remove_listener(listener))
+        self.model.reset(self.queue.open_deliveries())
+        self.atualizar_contagem()
+
+        # atraso depende do relógio: só repinta, sem consultar nada
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.table.viewport().update)
+        self.timer.start(ATRASO_INTERVAL * 1000)
+
+    # ========== FILA ==========
+    def _emit_changed(self, entrega):
+        # chamado na thread de quem mudou a fila
+        try:
+            self._changed.emit(entrega)
+        except RuntimeError:
+            self.queue.remove_listener(self._emit_changed)  # página já fechada
+
+    def aplicar(self, entrega):
+        self.model.upsert(entrega)
+        self.atualizar_contagem()
+
+    def atualizar_contagem(self):
+        pendentes, em_rota = self.model.counts()
+        self.status_label.setText(f"{pendentes} pendentes, {em_rota} em rota")
+
+    def selecionada(self):
+        indexes = self.table.selectionModel().selectedRows()
+        entrega = self.model.entrega(indexes[0].row()) if indexes else None
+        if entrega is None:
+            QMessageBox.warning(self, "Erro", "Selecione uma entrega")
+        return entrega
+
+    # ========== AÇÕES ==========
+    def despachar_proxima(self):
+        entregador_id = self.entregador_combo.currentData()
+        if entregador_id is None: QMessageBox.warning(self, "Erro", "Cadastre um entregador"); return
+        if self.queue.dispatch_next(entregador_id) is None:
+            QMessageBox.information(self, "Entregas", "Nenhuma entrega pendente")
+
+    def despachar_selecionada(self):
+        entregador_id = self.entregador_combo.currentData()
+        if entregador_id is None: QMessageBox.warning(self, "Erro", "Cadastre um entregador"); return
+        self.mudar(lambda entrega_id: self.queue.dispatch(entrega_id, entregador_id))
+
+    def cancelar(self):
+        entrega = self.selecionada()
+        if entrega is None: return
+        confirma = QMessageBox.question(self, "Cancelar", f"Cancelar a entrega #{entrega['id']}?",
+                                        QMessageBox.Yes | QMessageBox.No)
+        if confirma == QMessageBox.Yes:
+            self.mudar(self.queue.cancel, entrega)
+
+    def mudar(self, acao, entrega=None):
+        entrega = entrega or self.selecionada()
+        if entrega is None: return
+        if acao(entrega["id"]) is None:
+            QMessageBox.warning(self, "Erro", f"A entrega #{entrega['id']} está {entrega['status']}: ação não permitida")
+
+    def nova_entrega(self):
+        NewDeliveryDialog(self.company_name).exec_()
+
+    def montar_rotas(self):
+        RoutesDialog(self.company_name, self.entregador_combo).exec_()
+
+# ========== ESTILO GLOBAL =====================================
+CRUD_STYLE = """
+QWidget { background-color: #1b2330; color: #e5e5e5; font-size: 14px; }
+QLabel { color: #e5e5e5; font-weight: bold; }
+QPushButton { background-color: #3b6cee; padding: 8px 18px; border-radius: 6px; color: white; font-weight: bold; }
+QPushButton:hover { background-color: #5580ff; }
+QPushButton:pressed { background-color: #2d59cc; }
+QLineEdit, QComboBox, QSpinBox { border: 1px solid #3a4150; padding: 6px; border-radius: 5px; color: #eaeaea; }
+QTableView { background-color: #242c3b; border: 1px solid #384151; border-radius: 6px; gridline-color: #3c4558; }
+QHeaderView::section { background-color: #2e384a; padding: 6px; color: #d1d1d1; font-weight: bold; border: none; }
+"""
@@ -1,68 +1,15 @@
 from PyQt5.QtWidgets import (
     QWidget, QLabel, QVBoxLayout, QHBoxLayout, QPushButton,
-    QTableWidget, QTableWidgetItem, QComboBox, QLineEdit, QFrame, QMessageBox, QDialog, QFormLayout
+    QTableView, QComboBox, QLineEdit, QFrame, QMessageBox, QDialog, QFormLayout,
+    QInputDialog, QCheckBox, QDateEdit
 )
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QIcon, QPainter, QPainterPath, QPixmap, QColor
+from PyQt5.QtCore import Qt, QDate
+from app.ui.components.paged_table_model import PagedTableModel
+from app.ui.components.action_delegate import ActionDelegate
 from app.database.user_repository import (
-    get_all_stock, add_stock, get_product_by_search, update_product_quantity, update_stock, delete_stock
+    get_stock_page, apply_stock_movements, get_product_by_barcode, search_products, update_stock, delete_stock
 )
 
-# ========== ICONES VETORIAIS (mesmo que antes) ==========
-
-def make_icon(paint_fn, size=16, color=QColor("white")):
-    pix = QPixmap(size, size)
-    pix.fill(QColor(0,0,0,0))
-    p = QPainter(pix)
-    p.setRenderHint(QPainter.Antialiasing)
-    p.setPen(color)
-    p.setBrush(color)
-    path = QPainterPath()
-    paint_fn(path, size)
-    p.drawPath(path)
-    p.end()
-    return QIcon(pix)
-
-def icon_eye():
-    def paint(path, s):
-        path.addEllipse(s*0.1, s*0.3, s*0.8, s*0.4)
-        path.addEllipse(s*0.4, s*0.4, s*0.2, s*0.2)
-    return make_icon(paint)
-
-def icon_pencil():
-    def paint(path, s):
-        path.moveTo(s*0.2, s*0.8)
-        path.lineTo(s*0.8, s*0.2)
-        path.lineTo(s*0.9, s*0.3)
-        path.lineTo(s*0.3, s*0.9)
-        path.closeSubpath()
-    return make_icon(paint)
-
-def icon_trash():
-    def paint(path, s):
-        path.addRect(s*0.2, s*0.3, s*0.6, s*0.5)
-        path.addRect(s*0.15, s*0.2, s*0.7, s*0.1)
-    return make_icon(paint)
-
-# ========== BOTÕES DE AÇÃO ==========
-
-def make_action_btn(text, bg):
-    btn = QPushButton(text)
-    btn.setStyleSheet(f"""
-        QPushButton {{
-            background-color: {bg};
-            padding: 4px 10px;
-            border-radius: 4px;
-            color: white;
-            font-weight: bold;
-        }}
-        QPushButton:hover {{
-            background-color: {bg}CC;
-        }}
-    """)
-    return btn
-
-
 # ========== DIALOGS ==========
 class ViewStockDialog(QDialog):
     def __init__(self, company_name, produto):
@@ -80,24 +27,25 @@ class ViewStockDialog(QDialog):
         self.setLayout(form)
 
 class EditStockDialog(QDialog):
-    def __init__(self, company_name, produto, refresh_callback=None):
+    """Edita um movimento do histórico; o saldo do produto acompanha (trigger)"""
+    def __init__(self, company_name, movimento, refresh_callback=None):
         super().__init__()
         self.company_name = company_name
-        self.produto = produto
+        self.movimento = movimento
         self.refresh_callback = refresh_callback
-        self.setWindowTitle("Editar Produto")
+        self.setWindowTitle("Editar Movimento")
         self.setFixedWidth(400)
         self.setStyleSheet(CRUD_STYLE)
 
+        _id, nome, marca, codigo, qtd, tipo, origem, data = movimento
         form = QFormLayout()
-        self.nome_input = QLineEdit(produto['nome'])
-        self.marca_input = QLineEdit(produto['marca'])
-        self.valor_input = QLineEdit(str(produto['valor']))
-        self.qtd_input = QLineEdit(str(produto['quantidade']))
-        self.codigo_barra_input = QLineEdit(produto['codigo_barra'])
-        for label, widget in [("Nome", self.nome_input),("Marca", self.marca_input),
-                              ("Valor Unitário", self.valor_input),("Quantidade Atual", self.qtd_input),
-                              ("Código de Barras", self.codigo_barra_input)]:
+        form.addRow("Produto:", QLabel(f"{nome} - {marca} ({codigo})"))
+        form.addRow("Data:", QLabel(str(data)))
+        self.tipo_combo = QComboBox(); self.tipo_combo.addItems(["Entrada","Saída"])
+        self.tipo_combo.setCurrentText(tipo)
+        self.qtd_input = QLineEdit(str(qtd))
+        self.origem_input = QLineEdit(origem)
+        for label, widget in [("Tipo", self.tipo_combo),("Quantidade", self.qtd_input),("Origem", self.origem_input)]:
             form.addRow(label+":", widget)
         btn_save = QPushButton("Salvar")
         btn_save.clicked.connect(self.save)
@@ -105,22 +53,17 @@ class EditStockDialog(QDialog):
         self.setLayout(form)
 
     def save(self):
-        if not all([self.nome_input.text(), self.marca_input.text(), self.valor_input.text(),
-                    self.qtd_input.text(), self.codigo_barra_input.text()]):
-            QMessageBox.warning(self, "Erro", "Todos os campos são obrigatórios!")
+        try: qtd = int(self.qtd_input.text())
+        except ValueError: qtd = 0
+        if qtd <= 0 or not self.origem_input.text():
+            QMessageBox.warning(self, "Erro", "Informe quantidade e origem!")
+            return
+        if not update_stock(self.company_name, self.movimento[0], qtd, self.tipo_combo.currentText(), self.origem_input.text()):
+            QMessageBox.warning(self, "Erro", "Quantidade insuficiente em estoque")
             return
-        update_stock(
-            self.company_name,
-            self.produto['id'],
-            self.nome_input.text(),
-            self.marca_input.text(),
-            float(self.valor_input.text()),
-            int(self.qtd_input.text()),
-            self.codigo_barra_input.text()
-        )
         if self.refresh_callback:
             self.refresh_callback()
-        QMessageBox.information(self, "Sucesso", "Produto atualizado!")
+        QMessageBox.information(self, "Sucesso", "Movimento atualizado!")
         self.accept()
 
 # ========== ESTOQUE WINDOW ==========
@@ -156,6 +99,7 @@ class EstoqueWindow(QWidget):
         btn_search = QPushButton("Buscar")
         btn_search.setStyleSheet("background-color:#3b6cee;color:white;padding:4px 8px;border-radius:4px;")  # padding menor
         self.search_input.returnPressed.connect(self.buscar_produto)
+        btn_search.clicked.connect(self.buscar_produto)
 
         search_layout.addWidget(self.search_input)
         search_layout.addWidget(btn_search)
@@ -191,31 +135,74 @@ class EstoqueWindow(QWidget):
         layout.addWidget(self.card)
 
 
+        # Filtros do histórico
+        self.filtros = QWidget()
+        filtros_layout = QHBoxLayout(self.filtros); filtros_layout.setContentsMargins(0,0,0,0)
+        self.periodo_check = QCheckBox("Período:")
+        self.data_de = QDateEdit(QDate.currentDate().addDays(-30)); self.data_de.setCalendarPopup(True)
+        self.data_ate = QDateEdit(QDate.currentDate()); self.data_ate.setCalendarPopup(True)
+        for widget in (self.data_de, self.data_ate):
+            widget.setDisplayFormat("dd/MM/yyyy"); widget.setEnabled(False)
+        self.periodo_check.toggled.connect(self.data_de.setEnabled)
+        self.periodo_check.toggled.connect(self.data_ate.setEnabled)
+        self.filtro_produto_input = QLineEdit(); self.filtro_produto_input.setPlaceholderText("Produto (nome ou código)")
+        self.filtro_produto_input.returnPressed.connect(self.aplicar_filtros)
+        btn_filtrar = QPushButton("Filtrar"); btn_filtrar.clicked.connect(self.aplicar_filtros)
+        btn_limpar = QPushButton("Limpar"); btn_limpar.clicked.connect(self.limpar_filtros)
+        filtros_layout.addWidget(self.periodo_check); filtros_layout.addWidget(self.data_de)
+        filtros_layout.addWidget(QLabel("até")); filtros_layout.addWidget(self.data_ate)
+        filtros_layout.addWidget(self.filtro_produto_input, 1)
+        filtros_layout.addWidget(btn_filtrar); filtros_layout.addWidget(btn_limpar)
+        layout.addWidget(self.filtros)
+
         # Tabela
-        self.table = QTableWidget(); self.table.setColumnCount(8)
-        self.table.setHorizontalHeaderLabels(["Produto","Marca","Código","Quantidade","Tipo","Origem","Data","Ações"])
+        self.model = PagedTableModel(
+            [("Produto",1),("Marca",2),("Código",3),("Quantidade",4),("Tipo",5),("Origem",6),("Data",7),("Ações",None)],
+            parent=self
+        )
+        self.table = QTableView(); self.table.setModel(self.model)
+        self.action_delegate = ActionDelegate(self.table, show_text=False)
+        self.action_delegate.view_clicked.connect(lambda row: self.view_stock_product(self.model.rows[row][3]))
+        self.action_delegate.edit_clicked.connect(lambda row: self.edit_stock_product(self.model.rows[row]))
+        self.action_delegate.delete_clicked.connect(lambda row: self.delete_product_confirm(self.model.row_id(row)))
+        self.table.setItemDelegateForColumn(7, self.action_delegate)
+        self.table.setColumnWidth(7, self.action_delegate.width())
         self.table.horizontalHeader().setStretchLastSection(True)
         layout.addWidget(self.table)
 
         self.setLayout(layout)
         self.produto_selecionado = None
-        self.refresh_table(get_all_stock(self.company_name))
+        self.filtro_produto_id = None
+        self.refresh_table()
 
     # ========== MÉTODOS ==========
     def toggle_card(self):
         card_visivel = not self.card.isVisible()
         self.card.setVisible(card_visivel)
+        self.filtros.setVisible(not card_visivel)
         self.table.setVisible(not card_visivel)
         if card_visivel:
             self.search_input.setFocus()  # coloca o cursor automaticamente
 
+    def escolher_produto(self, termo):
+        """Busca o produto; pergunta qual quando houver vários resultados"""
+        resultados = search_products(self.company_name, termo)
+        if not resultados:
+            QMessageBox.warning(self, "Erro", "Produto não encontrado")
+            return None
+        produto = resultados[0]
+        if len(resultados) > 1:
+            opcoes = [f"{p['nome']} - {p['marca']} ({p['codigo_barra']})" for p in resultados]
+            escolha, ok = QInputDialog.getItem(self, "Selecionar Produto", "Produtos encontrados:", opcoes, 0, False)
+            if not ok: return None
+            produto = resultados[opcoes.index(escolha)]
+        return produto
+
     def buscar_produto(self):
         termo = self.search_input.text().strip()
         if not termo: return
-        produto = get_product_by_search(self.company_name, termo)
-        if not produto:
-            QMessageBox.warning(self, "Erro", "Produto não encontrado")
-            return
+        produto = self.escolher_produto(termo)
+        if not produto: return
         self.produto_selecionado = produto
         self.nome_input.setText(produto['nome'])
         self.marca_input.setText(produto['marca'])
@@ -224,68 +211,64 @@ class EstoqueWindow(QWidget):
 
     def confirmar_movimento(self):
         if not self.produto_selecionado: QMessageBox.warning(self, "Erro", "Busque e selecione um produto primeiro"); return
-        qtd = int(self.qtd_mov_input.text()); tipo = self.tipo_combo.currentText()
-        produto_id = self.produto_selecionado['id']; codigo_barra = self.produto_selecionado['codigo_barra']
-        nova_qtd = self.produto_selecionado['quantidade'] + qtd if tipo=="Entrada" else self.produto_selecionado['quantidade'] - qtd
-        if nova_qtd < 0: QMessageBox.warning(self,"Erro","Quantidade insuficiente em estoque"); return
-        update_product_quantity(self.company_name, produto_id, nova_qtd)
-        add_stock(self.company_name, produto_id, codigo_barra, qtd, tipo, origem="Interface")
+        try: qtd = int(self.qtd_mov_input.text())
+        except ValueError: qtd = 0
+        if qtd <= 0: QMessageBox.warning(self, "Erro", "Informe uma quantidade válida"); return
+        tipo = self.tipo_combo.currentText()
+        produto_id = self.produto_selecionado['id']
+        if not apply_stock_movements(self.company_name, [(produto_id, qtd, tipo, "Interface")]):
+            QMessageBox.warning(self,"Erro","Quantidade insuficiente em estoque"); return
         QMessageBox.information(self,"Sucesso","Movimento registrado!")
-        self.qtd_atual_input.setText(str(nova_qtd))
-        self.refresh_table(get_all_stock(self.company_name))
+        # saldo relido do banco (outro terminal pode ter movimentado também)
+        self.produto_selecionado = get_product_by_barcode(self.company_name, self.produto_selecionado['codigo_barra'])
+        self.qtd_atual_input.setText(str(self.produto_selecionado['quantidade']))
+        self.refresh_table()
         self.card.setVisible(False)
+        self.filtros.setVisible(True)
         self.table.setVisible(True)  # tabela reaparece
 
-    def refresh_table(self, movimentos):
-        self.table.setRowCount(len(movimentos))
-        for i, m in enumerate(movimentos):
-            _id,nome,marca,codigo,qtd,tipo,origem,data = m
-            self.table.setItem(i,0,QTableWidgetItem(nome))
-            self.table.setItem(i,1,QTableWidgetItem(marca))
-            self.table.setItem(i,2,QTableWidgetItem(codigo))
-            self.table.setItem(i,3,QTableWidgetItem(str(qtd)))
-            self.table.setItem(i,4,QTableWidgetItem(tipo))
-            self.table.setItem(i,5,QTableWidgetItem(origem))
-            self.table.setItem(i,6,QTableWidgetItem(data))
-            # Botões ação
-            self.add_actions(i, {'id':_id,'nome':nome,'marca':marca,'valor':0,'quantidade':qtd,'codigo_barra':codigo})
-
-    def add_actions(self, row, produto):
-        produto_id = produto['id']
-
-        btn_view = make_action_btn("", "#f1c40f"); btn_view.setIcon(icon_eye())
-        btn_edit = make_action_btn("", "#3498db"); btn_edit.setIcon(icon_pencil())
-        btn_delete = make_action_btn("", "#e74c3c"); btn_delete.setIcon(icon_trash())
-        btn_view.clicked.connect(lambda: self.view_stock_product(produto_id))
-        btn_edit.clicked.connect(lambda: self.edit_stock_product(produto_id))
-        btn_delete.clicked.connect(lambda: self.delete_product_confirm(produto_id))
-
-        hl = QHBoxLayout()
-        hl.addWidget(btn_view)
-        hl.addWidget(btn_edit)
-        hl.addWidget(btn_delete)
-        hl.setContentsMargins(0,0,0,0)
-
-        widget = QWidget()
-        widget.setLayout(hl)
-        self.table.setCellWidget(row,7,widget)
-
-    def view_stock_product(self, produto_id):
-        produto = get_product_by_search(self.company_name, produto_id)
+    def aplicar_filtros(self):
+        termo = self.filtro_produto_input.text().strip()
+        self.filtro_produto_id = None
+        if termo:
+            produto = self.escolher_produto(termo)
+            if not produto: return
+            self.filtro_produto_id = produto['id']
+            self.filtro_produto_input.setText(produto['nome'])
+        self.refresh_table()
+
+    def limpar_filtros(self):
+        self.periodo_check.setChecked(False)
+        self.filtro_produto_input.clear()
+        self.filtro_produto_id = None
+        self.refresh_table()
+
+    def refresh_table(self):
+        filtros = {"produto_id": self.filtro_produto_id}
+        if self.periodo_check.isChecked():
+            filtros["date_from"] = self.data_de.date().toString("yyyy-MM-dd")
+            filtros["date_to"] = self.data_ate.date().toString("yyyy-MM-dd")
+        # sem COUNT: a primeira página sai do índice, qualquer que seja o histórico
+        self.model.reset(lambda after_key: get_stock_page(
+            self.company_name, after_key=after_key, count=False, **filtros
+        ))
+
+    def view_stock_product(self, codigo_barra):
+        produto = get_product_by_barcode(self.company_name, codigo_barra)
         if not produto: return
         dlg = ViewStockDialog(self.company_name, produto); dlg.exec_()
 
-    def edit_stock_product(self, produto_id):
-        produto = get_product_by_search(self.company_name, produto_id)
-        if not produto: return
-        dlg = EditStockDialog(self.company_name, produto, refresh_callback=lambda: self.refresh_table(get_all_stock(self.company_name)))
+    def edit_stock_product(self, movimento):
+        dlg = EditStockDialog(self.company_name, movimento, refresh_callback=self.refresh_table)
         dlg.exec_()
 
     def delete_product_confirm(self, produto_id):
-        verify = QMessageBox.question(self,"Excluir","Tem certeza que deseja excluir este produto?",QMessageBox.Yes|QMessageBox.No)
+        verify = QMessageBox.question(self,"Excluir","Tem certeza que deseja excluir este movimento?",QMessageBox.Yes|QMessageBox.No)
         if verify == QMessageBox.Yes:
-            delete_stock(self.company_name, produto_id)
-            self.refresh_table(get_all_stock(self.company_name))
+            if not delete_stock(self.company_name, produto_id):
+                QMessageBox.warning(self, "Erro", "Quantidade insuficiente em estoque: a entrada já foi consumida")
+                return
+            self.refresh_table()
 
 # ========== ESTILO GLOBAL =====================================
 
@@ -324,7 +307,7 @@ CRUD_STYLE = """
         color: #eaeaea;
     }
 
-    QTableWidget {
+    QTableView {
         background-color: #242c3b;
         border: 1px solid #384151;
         border-radius: 6px;
@@ -339,7 +322,7 @@ CRUD_STYLE = """
         border: none;
     }
 
-    QTableWidget QTableCornerButton::section {
+    QTableView QTableCornerButton::section {
         background-color: #2e384a;
         border: none;
     }
@@ -1,70 +1,24 @@
 from PyQt5.QtWidgets import (
     QWidget, QLabel, QVBoxLayout, QHBoxLayout, QPushButton,
-    QTableWidget, QTableWidgetItem, QDialog, QFormLayout, QLineEdit,
+    QTableView, QDialog, QFormLayout, QLineEdit,
     QMessageBox, QFileDialog
 )
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QIcon, QPainter, QPainterPath, QPixmap, QColor, QImage
+from PyQt5.QtGui import QPixmap
+
+from app.ui.components.paged_table_model import PagedTableModel
+from app.ui.components.action_delegate import ActionDelegate
+from app.ui.components.search_controller import SearchController
 
 from app.database.user_repository import (
+    name_matches,
     create_fornecedor,
-    get_all_fornecedores,
+    get_fornecedores_page,
+    get_fornecedor_by_id,
     update_fornecedor,
     delete_fornecedor
 )
 
-# ================== ICONES ==================
-def make_icon(paint_fn, size=16, color=QColor("white")):
-    pix = QPixmap(size, size)
-    pix.fill(QColor(0,0,0,0))
-    p = QPainter(pix)
-    p.setRenderHint(QPainter.Antialiasing)
-    p.setPen(color)
-    p.setBrush(color)
-    path = QPainterPath()
-    paint_fn(path, size)
-    p.drawPath(path)
-    p.end()
-    return QIcon(pix)
-
-def icon_eye():
-    def paint(path, s):
-        path.addEllipse(s*0.1, s*0.3, s*0.8, s*0.4)
-        path.addEllipse(s*0.4, s*0.4, s*0.2, s*0.2)
-    return make_icon(paint)
-
-def icon_pencil():
-    def paint(path, s):
-        path.moveTo(s*0.2, s*0.8)
-        path.lineTo(s*0.8, s*0.2)
-        path.lineTo(s*0.9, s*0.3)
-        path.lineTo(s*0.3, s*0.9)
-        path.closeSubpath()
-    return make_icon(paint)
-
-def icon_trash():
-    def paint(path, s):
-        path.addRect(s*0.2, s*0.3, s*0.6, s*0.5)
-        path.addRect(s*0.15, s*0.2, s*0.7, s*0.1)
-    return make_icon(paint)
-
-# ================== BOTÕES ==================
-def make_action_btn(text, bg):
-    btn = QPushButton(text)
-    btn.setStyleSheet(f"""
-        QPushButton {{
-            background-color: {bg};
-            padding: 4px 10px;
-            border-radius: 4px;
-            color: white;
-            font-weight: bold;
-        }}
-        QPushButton:hover {{
-            background-color: {bg}CC;
-        }}
-    """)
-    return btn
-
 # ================== DIALOGS ==================
 class AddFornDialog(QDialog):
     def __init__(self, company_name):
@@ -235,79 +189,44 @@ class FornecedoresWindow(QWidget):
         search_layout = QHBoxLayout()
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Pesquisar fornecedor...")
-        self.search_input.textChanged.connect(self.search_forns)
         search_layout.addWidget(self.search_input)
         layout.addLayout(search_layout)
 
         # tabela
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels(["Foto","Nome","Email","Telefone","Endereço","Ações"])
+        self.model = PagedTableModel(
+            [("Foto", 5), ("Nome", 1), ("Email", 2), ("Telefone", 3),
+             ("Endereço", 4), ("Ações", None)],
+            photo_column=0, parent=self
+        )
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.action_delegate = ActionDelegate(self.table)
+        self.action_delegate.view_clicked.connect(lambda row: self.view_forn(self.model.row_id(row)))
+        self.action_delegate.edit_clicked.connect(lambda row: self.edit_forn(self.model.row_id(row)))
+        self.action_delegate.delete_clicked.connect(lambda row: self.delete_forn_confirm(self.model.row_id(row)))
+        self.table.setItemDelegateForColumn(5, self.action_delegate)
+        self.table.setColumnWidth(5, self.action_delegate.width())
         self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.verticalHeader().setDefaultSectionSize(44)
         layout.addWidget(self.table)
-        self.setLayout(layout)
 
+        self.searcher = SearchController(
+            self.search_input, self.model, self.page_query,
+            on_done=self.show_total, matcher=name_matches
+        )
+
+        self.setLayout(layout)
         self.refresh()
 
-    def refresh(self, search=None):
-        fornecedores = get_all_fornecedores(self.company_name)
-        if search:
-            s = search.lower()
-            fornecedores = [c for c in fornecedores if s in c[1].lower()]
+    def page_query(self, search):
+        return lambda after_key: get_fornecedores_page(self.company_name, search, after_key=after_key)
 
-        self.total_label.setText(f"Total de Fornecedores: {len(fornecedores)}")
-        if len(fornecedores)==0:
-            self.table.hide()
-            return
-        self.table.show()
-        self.table.setRowCount(len(fornecedores))
-
-        for index, row in enumerate(fornecedores):
-            _id, name, email, phone, address, photo = row
-            # foto
-            if photo:
-                pix = QPixmap()
-                pix.loadFromData(photo)
-                pix = pix.scaled(50,50, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-                lbl_photo = QLabel()
-                lbl_photo.setPixmap(pix)
-                lbl_photo.setAlignment(Qt.AlignCenter)
-                self.table.setCellWidget(index, 0, lbl_photo)
-            else:
-                self.table.setItem(index,0,QTableWidgetItem("Sem foto"))
-
-            self.table.setItem(index,1,QTableWidgetItem(name))
-            self.table.setItem(index,2,QTableWidgetItem(email))
-            self.table.setItem(index,3,QTableWidgetItem(phone))
-            self.table.setItem(index,4,QTableWidgetItem(address))
-
-            self.add_actions(index,_id)
-
-    def add_actions(self, row, forn_id):
-        btn_view = make_action_btn("Ver","#f1c40f")
-        btn_edit = make_action_btn("Editar","#3498db")
-        btn_delete = make_action_btn("Excluir","#e74c3c")
-
-        btn_view.setIcon(icon_eye())
-        btn_edit.setIcon(icon_pencil())
-        btn_delete.setIcon(icon_trash())
-
-        btn_view.clicked.connect(lambda: self.view_forn(forn_id))
-        btn_edit.clicked.connect(lambda: self.edit_forn(forn_id))
-        btn_delete.clicked.connect(lambda: self.delete_forn_confirm(forn_id))
-
-        hl = QHBoxLayout()
-        hl.addWidget(btn_view)
-        hl.addWidget(btn_edit)
-        hl.addWidget(btn_delete)
-        hl.setContentsMargins(0,0,0,0)
-
-        widget = QWidget()
-        widget.setLayout(hl)
-        self.table.setCellWidget(row,5,widget)
-
-    def search_forns(self):
-        self.refresh(self.search_input.text())
+    def refresh(self):
+        self.searcher.refresh()
+
+    def show_total(self):
+        self.total_label.setText(f"Total de Fornecedores: {self.model.total}")
+        self.table.setVisible(self.model.total > 0)
 
     def open_add_dialog(self):
         dlg = AddFornDialog(self.company_name)
@@ -315,15 +234,13 @@ class FornecedoresWindow(QWidget):
             self.refresh()
 
     def view_forn(self, forn_id):
-        forns = get_all_fornecedores(self.company_name)
-        forn = next((f for f in forns if f[0]==forn_id), None)
+        forn = get_fornecedor_by_id(self.company_name, forn_id)
         if not forn: return
         dlg = ViewFornDialog(self.company_name, forn)
         dlg.exec_()
 
     def edit_forn(self, forn_id):
-        forns = get_all_fornecedores(self.company_name)
-        forn = next((f for f in forns if f[0]==forn_id), None)
+        forn = get_fornecedor_by_id(self.company_name, forn_id)
         if not forn: return
         dlg = EditFornDialog(self.company_name, forn)
         if dlg.exec_():
@@ -343,9 +260,9 @@ QPushButton { background-color:#3b6cee; padding:8px 18px; border-radius:6px; col
 QPushButton:hover { background-color:#5580ff; }
 QPushButton:pressed { background-color:#2d59cc; }
 QLineEdit { border:1px solid #3a4150; padding:6px; border-radius:5px; color:#eaeaea; }
-QTableWidget { background-color:#242c3b; border:1px solid #384151; border-radius:6px; gridline-color:#3c4558; }
+QTableView { background-color:#242c3b; border:1px solid #384151; border-radius:6px; gridline-color:#3c4558; }
 QHeaderView::section { background-color:#2e384a; padding:6px; color:#d1d1d1; font-weight:bold; border:none; }
-QTableWidget QTableCornerButton::section { background-color:#2e384a; border:none; }
+QTableView QTableCornerButton::section { background-color:#2e384a; border:none; }
 QScrollBar:vertical { background:#202935; width:10px; }
 QScrollBar::handle:vertical { background:#3b6cee; min-height:20px; border-radius:4px; }
 """
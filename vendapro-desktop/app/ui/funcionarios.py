@@ -1,73 +1,24 @@
 from PyQt5.QtWidgets import (
     QWidget, QLabel, QVBoxLayout, QHBoxLayout, QPushButton,
-    QTableWidget, QTableWidgetItem, QDialog, QFormLayout, QLineEdit,
+    QTableView, QDialog, QFormLayout, QLineEdit,
     QMessageBox, QFileDialog
 )
 from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QIcon, QPainter, QPainterPath, QPixmap, QColor
+from PyQt5.QtGui import QPixmap
+
+from app.ui.components.paged_table_model import PagedTableModel
+from app.ui.components.action_delegate import ActionDelegate
+from app.ui.components.search_controller import SearchController
 
 from app.database.user_repository import (
-    get_all_funcionarios,
+    name_matches,
+    get_funcionarios_page,
+    get_funcionario_by_id,
     create_funcionario,
     update_funcionario,
     delete_funcionario
 )
 
-# ========== ICONES VETORIAIS ======================================
-
-def make_icon(paint_fn, size=16, color=QColor("white")):
-    pix = QPixmap(size, size)
-    pix.fill(QColor(0,0,0,0))
-    p = QPainter(pix)
-    p.setRenderHint(QPainter.Antialiasing)
-    p.setPen(color)
-    p.setBrush(color)
-    path = QPainterPath()
-    paint_fn(path, size)
-    p.drawPath(path)
-    p.end()
-    return QIcon(pix)
-
-def icon_eye():
-    def paint(path, s):
-        path.addEllipse(s*0.1, s*0.3, s*0.8, s*0.4)
-        path.addEllipse(s*0.4, s*0.4, s*0.2, s*0.2)
-    return make_icon(paint)
-
-def icon_pencil():
-    def paint(path, s):
-        path.moveTo(s*0.2, s*0.8)
-        path.lineTo(s*0.8, s*0.2)
-        path.lineTo(s*0.9, s*0.3)
-        path.lineTo(s*0.3, s*0.9)
-        path.closeSubpath()
-    return make_icon(paint)
-
-def icon_trash():
-    def paint(path, s):
-        path.addRect(s*0.2, s*0.3, s*0.6, s*0.5)
-        path.addRect(s*0.15, s*0.2, s*0.7, s*0.1)
-    return make_icon(paint)
-
-
-# ========== UTIL BOTÕES ======================================
-
-def make_action_btn(text, bg):
-    btn = QPushButton(text)
-    btn.setStyleSheet(f"""
-        QPushButton {{
-            background-color: {bg};
-            padding: 4px 10px;
-            border-radius: 4px;
-            color: white;
-            font-weight: bold;
-        }}
-        QPushButton:hover {{
-            background-color: {bg}CC;
-        }}
-    """)
-    
-    return btn
 # ========== DIALOG ADD FUNCIONÁRIO ====================================
 
 class AddFuncionarioDialog(QDialog):
@@ -266,93 +217,44 @@ class FuncionariosWindow(QWidget):
         search_layout = QHBoxLayout()
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Pesquisar funcionário...")
-        self.search_input.textChanged.connect(self.search_funcionarios)
 
         search_layout.addWidget(self.search_input)
         layout.addLayout(search_layout)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(6)
-        self.table.setHorizontalHeaderLabels(
-            ["Nome", "Email", "Telefone", "Cargo", "Endereço", "Ações"]
+        self.model = PagedTableModel(
+            [("Foto", 6), ("Nome", 1), ("Email", 2), ("Telefone", 3),
+             ("Cargo", 4), ("Endereço", 5), ("Ações", None)],
+            photo_column=0, parent=self
         )
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.action_delegate = ActionDelegate(self.table)
+        self.action_delegate.view_clicked.connect(lambda row: self.view_funcionario(self.model.row_id(row)))
+        self.action_delegate.edit_clicked.connect(lambda row: self.edit_funcionario(self.model.row_id(row)))
+        self.action_delegate.delete_clicked.connect(lambda row: self.delete_funcionario_confirm(self.model.row_id(row)))
+        self.table.setItemDelegateForColumn(6, self.action_delegate)
+        self.table.setColumnWidth(6, self.action_delegate.width())
         self.table.horizontalHeader().setStretchLastSection(True)
-
+        self.table.verticalHeader().setDefaultSectionSize(44)
         layout.addWidget(self.table)
-        self.setLayout(layout)
-
-        self.refresh()
-
-    def refresh(self, search=None):
-        funcionarios = get_all_funcionarios(self.company_name)
-
-        if search:
-            s = search.lower()
-            funcionarios = [f for f in funcionarios if s in f[1].lower()]
-
-        self.total_label.setText(f"Total de Funcionários: {len(funcionarios)}")
-
-        if len(funcionarios) == 0:
-            self.table.hide()
-            return
-
-        self.table.show()
-        self.table.setRowCount(len(funcionarios))
 
-        for index, row in enumerate(funcionarios):
-            _id, name, email, phone, cargo, address, photo_bytes = row  # agora 7 campos
-
-            # Foto
-            pixmap = QPixmap()
-            if photo_bytes:
-                pixmap.loadFromData(photo_bytes)
-            else:
-                pixmap.load("assets/images/user_default.png")
-            pixmap = pixmap.scaled(40, 40, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-
-            label_photo = QLabel()
-            label_photo.setPixmap(pixmap)
-            label_photo.setAlignment(Qt.AlignCenter)
-            self.table.setCellWidget(index, 0, label_photo)  # coluna 0 = foto
-
-            # Outras colunas
-            self.table.setItem(index, 1, QTableWidgetItem(name))
-            self.table.setItem(index, 2, QTableWidgetItem(email))
-            self.table.setItem(index, 3, QTableWidgetItem(phone))
-            self.table.setItem(index, 4, QTableWidgetItem(cargo))
-            self.table.setItem(index, 5, QTableWidgetItem(address))
-
-            self.add_actions(index, _id)
-
-
-    def add_actions(self, row, funcionario_id):
-
-        btn_view = make_action_btn("Ver", "#f1c40f")
-        btn_edit = make_action_btn("Editar", "#3498db")
-        btn_delete = make_action_btn("Excluir", "#e74c3c")
-
-        btn_view.setIcon(icon_eye())
-        btn_edit.setIcon(icon_pencil())
-        btn_delete.setIcon(icon_trash())
-
-        btn_view.clicked.connect(lambda: self.view_funcionario(funcionario_id))
-        btn_edit.clicked.connect(lambda: self.edit_funcionario(funcionario_id))
-        btn_delete.clicked.connect(lambda: self.delete_funcionario_confirm(funcionario_id))
+        self.searcher = SearchController(
+            self.search_input, self.model, self.page_query,
+            on_done=self.show_total, matcher=name_matches
+        )
 
-        hl = QHBoxLayout()
-        hl.addWidget(btn_view)
-        hl.addWidget(btn_edit)
-        hl.addWidget(btn_delete)
-        hl.setContentsMargins(0, 0, 0, 0)
+        self.setLayout(layout)
+        self.refresh()
 
-        widget = QWidget()
-        widget.setLayout(hl)
+    def page_query(self, search):
+        return lambda after_key: get_funcionarios_page(self.company_name, search, after_key=after_key)
 
-        self.table.setCellWidget(row, 5, widget)
+    def refresh(self):
+        self.searcher.refresh()
 
-    def search_funcionarios(self):
-        text = self.search_input.text()
-        self.refresh(text)
+    def show_total(self):
+        self.total_label.setText(f"Total de Funcionários: {self.model.total}")
+        self.table.setVisible(self.model.total > 0)
 
     def open_add_dialog(self):
         dlg = AddFuncionarioDialog(self.company_name)
@@ -360,16 +262,14 @@ class FuncionariosWindow(QWidget):
             self.refresh()
     
     def view_funcionario(self, funcionario_id):
-        funcionarios = get_all_funcionarios(self.company_name)
-        funcionario = next((c for c in funcionarios if c[0]==funcionario_id), None)
+        funcionario = get_funcionario_by_id(self.company_name, funcionario_id)
         if not funcionario: return
 
         dlg = ViewFuncionarioDialog(self.company_name, funcionario)
         dlg.exec_()
 
     def edit_funcionario(self, funcionario_id):
-        funcionarios = get_all_funcionarios(self.company_name)
-        funcionario = next((c for c in funcionarios if c[0]==funcionario_id), None)
+        funcionario = get_funcionario_by_id(self.company_name, funcionario_id)
         if not funcionario: return
 
         dlg = EditFuncionarioDialog(self.company_name, funcionario)
@@ -424,7 +324,7 @@ CRUD_STYLE = """
         color: #eaeaea;
     }
 
-    QTableWidget {
+    QTableView {
         background-color: #242c3b;
         border: 1px solid #384151;
         border-radius: 6px;
@@ -439,7 +339,7 @@ CRUD_STYLE = """
         border: none;
     }
 
-    QTableWidget QTableCornerButton::section {
+    QTableView QTableCornerButton::section {
         background-color: #2e384a;
         border: none;
     }
@@ -8,7 +8,7 @@ from PyQt5.QtGui import QPixmap
 from PyQt5.QtCore import Qt
 
 # IMPORTS PÓS-FUNÇÃO PARA EVITAR CICLO
-from app.database.user_repository import validate_login_for_company, get_all_companies
+from app.database.user_repository import validate_login_for_company, get_all_companies, open_company_db
 
 class LoginWindow(QWidget):
     def __init__(self):
@@ -113,6 +113,7 @@ class LoginWindow(QWidget):
         user_data = validate_login_for_company(company_name, user, password)
 
         if user_data:
+            open_company_db(company_name)
             self.open_main(user_data)
         else:
             QMessageBox.warning(self, "Erro", "Usuário ou senha inválidos.")
@@ -1,6 +1,7 @@
 # app/ui/main_window.py
 import sys
 import os
+import threading
 from PyQt5.QtWidgets import (
     QMainWindow, QWidget, QHBoxLayout, QVBoxLayout,
     QListWidget, QListWidgetItem, QPushButton, QLabel, QFrame, QDialog
@@ -20,6 +21,15 @@ from app.ui.fornecedores import FornecedoresWindow
 from app.ui.funcionarios import FuncionariosWindow
 from app.ui.produtos import ProdutosWindow
 from app.ui.vendas import VendasWindow
+from app.services.jobs import PeriodicJob
+from app.services.abc_analysis import update_abc_classification
+from app.services.delivery_queue import drop_queue
+
+CHECKPOINT_INTERVAL = 3600  # segundos entre consolidações do estoque
+ROLLUP_INTERVAL = 60  # segundos entre atualizações dos rollups de vendas
+ABC_INTERVAL = 6 * 3600  # verifica se a curva ABC (semanal) venceu
+REPOSICAO_INTERVAL = 3600  # verifica se os pontos de reposição (diários) venceram
+BIBLIOTECA_INTERVAL = 3600  # move fotos antigas e apaga imagens sem uso há dias
 
 
 class MainWindow(QMainWindow):
@@ -190,7 +200,7 @@ class MainWindow(QMainWindow):
             self.sidebar.addItem(QListWidgetItem(name))
 
         self.sidebar.currentItemChanged.connect(self.load_page)
-        self.current_page = PainelWindow()
+        self.current_page = PainelWindow(self.company_name)
         center_layout.addWidget(self.sidebar)
         center_layout.addWidget(self.current_page)
 
@@ -206,6 +216,24 @@ class MainWindow(QMainWindow):
         self.profile_card = None
         self.profile_card_visible = False
 
+        # miniaturas de fotos gravadas antes da coluna thumb (uma vez só)
+        from app.database.user_repository import (
+            backfill_thumbnails, update_stock_checkpoints, update_sales_rollups, update_reorder_points,
+            update_media_library
+        )
+        threading.Thread(target=backfill_thumbnails, args=(self.company_name,), daemon=True).start()
+
+        # jobs de fundo enquanto a empresa estiver aberta
+        self.jobs = [
+            PeriodicJob("checkpoints-estoque", update_stock_checkpoints, CHECKPOINT_INTERVAL, self.company_name),
+            PeriodicJob("rollups-vendas", update_sales_rollups, ROLLUP_INTERVAL, self.company_name),
+            PeriodicJob("curva-abc", update_abc_classification, ABC_INTERVAL, self.company_name),
+            PeriodicJob("pontos-reposicao", update_reorder_points, REPOSICAO_INTERVAL, self.company_name),
+            PeriodicJob("biblioteca", update_media_library, BIBLIOTECA_INTERVAL, self.company_name),
+        ]
+        for job in self.jobs:
+            job.start()
+
     # ----------------- PROFILE CARD FLUTUANTE -------------------
     def create_profile_card(self):
         import os
@@ -339,6 +367,11 @@ class MainWindow(QMainWindow):
         self.profile_card_visible = not self.profile_card_visible
 
     def logout(self):
+        from app.database.user_repository import close_company_db
+        for job in self.jobs:
+            job.stop()
+        drop_queue(self.company_name)
+        close_company_db(self.company_name)
         self.login_window = LoginWindow()
         self.login_window.show()
         self.close()
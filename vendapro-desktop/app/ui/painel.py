@@ -1,9 +1,12 @@
 from PyQt5.QtWidgets import (
-    QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QFrame
+    QWidget, QLabel, QPushButton, QVBoxLayout, QHBoxLayout, QGridLayout, QFrame, QMessageBox
 )
-from PyQt5.QtCore import Qt
+from PyQt5.QtCore import Qt, QTimer, pyqtSignal
 from PyQt5.QtGui import QFont
 
+from app.core.utils import format_money
+from app.services.dashboard import dashboard_cache
+
 
 class CardInfo(QFrame):
     def __init__(self, title, value):
@@ -25,17 +28,37 @@ class CardInfo(QFrame):
         title_lbl = QLabel(title)
         title_lbl.setStyleSheet("font-size: 13px; color: #cccccc;")
 
-        value_lbl = QLabel(str(value))
-        value_lbl.setStyleSheet("font-size: 28px; font-weight: bold; color: white;")
+        self.value_lbl = QLabel(str(value))
+        self.value_lbl.setStyleSheet("font-size: 28px; font-weight: bold; color: white;")
 
         layout.addWidget(title_lbl)
-        layout.addWidget(value_lbl)
+        layout.addWidget(self.value_lbl)
         layout.addStretch()
 
+    def set_value(self, value):
+        self.value_lbl.setText(str(value))
+
+
+# métricas dos cards: (chave, título, formatação)
+CARDS = [
+    ("vendas_hoje", "VENDAS HOJE", str),
+    ("faturamento_hoje", "FATURAMENTO HOJE", format_money),
+    ("ticket_medio", "TICKET MÉDIO", format_money),
+    ("clientes", "CLIENTES", str),
+    ("estoque_baixo", "ESTOQUE BAIXO", str),
+    ("valor_estoque", "VALOR EM ESTOQUE", format_money),
+]
+
 
 class PainelWindow(QWidget):
-    def __init__(self):
+    """Painel inicial. As métricas vêm do dashboard_cache: a tela nunca
+    consulta o banco na thread da interface."""
+
+    _metrics_loaded = pyqtSignal(object)
+
+    def __init__(self, company_name):
         super().__init__()
+        self.company_name = company_name
 
         self.setStyleSheet("""
             QWidget {
@@ -67,8 +90,29 @@ class PainelWindow(QWidget):
         welcome = QLabel("Bem-vindo, Chefe!😄")
         welcome.setStyleSheet("font-size: 26px; font-weight: 500; color: #002c5c;")
 
+        # badge de reposição: só aparece com produtos em alerta
+        self.alertas, self.total_alertas = [], 0
+        self.alert_badge = QPushButton()
+        self.alert_badge.setCursor(Qt.PointingHandCursor)
+        self.alert_badge.setStyleSheet("""
+            QPushButton {
+                background-color: #d62828;
+                color: white;
+                font-size: 14px;
+                font-weight: bold;
+                border-radius: 14px;
+                padding: 6px 16px;
+            }
+            QPushButton:hover {
+                background-color: #b51f1f;
+            }
+        """)
+        self.alert_badge.clicked.connect(self.show_alerts)
+        self.alert_badge.hide()
+
         header_layout.addWidget(welcome)
         header_layout.addStretch()
+        header_layout.addWidget(self.alert_badge, alignment=Qt.AlignLeft)
 
         # ============================
         #  CARDS + BOTÃO NOVA VENDA
@@ -76,8 +120,12 @@ class PainelWindow(QWidget):
         cards_row = QHBoxLayout()
         cards_row.setSpacing(15)
 
-        vendas_card = CardInfo("VENDAS HOJE", 150)
-        clientes_card = CardInfo("CLIENTES", 36)
+        self.cards = {}
+        cards_grid = QGridLayout()
+        cards_grid.setSpacing(15)
+        for i, (chave, titulo, _fmt) in enumerate(CARDS):
+            self.cards[chave] = CardInfo(titulo, "…")
+            cards_grid.addWidget(self.cards[chave], i // 3, i % 3)
 
         nova_venda_btn = QPushButton("NOVA VENDA")
         nova_venda_btn.setFixedSize(160, 50)
@@ -94,9 +142,8 @@ class PainelWindow(QWidget):
             }
         """)
 
-        cards_row.addWidget(vendas_card)
-        cards_row.addWidget(clientes_card)
-        cards_row.addWidget(nova_venda_btn)
+        cards_row.addLayout(cards_grid, 1)
+        cards_row.addWidget(nova_venda_btn, alignment=Qt.AlignTop)
 
         # ============================
         #  CARD CENTRAL — MENSAGEM
@@ -133,3 +180,46 @@ class PainelWindow(QWidget):
         main_layout.addLayout(cards_row)
         main_layout.addWidget(msg_card)
         main_layout.addStretch()
+
+        # ============================
+        #  MÉTRICAS (cache + atualização em segundo plano)
+        # ============================
+        self._metrics_loaded.connect(self.show_metrics)
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.refresh_metrics)
+        self.timer.start(dashboard_cache.ttl * 1000)
+        self.refresh_metrics()
+
+    def refresh_metrics(self):
+        metricas = dashboard_cache.get(self.company_name, self._emit_metrics)
+        if metricas is not None:
+            self.show_metrics(metricas)
+
+    def _emit_metrics(self, metricas):
+        # chamado na thread do cache
+        try:
+            self._metrics_loaded.emit(metricas)
+        except RuntimeError:
+            pass  # página já fechada
+
+    def show_metrics(self, metricas):
+        for chave, _titulo, fmt in CARDS:
+            self.cards[chave].set_value(fmt(metricas[chave]))
+
+        self.alertas, self.total_alertas = metricas["alertas"], metricas["estoque_baixo"]
+        plural = "s" if self.total_alertas != 1 else ""
+        self.alert_badge.setText(f"⚠ {self.total_alertas} produto{plural} para repor")
+        self.alert_badge.setToolTip(self._alert_lines())
+        self.alert_badge.setVisible(self.total_alertas > 0)
+
+    def _alert_lines(self):
+        return "\n".join(
+            f"{nome}: {quantidade} em estoque (ponto {ponto})"
+            for _id, nome, quantidade, ponto, _desde in self.alertas
+        )
+
+    def show_alerts(self):
+        QMessageBox.information(
+            self, "Reposição de estoque",
+            f"{self.total_alertas} produto(s) no ponto de reposição ou abaixo. Menores saldos:\n\n{self._alert_lines()}"
+        )
@@ -1,72 +1,29 @@
+import os
+import threading
+
 from PyQt5.QtWidgets import (
     QWidget, QLabel, QVBoxLayout, QHBoxLayout, QPushButton,
-    QTableWidget, QTableWidgetItem, QDialog, QFormLayout, QLineEdit,
-    QMessageBox, QFileDialog
+    QTableView, QDialog, QFormLayout, QLineEdit,
+    QMessageBox, QFileDialog, QProgressBar, QPlainTextEdit, QComboBox
 )
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QIcon, QPainter, QPainterPath, QPixmap, QColor
+from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtGui import QPixmap
+
+from app.ui.components.paged_table_model import PagedTableModel
+from app.ui.components.action_delegate import ActionDelegate
+from app.ui.components.search_controller import SearchController
 
+from app.services.product_import import import_products
 from app.database.user_repository import (
-    get_all_products,
+    product_matches,
+    get_products_page,
+    get_product_by_id,
     create_product,
     update_product,
-    delete_product
+    delete_product,
+    get_reorder_point
 )
 
-# ========== ICONES VETORIAIS ======================================
-
-def make_icon(paint_fn, size=16, color=QColor("white")):
-    pix = QPixmap(size, size)
-    pix.fill(QColor(0,0,0,0))
-    p = QPainter(pix)
-    p.setRenderHint(QPainter.Antialiasing)
-    p.setPen(color)
-    p.setBrush(color)
-    path = QPainterPath()
-    paint_fn(path, size)
-    p.drawPath(path)
-    p.end()
-    return QIcon(pix)
-
-def icon_eye():
-    def paint(path, s):
-        path.addEllipse(s*0.1, s*0.3, s*0.8, s*0.4)
-        path.addEllipse(s*0.4, s*0.4, s*0.2, s*0.2)
-    return make_icon(paint)
-
-def icon_pencil():
-    def paint(path, s):
-        path.moveTo(s*0.2, s*0.8)
-        path.lineTo(s*0.8, s*0.2)
-        path.lineTo(s*0.9, s*0.3)
-        path.lineTo(s*0.3, s*0.9)
-        path.closeSubpath()
-    return make_icon(paint)
-
-def icon_trash():
-    def paint(path, s):
-        path.addRect(s*0.2, s*0.3, s*0.6, s*0.5)
-        path.addRect(s*0.15, s*0.2, s*0.7, s*0.1)
-    return make_icon(paint)
-
-# ========== BOTÕES DE AÇÃO ======================================
-
-def make_action_btn(text, bg):
-    btn = QPushButton(text)
-    btn.setStyleSheet(f"""
-        QPushButton {{
-            background-color: {bg};
-            padding: 4px 10px;
-            border-radius: 4px;
-            color: white;
-            font-weight: bold;
-        }}
-        QPushButton:hover {{
-            background-color: {bg}CC;
-        }}
-    """)
-    return btn
-
 # ========== DIALOG ADD PRODUTO ====================================
 
 from PyQt5.QtWidgets import QFileDialog
@@ -150,7 +107,7 @@ class AddProductDialog(QDialog):
             self.company_name,
             self.name_input.text(),
             float(self.value_input.text() or 0),
-            int(self.quantity_input.text() or 0),
+            None,
             self.brand_input.text(),
             self.code_input.text(),
             self.photo_bytes
@@ -198,7 +155,7 @@ class EditProductDialog(QDialog):
         super().__init__()
         self.company_name = company_name
         self.product = product
-        self.photo_bytes = product[6]
+        self.photo_bytes = None  # só a foto escolhida agora é gravada
         self.setStyleSheet(CRUD_STYLE)
         self.setWindowTitle("Editar Produto")
         self.setFixedWidth(400)
@@ -206,15 +163,24 @@ class EditProductDialog(QDialog):
         form = QFormLayout()
         self.name_input = QLineEdit(product[1])
         self.value_input = QLineEdit(str(product[2]))
+        # saldo só muda por movimento (tela de Estoque): regravar o número
+        # lido ao abrir desfaria as vendas feitas com o diálogo aberto
         self.quantity_input = QLineEdit(str(product[3]))
+        self.quantity_input.setReadOnly(True)
+        self.quantity_input.setToolTip("Entradas e saídas pela tela de Estoque")
         self.brand_input = QLineEdit(product[4])
         self.code_input = QLineEdit(product[5])
+        # ponto de reposição fixo; vazio = automático pelo consumo
+        fixo, efetivo = get_reorder_point(company_name, product[0]) or (None, 0)
+        self.reorder_input = QLineEdit("" if fixo is None else str(fixo))
+        self.reorder_input.setPlaceholderText(f"automático ({efetivo})")
 
         form.addRow("Nome:", self.name_input)
         form.addRow("Valor:", self.value_input)
         form.addRow("Quantidade:", self.quantity_input)
         form.addRow("Marca:", self.brand_input)
         form.addRow("Código de Barra:", self.code_input)
+        form.addRow("Ponto de reposição:", self.reorder_input)
 
         self.photo_label = QLabel()
         pixmap = QPixmap()
@@ -242,20 +208,121 @@ class EditProductDialog(QDialog):
                 self.photo_bytes = f.read()
 
     def save(self):
+        ponto = self.reorder_input.text().strip()
+        if ponto and not ponto.isdigit():
+            QMessageBox.warning(self, "Erro", "Ponto de reposição deve ser um número inteiro")
+            return
         ok = update_product(
             self.company_name,
             self.product[0],
             self.name_input.text(),
             float(self.value_input.text() or 0),
-            int(self.quantity_input.text() or 0),
+            None,
             self.brand_input.text(),
             self.code_input.text(),
-            self.photo_bytes
+            self.photo_bytes,
+            ponto_reposicao=int(ponto) if ponto else None
         )
         if ok:
             self.accept()
-        else:
+        elif ok is None:
             QMessageBox.warning(self, "Erro", "Nada para atualizar")
+        else:
+            QMessageBox.warning(self, "Erro", "Código de barras já cadastrado")
+
+# ========== DIALOG IMPORTAR PRODUTOS ================================
+
+class ImportProductsDialog(QDialog):
+    """Importa um CSV/XLSX numa thread, mostrando o progresso.
+
+    Cancelar para depois do lote atual; abrir o mesmo arquivo de novo
+    continua a importação de onde parou.
+    """
+
+    _progress = pyqtSignal(int, float)
+    _finished = pyqtSignal(object)
+    _failed = pyqtSignal(str)
+
+    def __init__(self, company_name, path):
+        super().__init__()
+        self.company_name = company_name
+        self.path = path
+        self.cancel = threading.Event()
+        self.running = False
+        self.setStyleSheet(CRUD_STYLE)
+        self.setWindowTitle("Importar Produtos")
+        self.setFixedWidth(520)
+
+        layout = QVBoxLayout()
+        layout.addWidget(QLabel(os.path.basename(path)))
+        self.bar = QProgressBar()
+        self.bar.setRange(0, 1000)
+        self.bar.setTextVisible(False)
+        layout.addWidget(self.bar)
+        self.status_label = QLabel("Lendo arquivo...")
+        layout.addWidget(self.status_label)
+        self.errors_box = QPlainTextEdit()
+        self.errors_box.setReadOnly(True)
+        self.errors_box.setVisible(False)
+        layout.addWidget(self.errors_box)
+
+        self.btn = QPushButton("Cancelar")
+        self.btn.clicked.connect(self.reject)
+        layout.addWidget(self.btn, alignment=Qt.AlignRight)
+        self.setLayout(layout)
+
+        self._progress.connect(self.show_progress)
+        self._finished.connect(self.show_result)
+        self._failed.connect(self.show_error)
+        self.start()
+
+    def start(self):
+        self.running = True
+
+        def run():
+            try:
+                result = import_products(
+                    self.company_name, self.path,
+                    progress=self._progress.emit, cancel=self.cancel
+                )
+            except Exception as e:
+                self._failed.emit(str(e))
+                return
+            self._finished.emit(result)
+
+        threading.Thread(target=run, daemon=True).start()
+
+    def show_progress(self, linhas, fracao):
+        self.bar.setValue(int(fracao * 1000))
+        self.status_label.setText(f"{linhas} linhas processadas...")
+
+    def show_result(self, result):
+        self.running = False
+        self.bar.setValue(1000 if result["status"] == "concluída" else self.bar.value())
+        self.status_label.setText(
+            f"Importação {result['status']}: {result['gravados']} produtos gravados, "
+            f"{result['erros']} linhas com erro"
+        )
+        if result["detalhes"]:
+            self.errors_box.setPlainText("\n".join(f"Linha {linha}: {msg}" for linha, msg in result["detalhes"]))
+            self.errors_box.setVisible(True)
+        self.btn.setText("Fechar")
+        self.btn.setEnabled(True)
+
+    def show_error(self, message):
+        self.running = False
+        self.status_label.setText(f"Erro: {message}")
+        self.btn.setText("Fechar")
+        self.btn.setEnabled(True)
+
+    def reject(self):
+        if self.running:
+            # espera o lote atual terminar; o resultado chega por show_result
+            self.cancel.set()
+            self.btn.setText("Cancelando...")
+            self.btn.setEnabled(False)
+            return
+        self.accept()
 
 # ========== PÁGINA DE PRODUTOS ==================================
 
@@ -272,101 +339,82 @@ class ProdutosWindow(QWidget):
         self.total_label = QLabel("Total de Produtos: 0")
         btn_add = QPushButton("Adicionar Produto")
         btn_add.clicked.connect(self.open_add_dialog)
+        btn_import = QPushButton("Importar Planilha")
+        btn_import.clicked.connect(self.open_import_dialog)
         painel.addWidget(self.total_label)
         painel.addStretch()
+        painel.addWidget(btn_import)
         painel.addWidget(btn_add)
         layout.addLayout(painel)
 
         search_layout = QHBoxLayout()
         self.search_input = QLineEdit()
         self.search_input.setPlaceholderText("Pesquisar produto...")
-        self.search_input.textChanged.connect(self.search_products)
         search_layout.addWidget(self.search_input)
+        self.classe_combo = QComboBox()
+        self.classe_combo.addItem("Curva ABC: todas", None)
+        for classe in ("A", "B", "C"):
+            self.classe_combo.addItem(f"Classe {classe}", classe)
+        self.classe_combo.currentIndexChanged.connect(self.refresh)
+        search_layout.addWidget(self.classe_combo)
         layout.addLayout(search_layout)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels(
-            ["Foto", "Nome", "Valor", "Quantidade", "Marca", "Código", "Ações"]
+        self.model = PagedTableModel(
+            [("Foto", 6), ("Nome", 1), ("Valor", 2), ("Quantidade", 3),
+             ("Marca", 4), ("Código", 5), ("Ações", None)],
+            photo_column=0, parent=self
         )
+        self.table = QTableView()
+        self.table.setModel(self.model)
+        self.action_delegate = ActionDelegate(self.table)
+        self.action_delegate.view_clicked.connect(lambda row: self.view_product(self.model.row_id(row)))
+        self.action_delegate.edit_clicked.connect(lambda row: self.edit_product(self.model.row_id(row)))
+        self.action_delegate.delete_clicked.connect(lambda row: self.delete_product_confirm(self.model.row_id(row)))
+        self.table.setItemDelegateForColumn(6, self.action_delegate)
+        self.table.setColumnWidth(6, self.action_delegate.width())
         self.table.horizontalHeader().setStretchLastSection(True)
+        self.table.verticalHeader().setDefaultSectionSize(44)
         layout.addWidget(self.table)
+
+        self.searcher = SearchController(
+            self.search_input, self.model, self.page_query,
+            on_done=self.show_total, matcher=product_matches
+        )
+
         self.setLayout(layout)
         self.refresh()
 
-    def refresh(self, search=None):
-        produtos = get_all_products(self.company_name)
-        if search:
-            s = search.lower()
-            produtos = [p for p in produtos if s in p[1].lower()]
+    def page_query(self, search):
+        classe = self.classe_combo.currentData()
+        return lambda after_key: get_products_page(self.company_name, search, after_key=after_key, classe=classe)
 
-        self.total_label.setText(f"Total de Produtos: {len(produtos)}")
-        if len(produtos) == 0:
-            self.table.hide()
-            return
-        self.table.show()
-        self.table.setRowCount(len(produtos))
-
-        for index, row in enumerate(produtos):
-            _id, name, value, quantity, brand, code, photo_bytes = row
-
-            pixmap = QPixmap()
-            if photo_bytes:
-                pixmap.loadFromData(photo_bytes)
-            else:
-                pixmap.load("assets/images/user_default.png")
-            pixmap = pixmap.scaled(40, 40, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-            label_photo = QLabel()
-            label_photo.setPixmap(pixmap)
-            label_photo.setAlignment(Qt.AlignCenter)
-            self.table.setCellWidget(index, 0, label_photo)
-
-            self.table.setItem(index, 1, QTableWidgetItem(name))
-            self.table.setItem(index, 2, QTableWidgetItem(str(value)))
-            self.table.setItem(index, 3, QTableWidgetItem(str(quantity)))
-            self.table.setItem(index, 4, QTableWidgetItem(brand))
-            self.table.setItem(index, 5, QTableWidgetItem(code))
-
-            self.add_actions(index, _id)
-
-    def add_actions(self, row, product_id):
-        btn_view = make_action_btn("Ver", "#f1c40f")
-        btn_edit = make_action_btn("Editar", "#3498db")
-        btn_delete = make_action_btn("Excluir", "#e74c3c")
-        btn_view.setIcon(icon_eye())
-        btn_edit.setIcon(icon_pencil())
-        btn_delete.setIcon(icon_trash())
-        btn_view.clicked.connect(lambda: self.view_product(product_id))
-        btn_edit.clicked.connect(lambda: self.edit_product(product_id))
-        btn_delete.clicked.connect(lambda: self.delete_product_confirm(product_id))
-
-        hl = QHBoxLayout()
-        hl.addWidget(btn_view)
-        hl.addWidget(btn_edit)
-        hl.addWidget(btn_delete)
-        hl.setContentsMargins(0,0,0,0)
-        widget = QWidget()
-        widget.setLayout(hl)
-        self.table.setCellWidget(row, 6, widget)
-
-    def search_products(self):
-        self.refresh(self.search_input.text())
+    def refresh(self):
+        self.searcher.refresh()
+
+    def show_total(self):
+        self.total_label.setText(f"Total de Produtos: {self.model.total}")
+        self.table.setVisible(self.model.total > 0)
 
     def open_add_dialog(self):
         dialog = AddProductDialog(self.company_name)
         if dialog.exec_():
             self.refresh()
 
+    def open_import_dialog(self):
+        path, _ = QFileDialog.getOpenFileName(self, "Importar Produtos", "", "Planilhas (*.csv *.xlsx)")
+        if not path:
+            return
+        ImportProductsDialog(self.company_name, path).exec_()
+        self.refresh()
+
     def view_product(self, product_id):
-        produtos = get_all_products(self.company_name)
-        product = next((p for p in produtos if p[0]==product_id), None)
+        product = get_product_by_id(self.company_name, product_id)
         if not product: return
         dlg = ViewProductDialog(self.company_name, product)
         dlg.exec_()
 
     def edit_product(self, product_id):
-        produtos = get_all_products(self.company_name)
-        product = next((p for p in produtos if p[0]==product_id), None)
+        product = get_product_by_id(self.company_name, product_id)
         if not product: return
         dlg = EditProductDialog(self.company_name, product)
         if dlg.exec_():
@@ -410,7 +458,7 @@ QLineEdit {
     border-radius: 5px;
     color: #eaeaea;
 }
-QTableWidget {
+QTableView {
     background-color: #242c3b;
     border: 1px solid #384151;
     border-radius: 6px;
@@ -423,7 +471,7 @@ QHeaderView::section {
     font-weight: bold;
     border: none;
 }
-QTableWidget QTableCornerButton::section {
+QTableView QTableCornerButton::section {
     background-color: #2e384a;
     border: none;
 }
@@ -1,9 +1,229 @@
-from PyQt5.QtWidgets import QWidget, QLabel, QVBoxLayout
+from PyQt5.QtWidgets import (
+    QWidget, QLabel, QVBoxLayout, QHBoxLayout, QPushButton, QTableWidget,
+    QTableWidgetItem, QTableView, QLineEdit, QComboBox, QSpinBox, QMessageBox,
+    QInputDialog, QDialog, QFormLayout, QHeaderView
+)
+from PyQt5.QtCore import Qt
 
+from app.core.utils import format_money
+from app.ui.components.paged_table_model import PagedTableModel
+from app.ui.components.action_delegate import ActionDelegate
+from app.services.dashboard import dashboard_cache
+from app.database.user_repository import (
+    FORMAS_PAGAMENTO, finalize_sale, get_all_funcionarios, get_open_caixa, get_sale, get_sales_page,
+    search_products
+)
+
+# ========== DIALOG VER VENDA ==========
+class ViewSaleDialog(QDialog):
+    def __init__(self, venda):
+        super().__init__()
+        self.setWindowTitle(f"Venda #{venda['id']}")
+        self.setFixedWidth(560)
+        self.setStyleSheet(CRUD_STYLE)
+        layout = QVBoxLayout()
+
+        form = QFormLayout()
+        form.addRow("Data:", QLabel(str(venda["data"])))
+        form.addRow("Cliente:", QLabel(venda["cliente"] or "Consumidor final"))
+        form.addRow("Pagamento:", QLabel(venda["forma_pagamento"]))
+        layout.addLayout(form)
+
+        itens = QTableWidget(len(venda["itens"]), 4)
+        itens.setHorizontalHeaderLabels(["Produto", "Qtd", "Unitário", "Total"])
+        itens.verticalHeader().setVisible(False)
+        itens.setEditTriggers(QTableWidget.NoEditTriggers)
+        itens.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        for row, (nome, _codigo, qtd, unitario) in enumerate(venda["itens"]):
+            for col, text in enumerate((nome, str(qtd), format_money(unitario), format_money(qtd * unitario))):
+                itens.setItem(row, col, QTableWidgetItem(text))
+        layout.addWidget(itens)
+
+        totais = QFormLayout()
+        totais.addRow("Subtotal:", QLabel(format_money(venda["subtotal"])))
+        totais.addRow("Desconto:", QLabel(format_money(venda["desconto"])))
+        totais.addRow("Total:", QLabel(format_money(venda["total"])))
+        layout.addLayout(totais)
+
+        btn_close = QPushButton("Fechar")
+        btn_close.clicked.connect(self.close)
+        layout.addWidget(btn_close, alignment=Qt.AlignRight)
+        self.setLayout(layout)
+
+# ========== VENDAS WINDOW (PDV) ==========
 class VendasWindow(QWidget):
-    def __init__(self):
+    """Frente de caixa: monta o carrinho e finaliza a venda numa transação"""
+
+    def __init__(self, company_name):
         super().__init__()
+        self.company_name = company_name
+        self.setStyleSheet(CRUD_STYLE)
+        self.cart = {}  # produto_id -> [produto, quantidade], na ordem de inclusão
+
+        layout = QVBoxLayout(); layout.setContentsMargins(15,15,15,15)
+
+        # Leitura do produto (leitor de código de barras digita + Enter)
+        busca = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Código de barras ou nome do produto")
+        self.search_input.returnPressed.connect(self.adicionar_item)
+        self.qtd_input = QSpinBox(); self.qtd_input.setRange(1, 9999)
+        btn_add = QPushButton("Adicionar"); btn_add.clicked.connect(self.adicionar_item)
+        busca.addWidget(self.search_input, 1)
+        busca.addWidget(QLabel("Qtd:")); busca.addWidget(self.qtd_input)
+        busca.addWidget(btn_add)
+        layout.addLayout(busca)
+
+        # Carrinho
+        self.cart_table = QTableWidget(0, 5)
+        self.cart_table.setHorizontalHeaderLabels(["Produto", "Código", "Qtd", "Unitário", "Total"])
+        self.cart_table.verticalHeader().setVisible(False)
+        self.cart_table.setEditTriggers(QTableWidget.NoEditTriggers)
+        self.cart_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.cart_table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        layout.addWidget(self.cart_table, 2)
+
+        acoes = QHBoxLayout()
+        btn_remove = QPushButton("Remover Item"); btn_remove.clicked.connect(self.remover_item)
+        btn_clear = QPushButton("Limpar"); btn_clear.clicked.connect(self.limpar_carrinho)
+        self.total_label = QLabel(f"Total: {format_money(0)}")
+        self.total_label.setStyleSheet("font-size:20px;")
+        acoes.addWidget(btn_remove); acoes.addWidget(btn_clear)
+        acoes.addStretch(); acoes.addWidget(self.total_label)
+        layout.addLayout(acoes)
+
+        # Pagamento
+        pagamento = QHBoxLayout()
+        self.pagamento_combo = QComboBox(); self.pagamento_combo.addItems(FORMAS_PAGAMENTO)
+        self.vendedor_combo = QComboBox(); self.vendedor_combo.addItem("—", None)
+        for funcionario in get_all_funcionarios(self.company_name):
+            self.vendedor_combo.addItem(funcionario[1], funcionario[0])
+        self.desconto_input = QLineEdit(); self.desconto_input.setPlaceholderText("0,00")
+        self.desconto_input.setFixedWidth(100)
+        self.desconto_input.textChanged.connect(self.atualizar_total)
+        btn_finalizar = QPushButton("Finalizar Venda")
+        btn_finalizar.setStyleSheet("background-color:#2ecc71;")
+        btn_finalizar.clicked.connect(self.finalizar_venda)
+        pagamento.addWidget(QLabel("Vendedor:")); pagamento.addWidget(self.vendedor_combo)
+        pagamento.addWidget(QLabel("Pagamento:")); pagamento.addWidget(self.pagamento_combo)
+        pagamento.addWidget(QLabel("Desconto:")); pagamento.addWidget(self.desconto_input)
+        pagamento.addStretch(); pagamento.addWidget(btn_finalizar)
+        layout.addLayout(pagamento)
+
+        # Últimas vendas
+        layout.addWidget(QLabel("Últimas vendas"))
+        self.model = PagedTableModel(
+            [("Venda",0),("Data",1),("Itens",2),("Pagamento",3),("Total",4),("Ações",None)],
+            fetch_page=lambda after_key: get_sales_page(self.company_name, after_key=after_key),
+            parent=self
+        )
+        self.table = QTableView(); self.table.setModel(self.model)
+        self.action_delegate = ActionDelegate(self.table, show_text=False, actions=("view",))  # venda não se edita
+        self.action_delegate.view_clicked.connect(lambda row: self.ver_venda(self.model.row_id(row)))
+        self.table.setItemDelegateForColumn(5, self.action_delegate)
+        self.table.setColumnWidth(5, self.action_delegate.width())
+        self.table.horizontalHeader().setStretchLastSection(True)
+        layout.addWidget(self.table, 1)
 
-        layout = QVBoxLayout()
-        layout.addWidget(QLabel("Vendas"))
         self.setLayout(layout)
+        self.model.reset()
+        self.search_input.setFocus()
+
+    # ========== CARRINHO ==========
+    def escolher_produto(self, termo):
+        """Busca o produto; pergunta qual quando houver vários resultados"""
+        resultados = search_products(self.company_name, termo)
+        if not resultados:
+            QMessageBox.warning(self, "Erro", "Produto não encontrado")
+            return None
+        produto = resultados[0]
+        if len(resultados) > 1:
+            opcoes = [f"{p['nome']} - {p['marca']} ({p['codigo_barra']})" for p in resultados]
+            escolha, ok = QInputDialog.getItem(self, "Selecionar Produto", "Produtos encontrados:", opcoes, 0, False)
+            if not ok: return None
+            produto = resultados[opcoes.index(escolha)]
+        return produto
+
+    def adicionar_item(self):
+        termo = self.search_input.text().strip()
+        if not termo: return
+        produto = self.escolher_produto(termo)
+        if not produto: return
+        item = self.cart.setdefault(produto['id'], [produto, 0])
+        if item[1] + self.qtd_input.value() > produto['quantidade']:
+            QMessageBox.warning(self, "Erro", f"Estoque insuficiente ({produto['quantidade']} disponível)")
+            if not item[1]: del self.cart[produto['id']]
+            return
+        item[0] = produto  # preço e saldo mais recentes
+        item[1] += self.qtd_input.value()
+        self.search_input.clear(); self.qtd_input.setValue(1)
+        self.atualizar_carrinho()
+
+    def remover_item(self):
+        row = self.cart_table.currentRow()
+        if row < 0: return
+        del self.cart[list(self.cart)[row]]
+        self.atualizar_carrinho()
+
+    def limpar_carrinho(self):
+        self.cart.clear()
+        self.desconto_input.clear()
+        self.atualizar_carrinho()
+
+    def atualizar_carrinho(self):
+        self.cart_table.setRowCount(len(self.cart))
+        for row, (produto, qtd) in enumerate(self.cart.values()):
+            valores = (produto['nome'], produto['codigo_barra'], str(qtd),
+                       format_money(produto['valor']), format_money(produto['valor'] * qtd))
+            for col, text in enumerate(valores):
+                self.cart_table.setItem(row, col, QTableWidgetItem(text))
+        self.atualizar_total()
+
+    def subtotal(self):
+        return round(sum(produto['valor'] * qtd for produto, qtd in self.cart.values()), 2)
+
+    def desconto(self):
+        texto = self.desconto_input.text().strip().replace(",", ".")
+        try: return max(0.0, float(texto)) if texto else 0.0
+        except ValueError: return None
+
+    def atualizar_total(self):
+        desconto = self.desconto() or 0.0
+        self.total_label.setText(f"Total: {format_money(max(0.0, self.subtotal() - desconto))}")
+
+    # ========== CHECKOUT ==========
+    def finalizar_venda(self):
+        if not self.cart: QMessageBox.warning(self, "Erro", "Carrinho vazio"); return
+        if get_open_caixa(self.company_name) is None:
+            QMessageBox.warning(self, "Erro", "Abra o caixa antes de vender"); return
+        desconto = self.desconto()
+        if desconto is None or desconto > self.subtotal():
+            QMessageBox.warning(self, "Erro", "Desconto inválido"); return
+        itens = [(produto_id, qtd) for produto_id, (_produto, qtd) in self.cart.items()]
+        venda_id = finalize_sale(self.company_name, itens, self.pagamento_combo.currentText(),
+                                 desconto=desconto, funcionario_id=self.vendedor_combo.currentData())
+        if venda_id is None:
+            QMessageBox.warning(self, "Erro", "Venda não registrada: estoque insuficiente ou produto removido")
+            return
+        dashboard_cache.invalidate(self.company_name)
+        QMessageBox.information(self, "Sucesso", f"Venda #{venda_id} registrada!")
+        self.limpar_carrinho()
+        self.model.reset()
+        self.search_input.setFocus()
+
+    def ver_venda(self, venda_id):
+        venda = get_sale(self.company_name, venda_id)
+        if not venda: return
+        ViewSaleDialog(venda).exec_()
+
+# ========== ESTILO GLOBAL =====================================
+CRUD_STYLE = """
+QWidget { background-color: #1b2330; color: #e5e5e5; font-size: 14px; }
+QLabel { color: #e5e5e5; font-weight: bold; }
+QPushButton { background-color: #3b6cee; padding: 8px 18px; border-radius: 6px; color: white; font-weight: bold; }
+QPushButton:hover { background-color: #5580ff; }
+QPushButton:pressed { background-color: #2d59cc; }
+QLineEdit, QComboBox, QSpinBox { border: 1px solid #3a4150; padding: 6px; border-radius: 5px; color: #eaeaea; }
+QTableView, QTableWidget { background-color: #242c3b; border: 1px solid #384151; border-radius: 6px; gridline-color: #3c4558; }
+QHeaderView::section { background-color: #2e384a; padding: 6px; color: #d1d1d1; font-weight: bold; border: none; }
+"""
@@ -0,0 +1,131 @@
+"""Curva ABC: cálculo vetorizado (numpy) x laço Python linha a linha.
+
+Uso (dentro de vendapro-desktop):
+    python -m benchmarks.bench_abc [--produtos 50000] [--movimentos 2000000] [--itens 300000] [--dias 730]
+
+Gera um histórico de estoque e vendas espalhados em `dias` dias, calcula a
+curva com compute_abc e com uma implementação de referência que percorre
+movimentos (lidos da mesma forma) e itens um a um em dicts, e confere se as
+duas classificam igual.
+"""
+import argparse
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.database import user_repository as repo
+from app.database.connection import manager
+from app.services import abc_analysis
+from app.services.abc_analysis import compute_abc
+
+FORMATO = "%Y-%m-%d %H:%M:%S"
+
+
+def setup(company, produtos, movimentos, itens, dias, agora):
+    repo.init_company_db(company)
+    db_path = repo.get_company_db_path(company)
+    rng = random.Random(7)
+    inicio = agora - timedelta(days=dias)
+    data = lambda: (inicio + timedelta(seconds=rng.randrange(dias * 86400))).strftime(FORMATO)
+    with manager.connection(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO produto (nome, valor, quantidade, marca, codigo_barra) VALUES (?, ?, 0, 'Marca', ?)",
+            [(f"Produto {i}", round(1 + i % 97 * 0.35, 2), f"bench-{i}") for i in range(produtos)]
+        )
+        # entrada inicial grande e saídas de tamanhos bem diferentes por produto
+        conn.executemany(
+            "INSERT INTO estoque (produto_id, codigo_barra, quantidade, movimento_tipo, origem, data) "
+            "VALUES (?, '', 1000000, 'Entrada', 'bench', ?)",
+            [(p, data()) for p in range(1, produtos + 1)]
+        )
+        pesos = [1 / p for p in range(1, produtos + 1)]
+        escolhidos = rng.choices(range(1, produtos + 1), weights=pesos, k=movimentos - produtos)
+        conn.executemany(
+            "INSERT INTO estoque (produto_id, codigo_barra, quantidade, movimento_tipo, origem, data) "
+            "VALUES (?, '', ?, 'Saída', 'bench', ?)",
+            [(p, rng.randint(1, 3), data()) for p in escolhidos]
+        )
+        vendas = itens // 5
+        conn.executemany(
+            "INSERT INTO vendas (id, data, forma_pagamento, subtotal, total) VALUES (?, ?, 'Pix', 0, 0)",
+            [(v, data()) for v in range(1, vendas + 1)]
+        )
+        conn.executemany(
+            "INSERT INTO itens_venda (venda_id, produto_id, quantidade, valor_unitario) VALUES (?, ?, ?, ?)",
+            [(v, p, rng.randint(1, 3), round(1 + p % 97 * 0.35, 2))
+             for v in range(1, vendas + 1)
+             for p in rng.choices(range(1, produtos + 1), weights=pesos, k=5)]
+        )
+    repo.update_sales_rollups(company)
+
+
+def reference(company, dias, agora):
+    """Mesmo cálculo de compute_abc, linha a linha"""
+    inicio = agora - timedelta(days=dias)
+    t0, t1 = abc_analysis._julianday(inicio), abc_analysis._julianday(agora)
+    db_path = repo.get_company_db_path(company)
+    with manager.connection(db_path) as conn:
+        saldos = dict(conn.execute("SELECT id, quantidade FROM produto"))
+        ponderado, saidas, receita = {}, {}, {}
+        for rows in repo.iter_stock_ledger(company, inicio.strftime(FORMATO)):
+            for produto_id, tempo, delta in rows:
+                ponderado[produto_id] = ponderado.get(produto_id, 0) + delta * (min(tempo, t1) - t0)
+                if delta < 0:
+                    saidas[produto_id] = saidas.get(produto_id, 0) - delta
+        for produto_id, quantidade, valor in conn.execute("""
+            SELECT i.produto_id, i.quantidade, i.valor_unitario
+            FROM vendas v JOIN itens_venda i ON i.venda_id = v.id
+            WHERE v.data >= ? AND v.data <= ?
+        """, (inicio.strftime(FORMATO), agora.strftime(FORMATO))):
+            receita[produto_id] = receita.get(produto_id, 0) + quantidade * valor
+
+    ids = sorted(saldos)
+    total = sum(receita.get(p, 0) for p in ids)
+    classe, acumulada = {}, 0.0
+    for p in sorted(ids, key=lambda p: -receita.get(p, 0)):
+        classe[p] = "C" if receita.get(p, 0) <= 0 else (
+            "A" if acumulada < abc_analysis.LIMITE_A else "B" if acumulada < abc_analysis.LIMITE_B else "C")
+        acumulada += receita.get(p, 0) / total
+    medio = {p: max(saldos[p] - ponderado.get(p, 0) / (t1 - t0), 0) for p in ids}
+    return classe, {p: saidas.get(p, 0) for p in ids}, medio
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--produtos", type=int, default=50000)
+    parser.add_argument("--movimentos", type=int, default=2000000)
+    parser.add_argument("--itens", type=int, default=300000)
+    parser.add_argument("--dias", type=int, default=730)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="vendapro-bench-")
+    repo.BASE_DIR = tmp
+    company = "bench abc"
+    agora = datetime(2026, 6, 30, 12, 0, 0)
+    setup(company, args.produtos, args.movimentos, args.itens, args.dias, agora)
+
+    start = time.perf_counter()
+    rows = compute_abc(company, args.dias, agora=agora)
+    vetorizado = time.perf_counter() - start
+    start = time.perf_counter()
+    classe, saidas, medio = reference(company, args.dias, agora)
+    linha_a_linha = time.perf_counter() - start
+
+    diferentes = sum(
+        1 for row in rows
+        if row[3] != classe[row[0]] or row[4] != saidas[row[0]] or abs(row[5] - medio[row[0]]) > 0.01
+    )
+    contagem = {c: sum(1 for row in rows if row[3] == c) for c in "ABC"}
+    print(f"{args.produtos} produtos, {args.movimentos} movimentos, {args.itens} itens vendidos em {args.dias} dias")
+    print(f"vetorizado (numpy)   {vetorizado:8.2f} s")
+    print(f"linha a linha        {linha_a_linha:8.2f} s")
+    print(f"classes {contagem}, divergências com a referência: {diferentes}")
+
+    repo.close_company_db(company)
+    shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
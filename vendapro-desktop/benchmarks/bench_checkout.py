@@ -0,0 +1,84 @@
+"""Latência do checkout (finalize_sale) com cestas de 50 itens.
+
+Uso (dentro de vendapro-desktop):
+    python -m benchmarks.bench_checkout [--vendas 500] [--itens 50] [--produtos 5000]
+
+Para cada perfil de armazenamento mede p50 / p95 / p99 / máximo de uma
+venda completa (cabeçalho, itens, movimentos de estoque e baixa do saldo
+numa transação). A linha "item a item" reproduz a baixa sem transação
+única: um add_stock (e um commit) por item da cesta.
+"""
+import argparse
+import random
+import shutil
+import statistics
+import tempfile
+import time
+
+from app.database import user_repository as repo
+from app.database.connection import manager
+
+
+def setup(company, profile, produtos):
+    repo.init_company_db(company, profile)
+    db_path = repo.get_company_db_path(company)
+    with manager.connection(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO produto (nome, valor, quantidade, marca, codigo_barra) VALUES (?, ?, 0, 'Marca', ?)",
+            [(f"Produto {i}", round(1 + i % 97 * 0.35, 2), f"bench-{i}") for i in range(produtos)]
+        )
+        conn.execute("""
+            INSERT INTO estoque (produto_id, codigo_barra, quantidade, movimento_tipo, origem)
+            SELECT id, codigo_barra, 1000000, 'Entrada', 'bench' FROM produto
+        """)
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))]
+    return statistics.median(samples), pick(0.95), pick(0.99), samples[-1]
+
+
+def run(company, vendas, itens, produtos, item_by_item=False):
+    rng = random.Random(7)
+    db_path = repo.get_company_db_path(company)
+    with manager.connection(db_path) as conn:
+        barcodes = dict(conn.execute("SELECT id, codigo_barra FROM produto"))
+    samples = []
+    for _ in range(vendas):
+        cesta = [(rng.randint(1, produtos), rng.randint(1, 3)) for _ in range(itens)]
+        start = time.perf_counter()
+        if item_by_item:
+            for produto_id, qtd in cesta:
+                repo.add_stock(company, produto_id, barcodes[produto_id], qtd, "Saída", "bench")
+        else:
+            assert repo.finalize_sale(company, cesta, "Dinheiro") is not None
+        samples.append((time.perf_counter() - start) * 1000)
+    return percentiles(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--vendas", type=int, default=500)
+    parser.add_argument("--itens", type=int, default=50)
+    parser.add_argument("--produtos", type=int, default=5000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="vendapro-bench-")
+    repo.BASE_DIR = tmp
+
+    print(f"{'caso':<24}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'máx ms':>10}")
+    cases = [(f"checkout {name}", name, False) for name in repo.STORAGE_PROFILES]
+    cases.append(("item a item (fast)", "fast", True))
+    for label, profile, item_by_item in cases:
+        company = f"bench {label}"
+        setup(company, profile, args.produtos)
+        stats = run(company, args.vendas, args.itens, args.produtos, item_by_item)
+        repo.close_company_db(company)
+        print(f"{label:<24}" + "".join(f"{v:>10.2f}" for v in stats))
+
+    shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
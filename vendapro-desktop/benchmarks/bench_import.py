@@ -0,0 +1,60 @@
+"""Mede a importação do catálogo de produtos (CSV) em linhas por segundo.
+
+Uso (dentro de vendapro-desktop):
+    python -m benchmarks.bench_import [--rows 30000] [--lote 5000]
+
+Compara com o caminho antigo (um create_product por produto, como o
+AddProductDialog) numa amostra, e mede a reimportação do mesmo arquivo
+(upsert sem mudanças) e a importação de um arquivo que altera preços.
+"""
+import argparse
+import csv
+import os
+import shutil
+import tempfile
+import time
+
+from app.database import user_repository as repo
+from app.services.product_import import import_products
+
+
+def write_csv(path, rows, preco="9,90"):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f, delimiter=";")
+        writer.writerow(["Código de Barras", "Nome", "Preço", "Marca", "Quantidade"])
+        for i in range(rows):
+            writer.writerow([f"789{i:010d}", f"Produto {i}", preco, f"Marca {i % 50}", i % 20])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=30000)
+    parser.add_argument("--lote", type=int, default=5000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="vendapro-bench-")
+    repo.BASE_DIR = tmp
+    company = "bench importacao"
+    repo.init_company_db(company)
+    path = os.path.join(tmp, "catalogo.csv")
+
+    sample = min(args.rows, 2000)
+    start = time.perf_counter()
+    for i in range(sample):
+        repo.create_product(company, f"Antigo {i}", 9.9, i % 20, "Marca", f"antigo-{i}")
+    print(f"{'create_product (um a um)':<28}{sample / (time.perf_counter() - start):>12.0f} linhas/s")
+
+    cases = [("importação nova", "9,90"), ("reimportação igual", "9,90"), ("reimportação c/ preços", "10,90")]
+    for label, preco in cases:
+        write_csv(path, args.rows, preco)
+        start = time.perf_counter()
+        result = import_products(company, path, batch_size=args.lote)
+        rate = args.rows / (time.perf_counter() - start)
+        print(f"{label:<28}{rate:>12.0f} linhas/s  ({result['gravados']} gravados)")
+
+    repo.close_company_db(company)
+    shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Fotos como BLOB nos registros x biblioteca de imagens (media_store).
+
+Uso (dentro de vendapro-desktop):
+    python -m benchmarks.bench_media [--produtos 2000] [--imagens 100] [--kb 100]
+
+Grava `produtos` produtos com fotos de `kb` KB no layout antigo (BLOB na
+linha, a mesma foto repetida entre produtos, escolhida entre `imagens`
+distintas), mede tamanho do banco, backup e VACUUM, move as fotos para a
+biblioteca com migrate_photos_to_store, compacta e mede de novo.
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+
+from app.database import media_store
+from app.database import user_repository as repo
+from app.database.connection import manager
+
+
+def setup(company, produtos, imagens, kb):
+    repo.init_company_db(company)
+    db_path = repo.get_company_db_path(company)
+    rng = random.Random(7)
+    fotos = [rng.randbytes(kb * 1024) for _ in range(imagens)]
+    with manager.connection(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO produto (nome, valor, quantidade, marca, codigo_barra, photo, thumb) "
+            "VALUES (?, 1, 0, 'Marca', ?, ?, x'')",
+            [(f"Produto {i}", f"bench-{i}", rng.choice(fotos)) for i in range(produtos)]
+        )
+    return db_path
+
+
+def medir(db_path, tmp):
+    """(MB do banco, s do backup, s do VACUUM)"""
+    destino = os.path.join(tmp, "backup.db")
+    start = time.perf_counter()
+    with manager.connection(db_path) as conn:
+        alvo = sqlite3.connect(destino)
+        conn.backup(alvo)
+        alvo.close()
+    backup = time.perf_counter() - start
+    os.remove(destino)
+    start = time.perf_counter()
+    with manager.connection(db_path) as conn:
+        conn.execute("VACUUM")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    vacuum = time.perf_counter() - start
+    return os.path.getsize(db_path) / 2**20, backup, vacuum
+
+
+def tamanho_pasta(pasta):
+    return sum(os.path.getsize(os.path.join(raiz, nome)) for raiz, _d, nomes in os.walk(pasta) for nome in nomes)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--produtos", type=int, default=2000)
+    parser.add_argument("--imagens", type=int, default=100)
+    parser.add_argument("--kb", type=int, default=100)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="vendapro-bench-")
+    repo.BASE_DIR = tmp
+    company = "bench midia"
+    db_path = setup(company, args.produtos, args.imagens, args.kb)
+
+    blob_mb, blob_backup, blob_vacuum = medir(db_path, tmp)
+    start = time.perf_counter()
+    movidas = repo.migrate_photos_to_store(company)
+    migrar = time.perf_counter() - start
+    repo.compact_company_db(company)
+    lib_mb, lib_backup, lib_vacuum = medir(db_path, tmp)
+    pasta_mb = tamanho_pasta(media_store.media_dir(db_path)) / 2**20
+
+    print(f"{args.produtos} produtos, {args.imagens} fotos distintas de {args.kb} KB")
+    print(f"{'':22}{'banco':>10}{'backup':>10}{'VACUUM':>10}")
+    print(f"{'BLOB na linha':22}{blob_mb:>8.1f}MB{blob_backup:>9.2f}s{blob_vacuum:>9.2f}s")
+    print(f"{'biblioteca':22}{lib_mb:>8.1f}MB{lib_backup:>9.2f}s{lib_vacuum:>9.2f}s")
+    print(f"{movidas} fotos movidas em {migrar:.2f} s; pasta da biblioteca: {pasta_mb:.1f} MB")
+
+    repo.close_company_db(company)
+    shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
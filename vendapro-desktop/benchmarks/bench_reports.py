@@ -0,0 +1,91 @@
+"""Relatórios de vendas: soma direta das vendas x rollups por hora/dia.
+
+Uso (dentro de vendapro-desktop):
+    python -m benchmarks.bench_reports [--itens 300000] [--dias 90] [--produtos 5000]
+
+Gera vendas espalhadas em `dias` dias (cerca de 5 itens por venda), monta
+os rollups com rebuild_sales_rollups e mede cada relatório sobre o período
+inteiro com as bordas fora da hora cheia, nos dois modos.
+"""
+import argparse
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from app.database import user_repository as repo
+from app.database.connection import manager
+from app.database.reports import REPORTS, sales_report
+
+ITENS_POR_VENDA = 5
+
+
+def setup(company, itens, dias, produtos):
+    repo.init_company_db(company)
+    db_path = repo.get_company_db_path(company)
+    rng = random.Random(7)
+    inicio = datetime(2026, 1, 1)
+    vendas = itens // ITENS_POR_VENDA
+    with manager.connection(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO produto (nome, valor, quantidade, marca, codigo_barra) VALUES (?, ?, 0, ?, ?)",
+            [(f"Produto {i}", round(1 + i % 97 * 0.35, 2), f"Marca {i % 40}", f"bench-{i}") for i in range(produtos)]
+        )
+        conn.executemany(
+            "INSERT INTO vendas (id, data, forma_pagamento, funcionario_id, subtotal, total) VALUES (?, ?, ?, ?, 0, 0)",
+            [(v, (inicio + timedelta(seconds=rng.randrange(dias * 86400))).strftime("%Y-%m-%d %H:%M:%S"),
+              rng.choice(repo.FORMAS_PAGAMENTO), rng.randint(0, 8) or None) for v in range(1, vendas + 1)]
+        )
+        conn.executemany(
+            "INSERT INTO itens_venda (venda_id, produto_id, quantidade, valor_unitario) VALUES (?, ?, ?, ?)",
+            [(v, p, rng.randint(1, 3), round(1 + p % 97 * 0.35, 2))
+             for v in range(1, vendas + 1)
+             for p in rng.sample(range(1, produtos + 1), ITENS_POR_VENDA)]
+        )
+        conn.execute("""
+            UPDATE vendas SET total = (SELECT ROUND(SUM(quantidade * valor_unitario), 2)
+                                       FROM itens_venda WHERE venda_id = vendas.id)
+        """)
+    start = time.perf_counter()
+    repo.rebuild_sales_rollups(company)
+    print(f"rebuild dos rollups: {time.perf_counter() - start:.2f} s ({vendas} vendas, {itens} itens)")
+    return (inicio + timedelta(minutes=17)).strftime("%Y-%m-%d %H:%M:%S"), \
+           (inicio + timedelta(days=dias, minutes=-23)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def timed(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--itens", type=int, default=300000)
+    parser.add_argument("--dias", type=int, default=90)
+    parser.add_argument("--produtos", type=int, default=5000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="vendapro-bench-")
+    repo.BASE_DIR = tmp
+    company = "bench relatorios"
+    inicio, fim = setup(company, args.itens, args.dias, args.produtos)
+
+    print(f"{'relatório':<18}{'vendas ms':>12}{'rollups ms':>12}{'linhas':>8}  confere")
+    for por in REPORTS:
+        bruto_ms, bruto = timed(lambda: sales_report(company, inicio, fim, por, rollups=False))
+        rollup_ms, rollup = timed(lambda: sales_report(company, inicio, fim, por))
+        confere = [(k, q, round(v, 2)) for k, _r, q, v in bruto] == [(k, q, round(v, 2)) for k, _r, q, v in rollup]
+        print(f"{por:<18}{bruto_ms:>12.1f}{rollup_ms:>12.1f}{len(rollup):>8}  {'sim' if confere else 'NÃO'}")
+
+    repo.close_company_db(company)
+    shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Lotes e rotas de entrega: plan_batches sobre as pendentes da fila.
+
+Uso (dentro de vendapro-desktop):
+    python -m benchmarks.bench_routes [--entregas 200] [--repeticoes 20]
+
+Cria `entregas` pendentes espalhadas num raio de ~8 km da loja (zona pela
+distância), mede plan_batches com os lotes padrão e a rota de um lote único
+com todas as entregas (o pior caso do 2-opt), e compara os km da rota
+(vizinho mais próximo + 2-opt) com a ordem de prioridade e com o vizinho
+mais próximo sozinho.
+"""
+import argparse
+import math
+import random
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+from app.database import user_repository as repo
+from app.database.connection import manager
+from app.services import routing
+from app.services.delivery_queue import FORMATO, get_queue, drop_queue
+
+LOJA = (-23.5505, -46.6333)
+KM_POR_GRAU = 111.2
+
+
+def setup(company, entregas):
+    repo.init_company_db(company)
+    db_path = repo.get_company_db_path(company)
+    with manager.connection(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO vendas (id, data, forma_pagamento, subtotal, total) VALUES (?, CURRENT_TIMESTAMP, 'Pix', 0, 0)",
+            [(v,) for v in range(1, entregas + 1)]
+        )
+    rng = random.Random(7)
+    agora = datetime.now(timezone.utc)
+    queue = get_queue(company)
+    for venda_id in range(1, entregas + 1):
+        km = 8 * math.sqrt(rng.random())
+        angulo = rng.uniform(0, 2 * math.pi)
+        latitude = LOJA[0] + km * math.sin(angulo) / KM_POR_GRAU
+        longitude = LOJA[1] + km * math.cos(angulo) / (KM_POR_GRAU * math.cos(math.radians(LOJA[0])))
+        prometida = agora + timedelta(minutes=rng.randrange(20, 180))
+        queue.add(venda_id, f"Rua {venda_id}", int(km // 2), prometida.strftime(FORMATO), latitude, longitude)
+    return queue
+
+
+def cronometrar(funcao, repeticoes):
+    start = time.perf_counter()
+    for _ in range(repeticoes):
+        resultado = funcao()
+    return (time.perf_counter() - start) / repeticoes, resultado
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--entregas", type=int, default=200)
+    parser.add_argument("--repeticoes", type=int, default=20)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="vendapro-bench-")
+    repo.BASE_DIR = tmp
+    company = "bench rotas"
+    queue = setup(company, args.entregas)
+    pendentes = queue.pending()
+
+    lotes_tempo, lotes = cronometrar(lambda: routing.plan_batches(pendentes, LOJA), args.repeticoes)
+    unico_tempo, (unico, _km) = cronometrar(lambda: routing.route(pendentes, LOJA), args.repeticoes)
+    km_lotes = sum(lote["km"] for lote in lotes)
+
+    # lote único: rota x ordem de prioridade x vizinho mais próximo
+    dist = routing.distance_matrix([LOJA] + [(e["latitude"], e["longitude"]) for e in pendentes])
+    vizinho = routing.nearest_neighbour(dist)
+    km_prioridade = routing.tour_length(range(len(dist)), dist)
+    km_vizinho = routing.tour_length(vizinho, dist)
+    km_2opt = routing.tour_length(routing.two_opt(vizinho, dist), dist)
+
+    print(f"{args.entregas} entregas pendentes, média de {args.repeticoes} execuções")
+    print(f"lotes padrão ({len(lotes)} lotes, {km_lotes:.1f} km)   {lotes_tempo * 1000:8.1f} ms")
+    print(f"rota única de {len(unico)} paradas           {unico_tempo * 1000:8.1f} ms")
+    print(f"km do lote único: prioridade {km_prioridade:.1f}, vizinho mais próximo {km_vizinho:.1f}, "
+          f"+ 2-opt {km_2opt:.1f}")
+
+    drop_queue(company)
+    repo.close_company_db(company)
+    shutil.rmtree(tmp)
+
+
+if __name__ == "__main__":
+    main()
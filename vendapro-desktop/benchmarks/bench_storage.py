@@ -0,0 +1,113 @@
+"""Compara os perfis de armazenamento do SQLite ("durable" x "fast").
+
+Uso (dentro de vendapro-desktop):
+    python -m benchmarks.bench_storage [--rows 2000]
+
+Para cada perfil mede: commits de uma linha (como um save de produto),
+leituras pontuais por id e leituras feitas enquanto outra thread grava
+no estoque. A linha "sqlite padrão" reproduz o comportamento antigo:
+rollback journal, synchronous=FULL e uma conexão nova por chamada.
+"""
+import argparse
+import os
+import sqlite3
+import tempfile
+import threading
+import time
+
+from app.database import user_repository as repo
+
+
+def _timed(fn, n):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    return n / elapsed if elapsed else float("inf")
+
+
+def bench_profile(company, rows, raw=False):
+    db_path = repo.get_company_db_path(company)
+
+    if raw:
+        def execute(sql, params=()):
+            conn = sqlite3.connect(db_path)
+            try:
+                result = conn.execute(sql, params).fetchall()
+                conn.commit()
+                return result
+            finally:
+                conn.close()
+    else:
+        def execute(sql, params=()):
+            with repo.get_connection(db_path) as conn:
+                return conn.execute(sql, params).fetchall()
+
+    def inserts():
+        for i in range(rows):
+            execute(
+                "INSERT INTO produto (nome, valor, quantidade, marca, codigo_barra) VALUES (?, ?, ?, ?, ?)",
+                (f"Produto {i}", 9.9, 10, "Marca", f"{company}-{i}")
+            )
+
+    def reads():
+        for i in range(rows):
+            execute("SELECT * FROM produto WHERE id = ?", (i % rows + 1,))
+
+    write_rate = _timed(inserts, rows)
+    read_rate = _timed(reads, rows)
+
+    # leitores enquanto uma thread grava movimentos de estoque
+    stop = threading.Event()
+    reads_done = [0]
+
+    def writer():
+        for i in range(rows // 4):
+            execute(
+                "INSERT INTO estoque (produto_id, codigo_barra, quantidade, movimento_tipo, origem) VALUES (?, ?, ?, ?, ?)",
+                (i % rows + 1, "x", 1, "Entrada", "bench")
+            )
+        stop.set()
+
+    def reader():
+        while not stop.is_set():
+            execute("SELECT COUNT(*) FROM estoque")
+            reads_done[0] += 1
+
+    threads = [threading.Thread(target=writer), threading.Thread(target=reader)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    mixed_rate = reads_done[0] / (time.perf_counter() - start)
+    return write_rate, read_rate, mixed_rate
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=2000)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="vendapro-bench-")
+    repo.BASE_DIR = tmp
+
+    print(f"{'perfil':<16}{'commits/s':>12}{'leituras/s':>14}{'leituras/s c/ escrita':>24}")
+    cases = [("sqlite padrão", None)] + [(name, name) for name in repo.STORAGE_PROFILES]
+    for label, profile in cases:
+        company = f"bench {label}"
+        repo.init_company_db(company, profile or repo.DEFAULT_PROFILE)
+        if profile is None:
+            conn = sqlite3.connect(repo.get_company_db_path(company))
+            conn.execute("PRAGMA journal_mode = DELETE")
+            conn.close()
+        writes, reads, mixed = bench_profile(company, args.rows, raw=profile is None)
+        repo.close_company_db(company)
+        print(f"{label:<16}{writes:>12.0f}{reads:>14.0f}{mixed:>24.0f}")
+
+    for name in os.listdir(tmp):
+        os.remove(os.path.join(tmp, name))
+    os.rmdir(tmp)
+
+
+if __name__ == "__main__":
+    main()
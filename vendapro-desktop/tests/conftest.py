@@ -0,0 +1,56 @@
+"""Fixtures: cada teste usa uma empresa num banco temporário.
+
+Rodar de dentro de vendapro-desktop:
+    python -m pytest -q tests
+"""
+import os
+import shutil
+import sys
+import tempfile
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# antes do import: user_repository cria o banco global ao ser importado
+DATA_DIR = os.environ["VENDAPRO_DATA_DIR"] = tempfile.mkdtemp(prefix="vendapro-tests-")
+
+from app.database import user_repository as repo  # noqa: E402
+from app.database.connection import manager  # noqa: E402
+
+EMPRESA = "loja teste"
+
+
+def pytest_sessionfinish(session, exitstatus):
+    manager.close_all()
+    shutil.rmtree(DATA_DIR, ignore_errors=True)
+
+
+@pytest.fixture
+def empresa(tmp_path, monkeypatch):
+    """Empresa com o banco migrado em tmp_path (como os benchmarks)"""
+    monkeypatch.setattr(repo, "BASE_DIR", str(tmp_path))
+    repo.init_company_db(EMPRESA)
+    yield EMPRESA
+    repo.close_company_db(EMPRESA)
+
+
+@pytest.fixture
+def produto(empresa):
+    """Cria um produto (saldo inicial pelo histórico); retorna o id"""
+    def criar(codigo, quantidade=0, valor=10.0, nome=None, marca="Marca"):
+        repo.create_product(empresa, nome or f"Produto {codigo}", valor, quantidade, marca, codigo)
+        return repo.get_product_by_barcode(empresa, codigo)["id"]
+    return criar
+
+
+def saldo(empresa, produto_id):
+    """(produto.quantidade, soma do histórico com sinal)"""
+    with manager.connection(repo.get_company_db_path(empresa)) as conn:
+        return conn.execute("""
+            SELECT p.quantidade,
+                   COALESCE((SELECT SUM(CASE WHEN e.movimento_tipo = 'Entrada' THEN e.quantidade
+                                             ELSE -e.quantidade END)
+                             FROM estoque e WHERE e.produto_id = p.id), 0)
+            FROM produto p WHERE p.id = ?
+        """, (produto_id,)).fetchone()
@@ -0,0 +1,50 @@
+from datetime import timedelta
+
+import pytest
+
+from app.database import user_repository as repo
+from app.database.connection import manager
+from app.services import abc_analysis
+
+
+@pytest.fixture
+def loja(empresa, produto):
+    """Quatro produtos com 100 unidades desde 5 dias atrás e vendas de hoje;
+    receita 80 / 15 / 5 / 0"""
+    ids = [produto("1", valor=5.0), produto("2", valor=1.5), produto("3", valor=1.0), produto("4", valor=3.0)]
+    agora = abc_analysis._utcnow()
+    with manager.connection(repo.get_company_db_path(empresa)) as conn:
+        conn.executemany("""
+            INSERT INTO estoque (produto_id, codigo_barra, quantidade, movimento_tipo, origem, data)
+            SELECT id, codigo_barra, 100, ?, 'Compra', ? FROM produto WHERE id = ?
+        """, [(repo.ENTRADA, (agora - timedelta(days=5)).strftime("%Y-%m-%d %H:%M:%S"), p) for p in ids])
+    a, b, c, _d = ids
+    assert repo.finalize_sale(empresa, [(a, 16), (b, 4)], "Pix")
+    assert repo.finalize_sale(empresa, [(b, 6), (c, 5)], "Dinheiro")
+    return ids, agora + timedelta(minutes=1)
+
+
+def test_classes_por_receita_e_por_giro(empresa, loja):
+    ids, agora = loja
+    linhas = {linha[0]: dict(zip(repo.ABC_FIELDS, linha))
+              for linha in abc_analysis.compute_abc(empresa, dias=10, agora=agora)}
+    assert sorted(linhas) == sorted(ids)
+
+    a, b, c, d = (linhas[p] for p in ids)
+    assert [a["receita"], b["receita"], c["receita"], d["receita"]] == [80.0, 15.0, 5.0, 0.0]
+    assert [a["participacao"], b["participacao"], c["participacao"]] == [0.8, 0.95, 1.0]
+    assert [a["classe"], b["classe"], c["classe"], d["classe"]] == ["A", "B", "C", "C"]
+
+    # entrada de 100 na metade do período: estoque médio ~50
+    assert [a["saidas"], b["saidas"], c["saidas"], d["saidas"]] == [16, 10, 5, 0]
+    for linha in (a, b, c, d):
+        assert linha["estoque_medio"] == pytest.approx(50, abs=0.1)
+    assert a["giro"] > b["giro"] > c["giro"] > d["giro"] == 0
+    assert [a["classe_giro"], b["classe_giro"], c["classe_giro"], d["classe_giro"]] == ["A", "B", "C", "C"]
+
+
+def test_curva_gravada_e_refeita_so_depois_da_validade(empresa, loja):
+    assert abc_analysis.update_abc_classification(empresa) == 4
+    assert abc_analysis.update_abc_classification(empresa) is None
+    assert repo.get_abc_summary(empresa) == [("A", 1, 80.0), ("B", 1, 15.0), ("C", 2, 5.0)]
+    assert abc_analysis.update_abc_classification(empresa, force=True) == 4
@@ -0,0 +1,57 @@
+from app.database import user_repository as repo
+from app.database.barcode_index import barcode_index
+from app.database.connection import manager
+
+
+def _contadores():
+    stats = repo.barcode_index_stats()
+    return stats["hits"], stats["misses"]
+
+
+def test_leitura_pelo_indice_acompanha_as_escritas(empresa, produto):
+    a = produto("789", 5, nome="Leite")
+    db_path = repo.open_company_db(empresa)
+    assert barcode_index.loaded(db_path)
+
+    hits, misses = _contadores()
+    assert repo.get_product_by_barcode(empresa, "789")["quantidade"] == 5
+    assert _contadores() == (hits + 1, misses)
+
+    repo.update_product(empresa, a, nome="Leite Integral", codigo_barra="790")
+    repo.apply_stock_movements(empresa, [(a, 2, "Saída", "Venda")])
+    assert barcode_index.get(db_path, "789") is None
+    assert repo.get_product_by_barcode(empresa, "790")["nome"] == "Leite Integral"
+    assert repo.get_product_by_barcode(empresa, "790")["quantidade"] == 3
+
+    repo.delete_product(empresa, a)
+    assert repo.get_product_by_barcode(empresa, "790") is None
+
+
+def test_produto_gravado_por_fora_vem_do_banco(empresa, produto):
+    db_path = repo.open_company_db(empresa)
+    with manager.connection(db_path) as conn:
+        conn.execute("INSERT INTO produto (nome, valor, quantidade, marca, codigo_barra) "
+                     "VALUES ('Outro terminal', 1, 0, '', '555')")
+    assert barcode_index.get(db_path, "555") is None
+
+    hits, misses = _contadores()
+    assert repo.get_product_by_barcode(empresa, "555")["nome"] == "Outro terminal"
+    assert repo.get_product_by_barcode(empresa, "555")["nome"] == "Outro terminal"
+    assert _contadores() == (hits + 1, misses + 1)  # a segunda já vem do índice
+
+
+def test_logout_descarta_o_indice(empresa, produto):
+    produto("1")
+    db_path = repo.open_company_db(empresa)
+    repo.close_company_db(empresa)
+    assert not barcode_index.loaded(db_path)
+
+
+def test_busca_por_nome_nao_passa_pelo_indice(empresa, produto):
+    produto("789", nome="Leite")
+    repo.open_company_db(empresa)
+
+    hits, misses = _contadores()
+    assert [p["nome"] for p in repo.search_products(empresa, "leite")] == ["Leite"]
+    assert [p["nome"] for p in repo.search_products(empresa, "789")] == ["Leite"]
+    assert _contadores() == (hits + 1, misses)
@@ -0,0 +1,34 @@
+from app.database import user_repository as repo
+
+
+def _nomes(resultados):
+    return [produto["nome"] for produto in resultados]
+
+
+def test_codigo_de_barras_exato_vem_sozinho(empresa, produto):
+    produto("7891000100103", nome="Leite Integral")
+    produto("7891000100110", nome="Leite 7891000100103")
+
+    assert _nomes(repo.search_products(empresa, " 7891000100103 ")) == ["Leite Integral"]
+
+
+def test_prefixo_sem_acento_e_ranking_pelo_nome(empresa, produto):
+    produto("1", nome="Café Pilão", marca="Pilão")
+    produto("2", nome="Filtro de papel", marca="Cafeteira Brasil")
+    produto("3", nome="Açúcar", marca="União")
+
+    assert _nomes(repo.search_products(empresa, "caf")) == ["Café Pilão", "Filtro de papel"]
+    assert _nomes(repo.search_products(empresa, "acucar uniao")) == ["Açúcar"]
+    assert repo.search_products(empresa, "arroz") == []
+    assert repo.search_products(empresa, "  ") == []
+
+
+def test_indice_acompanha_edicao_e_exclusao(empresa, produto):
+    a = produto("1", nome="Sabão em pó")
+    repo.update_product(empresa, a, nome="Detergente")
+
+    assert repo.search_products(empresa, "sabao") == []
+    assert _nomes(repo.search_products(empresa, "deter")) == ["Detergente"]
+
+    repo.delete_product(empresa, a)
+    assert repo.search_products(empresa, "deter") == []
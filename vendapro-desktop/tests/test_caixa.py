@@ -0,0 +1,75 @@
+import sqlite3
+
+import pytest
+
+from app.database import user_repository as repo
+from app.database.connection import manager
+
+
+def test_totais_por_forma_e_fechamento(empresa, produto):
+    a = produto("1", 20, valor=5.0)
+    sessao = repo.open_caixa(empresa, 100)
+    assert sessao is not None
+    assert repo.open_caixa(empresa, 0) is None  # só um caixa aberto
+
+    repo.finalize_sale(empresa, [(a, 2)], repo.DINHEIRO)
+    repo.finalize_sale(empresa, [(a, 1)], "Pix")
+    repo.finalize_sale(empresa, [(a, 3)], repo.DINHEIRO, desconto=2.5)
+    assert repo.finalize_sale(empresa, [(a, 99)], repo.DINHEIRO) is None  # não entra nos totais
+
+    assert repo.add_caixa_movement(empresa, repo.SUPRIMENTO, 20)
+    assert repo.add_caixa_movement(empresa, repo.SANGRIA, 50, "Depósito")
+    leitura = repo.caixa_report(empresa)
+    assert leitura["por_forma"] == {repo.DINHEIRO: (2, 22.5), "Pix": (1, 5.0)}
+    assert (leitura["vendas"], leitura["total_vendas"]) == (3, 27.5)
+    assert leitura["dinheiro_esperado"] == 100 + 20 - 50 + 22.5
+
+    fechamento = repo.close_caixa(empresa, 90)
+    assert fechamento["status"] == repo.FECHADO
+    assert fechamento["diferenca"] == -2.5
+    assert fechamento["divergencias"] == []
+    assert repo.get_open_caixa(empresa) is None
+    assert repo.close_caixa(empresa, 0) is None
+
+
+def test_sangria_maior_que_a_gaveta(empresa):
+    assert not repo.add_caixa_movement(empresa, repo.SANGRIA, 10)  # sem caixa aberto
+    repo.open_caixa(empresa, 30)
+    assert not repo.add_caixa_movement(empresa, repo.SANGRIA, 30.01)
+    assert not repo.add_caixa_movement(empresa, repo.SUPRIMENTO, 0)
+    assert repo.add_caixa_movement(empresa, repo.SANGRIA, 30)
+    assert repo.caixa_report(empresa)["dinheiro_esperado"] == 0
+
+
+def test_venda_sem_caixa_aberto_fica_fora_da_sessao(empresa, produto):
+    a = produto("1", 5, valor=5.0)
+    repo.finalize_sale(empresa, [(a, 1)], "Pix")
+    sessao = repo.open_caixa(empresa, 0)
+    repo.finalize_sale(empresa, [(a, 1)], "Pix")
+
+    assert repo.caixa_report(empresa)["por_forma"] == {"Pix": (1, 5.0)}
+    assert repo.verify_caixa(empresa, sessao) == []
+
+
+def test_operacao_de_caixa_dentro_de_outra_transacao(empresa):
+    sessao = repo.open_caixa(empresa, 10)
+    db_path = repo.get_company_db_path(empresa)
+    with manager.connection(db_path) as conn:
+        conn.execute("UPDATE caixa_sessao SET valor_abertura = 30 WHERE id = ?", (sessao,))
+        assert repo.add_caixa_movement(empresa, repo.SUPRIMENTO, 5)
+
+    with pytest.raises(sqlite3.IntegrityError):
+        with manager.connection(db_path) as conn:
+            conn.execute("UPDATE caixa_sessao SET valor_abertura = 0 WHERE id = ?", (sessao,))
+            repo.add_caixa_movement(empresa, repo.SANGRIA, 100)
+    assert repo.caixa_report(empresa)["dinheiro_esperado"] == 35
+
+    assert repo.close_caixa(empresa, 35)["diferenca"] == 0
+    with pytest.raises(sqlite3.IntegrityError):
+        with manager.connection(db_path) as conn:
+            assert repo.open_caixa(empresa, 0)
+            assert repo.close_caixa(empresa, 0)
+            repo.close_caixa(empresa, 0)  # nenhum aberto: desfaz também a abertura
+    assert repo.get_open_caixa(empresa) is None
+    assert repo.caixa_report(empresa, sessao + 1) is None
+    assert repo.close_caixa(empresa, 0) is None
@@ -0,0 +1,106 @@
+import random
+from datetime import date, datetime, time, timedelta
+
+import pytest
+
+from app.database import user_repository as repo
+from app.database.connection import manager
+
+INICIO = date(2026, 1, 1)
+DIAS = 75
+
+
+@pytest.fixture
+def historico(empresa, produto):
+    """Três produtos com ~300 movimentos espalhados por DIAS dias;
+    retorna (ids, movimentos [(produto_id, dia, delta)])"""
+    ids = [produto(str(i), valor=2.0 + i) for i in range(3)]
+    rng = random.Random(3)
+    saldos = dict.fromkeys(ids, 0)
+    movimentos = []
+    for _ in range(300):
+        produto_id = rng.choice(ids)
+        dia = INICIO + timedelta(days=rng.randrange(DIAS))
+        movimentos.append((produto_id, dia, rng.randint(1, 9)))
+    linhas = []
+    # em ordem de data o saldo nunca fica negativo
+    for produto_id, dia, qtd in sorted(movimentos, key=lambda m: m[1]):
+        delta = -qtd if saldos[produto_id] >= qtd and rng.random() < 0.4 else qtd
+        saldos[produto_id] += delta
+        linhas.append((produto_id, dia, delta))
+    with manager.connection(repo.get_company_db_path(empresa)) as conn:
+        conn.executemany("""
+            INSERT INTO estoque (produto_id, codigo_barra, quantidade, movimento_tipo, origem, data)
+            SELECT id, codigo_barra, ?, ?, 'Teste', ? FROM produto WHERE id = ?
+        """, [(abs(delta), repo.ENTRADA if delta > 0 else "Saída", f"{dia} 12:00:00", produto_id)
+              for produto_id, dia, delta in linhas])
+    return ids, linhas
+
+
+def _replay(linhas, produto_id, dia):
+    return sum(delta for p, d, delta in linhas if p == produto_id and d <= dia)
+
+
+def _dias():
+    return [INICIO - timedelta(days=1)] + [INICIO + timedelta(days=n) for n in range(0, DIAS + 5, 4)]
+
+
+def _confere(empresa, ids, linhas):
+    for dia in _dias():
+        for produto_id in ids:
+            assert repo.get_stock_as_of(empresa, produto_id, dia.isoformat()) == _replay(linhas, produto_id, dia)
+        itens, total = repo.get_stock_valuation(empresa, dia.isoformat())
+        esperado = {p: _replay(linhas, p, dia) for p in ids}
+        assert {item[0]: item[2] for item in itens} == {p: s for p, s in esperado.items() if s}
+        assert total == pytest.approx(sum(item[2] * item[3] for item in itens))
+
+
+def test_saldo_em_data_igual_ao_historico_inteiro(empresa, historico):
+    ids, linhas = historico
+    _confere(empresa, ids, linhas)  # sem checkpoint: soma tudo
+
+    meio = (INICIO + timedelta(days=40)).isoformat()
+    assert repo.update_stock_checkpoints(empresa, until=meio) > 0
+    _confere(empresa, ids, linhas)
+
+    fim = (INICIO + timedelta(days=DIAS)).isoformat()
+    repo.update_stock_checkpoints(empresa, until=fim)
+    assert repo.update_stock_checkpoints(empresa, until=fim) == 0
+    _confere(empresa, ids, linhas)
+
+
+def test_movimento_retroativo_invalida_os_checkpoints(empresa, historico):
+    ids, linhas = historico
+    repo.update_stock_checkpoints(empresa, until=(INICIO + timedelta(days=DIAS)).isoformat())
+
+    dia = INICIO + timedelta(days=10)
+    with manager.connection(repo.get_company_db_path(empresa)) as conn:
+        conn.execute("""
+            INSERT INTO estoque (produto_id, codigo_barra, quantidade, movimento_tipo, origem, data)
+            SELECT id, codigo_barra, 50, 'Entrada', 'Retroativo', ? FROM produto WHERE id = ?
+        """, (f"{dia} 08:00:00", ids[0]))
+    linhas = linhas + [(ids[0], dia, 50)]
+    _confere(empresa, ids, linhas)
+    repo.update_stock_checkpoints(empresa, until=(INICIO + timedelta(days=DIAS)).isoformat())
+    _confere(empresa, ids, linhas)
+
+
+def test_aceita_date_e_datetime(empresa, historico):
+    ids, linhas = historico
+    meio = INICIO + timedelta(days=40)
+    assert repo.update_stock_checkpoints(empresa, until=meio) > 0
+    # datetime com hora: vale o dia inteiro, como "AAAA-MM-DD"
+    fim = datetime.combine(INICIO + timedelta(days=DIAS), time(8, 30))
+    assert repo.update_stock_checkpoints(empresa, until=fim) > 0
+    assert repo.update_stock_checkpoints(empresa, until=fim.date()) == 0
+    _confere(empresa, ids, linhas)
+
+    for dia in _dias():
+        quando = datetime.combine(dia, time(23, 59))
+        for produto_id in ids:
+            assert repo.get_stock_as_of(empresa, produto_id, quando) == _replay(linhas, produto_id, dia)
+            assert repo.get_stock_as_of(empresa, produto_id, dia) == _replay(linhas, produto_id, dia)
+        itens, _total = repo.get_stock_valuation(empresa, quando)
+        assert {item[0]: item[2] for item in itens} == {
+            p: s for p in ids if (s := _replay(linhas, p, dia))
+        }
@@ -0,0 +1,57 @@
+import os
+import sqlite3
+import threading
+import time
+
+from app.database import user_repository as repo
+from app.database.connection import WalCheckpointer, manager
+
+
+def _autocheckpoint(db_path):
+    with manager.connection(db_path) as conn:
+        return conn.execute("PRAGMA wal_autocheckpoint").fetchone()[0]
+
+
+def test_checkpoint_em_segundo_plano_so_nas_empresas(empresa, tmp_path):
+    db_path = repo.get_company_db_path(empresa)
+    assert _autocheckpoint(db_path) == 0
+    with manager.connection(db_path) as conn:
+        conn.execute("INSERT OR REPLACE INTO configuracao (chave, valor) VALUES ('teste', '1')")
+    assert db_path in manager._checkpointers
+
+    outro = str(tmp_path / "outro.db")
+    with manager.connection(outro) as conn:
+        conn.execute("CREATE TABLE t (x)")
+    assert _autocheckpoint(outro) == 1000  # padrão do SQLite
+    assert outro not in manager._checkpointers
+    manager.close(outro)
+
+
+def test_wal_preso_por_leitor_e_zerado(empresa):
+    db_path = repo.get_company_db_path(empresa)
+    with manager.connection(db_path) as conn:
+        conn.execute("CREATE TABLE lastro (x BLOB)")
+        conn.executemany("INSERT INTO lastro VALUES (randomblob(4096))", [()] * 100)
+    # leitura aberta: o PASSIVE não copia o que for gravado depois dela
+    leitor = sqlite3.connect(db_path, check_same_thread=False)
+    leitor.execute("BEGIN")
+    leitor.execute("SELECT COUNT(*) FROM lastro").fetchone()
+    with manager.connection(db_path) as conn:
+        conn.executemany("INSERT INTO lastro VALUES (randomblob(4096))", [()] * 100)
+
+    checkpointer = WalCheckpointer(db_path, interval=0.01, limit=0)
+    checkpointer.start()
+    checkpointer.pending.set()
+    threading.Timer(0.2, leitor.rollback).start()  # o TRUNCATE espera o leitor
+    try:
+        for _ in range(200):
+            if os.path.getsize(db_path + "-wal") == 0:
+                break
+            time.sleep(0.01)
+    finally:
+        checkpointer.stop()
+        checkpointer.join()
+        leitor.close()
+    assert os.path.getsize(db_path + "-wal") == 0
+    with manager.connection(db_path) as conn:
+        assert conn.execute("SELECT COUNT(*) FROM lastro").fetchone()[0] == 200
@@ -0,0 +1,117 @@
+import pytest
+
+from app.database import user_repository as repo
+from app.database.connection import manager
+from app.services.delivery_queue import drop_queue, get_queue
+
+
+@pytest.fixture
+def fila(empresa):
+    with manager.connection(repo.get_company_db_path(empresa)) as conn:
+        conn.executemany(
+            "INSERT INTO vendas (id, data, forma_pagamento, subtotal, total) VALUES (?, CURRENT_TIMESTAMP, 'Pix', 0, 0)",
+            [(v,) for v in range(1, 11)]
+        )
+    yield get_queue(empresa)
+    drop_queue(empresa)
+
+
+@pytest.fixture
+def avisos(fila):
+    recebidas = []
+    fila.add_listener(recebidas.append)
+    return recebidas
+
+
+def _ids(entregas):
+    return [entrega["id"] for entrega in entregas]
+
+
+def test_ordem_pela_saida_limite(fila):
+    # zona 3 prometida às 11h sai antes (10h30) da zona 0 prometida às 10h40
+    perto = fila.add(1, "Rua A", 0, "2026-01-01 10:40:00")
+    longe = fila.add(2, "Rua B", 3, "2026-01-01 11:00:00")
+    cedo = fila.add(3, "Rua C", 0, "2026-01-01 10:00:00")
+
+    assert _ids(fila.open_deliveries()) == _ids([cedo, longe, perto])
+    assert fila.peek()["id"] == cedo["id"]
+    assert [fila.dispatch_next(7)["id"] for _ in range(3)] == _ids([cedo, longe, perto])
+    assert fila.dispatch_next(7) is None
+    assert len(fila) == 0
+
+
+def test_mudancas_invalidam_a_entrada_do_heap(fila):
+    a = fila.add(1, "Rua A", 0, "2026-01-01 10:00:00")
+    b = fila.add(2, "Rua B", 0, "2026-01-01 11:00:00")
+
+    assert fila.cancel(a["id"])["status"] == repo.CANCELADA
+    assert fila.get(a["id"]) is None
+    assert fila.cancel(a["id"]) is None
+    assert fila.peek()["id"] == b["id"]
+
+    assert fila.dispatch(b["id"], 7)["status"] == repo.EM_ROTA
+    assert fila.peek() is None
+    assert fila.return_to_queue(b["id"])["entregador_id"] is None
+    assert fila.peek()["id"] == b["id"]
+    assert len(fila) == 1
+
+    assert fila.deliver(b["id"]) is None  # pendente não pode ser entregue
+    assert fila.dispatch_next(7)["id"] == b["id"]
+    assert fila.deliver(b["id"])["status"] == repo.ENTREGUE
+    assert fila.open_deliveries() == []
+
+
+def test_fila_recarregada_do_banco(empresa, fila):
+    a = fila.add(1, "Rua A", 0, "2026-01-01 10:00:00")
+    b = fila.add(2, "Rua B", 0, "2026-01-01 11:00:00")
+    fila.dispatch_next(7)
+
+    drop_queue(empresa)
+    nova = get_queue(empresa)
+    assert nova is not fila
+    assert nova.get(a["id"])["status"] == repo.EM_ROTA
+    assert [e["id"] for e in nova.open_deliveries() if e["status"] == repo.PENDENTE] == [b["id"]]
+
+
+def test_despacho_de_pendente_mudada_por_outro_terminal(empresa, fila, avisos):
+    a = fila.add(1, "Rua A", 0, "2026-01-01 10:00:00")
+    b = fila.add(2, "Rua B", 0, "2026-01-01 11:00:00")
+    avisos.clear()
+    assert repo.set_delivery_status(empresa, a["id"], repo.EM_ROTA, 5)
+
+    entrega = fila.dispatch_next(7)
+    assert entrega["id"] == b["id"]
+    assert entrega["entregador_id"] == 7
+    # o quadro recebe a linha atualizada da outra e depois a despachada
+    assert [(e["id"], e["status"], e["entregador_id"]) for e in avisos] == [
+        (a["id"], repo.EM_ROTA, 5), (b["id"], repo.EM_ROTA, 7)
+    ]
+    assert fila.get(a["id"])["entregador_id"] == 5
+    assert len(fila) == 0
+
+
+def test_despacho_de_pendente_cancelada_por_outro_terminal(empresa, fila, avisos):
+    a = fila.add(1, "Rua A", 0, "2026-01-01 10:00:00")
+    avisos.clear()
+    assert repo.set_delivery_status(empresa, a["id"], repo.CANCELADA)
+
+    assert fila.dispatch_next(7) is None
+    assert [(e["id"], e["status"]) for e in avisos] == [(a["id"], repo.CANCELADA)]
+    assert None not in avisos
+    assert fila.get(a["id"]) is None
+    assert fila.open_deliveries() == []
+
+
+def test_lote_com_entrega_de_outro_terminal(empresa, fila, avisos):
+    a = fila.add(1, "Rua A", 0, "2026-01-01 10:00:00")
+    # criada por outro terminal: a fila deste não a conhece
+    b = dict(zip(repo.ENTREGA_FIELDS, repo.create_delivery(empresa, 2, "Rua B", 0, "2026-01-01 11:00:00")))
+    avisos.clear()
+
+    despachadas = fila.dispatch_batch([a["id"], b["id"]], 7)
+    assert [(e["id"], e["status"], e["entregador_id"]) for e in despachadas] == [
+        (a["id"], repo.EM_ROTA, 7), (b["id"], repo.EM_ROTA, 7)
+    ]
+    assert _ids(avisos) == [a["id"], b["id"]]
+    assert fila.get(b["id"])["status"] == repo.EM_ROTA
+    assert len(fila) == 0
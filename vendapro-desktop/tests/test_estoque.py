@@ -0,0 +1,137 @@
+import sqlite3
+
+import pytest
+
+from app.database import user_repository as repo
+from app.database.connection import manager
+
+from conftest import saldo
+
+
+def test_movimentos_em_lote(empresa, produto):
+    a, b = produto("1", 5), produto("2", 5)
+    assert repo.apply_stock_movements(empresa, [
+        (a, 3, repo.ENTRADA, "Compra"),
+        (b, 2, "Saída", "Perda"),
+    ])
+    assert saldo(empresa, a) == (8, 8)
+    assert saldo(empresa, b) == (3, 3)
+
+
+def test_lote_com_produto_inexistente_nao_grava(empresa, produto):
+    a = produto("1", 5)
+    assert not repo.apply_stock_movements(empresa, [
+        (a, 3, repo.ENTRADA, "Compra"),
+        (999, 1, repo.ENTRADA, "Compra"),
+    ])
+    assert saldo(empresa, a) == (5, 5)
+
+
+def test_lote_com_saldo_negativo_nao_grava(empresa, produto):
+    a, b = produto("1", 5), produto("2", 1)
+    assert not repo.apply_stock_movements(empresa, [
+        (a, 3, "Saída", "Venda"),
+        (b, 2, "Saída", "Venda"),
+    ])
+    assert saldo(empresa, a) == (5, 5)
+    assert saldo(empresa, b) == (1, 1)
+
+
+def _ultimo_movimento(empresa, produto_id):
+    with manager.connection(repo.get_company_db_path(empresa)) as conn:
+        return conn.execute("SELECT MAX(id) FROM estoque WHERE produto_id = ?", (produto_id,)).fetchone()[0]
+
+
+def test_historico_mantem_o_saldo(empresa, produto):
+    a = produto("1", 5)
+    assert saldo(empresa, a) == (5, 5)
+
+    repo.add_stock(empresa, a, "1", 4, repo.ENTRADA, "Compra")
+    assert saldo(empresa, a) == (9, 9)
+
+    movimento = _ultimo_movimento(empresa, a)
+    assert repo.update_stock(empresa, movimento, quantidade=6)
+    assert saldo(empresa, a) == (11, 11)
+
+    assert repo.delete_stock(empresa, movimento)
+    assert saldo(empresa, a) == (5, 5)
+
+    assert repo.update_product(empresa, a, quantidade=2)
+    assert saldo(empresa, a) == (2, 2)
+
+
+def test_nao_apaga_entrada_ja_consumida(empresa, produto):
+    a = produto("1", 0)
+    repo.add_stock(empresa, a, "1", 4, repo.ENTRADA, "Compra")
+    entrada = _ultimo_movimento(empresa, a)
+    repo.add_stock(empresa, a, "1", 3, "Saída", "Venda")
+
+    assert repo.delete_stock(empresa, entrada) is False
+    assert saldo(empresa, a) == (1, 1)
+
+
+def test_nao_edita_movimento_para_saldo_negativo(empresa, produto):
+    a = produto("1", 5)
+    repo.add_stock(empresa, a, "1", 6, repo.ENTRADA, "Compra")
+    movimento = _ultimo_movimento(empresa, a)
+    repo.add_stock(empresa, a, "1", 10, "Saída", "Venda")
+
+    assert repo.update_stock(empresa, movimento, quantidade=1) is False
+    assert repo.update_stock(empresa, movimento, movimento_tipo="Saída") is False
+    assert saldo(empresa, a) == (1, 1)
+
+
+def test_conferencia_corrige_saldo_divergente(empresa, produto):
+    a, b = produto("1", 5), produto("2", 3)
+    with manager.connection(repo.get_company_db_path(empresa)) as conn:
+        conn.execute("UPDATE produto SET quantidade = 9 WHERE id = ?", (a,))
+
+    assert [(row[0], row[2], row[3]) for row in repo.reconcile_stock(empresa)] == [(a, 9, 5)]
+    repo.reconcile_stock(empresa, fix=True)
+    assert repo.reconcile_stock(empresa) == []
+    assert saldo(empresa, a) == (5, 5)
+    assert saldo(empresa, b) == (3, 3)
+
+
+def test_edicao_de_produto_vazia_ou_recusada(empresa, produto):
+    a, _b = produto("1", 5), produto("2")
+    assert repo.update_product(empresa, a) is None
+    assert repo.update_product(empresa, a, codigo_barra="2") is False
+    assert repo.update_product(empresa, a, nome="Outro", quantidade=-1) is False
+    assert repo.get_product_by_id(empresa, a)[1] == "Produto 1"
+    assert saldo(empresa, a) == (5, 5)
+
+
+def test_conferencia_nao_corrige_historico_negativo(empresa, produto):
+    a, b = produto("1", 5), produto("2", 3)
+    with manager.connection(repo.get_company_db_path(empresa)) as conn:
+        # histórico alterado por fora dos triggers (ex.: banco restaurado em partes)
+        conn.execute("DROP TRIGGER estoque_saldo_ai")
+        conn.execute("""
+            INSERT INTO estoque (produto_id, codigo_barra, quantidade, movimento_tipo, origem)
+            VALUES (?, '1', 9, 'Saída', 'Venda')
+        """, (a,))
+        conn.execute("UPDATE produto SET quantidade = 9 WHERE id = ?", (b,))
+
+    esperado = [(a, 5, -4), (b, 9, 3)]
+    assert [(row[0], row[2], row[3]) for row in repo.reconcile_stock(empresa, fix=True)] == esperado
+    assert saldo(empresa, b) == (3, 3)
+    assert [(row[0], row[2], row[3]) for row in repo.reconcile_stock(empresa)] == [(a, 5, -4)]
+
+
+def test_lote_com_movimento_invalido_nao_grava(empresa, produto):
+    a = produto("1", 5)
+    for movimento in ((a, 0, repo.ENTRADA, "Compra"), (a, -2, "Saída", "Perda"), (a, 1, "Transferência", "Loja 2")):
+        assert repo.apply_stock_movements(empresa, [(a, 1, repo.ENTRADA, "Compra"), movimento]) is False
+    assert saldo(empresa, a) == (5, 5)
+
+
+def test_lote_recusado_desfaz_a_transacao_de_fora(empresa, produto):
+    a, b = produto("1", 5), produto("2", 1)
+    with pytest.raises(sqlite3.IntegrityError):
+        with manager.connection(repo.get_company_db_path(empresa)) as conn:
+            conn.execute("UPDATE produto SET nome = 'Renomeado' WHERE id = ?", (a,))
+            repo.apply_stock_movements(empresa, [(a, 3, "Saída", "Venda"), (b, 2, "Saída", "Venda")])
+    assert repo.get_product_by_id(empresa, a)[1] == "Produto 1"
+    assert saldo(empresa, a) == (5, 5)
+    assert saldo(empresa, b) == (1, 1)
@@ -0,0 +1,112 @@
+import threading
+
+import openpyxl
+import pytest
+
+from app.database import user_repository as repo
+from app.services import product_import
+
+from conftest import saldo
+
+CABECALHO = "Código de Barras;Descrição;Preço;Marca;Qtd\n"
+
+
+def _csv(tmp_path, linhas, nome="catalogo.csv", encoding="utf-8"):
+    path = tmp_path / nome
+    path.write_bytes((CABECALHO + "".join(linha + "\n" for linha in linhas)).encode(encoding))
+    return str(path)
+
+
+def _produto(empresa, codigo):
+    return repo.get_product_by_barcode(empresa, codigo)
+
+
+def test_leitura_em_fluxo(tmp_path):
+    path = _csv(tmp_path, [f"{i};Item {i};1,50;;" for i in range(1000)])
+    rows = product_import.read_rows(path)
+    assert next(rows)[1][0] == "Código de Barras"
+    assert next(rows)[:2] == (2, ["0", "Item 0", "1,50", "", ""])
+    rows.close()
+
+
+def test_upsert_por_codigo_em_lotes(empresa, produto, tmp_path):
+    existente = produto("100", 4, valor=1.0, nome="Velho")
+    path = _csv(tmp_path, [
+        "100;Arroz 5kg;1.234,56;Tio;10",
+        "200;Feijão;8,90;Kicaldo;",
+        "300;Macarrão;4,5;;3",
+        ";Sem código;1;;",
+        "400;Óleo;abc;;",
+        "300;Macarrão Espaguete;4,75;Dona;7",  # repetido: vale a última
+        "500;Sal;2;;0",
+    ], encoding="cp1252")
+    lotes = []
+
+    result = product_import.import_products(empresa, path, batch_size=2,
+                                            progress=lambda linha, fracao: lotes.append(linha))
+    assert result["status"] == repo.CONCLUIDA
+    assert (result["linhas"], result["erros"]) == (8, 2)
+    assert [linha for linha, _msg in result["detalhes"]] == [5, 6]
+    assert lotes == [3, 5, 7, 8]
+
+    arroz = _produto(empresa, "100")
+    assert (arroz["id"], arroz["nome"], arroz["valor"], arroz["marca"]) == (existente, "Arroz 5kg", 1234.56, "Tio")
+    assert saldo(empresa, existente) == (10, 10)
+    assert _produto(empresa, "200")["quantidade"] == 0
+    assert (_produto(empresa, "300")["nome"], _produto(empresa, "300")["quantidade"]) == ("Macarrão Espaguete", 7)
+    assert _produto(empresa, "400") is None
+    assert [p["nome"] for p in repo.search_products(empresa, "espaguete")] == ["Macarrão Espaguete"]
+
+    # de novo, com o arquivo alterado: só o que mudou é regravado
+    path = _csv(tmp_path, ["100;Arroz 5kg;1.234,56;Tio;10", "200;Feijão Preto;8,90;Kicaldo;"])
+    result = product_import.import_products(empresa, path)
+    assert (result["gravados"], result["erros"]) == (1, 0)
+    assert _produto(empresa, "200")["nome"] == "Feijão Preto"
+
+
+def test_retoma_depois_de_queda(empresa, tmp_path):
+    path = _csv(tmp_path, [f"{i};Item {i};1;;{i}" for i in range(1, 11)])
+
+    def cai(linha, fracao):
+        if linha >= 7:
+            raise RuntimeError("queda")
+
+    with pytest.raises(RuntimeError):
+        product_import.import_products(empresa, path, batch_size=3, progress=cai)
+    assert _produto(empresa, "6") is not None
+    assert _produto(empresa, "7") is None
+
+    lotes = []
+    result = product_import.import_products(empresa, path, batch_size=3,
+                                            progress=lambda linha, fracao: lotes.append(linha))
+    assert lotes == [10, 11]  # continua depois da linha 7, não relê o começo
+    assert (result["status"], result["linhas"]) == (repo.CONCLUIDA, 11)
+    assert [_produto(empresa, str(i))["quantidade"] for i in range(1, 11)] == list(range(1, 11))
+
+
+def test_cancelar_e_continuar(empresa, tmp_path):
+    path = _csv(tmp_path, [f"{i};Item {i};1;;" for i in range(1, 11)])
+    cancel = threading.Event()
+    cancel.set()
+
+    result = product_import.import_products(empresa, path, batch_size=4, cancel=cancel)
+    assert (result["status"], result["linhas"], result["gravados"]) == (repo.INTERROMPIDA, 5, 4)
+
+    result = product_import.import_products(empresa, path, batch_size=4)
+    assert (result["status"], result["linhas"], result["gravados"]) == (repo.CONCLUIDA, 11, 10)
+
+
+def test_planilha_xlsx(empresa, tmp_path):
+    workbook = openpyxl.Workbook()
+    sheet = workbook.active
+    sheet.append(["EAN", "Produto", "Valor", "Estoque"])
+    sheet.append([7891000100103, "Leite", 4.99, 12])
+    sheet.append([7891000100110, "Manteiga", "11,50", None])
+    path = str(tmp_path / "catalogo.xlsx")
+    workbook.save(path)
+
+    result = product_import.import_products(empresa, path)
+    assert (result["gravados"], result["erros"]) == (2, 0)
+    leite = _produto(empresa, "7891000100103")
+    assert (leite["nome"], leite["valor"], leite["quantidade"]) == ("Leite", 4.99, 12)
+    assert _produto(empresa, "7891000100110")["valor"] == 11.5
@@ -0,0 +1,48 @@
+import pytest
+
+from app.database import user_repository as repo
+
+
+def _todas_as_paginas(pagina, **kwargs):
+    """Percorre as páginas pelo next_key; retorna (linhas, total da primeira)"""
+    linhas, total, next_key = pagina(**kwargs, limit=3)
+    while next_key is not None:
+        mais, sem_total, next_key = pagina(**kwargs, limit=3, after_key=next_key)
+        assert sem_total is None
+        linhas += mais
+    return linhas, total
+
+
+def test_paginas_de_clientes_por_nome(empresa):
+    nomes = ["Bruna", "Ana", "Carlos", "ana paula", "Bruno", "Ana", "Davi"]
+    for nome in nomes:
+        repo.create_client(empresa, nome, "", "", "")
+
+    def pagina(**kwargs):
+        return repo.get_clients_page(empresa, **kwargs)
+
+    linhas, total = _todas_as_paginas(pagina, order_by="name")
+    assert total == len(nomes)
+    assert [(row[1], row[0]) for row in linhas] == sorted((row[1], row[0]) for row in linhas)
+    assert len({row[0] for row in linhas}) == len(nomes)
+
+    linhas, total = _todas_as_paginas(pagina, search="ana", order_by="-id")
+    assert total == 3
+    assert [row[1] for row in linhas] == ["Ana", "ana paula", "Ana"]
+
+
+def test_paginas_de_produtos_pela_busca(empresa, produto):
+    for i in range(8):
+        produto(str(i), nome=f"Biscoito {i}" if i % 2 else f"Bolacha {i}")
+
+    def pagina(**kwargs):
+        return repo.get_products_page(empresa, **kwargs)
+
+    linhas, total = _todas_as_paginas(pagina, search="bisc", order_by="nome")
+    assert total == 4
+    assert [row[1] for row in linhas] == ["Biscoito 1", "Biscoito 3", "Biscoito 5", "Biscoito 7"]
+
+
+def test_ordenacao_invalida(empresa):
+    with pytest.raises(ValueError):
+        repo.get_clients_page(empresa, order_by="email; DROP TABLE clients")
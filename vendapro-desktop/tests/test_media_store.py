@@ -0,0 +1,135 @@
+import os
+import random
+import time
+
+import pytest
+
+from app.database import media_store
+from app.database import user_repository as repo
+from app.database.connection import manager
+from app.services.media_import import import_media_folder
+
+pytest.importorskip("PyQt5.QtGui")  # miniaturas (make_thumbnail)
+
+
+def _foto(semente, kb=4):
+    return random.Random(semente).randbytes(kb * 1024)
+
+
+def _refs(empresa):
+    with manager.connection(repo.get_company_db_path(empresa)) as conn:
+        return dict(conn.execute("SELECT hash, refs FROM midia").fetchall())
+
+
+def test_mesma_foto_gravada_uma_vez(empresa):
+    foto = _foto(1)
+    for codigo in ("1", "2"):
+        repo.create_product(empresa, f"Produto {codigo}", 1.0, 0, "Marca", codigo, foto)
+    a, b = (repo.get_product_by_barcode(empresa, codigo)["id"] for codigo in ("1", "2"))
+
+    key = media_store.digest(foto)
+    assert _refs(empresa) == {key: 2}
+    path = repo.get_photo_path(empresa, "produto", a)
+    assert path == repo.get_photo_path(empresa, "produto", b)
+    with open(path, "rb") as f:
+        assert f.read() == foto
+    stats = repo.get_media_stats(empresa)
+    assert (stats["arquivos"], stats["bytes"], stats["referencias"]) == (1, len(foto), 2)
+    assert stats["bytes_sem_dedup"] == 2 * len(foto)
+
+
+def test_referencias_e_coleta(empresa):
+    foto, outra = _foto(1), _foto(2)
+    for codigo in ("1", "2"):
+        repo.create_product(empresa, f"Produto {codigo}", 1.0, 0, "Marca", codigo, foto)
+    a, b = (repo.get_product_by_barcode(empresa, codigo)["id"] for codigo in ("1", "2"))
+    antiga = repo.get_photo_path(empresa, "produto", a)
+
+    repo.update_product(empresa, a, photo=outra)
+    repo.delete_product(empresa, b)
+    assert _refs(empresa) == {media_store.digest(foto): 0, media_store.digest(outra): 1}
+    assert repo.get_media_stats(empresa)["orfas"] == 1
+
+    assert repo.collect_media(empresa) == (1, len(foto))
+    assert not os.path.exists(antiga)
+    assert _refs(empresa) == {media_store.digest(outra): 1}
+    assert repo.collect_media(empresa) == (0, 0)
+
+
+def test_arquivo_de_transacao_desfeita_e_coletado(empresa):
+    db_path = repo.get_company_db_path(empresa)
+    foto = _foto(3)
+    with pytest.raises(RuntimeError):
+        with manager.connection(db_path) as conn:
+            media_store.put(conn, db_path, media_store.prepare(foto))
+            raise RuntimeError("desfaz")
+    path = media_store.media_path(db_path, media_store.digest(foto))
+    assert os.path.exists(path)
+    assert _refs(empresa) == {}
+
+    assert repo.collect_media(empresa) == (1, len(foto))
+    assert not os.path.exists(path)
+
+
+def test_importacao_de_pasta(empresa, produto, tmp_path):
+    for codigo in ("1", "2", "3"):
+        produto(codigo)
+    pasta = tmp_path / "fotos"
+    pasta.mkdir()
+    foto, outra = _foto(1), _foto(2)
+    (pasta / "1.jpg").write_bytes(foto)
+    (pasta / "2.png").write_bytes(foto)
+    (pasta / "3.jpg").write_bytes(outra)
+    (pasta / "9.jpg").write_bytes(outra)
+    (pasta / "leia.txt").write_text("fora")
+    lotes = []
+
+    result = import_media_folder(empresa, str(pasta), batch_size=2, progress=lotes.append)
+    assert lotes == [2, 4]
+    assert {k: result[k] for k in ("arquivos", "vinculados", "novas", "repetidas", "bytes_repetidos")} == {
+        "arquivos": 4, "vinculados": 3, "novas": 2, "repetidas": 2, "bytes_repetidos": 2 * len(foto),
+    }
+    assert result["sem_produto"] == ["9"]
+    assert _refs(empresa) == {media_store.digest(foto): 2, media_store.digest(outra): 1}
+
+
+def _png():
+    from PyQt5.QtCore import QBuffer, QByteArray, QIODevice
+    from PyQt5.QtGui import QImage
+
+    image = QImage(8, 8, QImage.Format_RGB32)
+    image.fill(0x3366CC)
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    image.save(buffer, "PNG")
+    return bytes(data)
+
+
+def test_coleta_automatica_so_leva_orfas_antigas(empresa):
+    db_path = repo.get_company_db_path(empresa)
+    foto = _foto(4)
+    with manager.connection(db_path) as conn:
+        media_store.put(conn, db_path, media_store.prepare(foto))
+    path = media_store.media_path(db_path, media_store.digest(foto))
+
+    # recém-importada, ainda sem produto: fica
+    assert media_store.collect(db_path, media_store.CARENCIA_DIAS) == (0, 0)
+    assert os.path.exists(path)
+
+    antiga = time.time() - (media_store.CARENCIA_DIAS + 1) * 86400
+    os.utime(path, (antiga, antiga))
+    with manager.connection(db_path) as conn:
+        conn.execute("UPDATE midia SET criada_em = datetime('now', '-30 days')")
+    assert media_store.collect(db_path, media_store.CARENCIA_DIAS) == (1, len(foto))
+    assert not os.path.exists(path)
+
+
+def test_put_gera_a_miniatura_que_faltava(empresa):
+    db_path = repo.get_company_db_path(empresa)
+    foto = _png()
+    # quem preparou achava que a imagem já estava na biblioteca
+    with manager.connection(db_path) as conn:
+        key = media_store.put(conn, db_path, media_store.prepare(foto, thumb=False))
+        thumb = conn.execute("SELECT thumb FROM midia WHERE hash = ?", (key,)).fetchone()[0]
+    assert thumb
@@ -0,0 +1,66 @@
+import threading
+
+from app.database import user_repository as repo
+from app.database.connection import manager
+from app.database.migrations import ESTOQUE_BAIXO
+from app.services.dashboard import DashboardCache
+
+
+def _varredura(empresa):
+    """As mesmas métricas calculadas varrendo as tabelas"""
+    with manager.connection(repo.get_company_db_path(empresa)) as conn:
+        vendas, faturamento = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(total), 0) FROM vendas WHERE date(data) = date('now')"
+        ).fetchone()
+        clientes, = conn.execute("SELECT COUNT(*) FROM clients").fetchone()
+        baixo, valor = conn.execute(
+            "SELECT COALESCE(SUM(quantidade <= ?), 0), COALESCE(SUM(quantidade * valor), 0) FROM produto",
+            (ESTOQUE_BAIXO,)
+        ).fetchone()
+    return vendas, round(faturamento, 2), clientes, baixo, round(valor, 2)
+
+
+def _painel(empresa):
+    m = repo.get_dashboard_metrics(empresa)
+    return (m["vendas_hoje"], round(m["faturamento_hoje"], 2), m["clientes"],
+            m["estoque_baixo"], round(m["valor_estoque"], 2))
+
+
+def test_metricas_acompanham_as_escritas(empresa, produto):
+    assert _painel(empresa) == (0, 0, 0, 0, 0)
+    a, b = produto("1", ESTOQUE_BAIXO + 2, valor=3.5), produto("2", 40, valor=1.25)
+    produto("3", 0, valor=9.0)
+    repo.create_client(empresa, "Ana", "", "", "")
+    repo.create_client(empresa, "Bruno", "", "", "")
+    assert _painel(empresa) == _varredura(empresa)
+
+    repo.finalize_sale(empresa, [(a, 3), (b, 1)], "Pix")
+    repo.finalize_sale(empresa, [(b, 4)], "Dinheiro", desconto=0.5)
+    m = repo.get_dashboard_metrics(empresa)
+    assert (m["vendas_hoje"], m["ticket_medio"]) == (2, round((11.75 + 4.5) / 2, 2))
+    assert _painel(empresa) == _varredura(empresa)
+
+    repo.update_product(empresa, b, valor=2.0)
+    repo.delete_product(empresa, a)
+    repo.delete_client(empresa, repo.get_clients_page(empresa)[0][0][0])
+    assert _painel(empresa) == _varredura(empresa)
+
+
+def test_cache_le_numa_thread_e_guarda(empresa, produto):
+    produto("1", 2, valor=1.0)
+    cache = DashboardCache(ttl=60)
+    lidas, pronto = [], threading.Event()
+
+    def callback(metricas):
+        lidas.append(metricas)
+        pronto.set()
+
+    assert cache.get(empresa, callback) is None
+    assert pronto.wait(5)
+    assert lidas[0]["estoque_baixo"] == 1
+    assert cache.get(empresa) == lidas[0]
+
+    cache.invalidate(empresa)
+    pronto.clear()
+    assert cache.get(empresa, callback) is None
+    assert pronto.wait(5)
@@ -0,0 +1,68 @@
+import random
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.database import reports
+from app.database import user_repository as repo
+from app.database.connection import manager
+
+INTERVALOS = [
+    ("2026-01-01", "2026-04-01"),
+    ("2026-01-15 10:30:00", "2026-03-02 01:00:00"),
+    ("2026-02-03 07:00:00", "2026-02-09 09:45:00"),
+]
+
+
+@pytest.fixture
+def vendas(empresa, produto):
+    """~150 vendas espalhadas entre janeiro e março"""
+    ids = [produto(str(i), 10000, valor=1.5 * (i + 1), marca=f"Marca {i % 2}") for i in range(4)]
+    repo.create_funcionario(empresa, "Vendedor", "", "", "", "")
+    funcionario = repo.get_funcionarios_page(empresa)[0][0][0]
+    rng = random.Random(5)
+    datas = []
+    for _ in range(150):
+        itens = [(rng.choice(ids), rng.randint(1, 4)) for _ in range(rng.randint(1, 3))]
+        venda_id = repo.finalize_sale(empresa, itens, rng.choice(repo.FORMAS_PAGAMENTO),
+                                      desconto=rng.choice([0, 0, 1]))
+        data = datetime(2026, 1, 1) + timedelta(minutes=rng.randrange(90 * 24 * 60))
+        datas.append((data.strftime(reports.FORMATO), rng.choice([None, funcionario]), venda_id))
+    with manager.connection(repo.get_company_db_path(empresa)) as conn:
+        conn.executemany("UPDATE vendas SET data = ?, funcionario_id = ? WHERE id = ?", datas)
+    return ids
+
+
+def test_plano_cobre_o_intervalo_sem_buracos():
+    trechos = reports.plan("2026-01-15 10:30:00", "2026-03-02 01:00:00")
+    assert [fonte for fonte, _ini, _fim in trechos] == [
+        reports.BRUTO, reports.HORA, reports.DIA, reports.MES, reports.DIA, reports.HORA
+    ]
+    assert trechos[0][1] == datetime(2026, 1, 15, 10, 30)
+    assert trechos[-1][2] == datetime(2026, 3, 2, 1, 0)
+    assert all(a[2] == b[1] for a, b in zip(trechos, trechos[1:]))
+
+
+@pytest.mark.parametrize("por", sorted(reports.REPORTS))
+def test_rollups_batem_com_as_vendas(empresa, vendas, por):
+    for inicio, fim in INTERVALOS:
+        esperado = reports.sales_report(empresa, inicio, fim, por=por, rollups=False)
+        assert esperado
+        assert reports.sales_report(empresa, inicio, fim, por=por) == esperado
+
+
+def test_rollups_incrementais_e_recalculo(empresa, vendas):
+    inicio, fim = INTERVALOS[0]
+    antes = reports.sales_report(empresa, inicio, fim, por="produto")
+    assert repo.update_sales_rollups(empresa) == 0
+
+    venda_id = repo.finalize_sale(empresa, [(vendas[0], 2)], "Pix")
+    with manager.connection(repo.get_company_db_path(empresa)) as conn:
+        conn.execute("UPDATE vendas SET data = '2026-02-10 12:00:00' WHERE id = ?", (venda_id,))
+    depois = reports.sales_report(empresa, inicio, fim, por="produto")
+    assert depois == reports.sales_report(empresa, inicio, fim, por="produto", rollups=False)
+    assert depois != antes
+
+    repo.rebuild_sales_rollups(empresa, since="2026-02-01")
+    assert reports.sales_report(empresa, inicio, fim, por="marca") == \
+        reports.sales_report(empresa, inicio, fim, por="marca", rollups=False)
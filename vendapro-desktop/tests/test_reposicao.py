@@ -0,0 +1,53 @@
+from app.database import user_repository as repo
+from app.database.migrations import ESTOQUE_BAIXO
+
+
+def _alertas(empresa):
+    return [alerta[:4] for alerta in repo.get_stock_alerts(empresa)]
+
+
+def test_ponto_fixo_entra_e_sai_do_alerta(empresa, produto):
+    a, b = produto("1", 20), produto("2", 3)
+    # sem ponto fixo nem consumo vale ESTOQUE_BAIXO
+    assert _alertas(empresa) == [(b, "Produto 2", 3, ESTOQUE_BAIXO)]
+
+    assert repo.set_reorder_point(empresa, a, 25)
+    assert repo.get_reorder_point(empresa, a) == (25, 25)
+    assert _alertas(empresa) == [(b, "Produto 2", 3, ESTOQUE_BAIXO), (a, "Produto 1", 20, 25)]
+    assert [alerta[0] for alerta in repo.get_stock_alerts(empresa, limit=1)] == [b]
+
+    assert repo.set_reorder_point(empresa, a, None)
+    assert repo.get_reorder_point(empresa, a) == (None, ESTOQUE_BAIXO)
+    assert _alertas(empresa) == [(b, "Produto 2", 3, ESTOQUE_BAIXO)]
+    assert not repo.set_reorder_point(empresa, 999, 1)
+
+
+def test_ponto_calculado_pelo_consumo(empresa, produto):
+    a, b = produto("1", 50), produto("2", 50)
+    assert repo.finalize_sale(empresa, [(a, 40)], "Pix")
+    assert _alertas(empresa) == []
+
+    # 40 saídas em 30 dias cobrindo 10 dias: ceil(40 / 30 * 10) = 14
+    assert repo.update_reorder_points(empresa, force=True) == 1
+    assert repo.update_reorder_points(empresa) is None
+    assert repo.get_reorder_point(empresa, a) == (None, 14)
+    assert repo.get_reorder_point(empresa, b) == (None, ESTOQUE_BAIXO)
+    assert _alertas(empresa) == [(a, "Produto 1", 10, 14)]
+
+    # reposição tira do alerta; nada mudou no consumo
+    assert repo.apply_stock_movements(empresa, [(a, 10, repo.ENTRADA, "Compra")])
+    assert _alertas(empresa) == []
+    assert repo.update_reorder_points(empresa, force=True) == 0
+
+
+def test_ponto_gravado_junto_com_o_produto(empresa, produto):
+    a = produto("1", 20)
+    assert repo.update_product(empresa, a, nome="Arroz", ponto_reposicao=25)
+    assert repo.get_reorder_point(empresa, a) == (25, 25)
+    assert _alertas(empresa) == [(a, "Arroz", 20, 25)]
+
+    # sem ponto_reposicao o ponto fica; None volta ao automático
+    assert repo.update_product(empresa, a, valor=2.0)
+    assert repo.get_reorder_point(empresa, a) == (25, 25)
+    assert repo.update_product(empresa, a, ponto_reposicao=None)
+    assert _alertas(empresa) == []
@@ -0,0 +1,107 @@
+import random
+
+import numpy as np
+import pytest
+
+from app.database import user_repository as repo
+from app.database.connection import manager
+from app.services import routing
+from app.services.delivery_queue import drop_queue, get_queue
+
+LOJA = (-23.55, -46.63)
+
+
+@pytest.fixture
+def fila(empresa):
+    with manager.connection(repo.get_company_db_path(empresa)) as conn:
+        conn.executemany(
+            "INSERT INTO vendas (id, data, forma_pagamento, subtotal, total) VALUES (?, CURRENT_TIMESTAMP, 'Pix', 0, 0)",
+            [(v,) for v in range(1, 21)]
+        )
+    yield get_queue(empresa)
+    drop_queue(empresa)
+
+
+def _pontos(n, semente=1):
+    rng = random.Random(semente)
+    return [(LOJA[0] + rng.uniform(-0.1, 0.1), LOJA[1] + rng.uniform(-0.1, 0.1)) for _ in range(n)]
+
+
+def test_two_opt_sem_troca_que_encurte():
+    dist = routing.distance_matrix([LOJA] + _pontos(40))
+    inicial = routing.nearest_neighbour(dist)
+    tour = routing.two_opt(inicial, dist)
+
+    assert tour[0] == 0
+    assert sorted(tour.tolist()) == list(range(len(dist)))
+    assert routing.tour_length(tour, dist) <= routing.tour_length(inicial, dist)
+    # ótimo local: nenhuma inversão de trecho encurta o ciclo
+    comprimento = routing.tour_length(tour, dist)
+    for i in range(1, len(tour) - 1):
+        for j in range(i + 1, len(tour)):
+            trocado = np.concatenate((tour[:i], tour[i:j + 1][::-1], tour[j + 1:]))
+            assert routing.tour_length(trocado, dist) >= comprimento - 1e-9
+
+
+def test_distancia_haversine():
+    dist = routing.distance_matrix([(0, 0), (0, 1), (1, 0)])
+    assert dist[0, 1] == pytest.approx(111.19, abs=0.01)
+    assert dist[1, 0] == dist[0, 1]
+    assert np.allclose(np.diag(dist), 0)
+
+
+def test_lotes_por_zona_e_janela(fila):
+    pontos = _pontos(9)
+    # zona 0: sete saídas a cada 4 min (lote de 6 + 1); zona 1: uma sem coordenadas
+    for venda in range(1, 8):
+        fila.add(venda, f"Rua {venda}", 0, f"2026-01-01 10:{4 * venda:02d}:00", *pontos[venda])
+    fila.add(8, "Rua 8", 1, "2026-01-01 10:20:00")
+    fila.add(9, "Rua 9", 1, "2026-01-01 12:00:00", *pontos[0])
+
+    lotes = routing.plan_batches(fila.pending(), LOJA)
+    assert [(lote["zona"], len(lote["entregas"])) for lote in lotes] == [(0, 6), (1, 1), (0, 1), (1, 1)]
+    assert sorted(e["id"] for lote in lotes for e in lote["entregas"]) == sorted(e["id"] for e in fila.pending())
+    assert all(lote["prioridade"] == min(e["prioridade"] for e in lote["entregas"]) for lote in lotes)
+    assert lotes[1]["km"] == 0.0
+
+
+def test_rota_deixa_sem_coordenadas_no_fim(fila):
+    pontos = _pontos(4)
+    entregas = [fila.add(v, f"Rua {v}", 0, "2026-01-01 10:00:00", *pontos[v - 1]) for v in range(1, 4)]
+    entregas.append(fila.add(4, "Rua 4", 0, "2026-01-01 09:00:00"))
+
+    ordem, km = routing.route(entregas, LOJA)
+    assert ordem[-1]["id"] == entregas[-1]["id"]
+    assert sorted(e["id"] for e in ordem) == sorted(e["id"] for e in entregas)
+    assert km > 0
+
+
+def test_despacho_do_lote_grava_a_ordem(empresa, fila):
+    pontos = _pontos(3)
+    entregas = [fila.add(v, f"Rua {v}", 0, "2026-01-01 10:00:00", *pontos[v - 1]) for v in range(1, 4)]
+    [lote] = routing.plan_batches(fila.pending(), LOJA)
+    ids = [e["id"] for e in lote["entregas"]]
+
+    despachadas = fila.dispatch_batch(ids, 7)
+    assert [(e["id"], e["status"], e["entregador_id"], e["rota_ordem"]) for e in despachadas] == [
+        (entrega_id, repo.EM_ROTA, 7, ordem) for ordem, entrega_id in enumerate(ids, 1)
+    ]
+    assert fila.pending() == []
+    assert repo.get_address_coordinates(empresa, entregas[0]["endereco"]) == pytest.approx(pontos[0])
+
+
+def test_lote_com_parada_cancelada_mantem_a_ordem_do_banco(empresa, fila):
+    pontos = _pontos(3)
+    for v in range(1, 4):
+        fila.add(v, f"Rua {v}", 0, "2026-01-01 10:00:00", *pontos[v - 1])
+    [lote] = routing.plan_batches(fila.pending(), LOJA)
+    ids = [e["id"] for e in lote["entregas"]]
+    fila.cancel(ids[1])
+
+    despachadas = fila.dispatch_batch(ids, 7)
+    esperado = [(ids[0], repo.EM_ROTA, 7, 1), (ids[2], repo.EM_ROTA, 7, 3)]
+    assert [(e["id"], e["status"], e["entregador_id"], e["rota_ordem"]) for e in despachadas] == esperado
+    assert sorted((e["id"], e["status"], e["entregador_id"], e["rota_ordem"])
+                  for e in fila.open_deliveries()) == sorted(esperado)
+    for entrega_id, _status, _entregador, ordem in esperado:
+        assert repo.get_delivery(empresa, entrega_id)[repo.ENTREGA_FIELDS.index("rota_ordem")] == ordem
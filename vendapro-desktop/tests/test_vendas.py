@@ -0,0 +1,68 @@
+import sqlite3
+
+import pytest
+
+from app.database import user_repository as repo
+from app.database.connection import manager
+
+from conftest import saldo
+
+
+def _contagem(empresa):
+    """(vendas, itens, movimentos de saída)"""
+    with manager.connection(repo.get_company_db_path(empresa)) as conn:
+        return conn.execute("""
+            SELECT (SELECT COUNT(*) FROM vendas), (SELECT COUNT(*) FROM itens_venda),
+                   (SELECT COUNT(*) FROM estoque WHERE movimento_tipo = 'Saída')
+        """).fetchone()
+
+
+def test_venda_baixa_estoque_pelo_preco_do_cadastro(empresa, produto):
+    a, b = produto("1", 5, valor=2.5), produto("2", 3, valor=4.0)
+
+    venda_id = repo.finalize_sale(empresa, [(a, 2), (b, 1), (a, 1)], "Pix", desconto=1)
+    assert venda_id is not None
+    venda = repo.get_sale(empresa, venda_id)
+    assert (venda["subtotal"], venda["desconto"], venda["total"]) == (11.5, 1, 10.5)
+    assert [(nome, qtd, unitario) for nome, _codigo, qtd, unitario in venda["itens"]] == [
+        ("Produto 1", 3, 2.5), ("Produto 2", 1, 4.0)
+    ]
+    assert saldo(empresa, a) == (2, 2)
+    assert saldo(empresa, b) == (2, 2)
+    assert _contagem(empresa) == (1, 2, 2)
+
+
+def test_produto_inexistente_desfaz_a_venda(empresa, produto):
+    a = produto("1", 5)
+
+    assert repo.finalize_sale(empresa, [(a, 1), (999, 1)], "Pix") is None
+    assert saldo(empresa, a) == (5, 5)
+    assert _contagem(empresa) == (0, 0, 0)
+
+
+def test_estoque_insuficiente_desfaz_a_venda(empresa, produto):
+    a, b = produto("1", 5), produto("2", 1)
+
+    assert repo.finalize_sale(empresa, [(a, 2), (b, 2)], "Dinheiro") is None
+    assert saldo(empresa, a) == (5, 5)
+    assert saldo(empresa, b) == (1, 1)
+    assert _contagem(empresa) == (0, 0, 0)
+
+
+def test_carrinho_invalido(empresa, produto):
+    a = produto("1", 5)
+    assert repo.finalize_sale(empresa, [], "Pix") is None
+    assert repo.finalize_sale(empresa, [(a, 0)], "Pix") is None
+    assert repo.finalize_sale(empresa, [(a, 1)], "Pix", desconto=-1) is None
+    assert _contagem(empresa) == (0, 0, 0)
+
+
+def test_venda_recusada_desfaz_a_transacao_de_fora(empresa, produto):
+    a = produto("1", 5)
+    with pytest.raises(sqlite3.IntegrityError):
+        with manager.connection(repo.get_company_db_path(empresa)) as conn:
+            conn.execute("UPDATE produto SET nome = 'Renomeado' WHERE id = ?", (a,))
+            repo.finalize_sale(empresa, [(a, 1), (999, 1)], "Pix")
+    assert repo.get_product_by_id(empresa, a)[1] == "Produto 1"
+    assert saldo(empresa, a) == (5, 5)
+    assert _contagem(empresa) == (0, 0, 0)